@@ -6,6 +6,7 @@
 API端点:
 - POST /api/v1/ask - 标准问答
 - POST /api/v1/ask/deep - 深度分析模式
+- POST /api/v1/ask/stream - 流式问答（SSE：节点进度事件 + 答案token）
 - GET /api/v1/health - 健康检查
 - GET /api/v1/info - 系统信息
 - GET / - API文档入口
@@ -15,14 +16,15 @@ import os
 import sys
 import time
 import asyncio
+import json
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 from contextlib import asynccontextmanager
-from concurrent.futures import ThreadPoolExecutor
 
 import uvicorn
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
@@ -34,7 +36,9 @@ load_dotenv(project_root / ".env", override=True)
 # 导入项目模块
 from src.utils.logger import setup_logger
 from src.graph.workflow import QuestionAnswerWorkflow
+from src.resources import get_workflow
 from src.graph.state import create_initial_state, GraphState
+from src.graph.streaming import token_sink, summarize_node_progress, NODE_STAGES
 from src.config import settings
 
 # 初始化logger
@@ -109,7 +113,6 @@ class SystemInfoResponse(BaseModel):
 
 # ========== 全局变量 ==========
 workflow: Optional[QuestionAnswerWorkflow] = None
-executor = ThreadPoolExecutor(max_workers=4)
 
 # ========== 辅助函数 ==========
 
@@ -159,17 +162,61 @@ def extract_sub_answers(state: GraphState) -> Optional[List[SubAnswer]]:
         for sa in sub_answers
     ]
 
-def run_workflow_sync(question: str, deep_thinking: bool = False) -> GraphState:
-    """同步运行工作流"""
-    global workflow
+async def stream_workflow_events(question: str, deep_thinking: bool, emit) -> GraphState:
+    """
+    异步运行工作流，并通过emit回调推送流式事件
+
+    - 每个节点完成时推送 progress 事件
+    - 总结阶段2生成时推送 token 事件
+
+    Args:
+        question: 用户问题
+        deep_thinking: 是否启用深度分析模式
+        emit: 事件回调 emit(事件名称, 事件数据)，可从任意线程调用
+
+    Returns:
+        最终状态
+    """
     if workflow is None:
         raise RuntimeError("工作流未初始化")
 
-    # 创建初始状态
     initial_state = create_initial_state(question, deep_thinking_mode=deep_thinking)
+    final_state = initial_state
+
+    with token_sink(lambda text: emit("token", {"text": text})):
+        # 节点返回完整状态，因此最后一个节点的输出就是最终状态
+        async for update in workflow.graph.astream(initial_state, stream_mode="updates"):
+            for node_name, node_state in update.items():
+                final_state = node_state
+                if node_name in NODE_STAGES:
+                    emit("progress", summarize_node_progress(node_name, node_state))
+
+    return final_state
+
+def build_answer_response(question: str, state: GraphState, processing_time_ms: int) -> AnswerResponse:
+    """根据工作流最终状态构建响应"""
+    return AnswerResponse(
+        success=not state.get("error"),
+        question=question,
+        answer=state.get("final_answer", "抱歉，无法生成答案"),
+        intent=state.get("intent"),
+        question_type=state.get("question_type"),
+        parameters=state.get("parameters"),
+        sub_questions=state.get("sub_questions"),
+        sub_answers=extract_sub_answers(state),
+        sources_count=count_total_sources(state),
+        sources=extract_sources_from_state(state),
+        deep_thinking_mode=state.get("deep_thinking_mode", False),
+        reasoning_steps=state.get("reasoning_steps"),
+        kg_expansion_info=state.get("kg_expansion_info"),
+        processing_time_ms=processing_time_ms,
+        error=state.get("error")
+    )
 
-    # 运行工作流
-    return workflow.graph.invoke(initial_state)
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """格式化为Server-Sent Events消息"""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
 
 # ========== FastAPI 生命周期管理 ==========
 
@@ -206,7 +253,7 @@ async def lifespan(app: FastAPI):
         settings.production_mode = True
         logger.info("[启动] 已启用生产模式")
 
-        workflow = QuestionAnswerWorkflow()
+        workflow = get_workflow()
         logger.info("[启动] 问答工作流初始化成功")
 
     except Exception as e:
@@ -222,7 +269,6 @@ async def lifespan(app: FastAPI):
     # 清理资源
     logger.info("API服务正在关闭...")
     workflow = None
-    executor.shutdown(wait=False)
     logger.info("API服务已关闭")
 
 # ========== 创建 FastAPI 应用 ==========
@@ -319,35 +365,13 @@ async def ask_question(request: QuestionRequest):
     try:
         logger.info(f"[API] 收到问题: {request.question[:100]}...")
 
-        # 在线程池中运行同步工作流
-        loop = asyncio.get_event_loop()
-        state = await loop.run_in_executor(
-            executor,
-            run_workflow_sync,
-            request.question,
-            request.deep_thinking
-        )
+        # 在事件循环中异步运行工作流（多个问题可以并发处理）
+        state = await workflow.arun(request.question, deep_thinking_mode=request.deep_thinking)
 
         processing_time_ms = int((time.time() - start_time) * 1000)
 
         # 构建响应
-        response = AnswerResponse(
-            success=not state.get("error"),
-            question=request.question,
-            answer=state.get("final_answer", "抱歉，无法生成答案"),
-            intent=state.get("intent"),
-            question_type=state.get("question_type"),
-            parameters=state.get("parameters"),
-            sub_questions=state.get("sub_questions"),
-            sub_answers=extract_sub_answers(state),
-            sources_count=count_total_sources(state),
-            sources=extract_sources_from_state(state),
-            deep_thinking_mode=state.get("deep_thinking_mode", False),
-            reasoning_steps=state.get("reasoning_steps"),
-            kg_expansion_info=state.get("kg_expansion_info"),
-            processing_time_ms=processing_time_ms,
-            error=state.get("error")
-        )
+        response = build_answer_response(request.question, state, processing_time_ms)
 
         logger.info(f"[API] 问题处理完成，耗时: {processing_time_ms}ms")
         return response
@@ -380,6 +404,67 @@ async def ask_question_deep(request: QuestionRequest):
     request.deep_thinking = True
     return await ask_question(request)
 
+@app.post("/api/v1/ask/stream", tags=["QA"])
+async def ask_question_stream(request: QuestionRequest):
+    """
+    流式问答接口（Server-Sent Events）
+
+    事件类型:
+    - **progress**: 节点完成（cache/intent/classify/extract/decompose/retrieve/summarize/exception）
+    - **token**: 答案生成片段（总结阶段2，按到达顺序推送）
+    - **done**: 最终结果（与 /api/v1/ask 的响应结构相同）
+    - **error**: 处理失败
+
+    命中答案缓存时不会推送token事件，答案直接包含在done事件中
+    """
+    if workflow is None:
+        raise HTTPException(status_code=503, detail="服务正在初始化，请稍后重试")
+
+    logger.info(f"[API] 收到流式问题: {request.question[:100]}...")
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def emit(event: str, data: Dict[str, Any]):
+        # 同步节点在线程池中运行，统一通过事件循环线程安全地入队
+        loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+    async def event_stream():
+        start_time = time.time()
+        future = asyncio.ensure_future(
+            stream_workflow_events(request.question, request.deep_thinking, emit)
+        )
+        # 工作流结束后放入结束标记（排在所有已推送事件之后）
+        future.add_done_callback(lambda _: loop.call_soon(queue.put_nowait, None))
+
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                event, data = item
+                yield format_sse(event, data)
+        finally:
+            # 客户端提前断开时取消工作流
+            if not future.done():
+                future.cancel()
+
+        processing_time_ms = int((time.time() - start_time) * 1000)
+        try:
+            state = future.result()
+            response = build_answer_response(request.question, state, processing_time_ms)
+            logger.info(f"[API] 流式问题处理完成，耗时: {processing_time_ms}ms")
+            yield format_sse("done", response.model_dump())
+        except Exception as e:
+            logger.error(f"[API] 流式处理问题失败: {str(e)}")
+            yield format_sse("error", {"error": str(e), "processing_time_ms": processing_time_ms})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # ========== 示例问题端点 ==========
 
 @app.get("/api/v1/examples", tags=["Help"])
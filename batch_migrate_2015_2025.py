@@ -2,6 +2,15 @@
 """
 2015-2025年德国议会数据大规模批量迁移系统
 使用最新的GPU优化参数，支持断点续传和智能进度管理
+
+断点续传分两级:
+- batch_migration_progress.json: 已完成/失败的年份
+- batch_migration_checkpoint.jsonl: 年份内每个已embedding并写入Qdrant的批次（chunk序号区间），
+  中断后重启直接从第一个未确认的批次继续，不重复计算已写入的embedding
+
+点ID由年份和chunk序号确定（year * 10_000_000 + chunk序号），重新写入同一批次会覆盖而不是重复。
+旧版本按时间戳生成点ID，新ID无法覆盖旧集合中的这些数据点；因此每个年份从头开始
+（没有检查点、指纹变化或--no-resume）时，先按source_file删除该年份文件已有的数据点再写入
 """
 
 import json
@@ -29,6 +38,7 @@ from src.vectordb.qdrant_client import create_qdrant_client
 from src.llm.embeddings import GeminiEmbeddingClient
 from src.utils.logger import logger
 from src.data_loader.splitter import ParliamentTextSplitter
+from src.data_loader.checkpoint import CheckpointLog, fingerprint
 
 @dataclass
 class MigrationTask:
@@ -73,6 +83,7 @@ class BatchMigrator2015to2025:
         self.progress_file = Path("batch_migration_progress.json")
         self.completed_years = set()
         self.failed_years = set()
+        self.checkpoint_log = CheckpointLog("batch_migration_checkpoint.jsonl")
         
         # 初始化组件
         logger.info("[BatchMigrator] 🚀 初始化大规模迁移系统...")
@@ -299,10 +310,27 @@ class BatchMigrator2015to2025:
             # 3. 批量生成embedding并插入
             logger.info(f"[{task.year}] 🧠 批量生成embedding...")
             
-            current_point_id = int(time.time() * 1000000) % 1000000000  # 基于时间戳生成起始ID
+            # 年份内检查点：数据文件或分块参数变化时chunk序号不再对应，从头开始
+            scope = str(task.year)
+            file_stat = task.file_path.stat()
+            start_index = self.checkpoint_log.begin(
+                scope,
+                fingerprint=fingerprint(task.file_path.name, file_stat.st_size, file_stat.st_mtime,
+                                        self.chunk_size, self.chunk_overlap),
+                resume=self.resume_from_checkpoint
+            )
+            if start_index > 0:
+                logger.info(f"[{task.year}] ⏩ 从检查点恢复: 跳过前 {start_index:,} 个chunks")
+            else:
+                # 从头开始: 清除该年份已有的数据点（旧版本的时间戳ID或分块变化前的chunk序号），避免重复
+                deleted = self.qdrant_client.delete_by_source_file(self.collection_name, task.file_path.name)
+                if deleted:
+                    logger.info(f"[{task.year}] 🧹 已清除该年份已有的 {deleted:,} 个数据点")
             
-            for i in range(0, len(all_chunks), self.embedding_batch_size):
+            for i in range(start_index, len(all_chunks), self.embedding_batch_size):
                 batch_chunks = all_chunks[i : i + self.embedding_batch_size]
+                if self.checkpoint_log.is_acknowledged(scope, i, i + len(batch_chunks)):
+                    continue
                 texts_to_embed = [chunk["text"] for chunk in batch_chunks]
                 
                 # 批量生成embedding
@@ -318,56 +346,38 @@ class BatchMigrator2015to2025:
                         payload = chunk_data["metadata"]
                         payload["text"] = chunk_data["text"]
                         
+                        # 由年份和chunk序号确定点ID，重启后重新写入未确认的批次会覆盖而不是重复
                         points_to_upsert.append({
-                            "id": current_point_id,
+                            "id": task.year * 10_000_000 + i + j,
                             "vector": vector,
                             "payload": payload
                         })
-                        current_point_id += 1
                 
-                    # 批量插入到Qdrant
+                # 并发分批插入到Qdrant（失败时自动减小批次并退避重试）
                 if points_to_upsert:
-                    try:
-                        self.qdrant_client.upsert_german_parliament_data(
-                            collection_name=self.collection_name,
-                            data_points=points_to_upsert
-                        )
-                    except Exception as e:
-                        logger.error(f"[{task.year}] ❌ Qdrant插入失败: {str(e)}")
-                        # 重试机制
-                        for retry in range(3):
-                            try:
-                                logger.info(f"[{task.year}] 🔄 重试插入 ({retry+1}/3)")
-                                time.sleep(2 ** retry)  # 指数退避
-                                self.qdrant_client.upsert_german_parliament_data(
-                                    collection_name=self.collection_name,
-                                    data_points=points_to_upsert
-                                )
-                                break
-                            except Exception as retry_e:
-                                logger.warning(f"[{task.year}] ⚠️  重试失败: {str(retry_e)}")
-                                if retry == 2:  # 最后一次重试
-                                    raise retry_e
+                    report = self.qdrant_client.bulk_upsert_german_parliament_data(
+                        collection_name=self.collection_name,
+                        data_points=points_to_upsert,
+                        batch_size=self.qdrant_batch_size
+                    )
+                    if report.failed:
+                        raise RuntimeError(f"Qdrant插入失败: {report.failed}个数据点重试后仍失败")
+                
+                # 写入成功后确认该批次（fsync后才继续下一批）
+                self.checkpoint_log.acknowledge(scope, i, i + len(batch_chunks), points=len(points_to_upsert))
                 
-                # 进度报告和检查点保存
+                # 进度报告
                 processed = min(i + self.embedding_batch_size, len(all_chunks))
                 progress = (processed / len(all_chunks)) * 100
                 logger.info(f"[{task.year}] 📊 进度: {progress:.1f}% ({processed}/{len(all_chunks)})")
                 
-                # 每10%或每5000个chunks保存一次检查点
-                if processed % 5000 == 0 or progress % 10 == 0:
-                    logger.info(f"[{task.year}] 💾 保存进度检查点...")
-                    # 更新任务状态
-                    temp_task = task
-                    temp_task.chunks_count = processed
-                    # 这里可以添加更详细的进度保存逻辑
-                
                 # 内存清理 (每20批次)
                 if (i // self.embedding_batch_size) % 20 == 0:
                     import gc
                     gc.collect()
                     logger.debug(f"[{task.year}] 🧹 内存清理完成")
             
+            self.checkpoint_log.complete(scope)
             task.end_time = time.time()
             task.status = "completed"
             
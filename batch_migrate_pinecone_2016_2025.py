@@ -2,6 +2,18 @@
 """
 批量迁移2016-2025年数据到Pinecone
 基于已验证的migrate_2015_optimal_config.py配置
+
+增量模式（默认）: 通过ChunkManifest只embedding并上传新增/变化的chunk，删除已不存在的chunk的向量；
+只有元数据变化的chunk（例如修正日期）只更新向量元数据，不重新embedding；
+--full 关闭增量模式（按年份跳过已存在的数据）；此时由检查点日志记录每个已上传的chunk区间，
+中断后重启从第一个未确认的窗口继续
+
+增量模式的向量ID由chunk键生成（"年份_哈希"），旧版脚本上传的 "年份_时间戳_序号" 向量不在清单中，
+不会被当作孤儿删除。增量模式发现索引中有清单之外的向量时拒绝继续（否则每个chunk会有两份向量）；
+首次切换到增量模式时使用 --replace-legacy: 按新ID重新上传，全部上传成功后删除这些旧向量
+
+演讲提取、分块、chunk键和向量元数据与ingest_pipeline.py相同（build_chunk / chunk_payload），
+两者共用german-bge的增量清单，交替运行不会重新embedding或互相删除向量
 """
 
 import os
@@ -19,15 +31,30 @@ sys.path.append(str(project_root))
 # 加载环境变量
 load_dotenv(project_root / ".env", override=True)
 
+from src.config import settings
 from src.utils.logger import setup_logger
 from src.llm.embeddings import GeminiEmbeddingClient
+from src.data_loader.checkpoint import CheckpointLog, fingerprint
+from src.data_loader.loader import iter_json_file
+from src.data_loader.manifest import (
+    ChunkManifest, build_chunk, chunk_payload, find_untracked_vector_ids, make_vector_id
+)
 from src.data_loader.splitter import ParliamentTextSplitter
+from src.vectordb.bulk_writer import BulkWriter
+from src.vectordb.index_epoch import bump_index_epoch
+from src.vectordb.metadata_patcher import MetadataPatcher
 from pinecone import Pinecone
 
 logger = setup_logger()
 
+EMBEDDING_MODEL = "BAAI/bge-m3"
+
+# 每次embedding并上传的chunk数（检查点粒度）
+EMBED_WINDOW = 1000
 
-def migrate_year(year: int, embedding_client, text_splitter, pinecone_index, skip_if_exists=True):
+
+def migrate_year(year: int, embedding_client, text_splitter, pinecone_index, skip_if_exists=True, manifest=None,
+                 checkpoint=None, replace_legacy=False):
     """
     迁移单个年份的数据
 
@@ -36,7 +63,11 @@ def migrate_year(year: int, embedding_client, text_splitter, pinecone_index, ski
         embedding_client: Embedding客户端
         text_splitter: 文本分块器
         pinecone_index: Pinecone索引
-        skip_if_exists: 如果数据已存在则跳过
+        skip_if_exists: 如果数据已存在则跳过（增量模式下不使用）
+        manifest: 增量索引清单（None表示全量上传）
+        checkpoint: 检查点日志（全量模式下按chunk区间断点续传）
+        replace_legacy: 增量模式下删除索引中不在清单里的向量（全部上传成功后）；
+            为False时遇到这样的向量则该年份失败
 
     Returns:
         dict: 迁移结果统计
@@ -49,7 +80,9 @@ def migrate_year(year: int, embedding_client, text_splitter, pinecone_index, ski
 
     try:
         # 1. 检查是否已迁移
-        if skip_if_exists:
+        # 上次中断的年份不跳过，从检查点继续
+        interrupted = checkpoint is not None and checkpoint.in_progress(str(year))
+        if skip_if_exists and manifest is None and not interrupted:
             stats = pinecone_index.describe_index_stats()
             # 检查是否有该年份的数据
             query_result = pinecone_index.query(
@@ -78,18 +111,16 @@ def migrate_year(year: int, embedding_client, text_splitter, pinecone_index, ski
             }
 
         logger.info(f"📂 加载{year}年数据文件...")
-        with open(data_file, 'r', encoding='utf-8') as f:
-            raw_data = json.load(f)
-
-        if 'transcript' not in raw_data:
-            logger.error(f"❌ {year}年数据文件格式错误")
+        # 与ingest_pipeline.py相同的演讲提取和分块，chunk键和元数据由build_chunk生成（两者共用增量清单）
+        data = list(iter_json_file(data_file))
+        if not data:
+            logger.error(f"❌ {year}年数据文件格式错误或没有演讲")
             return {
                 "year": year,
                 "status": "failed",
                 "reason": "invalid_format"
             }
 
-        data = raw_data['transcript']
         file_size_mb = data_file.stat().st_size / (1024*1024)
 
         logger.info(f"✅ {year}年数据加载成功")
@@ -98,142 +129,208 @@ def migrate_year(year: int, embedding_client, text_splitter, pinecone_index, ski
 
         # 3. 分块处理
         logger.info(f"🔄 分块{year}年数据...")
-        all_chunks = []
-        total_chars = 0
-
-        for i, item in enumerate(data):
-            text_id = item.get('text_id', f'{year}_unknown_{i}')
-            speech = item.get('speech', '')
-            metadata = item.get('metadata', {})
-
-            if not speech.strip():
-                continue
-
-            total_chars += len(speech)
-
-            # 分块
-            chunk_texts = text_splitter.text_splitter.split_text(speech)
-
-            # 添加元数据
-            for j, chunk_text in enumerate(chunk_texts):
-                chunk = {
-                    'text_id': f"{text_id}_chunk_{j}",
-                    'original_text_id': text_id,
-                    'chunk_index': j,
-                    'text': chunk_text.strip(),
-                    'metadata': {
-                        # Core time fields (separate for precise filtering)
-                        'year': metadata.get('year', str(year)),
-                        'month': metadata.get('month', '01'),
-                        'day': metadata.get('day', '01'),
-
-                        # Document ID (crucial for citation)
-                        'id': metadata.get('id', text_id),
-
-                        # Speaker information
-                        'speaker': metadata.get('speaker', ''),
-                        'group': metadata.get('group', ''),
-                        'lp': metadata.get('lp', ''),
-
-                        # Session information
-                        'session': metadata.get('session', ''),
-
-                        # User-friendly source reference: "id + speaker + time"
-                        'source_reference': f"{metadata.get('id', text_id)} | {metadata.get('speaker', 'Unknown')} | {metadata.get('year', year)}-{metadata.get('month', '01')}-{metadata.get('day', '01')}",
-
-                        # Technical fields
-                        'chunk_size': len(chunk_text.strip()),
-                        'total_chunks': len(chunk_texts),
-                        'source': 'german_parliament'
-                    }
-                }
-                all_chunks.append(chunk)
+        all_chunks = [build_chunk(chunk, default_year=str(year)) for chunk in text_splitter.split_speeches(data)]
 
         logger.info(f"✅ {year}年数据分块完成")
         logger.info(f"   原始记录: {len(data)} 条")
         logger.info(f"   生成块数: {len(all_chunks)} 个")
         logger.info(f"   平均块大小: {sum(len(c['text']) for c in all_chunks) / len(all_chunks):.0f} 字符")
 
-        # 4. 生成Embeddings
-        logger.info(f"🧠 生成{year}年BGE-M3 embeddings...")
-        texts = [chunk['text'] for chunk in all_chunks]
-
-        embedding_start = time.time()
-        vectors = embedding_client.embed_batch(
-            texts,
-            batch_size=128,  # embedding优化
-            max_workers=1    # GPU单线程
-        )
-        embedding_time = time.time() - embedding_start
-
-        logger.info(f"✅ Embedding生成完成")
-        logger.info(f"   生成时间: {embedding_time:.2f} 秒")
-        logger.info(f"   处理速度: {len(texts)/embedding_time:.1f} 条/秒")
+        # 增量模式：只处理新增/变化的chunk
+        orphaned_ids = []
+        legacy_ids = []
+        metadata_only = []
+        if manifest is not None:
+            # 清单之外的向量不会被当作孤儿删除，按新ID上传会产生重复
+            legacy_ids = find_untracked_vector_ids(pinecone_index.list(prefix=f'{year}_'), manifest.vector_ids(str(year)))
+            if legacy_ids and not replace_legacy:
+                logger.error(
+                    f"❌ {year}年索引中有 {len(legacy_ids)} 个向量不在增量清单中（旧版ID或清单丢失），"
+                    f"继续会产生重复向量。使用 --replace-legacy 重新上传并删除这些向量，或使用 --full"
+                )
+                return {
+                    "year": year,
+                    "status": "failed",
+                    "reason": "untracked_vectors",
+                    "untracked": len(legacy_ids)
+                }
+            if legacy_ids:
+                logger.info(f"♻️  {year}年有 {len(legacy_ids)} 个清单之外的向量，上传成功后删除")
+
+            plan = manifest.plan(
+                all_chunks,
+                chunk_params={
+                    'chunk_size': text_splitter.chunk_size,
+                    'chunk_overlap': text_splitter.chunk_overlap
+                },
+                model_name=EMBEDDING_MODEL,
+                years=[str(year)]
+            )
+            all_chunks = plan.to_embed
+            orphaned_ids = plan.orphaned_ids
+            metadata_only = plan.metadata_only
+            logger.info(
+                f"📋 增量计划: 需要embedding {len(all_chunks)} 个, 只更新元数据 {len(metadata_only)} 个, "
+                f"未变化 {plan.unchanged} 个, 待删除 {len(orphaned_ids)} 个"
+            )
+            if plan.is_empty and not legacy_ids:
+                logger.info(f"⏭️  {year}年数据没有变化，跳过")
+                return {
+                    "year": year,
+                    "status": "skipped",
+                    "reason": "unchanged",
+                    "unchanged": plan.unchanged
+                }
 
-        # 检查NaN
-        import math
-        nan_count = sum(1 for v in vectors if any(math.isnan(x) or math.isinf(x) for x in v))
-        if nan_count > 0:
-            logger.error(f"❌ 发现{nan_count}个NaN/Inf向量")
-            return {
-                "year": year,
-                "status": "failed",
-                "reason": "nan_vectors"
-            }
+        # 4-5. 分窗口生成Embeddings并上传到Pinecone
+        # 每个窗口写入后才处理下一个：中断时最多丢失一个窗口的embedding
+        # （增量模式由清单记录已上传的chunk；全量模式由检查点日志记录已确认的chunk区间）
+        scope = str(year)
+        start_index = 0
+        if checkpoint is not None:
+            file_stat = data_file.stat()
+            start_index = checkpoint.begin(
+                scope,
+                fingerprint=fingerprint(data_file.name, file_stat.st_size, file_stat.st_mtime,
+                                        text_splitter.chunk_size, text_splitter.chunk_overlap)
+            )
+            if start_index > 0:
+                logger.info(f"⏩ 从检查点恢复: 跳过前 {start_index} 个chunks")
 
-        # 5. 上传到Pinecone
-        logger.info(f"📤 上传{year}年数据到Pinecone...")
+        logger.info(f"🧠 生成{year}年BGE-M3 embeddings并上传到Pinecone...")
 
         # 获取上传前状态
         stats_before = pinecone_index.describe_index_stats()
         initial_count = stats_before['total_vector_count']
 
-        # 准备向量数据
-        vector_data = []
-        timestamp = int(time.time())
-
-        for i, (chunk, vector) in enumerate(zip(all_chunks, vectors)):
-            vector_item = {
-                "id": f"{year}_{timestamp}_{i}",
-                "values": vector,
-                "metadata": {
-                    **chunk['metadata'],
-                    "text": chunk['text'][:1000] + "..." if len(chunk['text']) > 1000 else chunk['text'],
-                    "original_text_id": chunk['original_text_id'],
-                    "chunk_index": chunk['chunk_index'],
-                    "upload_timestamp": timestamp
+        writer = BulkWriter(
+            lambda batch_vectors: pinecone_index.upsert(vectors=batch_vectors),
+            max_in_flight=4,
+            initial_batch_size=100,
+            name=f"pinecone-{year}"
+        )
+        embedding_time = 0.0
+        embedded_count = 0
+        uploaded_count = 0
+        failed_batches = 0
+        upload_start = time.time()
+
+        import math
+        for window_start in range(start_index, len(all_chunks), EMBED_WINDOW):
+            window = all_chunks[window_start:window_start + EMBED_WINDOW]
+            window_end = window_start + len(window)
+            if checkpoint is not None and checkpoint.is_acknowledged(scope, window_start, window_end):
+                continue
+
+            embedding_start = time.time()
+            vectors = embedding_client.embed_batch(
+                [chunk['text'] for chunk in window],
+                batch_size=128,  # embedding优化
+                max_workers=1    # GPU单线程
+            )
+            embedding_time += time.time() - embedding_start
+            embedded_count += len(window)
+
+            # 检查NaN
+            nan_count = sum(1 for v in vectors if any(math.isnan(x) or math.isinf(x) for x in v))
+            if nan_count > 0:
+                logger.error(f"❌ 发现{nan_count}个NaN/Inf向量")
+                return {
+                    "year": year,
+                    "status": "failed",
+                    "reason": "nan_vectors"
                 }
-            }
-            vector_data.append(vector_item)
 
-        # 批量上传
-        batch_size = 100
-        total_batches = (len(vector_data) + batch_size - 1) // batch_size
+            # 准备向量数据（向量ID由chunk键确定，重启后重新上传未确认的窗口会覆盖而不是重复）
+            vector_data = []
+            for chunk, vector in zip(window, vectors):
+                vector_data.append({
+                    "id": chunk['vector_id'] if manifest is not None else make_vector_id(chunk['year'], chunk['chunk_key']),
+                    "values": vector,
+                    "metadata": chunk_payload(chunk, max_text_chars=1000)
+                })
 
-        upload_start = time.time()
-        uploaded_count = 0
+            # 并发批量上传（按条数和请求体大小切分，失败时减小批次重试）
+            chunk_by_id = {item["id"]: chunk for item, chunk in zip(vector_data, window)}
 
-        for batch_idx in range(total_batches):
-            batch_start = batch_idx * batch_size
-            batch_end = min(batch_start + batch_size, len(vector_data))
-            batch_vectors = vector_data[batch_start:batch_end]
+            def commit_batch(batch_vectors):
+                # 上传成功后才记入清单，失败的批次下次重建时重新处理
+                if manifest is not None:
+                    manifest.commit([chunk_by_id[item["id"]] for item in batch_vectors])
 
-            try:
-                pinecone_index.upsert(vectors=batch_vectors)
-                uploaded_count += len(batch_vectors)
+            report = writer.write(vector_data, on_batch_written=commit_batch)
+            uploaded_count += report.written
+            window_failed = report.failed > 0
+            if window_failed:
+                logger.error(f"   ❌ 窗口 {window_start}-{window_end}: {report.failed} 个向量上传失败")
+                failed_batches += 1
 
-                if (batch_idx + 1) % 10 == 0:
-                    logger.info(f"   进度: {batch_idx+1}/{total_batches} 批次")
-            except Exception as e:
-                logger.error(f"   ❌ 批次 {batch_idx+1} 上传失败: {str(e)}")
-                continue
+            # 整个窗口上传成功后确认检查点
+            if checkpoint is not None and not window_failed:
+                checkpoint.acknowledge(scope, window_start, window_end, vectors=len(vector_data))
+
+            logger.info(f"   进度: {window_end}/{len(all_chunks)} chunks")
+
+        if checkpoint is not None and failed_batches == 0:
+            checkpoint.complete(scope)
+
+        logger.info(f"✅ Embedding生成完成")
+        logger.info(f"   生成时间: {embedding_time:.2f} 秒")
+        logger.info(f"   处理速度: {embedded_count/max(embedding_time, 1e-6):.1f} 条/秒")
 
         upload_time = time.time() - upload_start
 
         logger.info(f"✅ Pinecone上传完成")
         logger.info(f"   上传向量数: {uploaded_count}")
         logger.info(f"   上传时间: {upload_time:.2f} 秒")
-        logger.info(f"   平均速度: {uploaded_count/upload_time:.1f} 向量/秒")
+        logger.info(f"   平均速度: {uploaded_count/max(upload_time, 1e-6):.1f} 向量/秒")
+
+        # 删除已不存在的chunk的向量
+        deleted_count = 0
+        for start in range(0, len(orphaned_ids), 1000):
+            batch_ids = orphaned_ids[start:start + 1000]
+            try:
+                pinecone_index.delete(ids=batch_ids)
+                manifest.remove(batch_ids)
+                deleted_count += len(batch_ids)
+            except Exception as e:
+                logger.error(f"   ❌ 删除孤儿向量失败: {str(e)}")
+        if orphaned_ids:
+            logger.info(f"🗑️  删除孤儿向量: {deleted_count}/{len(orphaned_ids)}")
+
+        # 只有元数据变化的chunk: 复用原向量，只更新元数据
+        metadata_updated = 0
+        if metadata_only:
+            payloads = {chunk['vector_id']: chunk_payload(chunk, max_text_chars=1000) for chunk in metadata_only}
+            patch_report = MetadataPatcher(
+                pinecone_index,
+                desired_metadata=lambda vector_id, _: payloads.get(vector_id),
+                name=f"pinecone-{year}"
+            ).patch(
+                [list(payloads)[start:start + 100] for start in range(0, len(payloads), 100)]
+            )
+            if patch_report.failed == 0:
+                manifest.commit(metadata_only)
+                metadata_updated = len(metadata_only)
+            else:
+                # 不记入清单，下次运行重新检测
+                logger.error(f"   ❌ 元数据更新失败: {patch_report.failed} 个向量")
+            logger.info(f"🏷️  更新元数据: {metadata_updated}/{len(metadata_only)}")
+
+        # 清单之外的旧向量只在全部新向量上传成功后删除，避免检索不到这一年的数据
+        legacy_deleted = 0
+        if legacy_ids and failed_batches == 0:
+            for start in range(0, len(legacy_ids), 1000):
+                batch_ids = legacy_ids[start:start + 1000]
+                try:
+                    pinecone_index.delete(ids=batch_ids)
+                    legacy_deleted += len(batch_ids)
+                except Exception as e:
+                    logger.error(f"   ❌ 删除旧向量失败: {str(e)}")
+            logger.info(f"🗑️  删除清单之外的旧向量: {legacy_deleted}/{len(legacy_ids)}")
+        elif legacy_ids:
+            logger.warning(f"⚠️  有上传失败的批次，保留 {len(legacy_ids)} 个旧向量，重新运行后再删除")
+        deleted_count += legacy_deleted
 
         # 等待索引更新
         time.sleep(3)
@@ -257,7 +354,7 @@ def migrate_year(year: int, embedding_client, text_splitter, pinecone_index, ski
         chunks_count = len(all_chunks)
 
         # 清理内存
-        del vectors, vector_data, all_chunks, data
+        del all_chunks, data
         gc.collect()
 
         return {
@@ -266,6 +363,8 @@ def migrate_year(year: int, embedding_client, text_splitter, pinecone_index, ski
             "records": records_count,
             "chunks": chunks_count,
             "vectors": uploaded_count,
+            "deleted": deleted_count,
+            "metadata_updated": metadata_updated,
             "embedding_time": embedding_time,
             "upload_time": upload_time,
             "total_time": total_time
@@ -285,6 +384,9 @@ def migrate_year(year: int, embedding_client, text_splitter, pinecone_index, ski
 
 def main():
     """主函数"""
+    incremental = "--full" not in sys.argv[1:]
+    replace_legacy = "--replace-legacy" in sys.argv[1:]
+
     logger.info("🚀 开始2016-2025年数据批量迁移")
     logger.info("="*80)
 
@@ -307,6 +409,11 @@ def main():
     index = pc.Index("german-bge")
     logger.info("✅ Pinecone客户端初始化完成")
 
+    # 增量索引清单
+    manifest = ChunkManifest(settings.ingestion_manifest_path, index_name="german-bge") if incremental else None
+    checkpoint = None if incremental else CheckpointLog(str(project_root / "batch_migration_checkpoint_2016_2025.jsonl"))
+    logger.info(f"✅ 迁移模式: {'增量（清单: ' + settings.ingestion_manifest_path + '）' if incremental else '全量'}")
+
     # 文本分块器
     text_splitter = ParliamentTextSplitter(
         chunk_size=4000,
@@ -318,6 +425,15 @@ def main():
     stats_initial = index.describe_index_stats()
     logger.info(f"📊 迁移前Pinecone状态: {stats_initial['total_vector_count']} 向量")
 
+    # 清单为空而索引已有数据: 索引是旧版脚本或全量模式建立的，增量模式会重复上传全部数据
+    if incremental and manifest.count() == 0 and stats_initial['total_vector_count'] > 0 and not replace_legacy:
+        logger.error(
+            f"❌ 增量清单为空，但索引已有 {stats_initial['total_vector_count']} 个向量。"
+            f"使用 --replace-legacy 按新ID重建并删除旧向量，或使用 --full 跳过已存在的年份"
+        )
+        manifest.close()
+        return 1
+
     # 要迁移的年份 (2015已完成，从2016开始)
     years = list(range(2016, 2026))  # 2016-2025
 
@@ -337,7 +453,10 @@ def main():
             embedding_client=embedding_client,
             text_splitter=text_splitter,
             pinecone_index=index,
-            skip_if_exists=True
+            skip_if_exists=True,
+            manifest=manifest,
+            checkpoint=checkpoint,
+            replace_legacy=replace_legacy
         )
 
         results.append(result)
@@ -360,6 +479,10 @@ def main():
     failed_count = sum(1 for r in results if r['status'] == 'failed')
     skipped_count = sum(1 for r in results if r['status'] == 'skipped')
 
+    # 索引内容已变化，使答案缓存等依赖检索结果的缓存失效
+    if success_count > 0:
+        bump_index_epoch(f"批量迁移{success_count}个年份")
+
     logger.info(f"\n📊 迁移统计:")
     logger.info(f"   成功: {success_count}")
     logger.info(f"   失败: {failed_count}")
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+流水线索引构建（加载 / 分块 / 元数据丰富 / Embedding / 写入 同时进行）
+
+用法:
+    python ingest_pipeline.py --backend pinecone --years 2019 2020
+    python ingest_pipeline.py --backend qdrant --collection german_parliament
+    python ingest_pipeline.py --backend local --years 2019      # 本地索引一次性构建，总是全量
+    python ingest_pipeline.py --backend artifacts --years 2019  # 写入Embedding产物存储，之后可导入任意向量库
+
+增量模式（默认，pinecone/qdrant）: 通过ChunkManifest只embedding并写入新增/变化的chunk，删除孤儿向量；
+--full 关闭增量模式。只有能删除向量的后端（supports_delete）支持增量模式
+
+增量模式发现索引中有清单之外的向量（旧版脚本按 "年份_时间戳_序号" 上传的向量）时拒绝继续，
+否则每个chunk会有两份向量；首次切换到增量模式时使用 --replace-legacy: 按新ID重新上传，全部写入成功后删除这些旧向量
+
+local / artifacts 后端（supports_sparse）在Embedding阶段同时保存BGE-M3稀疏词项权重，
+本地索引据此构建稀疏倒排索引（混合检索）；--no-sparse 关闭
+
+pinecone 后端通过BulkWriter并发写入（--upsert-workers个请求同时在途，AIMD调整批次大小），
+流水线写入阶段为单worker，每次交给它 --upsert-batch-size × --upsert-workers 个chunk
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+import numpy as np
+from dotenv import load_dotenv
+
+project_root = Path(__file__).resolve().parent
+sys.path.append(str(project_root))
+
+load_dotenv(project_root / ".env", override=True)
+
+from src.config import settings
+from src.utils import logger
+from src.data_loader import ParliamentDataLoader, ParliamentTextSplitter, ChunkManifest
+from src.data_loader.manifest import chunk_payload, find_untracked_vector_ids
+from src.data_loader.pipeline import UntrackedVectorsError, run_ingestion
+from src.vectordb.bulk_writer import BulkWriter
+from src.vectordb.index_epoch import bump_index_epoch
+from src.vectordb.metadata_patcher import MetadataPatcher
+
+
+class PineconeSink:
+    """写入Pinecone索引（BulkWriter: 多个请求同时在途，按字节数切分批次，失败的批次拆分重试）"""
+
+    supports_delete = True
+    supports_sparse = False
+
+    def __init__(self, index_name: str, max_in_flight: int = 4, batch_size: int = 100):
+        from pinecone import Pinecone
+        pc = Pinecone(api_key=os.getenv("PINECONE_VECTOR_DATABASE_API_KEY"))
+        self.index = pc.Index(index_name)
+        self.writer = BulkWriter(
+            lambda batch: self.index.upsert(vectors=batch),
+            max_in_flight=max_in_flight,
+            initial_batch_size=batch_size,
+            name=f"pinecone:{index_name}"
+        )
+
+    def upsert(self, chunks):
+        report = self.writer.write(
+            {"id": c['vector_id'], "values": c['vector'], "metadata": chunk_payload(c, max_text_chars=1000)}
+            for c in chunks
+        )
+        if report.failed:
+            # 抛出异常使流水线停止，这一批不会记入增量清单
+            raise RuntimeError(f"Pinecone写入失败: {report.failed}/{len(chunks)}个向量重试后仍失败")
+
+    def delete(self, ids):
+        self.index.delete(ids=ids)
+
+    def update_metadata(self, chunks):
+        # 只有元数据变化: fetch原向量后合并新元数据重新upsert，不重新embedding
+        payloads = {c['vector_id']: chunk_payload(c, max_text_chars=1000) for c in chunks}
+        report = MetadataPatcher(
+            self.index, desired_metadata=lambda vector_id, _: payloads.get(vector_id), name="pipeline"
+        ).patch([list(payloads)])
+        if report.failed:
+            raise RuntimeError(f"Pinecone元数据更新失败: {report.failed}/{len(chunks)}个向量重试后仍失败")
+
+    def vector_count(self):
+        return self.index.describe_index_stats()['total_vector_count']
+
+    def untracked_ids(self, year, tracked):
+        return find_untracked_vector_ids(self.index.list(prefix=f"{year}_"), tracked)
+
+    def delete_untracked(self, ids):
+        self.index.delete(ids=ids)
+
+    def close(self):
+        pass
+
+
+class QdrantSink:
+    """写入Qdrant集合（点ID只能是整数或UUID，由向量ID确定性生成UUID）"""
+
+    supports_delete = True
+    supports_sparse = False
+
+    def __init__(self, collection_name: str, vector_size: int):
+        from src.vectordb.qdrant_client import create_qdrant_client, qdrant_point_id
+        self._point_id = qdrant_point_id
+        self.client = create_qdrant_client()
+        self.collection_name = collection_name
+        self.client.create_collection_for_german_parliament(collection_name=collection_name, vector_size=vector_size)
+
+    def upsert(self, chunks):
+        self.client.upsert_german_parliament_data(self.collection_name, [
+            {"id": self._point_id(c['vector_id']), "vector": c['vector'], "payload": chunk_payload(c)}
+            for c in chunks
+        ])
+
+    def delete(self, ids):
+        self.delete_untracked([self._point_id(vector_id) for vector_id in ids])
+
+    def update_metadata(self, chunks):
+        from qdrant_client.models import SetPayload, SetPayloadOperation
+        self.client.client.batch_update_points(
+            collection_name=self.collection_name,
+            update_operations=[
+                SetPayloadOperation(set_payload=SetPayload(
+                    payload=chunk_payload(c), points=[self._point_id(c['vector_id'])]
+                ))
+                for c in chunks
+            ]
+        )
+
+    def vector_count(self):
+        return self.client.get_collection_info(self.collection_name)['points_count'] or 0
+
+    def untracked_ids(self, year, tracked):
+        # 清单记录的是向量ID，索引中是由它生成的点ID；旧版脚本的点ID是整数，按payload中的年份列出
+        return find_untracked_vector_ids(self._point_id_pages(year), {self._point_id(vector_id) for vector_id in tracked})
+
+    def delete_untracked(self, point_ids):
+        from qdrant_client.models import PointIdsList
+        self.client.client.delete(
+            collection_name=self.collection_name,
+            points_selector=PointIdsList(points=list(point_ids))
+        )
+
+    def _point_id_pages(self, year):
+        from qdrant_client.models import FieldCondition, Filter, MatchValue
+        # 旧版脚本的year是整数，流水线写入的是字符串
+        year_filter = Filter(should=[
+            FieldCondition(key="year", match=MatchValue(value=value)) for value in (str(year), int(year))
+        ])
+        offset = None
+        while True:
+            points, offset = self.client.client.scroll(
+                collection_name=self.collection_name, scroll_filter=year_filter, limit=1000,
+                offset=offset, with_payload=False, with_vectors=False
+            )
+            yield [point.id for point in points]
+            if offset is None:
+                break
+
+    def close(self):
+        self.client.close()
+
+
+class LocalIndexSink:
+    """
+    收集全部向量，结束时一次性构建本地索引（LocalVectorRetriever.build_index），总是全量
+
+    向量写入预分配的float32矩阵（容量不足时倍增），不为每个分量创建Python float对象
+    """
+
+    supports_delete = False
+    supports_sparse = True
+
+    def __init__(self, index_dir: str, dimension: int, initial_capacity: int = 4096):
+        self.index_dir = index_dir
+        self.vectors = np.empty((initial_capacity, dimension), dtype=np.float32)
+        self.count = 0
+        self.ids, self.metadatas, self.lexical_weights = [], [], []
+        self._lock = threading.Lock()
+
+    def upsert(self, chunks):
+        with self._lock:
+            end = self.count + len(chunks)
+            if end > len(self.vectors):
+                grown = np.empty((max(end, 2 * len(self.vectors)), self.vectors.shape[1]), dtype=np.float32)
+                grown[:self.count] = self.vectors[:self.count]
+                self.vectors = grown
+            self.vectors[self.count:end] = [c['vector'] for c in chunks]
+            self.count = end
+            for c in chunks:
+                self.ids.append(c['vector_id'])
+                self.metadatas.append(chunk_payload(c))
+                self.lexical_weights.append(c.get('lexical_weights'))
+
+    def close(self):
+        from src.vectordb.local_retriever import LocalVectorRetriever
+        if self.ids:
+            has_sparse = all(weights is not None for weights in self.lexical_weights)
+            LocalVectorRetriever.build_index(
+                self.index_dir, self.ids, self.vectors[:self.count], self.metadatas,
+                lexical_weights=self.lexical_weights if has_sparse else None
+            )
+
+
+class ArtifactSink:
+    """写入Embedding产物存储（按年份缓冲，满一个分区文件时追加；本次出现的年份先清空，总是全量）"""
+
+    supports_delete = False
+    supports_sparse = True
+
+    def __init__(self, root_dir: str, model_name: str):
+        from src.vectordb.artifact_store import EmbeddingArtifactStore
+        self.store = EmbeddingArtifactStore(root_dir, model_name=model_name)
+        self.buffers = {}
+        self._lock = threading.Lock()
+
+    def upsert(self, chunks):
+        full = []
+        with self._lock:
+            for c in chunks:
+                year = c['year']
+                if year not in self.buffers:
+                    self.store.clear_year(year)
+                    self.buffers[year] = []
+                metadata = chunk_payload(c)
+                del metadata['text']
+                self.buffers[year].append({
+                    "id": c['vector_id'], "chunk_key": c['chunk_key'],
+                    "text": c['text'], "metadata": metadata, "vector": c['vector'],
+                    "lexical_weights": c.get('lexical_weights')
+                })
+                if len(self.buffers[year]) >= self.store.part_rows:
+                    full.append((year, self.buffers[year]))
+                    self.buffers[year] = []
+        for year, records in full:
+            self.store.append(year, records)
+
+    def close(self):
+        for year, records in self.buffers.items():
+            self.store.append(year, records)
+        self.buffers = {year: [] for year in self.buffers}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流水线索引构建")
+    parser.add_argument("--backend", choices=["pinecone", "qdrant", "local", "artifacts"], default="pinecone")
+    parser.add_argument("--years", nargs="*", help="只处理这些年份（默认按DATA_MODE配置）")
+    parser.add_argument("--index-name", default="german-bge", help="Pinecone索引名称")
+    parser.add_argument("--collection", default="german_parliament", help="Qdrant集合名称")
+    parser.add_argument("--index-dir", default=settings.local_index_dir, help="本地索引目录")
+    parser.add_argument("--artifact-dir", default=settings.embedding_artifact_dir, help="Embedding产物存储目录")
+    parser.add_argument("--model", default="BAAI/bge-m3")
+    parser.add_argument("--dimensions", type=int, default=1024)
+    parser.add_argument("--chunk-size", type=int, default=4000)
+    parser.add_argument("--chunk-overlap", type=int, default=800)
+    parser.add_argument("--chunk-workers", type=int, default=1)
+    parser.add_argument("--embed-batch-size", type=int, default=128)
+    parser.add_argument("--upsert-workers", type=int, default=4)
+    parser.add_argument("--upsert-batch-size", type=int, default=100)
+    parser.add_argument("--queue-size", type=int, default=2048)
+    parser.add_argument("--full", action="store_true", help="关闭增量模式")
+    parser.add_argument("--replace-legacy", action="store_true",
+                        help="增量模式下按新ID重新上传并删除索引中清单之外的旧向量")
+    parser.add_argument("--no-sparse", action="store_true", help="不保存BGE-M3稀疏词项权重（local/artifacts后端）")
+    parser.add_argument("--report", help="运行报告输出路径（JSON）")
+    args = parser.parse_args()
+
+    from src.llm.embeddings import GeminiEmbeddingClient
+    embedding_client = GeminiEmbeddingClient(
+        embedding_mode="local",
+        model_name=args.model,
+        dimensions=args.dimensions
+    )
+
+    upsert_workers, upsert_batch_size = args.upsert_workers, args.upsert_batch_size
+    if args.backend == "pinecone":
+        sink = PineconeSink(args.index_name, max_in_flight=args.upsert_workers, batch_size=args.upsert_batch_size)
+        index_name = args.index_name
+        # 并发由BulkWriter负责
+        upsert_workers, upsert_batch_size = 1, args.upsert_batch_size * args.upsert_workers
+    elif args.backend == "qdrant":
+        sink, index_name = QdrantSink(args.collection, args.dimensions), f"qdrant:{args.collection}"
+    elif args.backend == "local":
+        sink, index_name = LocalIndexSink(args.index_dir, args.dimensions), f"local:{args.index_dir}"
+    else:
+        sink, index_name = ArtifactSink(args.artifact_dir, args.model), f"artifacts:{args.artifact_dir}"
+
+    incremental = not args.full and sink.supports_delete
+    manifest = ChunkManifest(settings.ingestion_manifest_path, index_name=index_name) if incremental else None
+    with_sparse = sink.supports_sparse and embedding_client.supports_sparse and not args.no_sparse
+    logger.info(
+        f"✅ 后端: {args.backend}, 模式: {'增量' if incremental else '全量'}, "
+        f"稀疏词项权重: {'保存' if with_sparse else '不保存'}"
+    )
+
+    loader = ParliamentDataLoader(data_mode="PART", years=args.years) if args.years else ParliamentDataLoader()
+    text_splitter = ParliamentTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+
+    try:
+        report = run_ingestion(
+            loader.iter_speeches(),
+            text_splitter=text_splitter,
+            embedding_client=embedding_client,
+            sink=sink,
+            manifest=manifest,
+            model_name=args.model,
+            years=args.years,
+            chunk_workers=args.chunk_workers,
+            embed_batch_size=args.embed_batch_size,
+            upsert_workers=upsert_workers,
+            upsert_batch_size=upsert_batch_size,
+            queue_size=args.queue_size,
+            embed_kwargs={"batch_size": args.embed_batch_size, "max_workers": 1},
+            with_sparse=with_sparse,
+            replace_legacy=args.replace_legacy
+        )
+        sink.close()
+    except UntrackedVectorsError as e:
+        logger.error(f"❌ {e}")
+        return 1
+    finally:
+        if manifest is not None:
+            manifest.close()
+
+    # 本地索引的build_index会自行更新索引版本；产物存储不是检索索引
+    # 只删除了孤儿向量（演讲被移除）或只更新了元数据时缓存中的结果同样过期
+    written, deleted, updated = report.stage("upsert").items_out, report.deleted, report.metadata_updated
+    if args.backend in ("pinecone", "qdrant") and (written > 0 or deleted > 0 or updated > 0):
+        bump_index_epoch(f"流水线索引构建: {index_name}（写入{written}个, 删除{deleted}个, 更新元数据{updated}个）")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report.to_dict(), f, ensure_ascii=False, indent=2)
+        logger.info(f"💾 运行报告已保存到 {args.report}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
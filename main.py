@@ -4,7 +4,7 @@
 """
 
 import sys
-from src.graph.workflow import QuestionAnswerWorkflow
+from src.resources import get_workflow
 from src.utils.logger import logger
 
 
@@ -19,7 +19,7 @@ def main():
     # 初始化工作流
     try:
         print("正在初始化系统...")
-        workflow = QuestionAnswerWorkflow()
+        workflow = get_workflow()
         logger.info("工作流初始化成功")
         print("✅ 系统初始化成功\n")
     except Exception as e:
@@ -28,6 +28,8 @@ from langchain_cohere import CohereRerank
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_chroma import Chroma
 
+from src.resources import get_or_create_resource
+
 
 # --- 全局变量 ---
 RAG_COMPONENTS = {}
@@ -175,7 +177,8 @@ async def lifespan(app: FastAPI):
         if not os.getenv(key):
             raise ValueError(f"{key} 未设置！")
     
-    components = initialize_components()
+    # 通过进程级资源注册表获取组件：同一进程内重复启动（如测试、热重载）不再重新加载模型
+    components = get_or_create_resource(("render_components", os.getenv("APP_MODE")), initialize_components)
     RAG_COMPONENTS.update(components)
     print("--- (2/3) LangChain 组件全部初始化完成 ---")
     print("--- (3/3) 服务器已准备就绪，可以接受请求 ---")
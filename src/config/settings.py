@@ -57,6 +57,38 @@ class Settings(BaseSettings):
         default=1024,
         description="本地Embedding向量维度（BGE-M3为1024维，sentence-transformers模型各不相同）"
     )
+    embedding_dispatcher_enabled: bool = Field(
+        default=True,
+        description="本地Embedding是否合并并发请求的查询（微批处理，一次前向计算）"
+    )
+    embedding_dispatcher_max_batch_size: int = Field(
+        default=32,
+        description="查询微批处理单批最大文本数"
+    )
+    embedding_dispatcher_max_wait_ms: float = Field(
+        default=5.0,
+        description="查询微批处理等待窗口（毫秒），第一条查询到达后最多等待多久再执行"
+    )
+    local_embedding_token_budget: int = Field(
+        default=16384,
+        description="本地批量Embedding单批补齐后的最大token数（按token长度分桶组批，0表示按固定条数分批）"
+    )
+    local_embedding_backend: Literal["torch", "onnx"] = Field(
+        default="torch",
+        description="本地Embedding推理后端: torch(PyTorch) / onnx(BGE-M3 ONNX图，CPU推理，不支持稀疏词项权重)"
+    )
+    local_embedding_onnx_path: str = Field(
+        default="./models/bge-m3-onnx",
+        description="BGE-M3 ONNX导出目录（python -m src.llm.onnx_embeddings --export --check 生成）"
+    )
+    local_embedding_onnx_quantized: bool = Field(
+        default=True,
+        description="ONNX后端是否使用动态int8量化模型"
+    )
+    local_embedding_onnx_threads: int = Field(
+        default=0,
+        description="ONNX Runtime推理线程数（0表示由ONNX Runtime决定）"
+    )
     
     # OpenAI Embedding配置
     openai_embedding_model: str = Field(
@@ -90,6 +122,24 @@ class Settings(BaseSettings):
         description="DeepInfra Embedding向量维度（BAAI/bge-m3为1024维）"
     )
     
+    # 查询向量缓存配置（内存LRU + SQLite持久化）
+    embedding_cache_enabled: bool = Field(
+        default=True,
+        description="是否启用查询向量缓存（对local/deepinfra/openai模式均生效）"
+    )
+    embedding_cache_path: str = Field(
+        default="./cache/embedding_cache.sqlite",
+        description="查询向量缓存的SQLite文件路径（为空则只使用内存缓存）"
+    )
+    embedding_cache_memory_items: int = Field(
+        default=10000,
+        description="内存LRU缓存的最大条目数"
+    )
+    embedding_cache_disk_items: int = Field(
+        default=500000,
+        description="磁盘缓存的最大条目数（超出后淘汰最久未使用的条目）"
+    )
+    
     # Vertex AI 配置
     vertex_project_id: str = Field(
         default="heroic-cedar-476803-e1",
@@ -138,6 +188,104 @@ class Settings(BaseSettings):
         description="Milvus Collection名称"
     )
     
+    # ========== 检索后端配置 ==========
+    vector_backend: Literal["pinecone", "local"] = Field(
+        default="pinecone",
+        description="检索后端: pinecone(云端索引) / local(进程内内存映射向量索引)"
+    )
+    local_index_dir: str = Field(
+        default="./local_index/german-bge",
+        description="本地向量索引目录（vector_backend=local时使用）"
+    )
+    hybrid_search_enabled: bool = Field(
+        default=True,
+        description="是否启用稠密+稀疏混合检索（需要本地BGE-M3和包含稀疏倒排索引的本地索引）"
+    )
+    hybrid_dense_weight: float = Field(
+        default=1.0,
+        description="混合检索中稠密向量得分的权重"
+    )
+    hybrid_sparse_weight: float = Field(
+        default=0.3,
+        description="混合检索中BGE-M3稀疏词项得分的权重"
+    )
+    retrieval_max_concurrency: int = Field(
+        default=8,
+        description="检索节点合并后的唯一检索的全局并发上限"
+    )
+    search_cache_enabled: bool = Field(
+        default=True,
+        description="是否缓存检索结果（按查询向量、过滤条件、top_k）"
+    )
+    search_cache_ttl_seconds: float = Field(
+        default=3600,
+        description="检索结果缓存有效期（秒）"
+    )
+    search_cache_max_entries: int = Field(
+        default=2000,
+        description="检索结果缓存最大条目数（超出后淘汰最久未使用的条目）"
+    )
+    index_epoch_path: str = Field(
+        default="./cache/index_epoch",
+        description="索引版本号文件（重建/迁移索引后更新，依赖检索结果的缓存据此失效）"
+    )
+    
+    # ========== 答案缓存配置 ==========
+    answer_cache_enabled: bool = Field(
+        default=True,
+        description="是否启用语义答案缓存（相似问题直接返回已生成的答案）"
+    )
+    answer_cache_similarity_threshold: float = Field(
+        default=0.97,
+        description="答案缓存命中所需的最小问题向量余弦相似度"
+    )
+    answer_cache_ttl_seconds: float = Field(
+        default=86400,
+        description="答案缓存条目有效期（秒）"
+    )
+    answer_cache_max_entries: int = Field(
+        default=500,
+        description="答案缓存最大条目数（超出后淘汰最久未使用的条目）"
+    )
+    
+    # ========== 重排序配置 ==========
+    rerank_enabled: bool = Field(
+        default=False,
+        description="是否在检索与总结之间加入重排序节点"
+    )
+    rerank_backend: Literal["local", "cohere"] = Field(
+        default="cohere",
+        description="重排序后端: cohere(Cohere Rerank API，默认) / local(本地Cross-Encoder，需显式开启并安装模型)"
+    )
+    local_reranker_model: str = Field(
+        default="BAAI/bge-reranker-v2-m3",
+        description="本地重排序模型名称（未指定ONNX模型时通过sentence-transformers加载）"
+    )
+    local_reranker_onnx_path: str = Field(
+        default="",
+        description="导出的ONNX重排序模型目录（包含model.onnx和tokenizer文件），为空则使用PyTorch推理"
+    )
+    rerank_top_n: int = Field(
+        default=15,
+        description="每个子问题重排后保留的文档数"
+    )
+    rerank_max_candidates: int = Field(
+        default=50,
+        description="每个子问题参与重排的最大候选文档数"
+    )
+    rerank_batch_size: int = Field(
+        default=32,
+        description="本地重排序单次推理的最大 (问题, 文档) 对数"
+    )
+    rerank_max_length: int = Field(
+        default=512,
+        description="本地重排序单个 (问题, 文档) 对的最大token数"
+    )
+    rerank_timeout_seconds: float = Field(
+        default=10.0,
+        description="异步重排序截止时间（秒），推理在批次之间检查，超时后停止推理并保留原始检索排序"
+    )
+    
     # ========== 数据配置 ==========
     data_mode: Literal["PART", "ALL"] = Field(
         default="PART",
@@ -154,6 +302,16 @@ class Settings(BaseSettings):
         description="数据目录路径"
     )
     
+    # ========== 索引构建配置 ==========
+    ingestion_manifest_path: str = Field(
+        default="./cache/ingestion_manifest.sqlite",
+        description="增量索引清单（每个chunk的内容哈希和向量ID），重建时只embedding新增/变化的chunk"
+    )
+    embedding_artifact_dir: str = Field(
+        default="./artifacts/bge-m3",
+        description="Embedding产物存储目录（按年份分区的Arrow文件: 文本+元数据+float16向量），切换向量库时直接导入不重新embedding"
+    )
+    
     # ========== 文本分块配置 ==========
     chunk_size: int = Field(
         default=1000,
@@ -176,12 +334,36 @@ class Settings(BaseSettings):
         description="生产模式开关: True=生产模式(跳过子答案生成,直接生成最终答案), False=测试模式(生成详细子答案)"
     )
 
+    # ========== 总结配置 ==========
+    summarize_extraction_concurrency: int = Field(
+        default=4,
+        description="两阶段总结中阶段1（结构化提取）的最大并发LLM调用数，1表示逐个串行提取"
+    )
+
     # ========== LLM输出配置 ==========
     llm_max_tokens: int = Field(
         default=65536,
         description="LLM最大输出token数。Gemini 2.5 Pro通过Evolink支持最大65.5K tokens，已验证可用"
     )
     
+    # LLM响应缓存配置（仅temperature=0的确定性调用）
+    llm_cache_enabled: bool = Field(
+        default=True,
+        description="是否启用LLM响应缓存（temperature不为0的调用不缓存）"
+    )
+    llm_cache_path: str = Field(
+        default="./cache/llm_response_cache.sqlite",
+        description="LLM响应缓存的SQLite文件路径（为空则只使用内存缓存）"
+    )
+    llm_cache_memory_items: int = Field(
+        default=2000,
+        description="LLM响应内存LRU缓存的最大条目数"
+    )
+    llm_cache_disk_items: int = Field(
+        default=100000,
+        description="LLM响应磁盘缓存的最大条目数（超出后淘汰最久未使用的条目）"
+    )
+    
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
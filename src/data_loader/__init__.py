@@ -5,9 +5,18 @@
 from .loader import ParliamentDataLoader
 from .splitter import ParliamentTextSplitter
 from .mapper import MetadataMapper
+from .manifest import ChunkManifest, IngestionPlan
+from .pipeline import IngestionPipeline, Stage, run_ingestion
+from .checkpoint import CheckpointLog
 
 __all__ = [
     "ParliamentDataLoader",
     "ParliamentTextSplitter",
-    "MetadataMapper"
+    "MetadataMapper",
+    "ChunkManifest",
+    "IngestionPlan",
+    "IngestionPipeline",
+    "Stage",
+    "run_ingestion",
+    "CheckpointLog"
 ]
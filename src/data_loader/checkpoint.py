@@ -0,0 +1,230 @@
+"""
+迁移检查点日志（预写日志）
+长时间迁移中每个完成embedding并写入向量库的批次，按chunk序号区间追加一条记录
+
+- 每条记录一行JSON，写入后flush + fsync，进程崩溃或断电后已确认的批次不会丢失
+- 崩溃时写了一半的最后一行在读取时忽略（该批次视为未确认，重启后重新处理）
+- 重启时跳过已确认的区间，从第一个未确认的批次继续，已计算的embedding不再重复计算
+- 区间只在chunk序号稳定时有意义: 数据文件或分块参数变化（指纹不同）时丢弃该范围的旧记录
+
+用法:
+    log = CheckpointLog("./cache/migration_checkpoint.jsonl")
+    start = log.begin("2019", fingerprint=fingerprint(file_size, mtime, chunk_size, chunk_overlap))
+    for i in range(start, len(chunks), batch_size):
+        if log.is_acknowledged("2019", i, i + batch_size):
+            continue
+        ... embedding + upsert ...
+        log.acknowledge("2019", i, i + batch_size)
+    log.complete("2019")
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from src.utils import logger
+
+
+def fingerprint(*parts: Any) -> str:
+    """由数据文件信息和分块参数生成指纹（任一变化时chunk序号不再对应）"""
+    raw = json.dumps([str(part) for part in parts], ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class _ScopeState:
+    """单个范围（例如一个年份）的检查点状态"""
+
+    def __init__(self, fingerprint: str = ""):
+        self.fingerprint = fingerprint
+        self.ranges: List[Tuple[int, int]] = []
+        self.complete = False
+
+    def add(self, start: int, end: int):
+        """加入区间并合并相邻/重叠区间"""
+        merged = []
+        for s, e in sorted(self.ranges + [(start, end)]):
+            if merged and s <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], e))
+            else:
+                merged.append((s, e))
+        self.ranges = merged
+
+
+class CheckpointLog:
+    """
+    追加写入的检查点日志（JSONL）
+
+    记录类型:
+    - begin:    开始/恢复一个范围（带指纹；指纹变化或不恢复时清空该范围的旧记录）
+    - ack:      区间 [start, end) 的chunk已embedding并写入向量库
+    - complete: 该范围全部完成
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 日志文件路径
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._scopes: Dict[str, _ScopeState] = {}
+
+        created = not self.path.exists()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        torn = self._replay()
+        self._file = open(self.path, "ab")
+        if torn:
+            # 上次崩溃留下的半行: 先补换行，后续记录从新行开始
+            self._file.write(b"\n")
+            self._sync()
+        if created:
+            self._sync_dir()
+
+        logger.info(f"[CheckpointLog] 初始化完成: {self.path} (范围数={len(self._scopes)})")
+
+    def begin(self, scope: str, fingerprint: str = "", resume: bool = True) -> int:
+        """
+        开始或恢复一个范围
+
+        Args:
+            scope: 范围名称（例如年份）
+            fingerprint: 数据指纹，与日志中的不一致时丢弃旧记录
+            resume: False表示丢弃旧记录从头开始
+
+        Returns:
+            第一个未确认的chunk序号（0表示从头开始）
+        """
+        scope = str(scope)
+        with self._lock:
+            state = self._scopes.get(scope)
+            if state is not None and resume and state.fingerprint == fingerprint:
+                start = state.ranges[0][1] if state.ranges and state.ranges[0][0] == 0 else 0
+                if state.ranges:
+                    acked = sum(e - s for s, e in state.ranges)
+                    logger.info(f"[CheckpointLog] ♻️  恢复 {scope}: 已确认{acked:,}个chunk，从第{start:,}个继续")
+                return start
+            self._append({"type": "begin", "scope": scope, "fingerprint": fingerprint})
+            self._scopes[scope] = _ScopeState(fingerprint)
+            return 0
+
+    def acknowledge(self, scope: str, start: int, end: int, **extra: Any):
+        """
+        确认区间 [start, end) 的chunk已写入向量库（fsync后返回）
+
+        Args:
+            scope: 范围名称
+            start: 起始chunk序号（含）
+            end: 结束chunk序号（不含）
+            **extra: 附加信息（例如写入的向量数），只记录不解析
+        """
+        scope = str(scope)
+        with self._lock:
+            self._append({"type": "ack", "scope": scope, "start": int(start), "end": int(end), **extra})
+            self._scopes.setdefault(scope, _ScopeState()).add(int(start), int(end))
+
+    def complete(self, scope: str):
+        """标记范围全部完成"""
+        scope = str(scope)
+        with self._lock:
+            self._append({"type": "complete", "scope": scope})
+            self._scopes.setdefault(scope, _ScopeState()).complete = True
+
+    def is_acknowledged(self, scope: str, start: int, end: int) -> bool:
+        """区间 [start, end) 是否已全部确认"""
+        with self._lock:
+            state = self._scopes.get(str(scope))
+            if state is None:
+                return False
+            return any(s <= start and end <= e for s, e in state.ranges)
+
+    def first_unacknowledged(self, scope: str) -> int:
+        """第一个未确认的chunk序号"""
+        with self._lock:
+            state = self._scopes.get(str(scope))
+            if state is None or not state.ranges or state.ranges[0][0] != 0:
+                return 0
+            return state.ranges[0][1]
+
+    def acknowledged_count(self, scope: str) -> int:
+        """已确认的chunk数"""
+        with self._lock:
+            state = self._scopes.get(str(scope))
+            return sum(e - s for s, e in state.ranges) if state is not None else 0
+
+    def is_complete(self, scope: str) -> bool:
+        with self._lock:
+            state = self._scopes.get(str(scope))
+            return state is not None and state.complete
+
+    def in_progress(self, scope: str) -> bool:
+        """已开始但未完成（上次中断）"""
+        with self._lock:
+            state = self._scopes.get(str(scope))
+            return state is not None and not state.complete
+
+    def close(self):
+        """关闭日志文件"""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def _append(self, record: Dict[str, Any]):
+        """追加一条记录并fsync（调用方持有锁）"""
+        record = {**record, "ts": time.time()}
+        self._file.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _sync_dir(self):
+        """新建文件后同步目录项，保证文件本身在崩溃后存在"""
+        try:
+            fd = os.open(str(self.path.parent), os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def _replay(self) -> bool:
+        """
+        读取已有日志重建状态
+
+        Returns:
+            文件是否以不完整的行结尾（上次写入时崩溃）
+        """
+        if not self.path.exists():
+            return False
+
+        data = self.path.read_bytes()
+        if not data:
+            return False
+
+        for line in data.split(b"\n"):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except (ValueError, UnicodeDecodeError):
+                logger.warning(f"[CheckpointLog] ⚠️  忽略不完整的记录: {line[:80]!r}")
+                continue
+
+            scope = record.get("scope")
+            kind = record.get("type")
+            if kind == "begin":
+                self._scopes[scope] = _ScopeState(record.get("fingerprint", ""))
+            elif kind == "ack":
+                self._scopes.setdefault(scope, _ScopeState()).add(record["start"], record["end"])
+            elif kind == "complete":
+                self._scopes.setdefault(scope, _ScopeState()).complete = True
+
+        return not data.endswith(b"\n")
@@ -2,16 +2,41 @@
 数据加载器模块
 负责从JSON文件加载德国议会演讲数据
 支持部分加载和全量加载
+
+加载方式:
+- load_data(): 一次性加载为列表（原有方式）
+- iter_speeches(): 逐条流式产出，峰值内存不超过单个文件（安装ijson时不超过单条记录）
+- iter_speeches_parallel(): 多进程并行解析文件，按文件顺序流式产出
 """
 
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator
 from tqdm import tqdm
 
 from src.config import settings
 from src.utils import logger
 
+# 可选：增量JSON解析（大文件无需整体读入内存）
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+
+# 会议主持人头衔（会议主持不是真正的发言人）
+MODERATOR_TITLES = (
+    "Vizepräsident",
+    "Vizepräsidentin",
+    "Präsident",
+    "Präsidentin",
+    "Alterspräsident",
+    "Alterspräsidentin"
+)
+
 
 class ParliamentDataLoader:
     """
@@ -22,6 +47,7 @@ class ParliamentDataLoader:
     2. 提取和清洗metadata
     3. 支持按年份过滤(PART模式)
     4. 支持全量加载(ALL模式)
+    5. 支持流式加载和多进程并行加载
     """
     
     def __init__(
@@ -47,18 +73,109 @@ class ParliamentDataLoader:
         if self.data_mode == "PART":
             logger.info(f"部分数据模式: 年份={self.years}")
     
-    def load_data(self) -> List[Dict[str, Any]]:
+    def load_data(self, parallel: bool = False, max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         根据配置加载数据
         
+        Args:
+            parallel: 是否多进程并行解析文件
+            max_workers: 并行进程数，默认CPU核数
+        
         Returns:
             包含所有speech数据的列表,每条数据包含metadata和speech内容
         """
+        if parallel:
+            all_data = list(self.iter_speeches_parallel(max_workers=max_workers))
+            logger.success(f"并行数据加载完成: 共{len(all_data)}条记录")
+            return all_data
+        
         if self.data_mode == "PART":
             return self._load_partial_data()
         else:
             return self._load_all_data()
     
+    def get_data_files(self) -> List[Path]:
+        """
+        获取当前模式下要加载的JSON文件列表（按年份排序）
+        
+        Returns:
+            存在的数据文件路径列表
+        """
+        if self.data_mode == "PART":
+            files = []
+            for year in self.years:
+                file_path = self.data_dir / f"pp_{year}.json"
+                if not file_path.exists():
+                    logger.warning(f"文件不存在: {file_path}")
+                    continue
+                files.append(file_path)
+            return files
+        
+        json_files = sorted(self.data_dir.glob("pp_*.json"))
+        if not json_files:
+            logger.error(f"未找到任何JSON文件: {self.data_dir}")
+        return json_files
+    
+    def iter_speeches(self, incremental: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        流式加载演讲数据（逐文件解析，逐条产出）
+        
+        Args:
+            incremental: 是否使用ijson增量解析（未安装ijson时自动回退为逐文件json.load）
+        
+        Yields:
+            演讲数据，结构与load_data()中的元素相同
+        """
+        if incremental and not IJSON_AVAILABLE:
+            logger.debug("ijson未安装，流式加载将逐文件使用json.load")
+        
+        files = self.get_data_files()
+        logger.info(f"开始流式加载数据: {len(files)}个文件")
+        
+        for file_path in files:
+            yield from iter_json_file(file_path, incremental=incremental)
+    
+    def iter_speeches_parallel(
+        self,
+        max_workers: Optional[int] = None,
+        max_pending_files: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        多进程并行解析JSON文件，按文件顺序流式产出演讲数据
+        
+        同时在途（已解析未消费）的文件数有上限，峰值内存约为 max_pending_files 个文件
+        
+        Args:
+            max_workers: 进程数，默认CPU核数
+            max_pending_files: 最多同时在途的文件数，默认等于进程数
+        
+        Yields:
+            演讲数据，顺序与串行加载一致
+        """
+        files = self.get_data_files()
+        if not files:
+            return
+        
+        max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(files)))
+        max_pending_files = max(1, max_pending_files or max_workers)
+        
+        logger.info(f"开始并行加载数据: {len(files)}个文件, 进程数={max_workers}")
+        
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            pending = []
+            next_index = 0
+            with tqdm(total=len(files), desc="并行解析JSON文件") as progress:
+                while next_index < len(files) or pending:
+                    # 补充在途任务（有界窗口，避免解析速度快于消费速度时内存膨胀）
+                    while next_index < len(files) and len(pending) < max_pending_files:
+                        pending.append(executor.submit(parse_json_file, str(files[next_index])))
+                        next_index += 1
+                    
+                    # 按提交顺序取结果，保持文件顺序
+                    speeches = pending.pop(0).result()
+                    progress.update(1)
+                    yield from speeches
+    
     def _load_partial_data(self) -> List[Dict[str, Any]]:
         """
         加载部分年份的数据
@@ -123,75 +240,7 @@ class ParliamentDataLoader:
             - speech: 演讲内容
             - file: 文件名
         """
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                json_data = json.load(f)
-            
-            speeches = []
-            
-            # 提取session年份
-            session_year = json_data.get('session', 'unknown')
-            
-            # 遍历transcript提取每条演讲
-            for item in json_data.get('transcript', []):
-                # 只处理有metadata的text_block
-                if item.get('type') != 'text_block' or 'metadata' not in item:
-                    continue
-                
-                metadata = item['metadata'].copy()
-                speech = item.get('speech', '')
-                
-                # 跳过空演讲
-                if not speech or not speech.strip():
-                    continue
-                
-                # 清洗speaker字段中的特殊字符
-                speaker = metadata.get('speaker', '')
-                speaker = speaker.lstrip('„"„')
-                speaker = speaker.rstrip('""„')
-                speaker = speaker.strip()
-
-                # 过滤主持人（会议主持不是真正的发言人）
-                MODERATOR_TITLES = [
-                    "Vizepräsident",
-                    "Vizepräsidentin",
-                    "Präsident",
-                    "Präsidentin",
-                    "Alterspräsident",
-                    "Alterspräsidentin"
-                ]
-
-                # 检查speaker是否是主持人
-                is_moderator = False
-                for title in MODERATOR_TITLES:
-                    if speaker.startswith(title):
-                        is_moderator = True
-                        break
-
-                # 如果是主持人，标记并跳过此演讲
-                if is_moderator:
-                    metadata['speaker'] = None
-                    metadata['is_moderator'] = True
-                    # 跳过主持人发言
-                    continue
-                else:
-                    metadata['speaker'] = speaker
-                    metadata['is_moderator'] = False
-                
-                # 添加文件名
-                metadata['file'] = file_path.name
-                
-                speeches.append({
-                    'metadata': metadata,
-                    'speech': speech
-                })
-            
-            logger.debug(f"文件 {file_path.name} 提取了 {len(speeches)} 条演讲")
-            return speeches
-            
-        except Exception as e:
-            logger.error(f"加载文件 {file_path} 时出错: {e}")
-            return []
+        return parse_json_file(str(file_path))
     
     def get_statistics(self, data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -234,6 +283,103 @@ class ParliamentDataLoader:
         return stats
 
 
+def iter_json_file(file_path: Path, incremental: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    逐条产出单个JSON文件中的演讲数据
+    
+    Args:
+        file_path: JSON文件路径
+        incremental: 是否使用ijson增量解析transcript（需要安装ijson）
+    
+    Yields:
+        演讲数据 {'metadata': {...}, 'speech': '...'}
+    """
+    count = 0
+    try:
+        for item in _iter_transcript_items(file_path, incremental and IJSON_AVAILABLE):
+            speech = _extract_speech(item, file_path.name)
+            if speech is not None:
+                count += 1
+                yield speech
+        
+        logger.debug(f"文件 {file_path.name} 提取了 {count} 条演讲")
+    
+    except Exception as e:
+        logger.error(f"加载文件 {file_path} 时出错: {e}")
+
+
+def parse_json_file(file_path: str) -> List[Dict[str, Any]]:
+    """
+    解析单个JSON文件为演讲列表（模块级函数，可在进程池中执行）
+    
+    Args:
+        file_path: JSON文件路径
+    
+    Returns:
+        该文件中所有演讲数据；出错时返回已解析的部分并记录错误
+    """
+    return list(iter_json_file(Path(file_path)))
+
+
+def _iter_transcript_items(file_path: Path, incremental: bool) -> Iterator[Dict[str, Any]]:
+    """遍历transcript中的条目（增量解析或整体加载）"""
+    if incremental:
+        with open(file_path, 'rb') as f:
+            yield from ijson.items(f, 'transcript.item', use_float=True)
+    else:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            json_data = json.load(f)
+        yield from json_data.get('transcript', [])
+
+
+def _extract_speech(item: Dict[str, Any], file_name: str) -> Optional[Dict[str, Any]]:
+    """
+    从transcript条目中提取演讲（清洗speaker，跳过主持人和空演讲）
+    
+    Args:
+        item: transcript条目
+        file_name: 来源文件名
+    
+    Returns:
+        演讲数据；不是有效演讲时返回None
+    """
+    # 只处理有metadata的text_block
+    if item.get('type') != 'text_block' or 'metadata' not in item:
+        return None
+    
+    metadata = item['metadata'].copy()
+    speech = item.get('speech', '')
+    
+    # 跳过空演讲
+    if not speech or not speech.strip():
+        return None
+    
+    # 清洗speaker字段中的特殊字符
+    speaker = metadata.get('speaker', '')
+    speaker = speaker.lstrip('„"„')
+    speaker = speaker.rstrip('""„')
+    speaker = speaker.strip()
+    
+    # 过滤主持人（会议主持不是真正的发言人）
+    if speaker.startswith(MODERATOR_TITLES):
+        return None
+    
+    metadata['speaker'] = speaker
+    metadata['is_moderator'] = False
+    
+    # 演讲ID（chunk键和引用使用，与按原始JSON修补元数据的脚本一致）
+    if item.get('text_id'):
+        metadata['text_id'] = item['text_id']
+    
+    # 添加文件名
+    metadata['file'] = file_name
+    
+    return {
+        'metadata': metadata,
+        'speech': speech
+    }
+
+
 if __name__ == "__main__":
     # 测试数据加载器
     loader = ParliamentDataLoader()
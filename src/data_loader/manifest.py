@@ -0,0 +1,381 @@
+"""
+增量索引清单（Chunk Manifest）
+记录每个已写入向量库的chunk: 内容哈希（chunk文本 + 分块参数 + Embedding模型）、元数据哈希和向量ID
+
+重建索引时与清单对比:
+- 新增/内容变化的chunk -> 需要embedding并upsert
+- 只有元数据变化的chunk（例如修正某年份的日期） -> 只更新向量库中的元数据，不重新embedding
+- 两个哈希都未变的chunk -> 跳过
+- 清单中有、本次数据中已不存在的chunk -> 孤儿向量，从向量库删除
+
+向量ID由chunk键确定性生成（保留"年份_"前缀，兼容按年份list的脚本），重复upsert覆盖同一向量
+
+build_chunk / chunk_payload 是ingest_pipeline和batch_migrate脚本共用的chunk键与向量库元数据:
+两个工具共用同一份清单（例如german-bge），chunk键、文本或元数据不一致时，
+交替运行会互相重新embedding整年数据，并把对方的向量当作孤儿删除
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from src.utils import logger
+from .mapper import get_party_mapper
+
+
+def content_hash(text: str, chunk_params: Dict[str, Any], model_name: str) -> str:
+    """
+    chunk内容哈希
+
+    Args:
+        text: chunk文本
+        chunk_params: 分块参数（chunk_size / chunk_overlap 等）
+        model_name: Embedding模型名称
+
+    Returns:
+        sha256十六进制字符串
+    """
+    params = json.dumps(chunk_params, sort_keys=True, ensure_ascii=False)
+    raw = f"{model_name}\x00{params}\x00{text}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def metadata_hash(metadata: Dict[str, Any]) -> str:
+    """chunk元数据哈希（只有元数据变化时不需要重新embedding）"""
+    raw = json.dumps(metadata, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def make_chunk_key(text_id: str, chunk_index: int) -> str:
+    """chunk键: 演讲ID + chunk序号"""
+    return f"{text_id}#{chunk_index}"
+
+
+def make_vector_id(year: str, chunk_key: str) -> str:
+    """由chunk键确定性生成向量ID（"年份_哈希"）"""
+    return f"{year}_{hashlib.sha1(chunk_key.encode('utf-8')).hexdigest()[:20]}"
+
+
+def build_chunk(chunk: Dict[str, Any], default_year: str = "") -> Dict[str, Any]:
+    """
+    分块结果 -> 写入向量库的chunk（chunk键、文本和元数据在所有索引工具中一致）
+
+    Args:
+        chunk: ParliamentTextSplitter.split_speeches格式的chunk
+            {'text': ..., 'metadata': {演讲metadata + chunk_id / total_chunks}}；
+            演讲ID取metadata中的text_id（原始JSON中transcript条目的text_id），没有时取id
+        default_year: metadata中没有year时使用的年份（数据文件的年份）
+
+    Returns:
+        {chunk_key, year, original_text_id, chunk_index, text, metadata}，
+        metadata为向量库中保存的元数据（不含text）
+    """
+    source = chunk['metadata']
+    text = chunk['text'].strip()
+    text_id = str(source.get('text_id') or source.get('id'))
+    chunk_index = source.get('chunk_id', 0)
+    year = source.get('year') or default_year
+    month = source.get('month', '01')
+    day = source.get('day', '01')
+    doc_id = source.get('id', text_id)
+    group = source.get('group', '')
+    return {
+        'chunk_key': make_chunk_key(text_id, chunk_index),
+        'year': str(year),
+        'original_text_id': text_id,
+        'chunk_index': chunk_index,
+        'text': text,
+        'metadata': {
+            # 时间字段（分开保存，便于精确过滤）
+            'year': year,
+            'month': month,
+            'day': day,
+            # 文档ID（引用用）
+            'id': doc_id,
+            'speaker': source.get('speaker', ''),
+            'group': group,
+            'group_chinese': get_party_mapper().get_chinese_name(group) if group else '',
+            'lp': source.get('lp', ''),
+            'session': source.get('session', ''),
+            # 引用来源: "id | 发言人 | 日期"
+            'source_reference': f"{doc_id} | {source.get('speaker', 'Unknown')} | {year}-{month}-{day}",
+            'chunk_size': len(text),
+            'total_chunks': source.get('total_chunks', 1),
+            'source': 'german_parliament'
+        }
+    }
+
+
+def chunk_payload(chunk: Dict[str, Any], max_text_chars: Optional[int] = None) -> Dict[str, Any]:
+    """
+    向量库中保存的元数据: build_chunk的metadata + text + original_text_id / chunk_index / chunk_key
+
+    Args:
+        chunk: build_chunk返回的chunk
+        max_text_chars: text最大字符数（Pinecone元数据大小有限制），超过时截断并加"..."
+
+    Returns:
+        元数据字典
+    """
+    text = chunk['text']
+    if max_text_chars is not None and len(text) > max_text_chars:
+        text = text[:max_text_chars] + "..."
+    return {
+        **chunk['metadata'],
+        'text': text,
+        'original_text_id': chunk['original_text_id'],
+        'chunk_index': chunk['chunk_index'],
+        'chunk_key': chunk['chunk_key']
+    }
+
+
+def find_untracked_vector_ids(id_pages: Iterable[Iterable[Any]], tracked: Set[Any]) -> List[Any]:
+    """
+    索引中不在清单里的向量ID（旧版脚本上传的向量，或清单丢失后残留的向量）
+
+    这些向量不会被当作孤儿删除；增量模式按新ID上传时每个chunk会有两份向量
+
+    Args:
+        id_pages: 索引中某年份的向量ID分页（例如Pinecone的 index.list(prefix="2019_")）
+        tracked: 清单中该年份的向量ID（与id_pages使用同一种ID）
+
+    Returns:
+        向量ID列表
+    """
+    return [vector_id for page in id_pages for vector_id in page if vector_id not in tracked]
+
+
+def plan_chunk(
+    chunk: Dict[str, Any],
+    chunk_params: Dict[str, Any],
+    model_name: str,
+    entry: Optional[tuple]
+) -> Optional[Dict[str, Any]]:
+    """
+    单个chunk与清单条目对比
+
+    Args:
+        chunk: 需要 chunk_key / text / year 字段，可选metadata（参与元数据哈希）
+        chunk_params: 分块参数
+        model_name: Embedding模型名称
+        entry: 清单条目 (vector_id, content_hash, metadata_hash)，不存在时为None
+
+    Returns:
+        内容和元数据都未变时返回None，否则返回补充了 content_hash / metadata_hash / vector_id /
+        metadata_only（True表示只需更新元数据）字段的chunk
+    """
+    digest = content_hash(chunk["text"], chunk_params, model_name)
+    meta_digest = metadata_hash(chunk.get("metadata") or {})
+    same_content = entry is not None and entry[1] == digest
+    if same_content and entry[2] == meta_digest:
+        return None
+    return {
+        **chunk,
+        "content_hash": digest,
+        "metadata_hash": meta_digest,
+        # 内容变化的chunk沿用原向量ID，upsert直接覆盖
+        "vector_id": entry[0] if entry is not None else make_vector_id(str(chunk["year"]), chunk["chunk_key"]),
+        "metadata_only": same_content
+    }
+
+
+class IngestionPlan:
+    """
+    增量索引计划
+
+    Attributes:
+        to_embed: 需要embedding并upsert的chunk（已补充 chunk_key / vector_id / content_hash 字段）
+        unchanged: 内容和元数据都未变、跳过的chunk数
+        orphaned_ids: 需要从向量库删除的向量ID
+        metadata_only: 只有元数据变化、只需更新向量库元数据的chunk
+    """
+
+    def __init__(
+        self,
+        to_embed: List[Dict[str, Any]],
+        unchanged: int,
+        orphaned_ids: List[str],
+        metadata_only: Optional[List[Dict[str, Any]]] = None
+    ):
+        self.to_embed = to_embed
+        self.unchanged = unchanged
+        self.orphaned_ids = orphaned_ids
+        self.metadata_only = metadata_only or []
+
+    @property
+    def is_empty(self) -> bool:
+        """没有需要写入、更新或删除的内容"""
+        return not self.to_embed and not self.orphaned_ids and not self.metadata_only
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "to_embed": len(self.to_embed),
+            "metadata_only": len(self.metadata_only),
+            "unchanged": self.unchanged,
+            "orphaned": len(self.orphaned_ids)
+        }
+
+
+class ChunkManifest:
+    """
+    增量索引清单（SQLite）
+
+    同一个文件可以保存多个索引（Pinecone / Qdrant / 本地索引）的清单，按index_name区分
+
+    用法:
+        manifest = ChunkManifest("./cache/ingestion_manifest.sqlite", index_name="german-bge")
+        plan = manifest.plan(chunks, chunk_params, model_name, years=["2019"])
+        ... embedding + upsert plan.to_embed ...
+        manifest.commit(uploaded_chunks)          # 向量库确认写入后再记录
+        ... 更新 plan.metadata_only 的元数据 ...
+        manifest.commit(plan.metadata_only)
+        ... 删除 plan.orphaned_ids ...
+        manifest.remove(plan.orphaned_ids)
+    """
+
+    def __init__(self, db_path: str = "./cache/ingestion_manifest.sqlite", index_name: str = ""):
+        """
+        Args:
+            db_path: SQLite文件路径
+            index_name: 向量索引名称
+        """
+        self.db_path = db_path
+        self.index_name = index_name
+        self._lock = threading.Lock()
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                index_name TEXT NOT NULL,
+                chunk_key TEXT NOT NULL,
+                vector_id TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                metadata_hash TEXT NOT NULL DEFAULT '',
+                year TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (index_name, chunk_key)
+            )
+            """
+        )
+        # 旧版清单没有元数据哈希: 补充列，已有条目的元数据视为未知（下次运行时按元数据变化处理一次）
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(chunks)")}
+        if "metadata_hash" not in columns:
+            self._conn.execute("ALTER TABLE chunks ADD COLUMN metadata_hash TEXT NOT NULL DEFAULT ''")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_year ON chunks(index_name, year)")
+        self._conn.commit()
+
+        logger.info(f"[ChunkManifest] 初始化完成: {db_path} (索引={index_name or '默认'}, 已记录{self.count()}个chunk)")
+
+    def plan(
+        self,
+        chunks: Iterable[Dict[str, Any]],
+        chunk_params: Dict[str, Any],
+        model_name: str,
+        years: Optional[Iterable[str]] = None
+    ) -> IngestionPlan:
+        """
+        对比清单生成增量计划
+
+        Args:
+            chunks: 本次数据的全部chunk，每个需要 chunk_key / text / year 字段（可选metadata）
+            chunk_params: 分块参数（参与内容哈希）
+            model_name: Embedding模型名称（参与内容哈希）
+            years: 本次数据覆盖的年份（只在这些年份内查找孤儿向量），None表示使用chunks中出现的年份
+
+        Returns:
+            IngestionPlan
+        """
+        chunks = list(chunks)
+        scope = {str(y) for y in years} if years is not None else {str(c["year"]) for c in chunks}
+        existing = self.load_entries(scope)
+
+        to_embed = []
+        metadata_only = []
+        unchanged = 0
+        seen = set()
+        for chunk in chunks:
+            seen.add(chunk["chunk_key"])
+            planned = plan_chunk(chunk, chunk_params, model_name, existing.get(chunk["chunk_key"]))
+            if planned is None:
+                unchanged += 1
+            elif planned["metadata_only"]:
+                metadata_only.append(planned)
+            else:
+                to_embed.append(planned)
+
+        orphaned_ids = [entry[0] for key, entry in existing.items() if key not in seen]
+
+        plan = IngestionPlan(to_embed, unchanged, orphaned_ids, metadata_only)
+        logger.info(f"[ChunkManifest] 增量计划 (年份={sorted(scope)}): {plan.summary()}")
+        return plan
+
+    def commit(self, chunks: Iterable[Dict[str, Any]]):
+        """记录已确认写入向量库的chunk（plan.to_embed / plan.metadata_only中的条目）"""
+        now = time.time()
+        rows = [
+            (self.index_name, c["chunk_key"], c["vector_id"], c["content_hash"], c.get("metadata_hash", ""),
+             str(c["year"]), now)
+            for c in chunks
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks "
+                "(index_name, chunk_key, vector_id, content_hash, metadata_hash, year, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def remove(self, vector_ids: Iterable[str]):
+        """删除已从向量库删除的向量记录"""
+        rows = [(self.index_name, vector_id) for vector_id in vector_ids]
+        with self._lock:
+            self._conn.executemany("DELETE FROM chunks WHERE index_name = ? AND vector_id = ?", rows)
+            self._conn.commit()
+
+    def count(self, year: Optional[str] = None) -> int:
+        """已记录的chunk数"""
+        with self._lock:
+            if year is None:
+                row = self._conn.execute(
+                    "SELECT COUNT(*) FROM chunks WHERE index_name = ?", (self.index_name,)
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT COUNT(*) FROM chunks WHERE index_name = ? AND year = ?", (self.index_name, str(year))
+                ).fetchone()
+        return row[0]
+
+    def vector_ids(self, year: str) -> Set[str]:
+        """清单中记录的某年份全部向量ID"""
+        with self._lock:
+            return {
+                row[0] for row in self._conn.execute(
+                    "SELECT vector_id FROM chunks WHERE index_name = ? AND year = ?", (self.index_name, str(year))
+                )
+            }
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    def load_entries(self, years: Iterable[str]) -> Dict[str, tuple]:
+        """读取指定年份的清单条目: {chunk_key: (vector_id, content_hash, metadata_hash)}"""
+        entries = {}
+        with self._lock:
+            for year in years:
+                for key, vector_id, digest, meta_digest in self._conn.execute(
+                    "SELECT chunk_key, vector_id, content_hash, metadata_hash FROM chunks "
+                    "WHERE index_name = ? AND year = ?",
+                    (self.index_name, year)
+                ):
+                    entries[key] = (vector_id, digest, meta_digest)
+        return entries
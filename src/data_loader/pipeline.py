@@ -0,0 +1,660 @@
+"""
+流水线式数据摄取（加载 -> 分块 -> 元数据丰富 -> Embedding -> 写入向量库）
+
+原有脚本按阶段串行处理完整列表: 解析JSON时GPU空闲，编码时网络空闲。
+这里各阶段由有界队列连接、各自配置worker数并同时运行:
+- 队列满时上游阻塞（背压），内存占用取决于队列容量而不是数据总量
+- 总耗时趋近最慢的阶段，而不是各阶段耗时之和
+- 每个阶段记录处理量、忙碌时间、等待上游（饥饿）和等待下游（背压）的时间，用于定位瓶颈
+
+用法:
+    report = run_ingestion(
+        loader.iter_speeches(),
+        text_splitter=splitter,
+        embedding_client=client,
+        sink=sink,                 # upsert(chunks)；supports_delete为True时还有delete(ids)
+        manifest=manifest,         # 可选，增量模式
+        model_name="BAAI/bge-m3"
+    )
+
+增量模式下，能列出向量的sink（vector_count() / untracked_ids(year, tracked) / delete_untracked(ids)）
+会检查索引中不在清单里的向量（旧版脚本的 "年份_时间戳_序号" 向量）: 这些向量不会被当作孤儿删除，
+按新ID上传会使索引翻倍。发现时拒绝继续（UntrackedVectorsError），replace_legacy=True时按新ID上传，
+流水线全部成功后删除这些向量
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from src.utils import logger
+from .manifest import ChunkManifest, build_chunk, make_vector_id, plan_chunk
+
+
+# 队列结束标记：上游最后一个worker退出时，为下游每个worker放入一个
+_END = object()
+
+
+class PipelineAborted(Exception):
+    """其他阶段出错，流水线停止"""
+
+
+class UntrackedVectorsError(Exception):
+    """增量模式下索引中有清单之外的向量（继续会产生重复向量）"""
+
+
+@dataclass
+class StageStats:
+    """单个阶段的统计信息"""
+    name: str
+    workers: int
+    items_in: int = 0
+    items_out: int = 0
+    batches: int = 0
+    busy_seconds: float = 0.0
+    starved_seconds: float = 0.0
+    blocked_seconds: float = 0.0
+
+    def utilization(self, elapsed: float) -> float:
+        """worker忙碌时间占比（接近1的阶段即瓶颈）"""
+        if elapsed <= 0 or self.workers <= 0:
+            return 0.0
+        return self.busy_seconds / (elapsed * self.workers)
+
+    def to_dict(self, elapsed: float) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "workers": self.workers,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "batches": self.batches,
+            "items_per_second": self.items_in / elapsed if elapsed > 0 else 0.0,
+            "utilization": self.utilization(elapsed),
+            "busy_seconds": self.busy_seconds,
+            "starved_seconds": self.starved_seconds,
+            "blocked_seconds": self.blocked_seconds
+        }
+
+
+@dataclass
+class PipelineReport:
+    """流水线运行报告（deleted: 增量模式下删除的孤儿向量数；metadata_updated: 只更新了元数据的向量数）"""
+    elapsed: float
+    stages: List[StageStats]
+    deleted: int = 0
+    metadata_updated: int = 0
+
+    @property
+    def bottleneck(self) -> Optional[str]:
+        """忙碌时间占比最高的阶段"""
+        if not self.stages:
+            return None
+        return max(self.stages, key=lambda s: s.utilization(self.elapsed)).name
+
+    def stage(self, name: str) -> StageStats:
+        for stats in self.stages:
+            if stats.name == name:
+                return stats
+        raise KeyError(name)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "elapsed": self.elapsed,
+            "bottleneck": self.bottleneck,
+            "deleted": self.deleted,
+            "metadata_updated": self.metadata_updated,
+            "stages": [stats.to_dict(self.elapsed) for stats in self.stages]
+        }
+
+
+class Stage:
+    """
+    流水线阶段
+
+    fn接收一批输入（最多batch_size条），返回该批的输出（条数可以不同，空列表表示全部过滤掉）
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[List[Any]], Iterable[Any]],
+        workers: int = 1,
+        batch_size: int = 1
+    ):
+        """
+        Args:
+            name: 阶段名称（用于统计和线程名）
+            fn: 批处理函数，多个worker时必须线程安全
+            workers: worker线程数
+            batch_size: 每次调用fn的最大输入条数
+        """
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+
+
+class IngestionPipeline:
+    """
+    有界队列连接的多阶段流水线
+
+    数据源在单独的线程中迭代（统计中记为"load"阶段）；
+    阶段之间不保证顺序（多个worker并行处理），写入向量库使用确定性ID，顺序无关
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 1024, source_name: str = "load"):
+        """
+        Args:
+            stages: 阶段列表（按执行顺序）
+            queue_size: 每个阶段输入队列的容量（条）
+            source_name: 数据源阶段在统计中的名称
+        """
+        if not stages:
+            raise ValueError("流水线至少需要一个阶段")
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.source_name = source_name
+
+    def run(self, source: Iterable[Any]) -> PipelineReport:
+        """
+        运行流水线直到数据源耗尽且所有阶段处理完毕
+
+        Args:
+            source: 数据源（任意可迭代对象，例如 ParliamentDataLoader.iter_speeches()）
+
+        Returns:
+            PipelineReport
+
+        Raises:
+            任一阶段（或数据源）抛出的第一个异常
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        source_stats = StageStats(name=self.source_name, workers=1)
+        stage_stats = [StageStats(name=stage.name, workers=stage.workers) for stage in self.stages]
+        stop = threading.Event()
+        errors: List[BaseException] = []
+        remaining = [stage.workers for stage in self.stages]
+        lock = threading.Lock()
+
+        def fail(e: BaseException):
+            with lock:
+                errors.append(e)
+            stop.set()
+
+        def put(q: queue.Queue, item: Any, stats: StageStats):
+            try:
+                q.put_nowait(item)
+                return
+            except queue.Full:
+                pass
+            start = time.perf_counter()
+            while True:
+                if stop.is_set():
+                    raise PipelineAborted()
+                try:
+                    q.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            with lock:
+                stats.blocked_seconds += time.perf_counter() - start
+
+        def get(q: queue.Queue, stats: StageStats) -> Any:
+            try:
+                return q.get_nowait()
+            except queue.Empty:
+                pass
+            start = time.perf_counter()
+            while True:
+                if stop.is_set():
+                    raise PipelineAborted()
+                try:
+                    item = q.get(timeout=0.1)
+                    break
+                except queue.Empty:
+                    continue
+            with lock:
+                stats.starved_seconds += time.perf_counter() - start
+            return item
+
+        def close_downstream(index: int, stats: StageStats):
+            """上游阶段全部结束后，为下游每个worker放入结束标记"""
+            if index < len(self.stages):
+                for _ in range(self.stages[index].workers):
+                    put(queues[index], _END, stats)
+
+        def feed():
+            try:
+                iterator = iter(source)
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        break
+                    source_stats.busy_seconds += time.perf_counter() - start
+                    source_stats.items_in += 1
+                    source_stats.items_out += 1
+                    put(queues[0], item, source_stats)
+                close_downstream(0, source_stats)
+            except PipelineAborted:
+                pass
+            except BaseException as e:
+                logger.error(f"[IngestionPipeline] 数据源失败: {e}")
+                fail(e)
+
+        def work(index: int):
+            stage = self.stages[index]
+            stats = stage_stats[index]
+            inbox = queues[index]
+            outbox = queues[index + 1] if index + 1 < len(self.stages) else None
+            try:
+                done = False
+                while not done:
+                    batch = []
+                    while len(batch) < stage.batch_size:
+                        item = get(inbox, stats)
+                        if item is _END:
+                            done = True
+                            break
+                        batch.append(item)
+                    if not batch:
+                        continue
+
+                    start = time.perf_counter()
+                    outputs = list(stage.fn(batch))
+                    with lock:
+                        stats.busy_seconds += time.perf_counter() - start
+                        stats.items_in += len(batch)
+                        stats.items_out += len(outputs)
+                        stats.batches += 1
+
+                    if outbox is not None:
+                        for output in outputs:
+                            put(outbox, output, stats)
+
+                with lock:
+                    remaining[index] -= 1
+                    last = remaining[index] == 0
+                if last:
+                    close_downstream(index + 1, stats)
+            except PipelineAborted:
+                pass
+            except BaseException as e:
+                logger.error(f"[IngestionPipeline] 阶段 {stage.name} 失败: {e}")
+                fail(e)
+
+        threads = [threading.Thread(target=feed, name=f"pipeline-{self.source_name}", daemon=True)]
+        for index, stage in enumerate(self.stages):
+            for worker_id in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=work, args=(index,), name=f"pipeline-{stage.name}-{worker_id}", daemon=True
+                ))
+
+        logger.info(
+            f"[IngestionPipeline] 🚀 启动: {self.source_name} -> "
+            + " -> ".join(f"{stage.name}(x{stage.workers})" for stage in self.stages)
+            + f", 队列容量={self.queue_size}"
+        )
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        if errors:
+            raise errors[0]
+
+        report = PipelineReport(elapsed=elapsed, stages=[source_stats] + stage_stats)
+        self._log_report(report)
+        return report
+
+    @staticmethod
+    def _log_report(report: PipelineReport):
+        """输出各阶段吞吐量"""
+        logger.info(f"[IngestionPipeline] ✅ 完成: 耗时 {report.elapsed:.1f}秒, 瓶颈阶段: {report.bottleneck}")
+        for stats in report.stages:
+            info = stats.to_dict(report.elapsed)
+            logger.info(
+                f"[IngestionPipeline]   {stats.name:<8} x{stats.workers}: "
+                f"{stats.items_in:,}条 -> {stats.items_out:,}条, "
+                f"{info['items_per_second']:.1f}条/秒, 忙碌{info['utilization']:.0%}, "
+                f"等待上游{stats.starved_seconds:.1f}秒, 等待下游{stats.blocked_seconds:.1f}秒"
+            )
+
+
+# ========== 摄取阶段 ==========
+
+class SpeechChunker:
+    """
+    分块阶段: 演讲 -> chunk（格式与ParliamentTextSplitter.split_speeches相同）
+
+    直接使用ParliamentTextSplitter.iter_chunks / materialize_chunk，与其他索引脚本的分块规则一致，
+    chunk_id（进而chunk_key和向量ID）不会因为分块实现不同而漂移；空演讲跳过
+    """
+
+    def __init__(self, text_splitter):
+        self.text_splitter = text_splitter
+
+    def __call__(self, speeches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        speeches = [speech_data for speech_data in speeches if speech_data.get('speech', '').strip()]
+        if not speeches:
+            return []
+        metadata_table: List[Dict[str, Any]] = []
+        return [
+            self.text_splitter.materialize_chunk(chunk, metadata_table)
+            for chunk in self.text_splitter.iter_chunks(
+                speeches, metadata_table=metadata_table, max_workers=1, batch_size=len(speeches)
+            )
+        ]
+
+
+class ManifestFilter:
+    """
+    增量过滤阶段: 补充 vector_id，跳过清单中内容未变的chunk（输入为build_chunk格式）
+
+    流式处理时无法预先拿到全部chunk，清单条目按年份在首次出现时加载；
+    只有元数据变化的chunk不进入embedding，收集在 metadata_only 中；
+    运行结束后 orphaned_ids() 返回已加载年份中本次未出现的chunk的向量ID
+    """
+
+    def __init__(
+        self,
+        manifest: Optional[ChunkManifest],
+        chunk_params: Dict[str, Any],
+        model_name: str,
+        years: Optional[Iterable[str]] = None,
+        on_year_loaded: Optional[Callable[[str], None]] = None
+    ):
+        """
+        Args:
+            manifest: 增量索引清单，None表示全量（只生成确定性向量ID）
+            chunk_params: 分块参数（参与内容哈希）
+            model_name: Embedding模型名称（参与内容哈希）
+            years: 本次数据覆盖的年份，提供时预先加载（没有任何chunk的年份也能检测孤儿）
+            on_year_loaded: 年份的清单条目首次加载时调用（增量模式，例如检查清单之外的向量）
+        """
+        self.manifest = manifest
+        self.chunk_params = chunk_params
+        self.model_name = model_name
+        self.on_year_loaded = on_year_loaded
+        self.unchanged = 0
+        self.metadata_only: List[Dict[str, Any]] = []
+        self._existing: Dict[str, Dict[str, tuple]] = {}
+        self._seen = set()
+        self._lock = threading.Lock()
+        for year in years or []:
+            self._entries(str(year))
+
+    def __call__(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        to_embed = []
+        with self._lock:
+            for chunk in chunks:
+                if self.manifest is None:
+                    to_embed.append({**chunk, "vector_id": make_vector_id(chunk["year"], chunk["chunk_key"])})
+                    continue
+                self._seen.add(chunk["chunk_key"])
+                planned = plan_chunk(
+                    chunk, self.chunk_params, self.model_name,
+                    self._entries(chunk["year"]).get(chunk["chunk_key"])
+                )
+                if planned is None:
+                    self.unchanged += 1
+                elif planned["metadata_only"]:
+                    self.metadata_only.append(planned)
+                else:
+                    to_embed.append(planned)
+        return to_embed
+
+    def orphaned_ids(self) -> List[str]:
+        """已加载年份中本次未出现的chunk的向量ID"""
+        return [
+            entry[0]
+            for entries in self._existing.values()
+            for key, entry in entries.items()
+            if key not in self._seen
+        ]
+
+    def _entries(self, year: str) -> Dict[str, tuple]:
+        if year not in self._existing:
+            self._existing[year] = self.manifest.load_entries([year]) if self.manifest is not None else {}
+            if self.manifest is not None and self.on_year_loaded is not None:
+                self.on_year_loaded(year)
+        return self._existing[year]
+
+
+class UntrackedVectorCheck:
+    """
+    增量模式下逐年检查索引中不在清单里的向量
+
+    sink需要提供 vector_count() / untracked_ids(year, tracked_vector_ids) / delete_untracked(ids)；
+    replace_legacy=False时发现这样的向量即抛出UntrackedVectorsError，
+    否则记录下来，由调用方在全部新向量写入成功后删除
+    """
+
+    def __init__(self, sink, manifest: ChunkManifest, replace_legacy: bool = False):
+        """
+        Args:
+            sink: 向量库写入器
+            manifest: 增量索引清单
+            replace_legacy: 按新ID重新上传并删除清单之外的向量
+        """
+        self.sink = sink
+        self.manifest = manifest
+        self.replace_legacy = replace_legacy
+        self.legacy_ids: Dict[str, List[Any]] = {}
+
+    @staticmethod
+    def supported(sink) -> bool:
+        """sink是否能列出索引中的向量"""
+        return all(hasattr(sink, name) for name in ("vector_count", "untracked_ids", "delete_untracked"))
+
+    def check_index(self):
+        """清单为空而索引已有数据: 索引是旧版脚本或全量模式建立的，增量模式会重复上传全部数据"""
+        if self.replace_legacy or self.manifest.count() > 0:
+            return
+        total = self.sink.vector_count()
+        if total > 0:
+            raise UntrackedVectorsError(
+                f"增量清单为空，但索引已有 {total} 个向量。"
+                f"使用 --replace-legacy 按新ID重建并删除旧向量，或使用 --full"
+            )
+
+    def __call__(self, year: str):
+        """检查单个年份"""
+        legacy_ids = self.sink.untracked_ids(year, self.manifest.vector_ids(year))
+        if not legacy_ids:
+            return
+        if not self.replace_legacy:
+            raise UntrackedVectorsError(
+                f"{year}年索引中有 {len(legacy_ids)} 个向量不在增量清单中（旧版ID或清单丢失），"
+                f"继续会产生重复向量。使用 --replace-legacy 重新上传并删除这些向量，或使用 --full"
+            )
+        logger.info(f"[IngestionPipeline] ♻️  {year}年有 {len(legacy_ids)} 个清单之外的向量，写入成功后删除")
+        self.legacy_ids[year] = legacy_ids
+
+    def delete_legacy(self) -> int:
+        """删除记录的清单之外的向量（流水线全部成功后调用）"""
+        deleted = 0
+        for year, legacy_ids in self.legacy_ids.items():
+            for start in range(0, len(legacy_ids), 1000):
+                batch_ids = legacy_ids[start:start + 1000]
+                self.sink.delete_untracked(batch_ids)
+                deleted += len(batch_ids)
+            logger.info(f"[IngestionPipeline] 🗑️  {year}年删除清单之外的旧向量: {len(legacy_ids):,}个")
+        self.legacy_ids = {}
+        return deleted
+
+
+class ChunkEmbedder:
+    """
+    Embedding阶段: 为一批chunk生成向量（写入chunk['vector']）
+
+    with_sparse=True时在同一次前向计算中得到BGE-M3稀疏词项权重（写入chunk['lexical_weights']），
+    供本地索引构建稀疏倒排索引
+    """
+
+    def __init__(self, embedding_client, with_sparse: bool = False, **embed_kwargs):
+        """
+        Args:
+            embedding_client: 提供 embed_batch(texts, **kwargs) 的Embedding客户端
+                （with_sparse时还需要 embed_batch_with_sparse）
+            with_sparse: 是否同时生成稀疏词项权重
+            **embed_kwargs: 传给embed_batch / embed_batch_with_sparse的参数
+        """
+        self.embedding_client = embedding_client
+        self.with_sparse = with_sparse
+        self.embed_kwargs = embed_kwargs
+
+    def __call__(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        texts = [chunk['text'] for chunk in chunks]
+        if self.with_sparse:
+            vectors, lexical_weights = self.embedding_client.embed_batch_with_sparse(texts, **self.embed_kwargs)
+        else:
+            vectors, lexical_weights = self.embedding_client.embed_batch(texts, **self.embed_kwargs), None
+        if len(vectors) != len(chunks):
+            raise RuntimeError(f"Embedding返回{len(vectors)}个向量，期望{len(chunks)}个")
+        if lexical_weights is None:
+            return [{**chunk, 'vector': vector} for chunk, vector in zip(chunks, vectors)]
+        return [
+            {**chunk, 'vector': vector, 'lexical_weights': weights}
+            for chunk, vector, weights in zip(chunks, vectors, lexical_weights)
+        ]
+
+
+class ChunkUpserter:
+    """写入阶段: 写入向量库，确认成功后记入清单"""
+
+    def __init__(self, sink, manifest: Optional[ChunkManifest] = None):
+        """
+        Args:
+            sink: 提供 upsert(chunks) 的向量库写入器（chunk含 vector_id / vector / text / metadata）
+            manifest: 增量索引清单
+        """
+        self.sink = sink
+        self.manifest = manifest
+
+    def __call__(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        self.sink.upsert(chunks)
+        if self.manifest is not None:
+            self.manifest.commit(chunks)
+        return chunks
+
+
+def _build_chunks(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """元数据丰富阶段: 生成chunk键和向量库元数据（与batch_migrate脚本共用build_chunk）"""
+    return [build_chunk(chunk) for chunk in chunks]
+
+
+def run_ingestion(
+    speeches: Iterable[Dict[str, Any]],
+    text_splitter,
+    embedding_client,
+    sink,
+    manifest: Optional[ChunkManifest] = None,
+    model_name: str = "",
+    years: Optional[Iterable[str]] = None,
+    chunk_workers: int = 1,
+    embed_batch_size: int = 128,
+    upsert_workers: int = 4,
+    upsert_batch_size: int = 100,
+    queue_size: int = 2048,
+    embed_kwargs: Optional[Dict[str, Any]] = None,
+    with_sparse: bool = False,
+    replace_legacy: bool = False
+) -> PipelineReport:
+    """
+    运行完整摄取流水线: load -> chunk -> enrich -> filter -> embed -> upsert
+
+    增量模式下运行结束后删除孤儿向量（sink.delete）、更新只有元数据变化的向量（sink.update_metadata）并更新清单；
+    增量模式要求sink.supports_delete为True（不能删除的sink无法清理孤儿向量）；
+    sink没有update_metadata时只记录警告，不记入清单（下次运行重新检测）；
+    sink能列出向量时检查清单之外的向量（见UntrackedVectorCheck）
+
+    Args:
+        speeches: 演讲数据源（ParliamentDataLoader.iter_speeches()）
+        text_splitter: ParliamentTextSplitter
+        embedding_client: Embedding客户端
+        sink: 向量库写入器（upsert(chunks)；supports_delete为True时还需提供delete(ids)）
+        manifest: 增量索引清单，None表示全量
+        model_name: Embedding模型名称（参与内容哈希）
+        years: 本次数据覆盖的年份（孤儿检测范围）
+        chunk_workers: 分块worker数
+        embed_batch_size: 每次embedding的chunk数（Embedding固定单worker，避免争用GPU）
+        upsert_workers: 写入worker数（网络并发）
+        upsert_batch_size: 每次写入的向量数
+        queue_size: 阶段间队列容量
+        embed_kwargs: 传给embed_batch的额外参数
+        with_sparse: 同时生成BGE-M3稀疏词项权重（chunk['lexical_weights']，需要sink能保存）
+        replace_legacy: 增量模式下按新ID上传并删除清单之外的向量（全部写入成功后）；
+            为False时遇到这样的向量抛出UntrackedVectorsError
+
+    Returns:
+        PipelineReport（report.deleted为删除的孤儿向量和清单之外的旧向量数，
+        report.metadata_updated为只更新元数据的向量数）
+    """
+    if manifest is not None and not getattr(sink, "supports_delete", False):
+        raise ValueError(f"{type(sink).__name__}不支持删除向量，无法用于增量模式（孤儿向量无法清理）")
+
+    untracked_check = None
+    if manifest is not None:
+        if UntrackedVectorCheck.supported(sink):
+            untracked_check = UntrackedVectorCheck(sink, manifest, replace_legacy=replace_legacy)
+            untracked_check.check_index()
+        else:
+            logger.warning(f"[IngestionPipeline] ⚠️  {type(sink).__name__}不能列出向量，跳过清单之外向量的检查")
+
+    change_filter = ManifestFilter(
+        manifest,
+        chunk_params={'chunk_size': text_splitter.chunk_size, 'chunk_overlap': text_splitter.chunk_overlap},
+        model_name=model_name,
+        years=years,
+        on_year_loaded=untracked_check
+    )
+
+    pipeline = IngestionPipeline([
+        Stage("chunk", SpeechChunker(text_splitter), workers=chunk_workers, batch_size=32),
+        Stage("enrich", _build_chunks, batch_size=256),
+        Stage("filter", change_filter, batch_size=256),
+        Stage(
+            "embed",
+            ChunkEmbedder(embedding_client, with_sparse=with_sparse, **(embed_kwargs or {})),
+            batch_size=embed_batch_size
+        ),
+        Stage("upsert", ChunkUpserter(sink, manifest), workers=upsert_workers, batch_size=upsert_batch_size)
+    ], queue_size=queue_size)
+
+    report = pipeline.run(speeches)
+
+    if manifest is not None:
+        orphaned_ids = change_filter.orphaned_ids()
+        for start in range(0, len(orphaned_ids), 1000):
+            batch_ids = orphaned_ids[start:start + 1000]
+            sink.delete(batch_ids)
+            manifest.remove(batch_ids)
+            report.deleted += len(batch_ids)
+        if untracked_check is not None:
+            # 流水线出错时pipeline.run已抛出异常，旧向量只在全部新向量写入成功后删除
+            report.deleted += untracked_check.delete_legacy()
+        metadata_only = change_filter.metadata_only
+        if metadata_only and hasattr(sink, "update_metadata"):
+            for start in range(0, len(metadata_only), upsert_batch_size):
+                batch = metadata_only[start:start + upsert_batch_size]
+                sink.update_metadata(batch)
+                manifest.commit(batch)
+                report.metadata_updated += len(batch)
+        elif metadata_only:
+            logger.warning(
+                f"[IngestionPipeline] ⚠️  {type(sink).__name__}不支持更新元数据，"
+                f"跳过 {len(metadata_only):,} 个只有元数据变化的chunk"
+            )
+        logger.info(
+            f"[IngestionPipeline] 📋 增量结果: 写入 {report.stage('upsert').items_out:,} 个, "
+            f"更新元数据 {report.metadata_updated:,} 个, "
+            f"未变化 {change_filter.unchanged:,} 个, 删除孤儿 {len(orphaned_ids):,} 个"
+        )
+
+    return report
@@ -2,9 +2,16 @@
 文本分块器模块
 负责将长文本分割成适合向量化的小块
 保留完整的metadata信息
+
+分块方式:
+- split_speeches(): 单进程，每个chunk复制完整metadata（原有方式）
+- iter_chunks() / split_speeches_parallel(): 多进程分块，按顺序产出轻量chunk，
+  chunk只保存metadata_id，演讲metadata在metadata表中按引用共享
 """
 
-from typing import List, Dict, Any
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from src.config import settings
 from src.utils import logger
@@ -19,6 +26,7 @@ class ParliamentTextSplitter:
     2. 每个chunk保留完整的metadata
     3. 支持自定义chunk大小和重叠
     4. 智能处理段落边界
+    5. 支持多进程流式分块（metadata按引用共享）
     """
     
     def __init__(
@@ -96,6 +104,108 @@ class ParliamentTextSplitter:
         
         return all_chunks
     
+    def iter_chunks(
+        self,
+        speeches: Iterable[Dict[str, Any]],
+        metadata_table: Optional[List[Dict[str, Any]]] = None,
+        max_workers: Optional[int] = None,
+        batch_size: int = 200
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        流式分块（可多进程），按演讲顺序产出轻量chunk
+        
+        只把演讲文本发送到子进程分割；metadata留在主进程，
+        以演讲序号(metadata_id)引用，不为每个chunk复制metadata字典
+        
+        Args:
+            speeches: 演讲数据（列表或ParliamentDataLoader.iter_speeches()的迭代器）
+            metadata_table: 可选的metadata表，每条演讲的metadata按顺序追加（引用，不复制），
+                metadata_table[chunk['metadata_id']] 即该chunk的演讲metadata
+            max_workers: 进程数，默认CPU核数；1表示在当前进程中分块
+            batch_size: 每个子进程任务包含的演讲数
+        
+        Yields:
+            轻量chunk:
+            - text: 分块文本内容
+            - metadata_id: 所属演讲的序号
+            - chunk_id / total_chunks / chunk_size: 与split_speeches中metadata的同名字段相同
+        """
+        max_workers = max(1, max_workers or os.cpu_count() or 1)
+        batches = _iter_text_batches(speeches, metadata_table, batch_size)
+        
+        if max_workers == 1:
+            for batch in batches:
+                yield from _lean_chunks(_split_batch(batch, self.text_splitter, self.chunk_size))
+            return
+        
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker_splitter,
+            initargs=(self.chunk_size, self.chunk_overlap, self.separators)
+        ) as executor:
+            # 有界窗口：最多 2*进程数 个批次在途，结果按提交顺序取回
+            pending = []
+            for batch in batches:
+                pending.append(executor.submit(_split_batch_in_worker, batch))
+                if len(pending) >= max_workers * 2:
+                    yield from _lean_chunks(pending.pop(0).result())
+            for future in pending:
+                yield from _lean_chunks(future.result())
+    
+    def split_speeches_parallel(
+        self,
+        speeches: Iterable[Dict[str, Any]],
+        max_workers: Optional[int] = None,
+        batch_size: int = 200
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        多进程分块
+        
+        Args:
+            speeches: 演讲数据
+            max_workers: 进程数，默认CPU核数
+            batch_size: 每个子进程任务包含的演讲数
+        
+        Returns:
+            (轻量chunk列表, metadata表)，chunk通过metadata_id引用metadata表中的演讲metadata
+        """
+        metadata_table: List[Dict[str, Any]] = []
+        chunks = list(self.iter_chunks(
+            speeches,
+            metadata_table=metadata_table,
+            max_workers=max_workers,
+            batch_size=batch_size
+        ))
+        
+        logger.success(f"并行分块完成: {len(metadata_table)}条演讲 -> {len(chunks)}个chunks")
+        
+        return chunks, metadata_table
+    
+    @staticmethod
+    def materialize_chunk(
+        chunk: Dict[str, Any],
+        metadata_table: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        把轻量chunk还原为split_speeches的格式（写入向量库前按需调用）
+        
+        Args:
+            chunk: iter_chunks产出的轻量chunk
+            metadata_table: metadata表
+        
+        Returns:
+            {'text': ..., 'metadata': {原始metadata + chunk_id/total_chunks/chunk_size}}
+        """
+        return {
+            'text': chunk['text'],
+            'metadata': {
+                **metadata_table[chunk['metadata_id']],
+                'chunk_id': chunk['chunk_id'],
+                'total_chunks': chunk['total_chunks'],
+                'chunk_size': chunk['chunk_size']
+            }
+        }
+    
     def _split_single_speech(
         self,
         speech_data: Dict[str, Any]
@@ -157,7 +267,11 @@ class ParliamentTextSplitter:
             统计信息字典
         """
         total_chunks = len(chunks)
-        chunk_sizes = [chunk['metadata']['chunk_size'] for chunk in chunks]
+        # 兼容轻量chunk（chunk_size在顶层）和完整chunk（chunk_size在metadata中）
+        chunk_sizes = [
+            chunk['chunk_size'] if 'chunk_size' in chunk else chunk['metadata']['chunk_size']
+            for chunk in chunks
+        ]
         
         stats = {
             'total_chunks': total_chunks,
@@ -175,6 +289,74 @@ class ParliamentTextSplitter:
         return stats
 
 
+# ========== 多进程分块辅助函数（模块级，可在子进程中执行） ==========
+
+# 子进程内的分割器（由进程池initializer创建，每个进程一个）
+_worker_splitter: Optional[RecursiveCharacterTextSplitter] = None
+_worker_chunk_size: int = 0
+
+
+def _init_worker_splitter(chunk_size: int, chunk_overlap: int, separators: List[str]):
+    """进程池initializer：在子进程中创建分割器"""
+    global _worker_splitter, _worker_chunk_size
+    _worker_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=separators,
+        length_function=len,
+        is_separator_regex=False
+    )
+    _worker_chunk_size = chunk_size
+
+
+def _split_batch_in_worker(batch: List[Tuple[int, str]]) -> List[Tuple[int, List[str]]]:
+    """子进程任务：分割一批演讲文本"""
+    return _split_batch(batch, _worker_splitter, _worker_chunk_size)
+
+
+def _split_batch(
+    batch: List[Tuple[int, str]],
+    text_splitter: RecursiveCharacterTextSplitter,
+    chunk_size: int
+) -> List[Tuple[int, List[str]]]:
+    """分割一批演讲文本（规则与_split_single_speech相同：不超过chunk_size的文本不分割）"""
+    return [
+        (metadata_id, [text] if len(text) <= chunk_size else text_splitter.split_text(text))
+        for metadata_id, text in batch
+    ]
+
+
+def _iter_text_batches(
+    speeches: Iterable[Dict[str, Any]],
+    metadata_table: Optional[List[Dict[str, Any]]],
+    batch_size: int
+) -> Iterator[List[Tuple[int, str]]]:
+    """按批次产出 (metadata_id, 演讲文本)，同时把metadata按引用追加到metadata表"""
+    batch = []
+    for metadata_id, speech_data in enumerate(speeches):
+        if metadata_table is not None:
+            metadata_table.append(speech_data['metadata'])
+        batch.append((metadata_id, speech_data['speech']))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _lean_chunks(split_results: List[Tuple[int, List[str]]]) -> Iterator[Dict[str, Any]]:
+    """把分割结果展开为轻量chunk"""
+    for metadata_id, text_chunks in split_results:
+        for i, chunk_text in enumerate(text_chunks):
+            yield {
+                'text': chunk_text,
+                'metadata_id': metadata_id,
+                'chunk_id': i,
+                'total_chunks': len(text_chunks),
+                'chunk_size': len(chunk_text)
+            }
+
+
 if __name__ == "__main__":
     # 测试文本分块器
     from src.data_loader.loader import ParliamentDataLoader
@@ -0,0 +1,238 @@
+"""
+语义答案缓存
+对相似问题直接返回已生成的最终状态，跳过Decompose/Retrieve/Summarize（缓存查询位于Extract之后）
+
+命中条件:
+1. 问题向量余弦相似度 >= 阈值
+2. Extract节点提取的参数一致（年份、党派、发言人）且问题类型、深度模式相同，
+   避免"2017年"与"2019年"这类高相似问题误命中
+3. 条目未过期（TTL），且生成时的索引版本号与当前一致（索引重建后自动失效）
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..utils.logger import logger
+from ..vectordb.index_epoch import get_index_epoch
+
+
+def _normalized_values(value: Any) -> Tuple[str, ...]:
+    """参数值（字符串或列表）-> 去重排序后的元组"""
+    if value is None:
+        return ()
+    if isinstance(value, (list, tuple, set)):
+        return tuple(sorted({str(item).strip() for item in value if item}))
+    return (str(value).strip(),) if str(value).strip() else ()
+
+
+def parameter_signature(state: Dict) -> Tuple:
+    """
+    从状态中Extract节点提取的参数生成签名
+
+    Args:
+        state: 经过Extract节点的状态（parameters / question_type / deep_thinking_mode）
+
+    Returns:
+        (年份元组, 党派元组, 发言人元组, 问题类型, 深度模式)
+    """
+    parameters = state.get("parameters") or {}
+    time_range = parameters.get("time_range") or {}
+    years = time_range.get("specific_years") or [
+        year for year in (time_range.get("start_year"), time_range.get("end_year")) if year
+    ]
+    return (
+        _normalized_values(years),
+        _normalized_values(parameters.get("parties")),
+        _normalized_values(parameters.get("speakers")),
+        state.get("question_type") or "",
+        bool(state.get("deep_thinking_mode", False))
+    )
+
+
+class SemanticAnswerCache:
+    """
+    语义答案缓存
+
+    功能:
+    1. 按问题向量相似度查找已缓存的最终状态
+    2. TTL过期 + 条目数上限（LRU淘汰）
+    3. 显式失效（invalidate）与索引版本号自动失效
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.97,
+        ttl_seconds: float = 86400,
+        max_entries: int = 500
+    ):
+        """
+        初始化答案缓存
+
+        Args:
+            similarity_threshold: 命中所需的最小余弦相似度
+            ttl_seconds: 条目有效期（秒）
+            max_entries: 最大条目数
+        """
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        # 缓存条目: {条目ID: {"question", "vector", "signature", "state", "created_at", "epoch"}}
+        self._entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        logger.info(
+            f"[AnswerCache] 初始化完成: 相似度阈值={similarity_threshold}, "
+            f"TTL={ttl_seconds}秒, 最大条目数={max_entries}"
+        )
+
+    def lookup(
+        self,
+        question: str,
+        question_vector: List[float],
+        signature: Tuple
+    ) -> Optional[Tuple[Dict, Dict]]:
+        """
+        查找相似问题的缓存状态
+
+        Args:
+            question: 用户问题
+            question_vector: 问题向量
+            signature: 参数签名（parameter_signature）
+
+        Returns:
+            命中时返回 (最终状态副本, 命中信息)，否则返回None
+        """
+        query = _normalize(question_vector)
+        epoch = get_index_epoch()
+        now = time.time()
+
+        with self._lock:
+            self._expire(now, epoch)
+
+            best_id, best_score = None, -1.0
+            for entry_id, entry in self._entries.items():
+                if entry["signature"] != signature:
+                    continue
+                score = float(np.dot(query, entry["vector"]))
+                if score > best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None or best_score < self.similarity_threshold:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_id)
+            entry = self._entries[best_id]
+            self.hits += 1
+
+            hit_info = {
+                "hit": True,
+                "similarity": round(best_score, 4),
+                "cached_question": entry["question"],
+                "age_seconds": round(now - entry["created_at"], 1)
+            }
+            return copy.deepcopy(entry["state"]), hit_info
+
+    def store(
+        self,
+        question: str,
+        question_vector: List[float],
+        final_state: Dict,
+        signature: Tuple
+    ):
+        """
+        缓存最终状态
+
+        Args:
+            question: 用户问题
+            question_vector: 问题向量
+            final_state: 工作流最终状态（只应缓存成功的状态）
+            signature: 参数签名（parameter_signature）
+        """
+        entry = {
+            "question": question,
+            "vector": _normalize(question_vector),
+            "signature": signature,
+            "state": copy.deepcopy(final_state),
+            "created_at": time.time(),
+            "epoch": get_index_epoch()
+        }
+
+        with self._lock:
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        logger.info(f"[AnswerCache] 已缓存答案: {question[:50]}... (当前条目数: {len(self._entries)})")
+
+    def invalidate(self, reason: str = ""):
+        """清空全部缓存（如索引重建后）"""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+        logger.info(f"[AnswerCache] 缓存已失效: 清除{count}个条目 {f'({reason})' if reason else ''}")
+
+    def get_stats(self) -> Dict:
+        """获取缓存统计信息"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def _expire(self, now: float, epoch: str):
+        """删除过期条目和旧索引版本的条目（调用方持有锁）"""
+        expired = [
+            entry_id for entry_id, entry in self._entries.items()
+            if now - entry["created_at"] > self.ttl_seconds or entry["epoch"] != epoch
+        ]
+        for entry_id in expired:
+            del self._entries[entry_id]
+        if expired:
+            logger.debug(f"[AnswerCache] 清除{len(expired)}个过期条目")
+
+
+def _normalize(vector: List[float]) -> np.ndarray:
+    """归一化向量（余弦相似度 = 内积）"""
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm > 0 else array
+
+
+# 答案缓存单例
+_answer_cache: Optional[SemanticAnswerCache] = None
+
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """
+    获取答案缓存单例
+
+    Returns:
+        SemanticAnswerCache实例；配置关闭时返回None
+    """
+    global _answer_cache
+    from ..config import settings
+
+    if not settings.answer_cache_enabled:
+        return None
+
+    if _answer_cache is None:
+        _answer_cache = SemanticAnswerCache(
+            similarity_threshold=settings.answer_cache_similarity_threshold,
+            ttl_seconds=settings.answer_cache_ttl_seconds,
+            max_entries=settings.answer_cache_max_entries
+        )
+    return _answer_cache
@@ -11,6 +11,7 @@ LangGraph节点模块
 7. SummarizeNode - 总结（增强版）
 8. IncrementalSummarizeNodeV2 - 两阶段增量式总结（Phase 2）
 9. ExceptionNode - 异常处理
+10. AnswerCacheLookupNode / AnswerCacheStoreNode - 语义答案缓存
 """
 
 from .intent_enhanced import EnhancedIntentNode as IntentNode
@@ -23,6 +24,7 @@ from .rerank import ReRankNode
 from .summarize_enhanced import EnhancedSummarizeNode as SummarizeNode
 from .summarize_incremental_v2 import IncrementalSummarizeNodeV2
 from .exception_enhanced import EnhancedExceptionNode as ExceptionNode
+from .answer_cache import AnswerCacheLookupNode, AnswerCacheStoreNode
 
 __all__ = [
     "IntentNode",
@@ -34,4 +36,6 @@ __all__ = [
     "SummarizeNode",
     "IncrementalSummarizeNodeV2",
     "ExceptionNode",
+    "AnswerCacheLookupNode",
+    "AnswerCacheStoreNode",
 ]
@@ -0,0 +1,141 @@
+"""
+语义答案缓存节点
+位于Extract之后（参数签名来自Extract节点提取的参数）和工作流出口（Summarize之后）
+
+1. AnswerCacheLookupNode - 对问题做Embedding，命中相似问题时直接返回已缓存的最终状态
+2. AnswerCacheStoreNode - 成功生成答案后写入缓存
+"""
+
+from typing import Optional
+
+from ...llm.embeddings import GeminiEmbeddingClient
+from ...resources import get_embedding_client
+from ...utils.logger import logger
+from ...utils.performance_monitor import get_performance_monitor
+from ..answer_cache import SemanticAnswerCache, get_answer_cache, parameter_signature
+from ..state import GraphState, update_state
+
+
+class AnswerCacheLookupNode:
+    """
+    答案缓存查询节点
+
+    功能:
+    1. 对用户问题做Embedding（与检索共用Embedding客户端和查询向量缓存）
+    2. 按问题向量相似度和Extract提取的参数签名查找，命中时返回缓存的最终状态，工作流直接结束
+    3. Embedding失败或未命中时继续正常流程（Decompose或Retrieve）
+
+    输出:
+    - metadata["answer_cache"]: 命中信息 {"hit": bool, "similarity", "cached_question", "age_seconds"}
+    """
+
+    MONITOR_NAME = "答案缓存"
+
+    def __init__(
+        self,
+        embedding_client: GeminiEmbeddingClient = None,
+        cache: Optional[SemanticAnswerCache] = None
+    ):
+        """
+        初始化答案缓存查询节点
+
+        Args:
+            embedding_client: Embedding客户端,如果为None则使用资源注册表中的共享客户端
+            cache: 答案缓存,如果为None则使用全局缓存（配置关闭时为None）
+        """
+        self.embedding_client = embedding_client or get_embedding_client()
+        self.cache = cache if cache is not None else get_answer_cache()
+
+    def __call__(self, state: GraphState) -> GraphState:
+        """
+        执行缓存查询
+
+        Args:
+            state: 当前状态
+
+        Returns:
+            命中时返回缓存的最终状态，否则返回原状态
+        """
+        metadata = dict(state.get("metadata") or {})
+        metadata["answer_cache"] = {"hit": False}
+        next_node = "decompose" if state.get("is_decomposed", False) else "retrieve"
+
+        if self.cache is None:
+            return update_state(state, metadata=metadata, current_node="answer_cache", next_node=next_node)
+
+        question = state["question"]
+
+        try:
+            question_vector = self.embedding_client.embed_text(question)
+            result = self.cache.lookup(question, question_vector, parameter_signature(state))
+        except Exception as e:
+            logger.warning(f"[AnswerCacheLookupNode] 缓存查询失败，继续正常流程: {str(e)}")
+            result = None
+
+        get_performance_monitor().record_cache_access(self.MONITOR_NAME, hit=result is not None)
+
+        if result is None:
+            logger.info("[AnswerCacheLookupNode] 未命中答案缓存")
+            return update_state(state, metadata=metadata, current_node="answer_cache", next_node=next_node)
+
+        cached_state, hit_info = result
+        logger.info(
+            f"[AnswerCacheLookupNode] ✅ 命中答案缓存: 相似度={hit_info['similarity']}, "
+            f"原问题={hit_info['cached_question'][:50]}"
+        )
+
+        cached_metadata = dict(cached_state.get("metadata") or {})
+        cached_metadata["answer_cache"] = hit_info
+        return update_state(
+            cached_state,
+            question=question,
+            metadata=cached_metadata,
+            current_node="answer_cache",
+            next_node="end"
+        )
+
+
+class AnswerCacheStoreNode:
+    """
+    答案缓存写入节点
+
+    只缓存成功生成最终答案的状态（无错误、非缓存命中）
+    """
+
+    def __init__(
+        self,
+        embedding_client: GeminiEmbeddingClient = None,
+        cache: Optional[SemanticAnswerCache] = None
+    ):
+        """
+        初始化答案缓存写入节点
+
+        Args:
+            embedding_client: Embedding客户端,如果为None则使用资源注册表中的共享客户端
+            cache: 答案缓存,如果为None则使用全局缓存（配置关闭时为None）
+        """
+        self.embedding_client = embedding_client or get_embedding_client()
+        self.cache = cache if cache is not None else get_answer_cache()
+
+    def __call__(self, state: GraphState) -> GraphState:
+        """
+        写入缓存
+
+        Args:
+            state: 当前状态
+
+        Returns:
+            原状态
+        """
+        if self.cache is None or state.get("error") or not state.get("final_answer"):
+            return update_state(state)
+
+        question = state["question"]
+        try:
+            # 查询节点已经对问题做过Embedding，这里通常直接命中查询向量缓存
+            question_vector = self.embedding_client.embed_text(question)
+            self.cache.store(question, question_vector, state, parameter_signature(state))
+        except Exception as e:
+            logger.warning(f"[AnswerCacheStoreNode] 写入答案缓存失败: {str(e)}")
+
+        return update_state(state)
@@ -1,14 +1,24 @@
 """
 重排序节点 (ReRank Node)
-使用Cohere Rerank API对检索到的文档进行重新排序
+对检索到的文档进行重新排序
+
+后端:
+- local: 本地Cross-Encoder（bge-reranker），所有子问题的文档对一次批量打分
+- cohere: Cohere Rerank API，逐个子问题请求
+
+异步执行时推理本身受截止时间约束: 本地后端在推理批次之间检查，Cohere后端在子问题之间检查
+并缩短请求超时，超时的子问题保留原始检索排序
 """
 
+import asyncio
 import os
+import time
 import requests
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from langchain_core.documents import Document
 
 from ..state import GraphState, update_state
+from ...config import settings
 from ...utils.logger import logger
 from ...utils.performance_monitor import get_performance_monitor
 
@@ -19,30 +29,47 @@ class ReRankNode:
     
     功能:
     1. 对RetrieveNode检索到的文档进行重新排序
-    2. 使用CohereRerank提高文档相关性排序
+    2. 使用本地Cross-Encoder或CohereRerank提高文档相关性排序
     3. 保留原始检索结构，增强排序质量
     
     输入: retrieval_results (检索结果)
     输出: reranked_results (重排后结果)
     """
     
-    def __init__(self):
-        """初始化重排序节点"""
+    def __init__(self, backend: Optional[str] = None, reranker=None, top_n: Optional[int] = None):
+        """
+        初始化重排序节点
+        
+        Args:
+            backend: 重排序后端（local / cohere），默认从配置读取
+            reranker: 本地重排序器，默认从资源注册表获取
+            top_n: 每个子问题保留的文档数，默认从配置读取
+        """
         logger.info("[ReRankNode] 初始化重排序节点...")
         
+        self.backend = backend or settings.rerank_backend
+        self.top_n = top_n or settings.rerank_top_n  # 【修复】从10增加到15，提供更多文档给总结阶段
+        self.max_candidates = settings.rerank_max_candidates
+        
         try:
-            # 检查API密钥
-            cohere_api_key = os.getenv("COHERE_API_KEY")
-            if not cohere_api_key:
-                raise ValueError("COHERE_API_KEY未设置，无法初始化重排序功能")
-            
-            # 保存API密钥和配置
-            self.cohere_api_key = cohere_api_key
-            self.model = "rerank-v3.5"  # 修正：使用正确的模型名
-            self.top_n = 15  # 【修复】从10增加到15，提供更多文档给总结阶段
-            self.api_url = "https://api.cohere.com/v2/rerank"  # 修正：使用v2 API
-            
-            logger.info("[ReRankNode] Cohere Rerank初始化成功")
+            if self.backend == "local":
+                if reranker is None:
+                    from ...resources import get_reranker
+                    reranker = get_reranker()
+                self.reranker = reranker
+                logger.info(f"[ReRankNode] 本地重排序初始化成功 ({self.reranker.model_name})")
+            else:
+                # 检查API密钥
+                cohere_api_key = os.getenv("COHERE_API_KEY")
+                if not cohere_api_key:
+                    raise ValueError("COHERE_API_KEY未设置，无法初始化重排序功能")
+                
+                # 保存API密钥和配置
+                self.cohere_api_key = cohere_api_key
+                self.model = "rerank-v3.5"  # 修正：使用正确的模型名
+                self.api_url = "https://api.cohere.com/v2/rerank"  # 修正：使用v2 API
+                
+                logger.info("[ReRankNode] Cohere Rerank初始化成功")
             
         except Exception as e:
             logger.error(f"[ReRankNode] 初始化失败: {str(e)}")
@@ -55,11 +82,36 @@ class ReRankNode:
         Args:
             state: 当前状态，包含retrieval_results
             
+        Returns:
+            更新后的状态，包含reranked_results
+        """
+        return self._rerank(state)
+    
+    async def acall(self, state: GraphState) -> GraphState:
+        """
+        异步执行重排序（在线程中推理，超过rerank_timeout_seconds后停止推理并保留原始检索排序）
+        
+        Args:
+            state: 当前状态，包含retrieval_results
+            
+        Returns:
+            更新后的状态，包含reranked_results
+        """
+        deadline = time.monotonic() + settings.rerank_timeout_seconds
+        return await asyncio.to_thread(self._rerank, state, deadline)
+    
+    def _rerank(self, state: GraphState, deadline: Optional[float] = None) -> GraphState:
+        """
+        执行重排序
+        
+        Args:
+            state: 当前状态，包含retrieval_results
+            deadline: 推理截止时间（time.monotonic()），None表示不限时
+            
         Returns:
             更新后的状态，包含reranked_results
         """
         # 性能监控开始
-        import time
         start_time = time.time()
         monitor = get_performance_monitor()
         
@@ -84,15 +136,16 @@ class ReRankNode:
                     next_node="summarize"
                 )
             
+            # 参与重排的候选文档（每个子问题最多max_candidates个）
+            candidates = [
+                (item.get("question", ""), (item.get("chunks") or [])[:self.max_candidates])
+                for item in retrieval_results
+            ]
+            rankings = self._rank_all(candidates, deadline)
+            
             reranked_results = []
             
-            # 对每个子问题的检索结果进行重排序
-            for i, retrieval_item in enumerate(retrieval_results):
-                question = retrieval_item.get("question", "")
-                chunks = retrieval_item.get("chunks", [])
-                
-                logger.info(f"[ReRankNode] 正在重排序第 {i+1}/{len(retrieval_results)} 个问题: {question[:50]}...")
-                
+            for i, ((question, chunks), ranking) in enumerate(zip(candidates, rankings)):
                 if not chunks:
                     logger.warning(f"[ReRankNode] 第 {i+1} 个问题没有chunks，跳过重排序")
                     reranked_results.append({
@@ -103,83 +156,15 @@ class ReRankNode:
                     })
                     continue
                 
-                # 转换chunks为Document对象进行重排序
-                documents = []
-                for chunk in chunks:
-                    # chunk格式: {"text": "...", "metadata": {...}, "score": 0.95}
-                    doc = Document(
-                        page_content=chunk.get("text", ""),
-                        metadata=chunk.get("metadata", {})
-                    )
-                    documents.append(doc)
+                if isinstance(ranking, Exception):
+                    logger.error(f"[ReRankNode] 重排序失败: {str(ranking)}")
+                    reranked_results.append(self._fallback_item(question, chunks, str(ranking)))
+                    continue
                 
-                logger.info(f"[ReRankNode] 对 {len(documents)} 个文档进行重排序")
+                reranked_item = self._build_reranked_item(question, chunks, ranking)
+                reranked_results.append(reranked_item)
                 
-                # 使用Cohere API进行重排序
-                try:
-                    # 修正：转换为正确的文档格式
-                    formatted_docs = [{"text": doc.page_content} for doc in documents]
-                    reranked_result = self._cohere_rerank(
-                        query=question,
-                        documents=formatted_docs,
-                        top_n=min(self.top_n, len(documents))
-                    )
-                    
-                    logger.info(f"[ReRankNode] 重排序完成，从 {len(documents)} 个文档中选出 {len(reranked_result)} 个")
-                    
-                    # 转换重排序后的文档回chunks格式，并保留重排序分数
-                    reranked_chunks = []
-                    rerank_scores = []
-
-                    for result in reranked_result:
-                        original_idx = result['index']
-                        original_doc = documents[original_idx]
-                        original_chunk = chunks[original_idx]  # 获取原始chunk以获得score
-                        rerank_score = result['relevance_score']
-
-                        chunk = {
-                            "text": original_doc.page_content,
-                            "metadata": original_doc.metadata,
-                            "score": original_chunk.get("score", 0.0),  # 从原始chunk获取检索分数
-                            "rerank_score": rerank_score,  # 新增重排序分数
-                            "rerank_position": len(reranked_chunks) + 1  # 重排序后的位置
-                        }
-
-                        reranked_chunks.append(chunk)
-                        rerank_scores.append(rerank_score)
-                    
-                    # 构建重排序结果
-                    reranked_item = {
-                        "question": question,
-                        "chunks": reranked_chunks,
-                        "answer": None,  # 待Summarize节点填充
-                        "rerank_scores": rerank_scores,
-                        "original_count": len(documents),
-                        "reranked_count": len(reranked_chunks)
-                    }
-                    
-                    reranked_results.append(reranked_item)
-                    
-                    logger.info(f"[ReRankNode] 第 {i+1} 个问题重排序完成，保留 {len(reranked_chunks)} 个文档")
-                    
-                except Exception as rerank_error:
-                    logger.error(f"[ReRankNode] 重排序失败: {str(rerank_error)}")
-                    
-                    # 重排序失败时，保留原始检索结果
-                    fallback_chunks = []
-                    for chunk in chunks:
-                        fallback_chunk = chunk.copy()
-                        fallback_chunk["rerank_score"] = None
-                        fallback_chunk["rerank_position"] = None
-                        fallback_chunks.append(fallback_chunk)
-                    
-                    reranked_results.append({
-                        "question": question,
-                        "chunks": fallback_chunks,
-                        "answer": None,
-                        "rerank_scores": [],
-                        "rerank_error": str(rerank_error)
-                    })
+                logger.info(f"[ReRankNode] 第 {i+1} 个问题重排序完成，保留 {reranked_item['reranked_count']} 个文档")
             
             logger.info(f"[ReRankNode] 重排序完成，处理了 {len(reranked_results)} 个问题")
             
@@ -210,7 +195,108 @@ class ReRankNode:
                 next_node="exception"
             )
     
-    def _cohere_rerank(self, query: str, documents: List[Dict], top_n: int = 10) -> List[Dict]:
+    def _rank_all(self, candidates: List[tuple], deadline: Optional[float] = None) -> List[Any]:
+        """
+        为所有子问题的候选文档排序
+        
+        Args:
+            candidates: [(问题, chunks)]
+            deadline: 推理截止时间（time.monotonic()），None表示不限时
+            
+        Returns:
+            与candidates一一对应的排序结果 [{index, relevance_score}]；失败/超时的子问题为异常对象
+        """
+        if self.backend == "local":
+            requests_to_rank = [
+                (question, [chunk.get("text", "") for chunk in chunks], [_chunk_id(chunk) for chunk in chunks])
+                for question, chunks in candidates if chunks
+            ]
+            total_pairs = sum(len(texts) for _, texts, _ in requests_to_rank)
+            logger.info(f"[ReRankNode] 本地批量重排序: {len(requests_to_rank)} 个问题, {total_pairs} 个文档对")
+            try:
+                ranked = iter(self.reranker.rerank_batch(requests_to_rank, top_n=self.top_n, deadline=deadline))
+            except Exception as e:
+                return [e] * len(candidates)
+            return [next(ranked) if chunks else [] for _, chunks in candidates]
+        
+        rankings = []
+        for i, (question, chunks) in enumerate(candidates):
+            if not chunks:
+                rankings.append([])
+                continue
+            request_timeout = 30.0
+            if deadline is not None:
+                request_timeout = min(request_timeout, deadline - time.monotonic())
+                if request_timeout <= 0:
+                    logger.warning(f"[ReRankNode] ⏰ 超过截止时间，第 {i+1} 个问题保留原始检索排序")
+                    rankings.append(TimeoutError("重排序超时"))
+                    continue
+            logger.info(f"[ReRankNode] 正在重排序第 {i+1}/{len(candidates)} 个问题: {question[:50]}...")
+            try:
+                # 修正：转换为正确的文档格式
+                formatted_docs = [{"text": chunk.get("text", "")} for chunk in chunks]
+                rankings.append(self._cohere_rerank(
+                    query=question,
+                    documents=formatted_docs,
+                    top_n=min(self.top_n, len(chunks)),
+                    timeout=request_timeout
+                ))
+            except Exception as rerank_error:
+                rankings.append(rerank_error)
+        return rankings
+    
+    @staticmethod
+    def _build_reranked_item(question: str, chunks: List[Dict], ranking: List[Dict]) -> Dict:
+        """按排序结果构建重排后的子问题结果，并保留重排序分数"""
+        reranked_chunks = []
+        rerank_scores = []
+
+        for result in ranking:
+            original_idx = result['index']
+            original_chunk = chunks[original_idx]  # 获取原始chunk以获得score
+            rerank_score = result['relevance_score']
+
+            chunk = {
+                "text": original_chunk.get("text", ""),
+                "metadata": original_chunk.get("metadata", {}),
+                "score": original_chunk.get("score", 0.0),  # 从原始chunk获取检索分数
+                "rerank_score": rerank_score,  # 新增重排序分数
+                "rerank_position": len(reranked_chunks) + 1  # 重排序后的位置
+            }
+            if "id" in original_chunk:
+                chunk["id"] = original_chunk["id"]
+
+            reranked_chunks.append(chunk)
+            rerank_scores.append(rerank_score)
+        
+        return {
+            "question": question,
+            "chunks": reranked_chunks,
+            "answer": None,  # 待Summarize节点填充
+            "rerank_scores": rerank_scores,
+            "original_count": len(chunks),
+            "reranked_count": len(reranked_chunks)
+        }
+    
+    @staticmethod
+    def _fallback_item(question: str, chunks: List[Dict], error: str) -> Dict:
+        """重排序失败时，保留原始检索结果"""
+        fallback_chunks = []
+        for chunk in chunks:
+            fallback_chunk = chunk.copy()
+            fallback_chunk["rerank_score"] = None
+            fallback_chunk["rerank_position"] = None
+            fallback_chunks.append(fallback_chunk)
+        
+        return {
+            "question": question,
+            "chunks": fallback_chunks,
+            "answer": None,
+            "rerank_scores": [],
+            "rerank_error": error
+        }
+    
+    def _cohere_rerank(self, query: str, documents: List[Dict], top_n: int = 10, timeout: float = 30) -> List[Dict]:
         """
         直接调用Cohere API进行重排序
         
@@ -218,6 +304,7 @@ class ReRankNode:
             query: 查询字符串
             documents: 文档对象列表，格式为[{"text": "..."}, {"text": "..."}]
             top_n: 返回top-n个结果
+            timeout: 请求超时时间（秒）
             
         Returns:
             重排序结果列表，每个元素包含 {index, relevance_score}
@@ -253,7 +340,7 @@ class ReRankNode:
                 self.api_url, 
                 json=data, 
                 headers=headers, 
-                timeout=30,
+                timeout=timeout,
                 proxies=proxies if proxies else None
             )
             response.raise_for_status()
@@ -291,6 +378,12 @@ class ReRankNode:
             logger.debug(f"[ReRankNode] Top-{i+1} (score={score:.3f}): {doc_text}...")
 
 
+def _chunk_id(chunk: Dict) -> Optional[str]:
+    """文档ID（用于重排分数缓存，缺失时由重排序器使用文本哈希）"""
+    chunk_id = chunk.get("id") or (chunk.get("metadata") or {}).get("id")
+    return str(chunk_id) if chunk_id else None
+
+
 if __name__ == "__main__":
     # 测试重排序节点
     from ..state import create_initial_state
@@ -319,7 +412,7 @@ if __name__ == "__main__":
     ]
     
     print("=== 测试重排序节点 ===")
-    print("注意: 需要设置COHERE_API_KEY环境变量")
+    print("注意: 本地后端需要sentence-transformers或ONNX模型，cohere后端需要设置COHERE_API_KEY环境变量")
     
     try:
         rerank_node = ReRankNode()
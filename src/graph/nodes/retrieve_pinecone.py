@@ -11,12 +11,24 @@ Pinecone数据检索节点
 
 import asyncio
 from typing import List, Dict, Optional
-from ...vectordb.pinecone_retriever import PineconeRetriever, create_pinecone_retriever
+from ...vectordb.pinecone_retriever import PineconeRetriever
+from ...vectordb.search_cache import CachedRetriever, get_search_result_cache, search_cache_scope
+from ...config import settings
 from ...llm.embeddings import GeminiEmbeddingClient
+from ...resources import get_embedding_client, get_vector_retriever
 from ...utils.logger import logger
 from ...utils.performance_monitor import get_performance_monitor
 from ..state import GraphState, update_state
 from ..knowledge_graph import get_knowledge_graph_manager
+from ..retrieval_planner import RetrievalPlanner
+
+
+class QueryVectorMap(dict):
+    """预计算的 {查询文本: 向量}；lexical_weights 保存原始问题的BGE-M3稀疏词项权重（混合检索用）"""
+
+    def __init__(self, vectors=(), lexical_weights: Optional[Dict[str, Dict[int, float]]] = None):
+        super().__init__(vectors)
+        self.lexical_weights = lexical_weights or {}
 
 
 class PineconeRetrieveNode:
@@ -50,8 +62,8 @@ class PineconeRetrieveNode:
         初始化Pinecone检索节点
 
         Args:
-            retriever: Pinecone检索器,如果为None则自动创建
-            embedding_client: Embedding客户端
+            retriever: Pinecone检索器,如果为None则使用资源注册表中的共享检索器
+            embedding_client: Embedding客户端,如果为None则使用资源注册表中的共享客户端
             top_k: 默认返回的top-k结果
             index_name: Pinecone索引名称
             enable_multi_year_strategy: 是否启用多年份分层检索策略
@@ -70,7 +82,7 @@ class PineconeRetrieveNode:
         if retriever is None:
             try:
                 logger.info(f"[PineconeRetrieveNode] 初始化Pinecone检索器...")
-                self.retriever = create_pinecone_retriever(
+                self.retriever = get_vector_retriever(
                     index_name=index_name,
                     default_limit=top_k
                 )
@@ -88,7 +100,12 @@ class PineconeRetrieveNode:
         else:
             self.retriever = retriever
 
-        self.embedding_client = embedding_client or GeminiEmbeddingClient()
+        # 检索结果缓存（配置关闭时为None）
+        search_cache = get_search_result_cache()
+        if search_cache is not None and not isinstance(self.retriever, CachedRetriever):
+            self.retriever = CachedRetriever(self.retriever, search_cache)
+
+        self.embedding_client = embedding_client or get_embedding_client()
 
         # 【架构解耦】初始化知识图谱管理器
         self.kg_manager = None
@@ -108,7 +125,22 @@ class PineconeRetrieveNode:
 
     def __call__(self, state: GraphState) -> GraphState:
         """
-        执行数据检索
+        执行数据检索（同步入口，内部运行异步实现）
+
+        Args:
+            state: 当前状态
+
+        Returns:
+            更新后的状态
+        """
+        return asyncio.run(self.acall(state))
+
+    async def acall(self, state: GraphState) -> GraphState:
+        """
+        执行数据检索（异步实现）
+
+        在已有事件循环中直接await（QuestionAnswerWorkflow.arun），
+        阻塞的Embedding和串行检索放到线程中执行，不阻塞事件循环
 
         Args:
             state: 当前状态
@@ -180,23 +212,38 @@ class PineconeRetrieveNode:
         thinking_process.append(f"提取参数: {parameters}")
 
         try:
-            # === 并发优化：根据配置选择串行或并发检索 ===
-            if self.enable_concurrent:
-                logger.info(f"[PineconeRetrieveNode] 🚀 使用并发模式检索 {len(questions)} 个问题")
-                retrieval_results, no_material_found, overall_year_distribution = asyncio.run(
-                    self._retrieve_all_concurrent(questions, parameters, thinking_process)
-                )
-            else:
-                logger.info(f"[PineconeRetrieveNode] 使用串行模式检索 {len(questions)} 个问题")
-                retrieval_results, no_material_found, overall_year_distribution = self._retrieve_all_sequential(
-                    questions, parameters, thinking_process
-                )
+            # === 批量Embedding预计算：所有子问题的所有查询变体一次性向量化 ===
+            query_vector_map = await asyncio.to_thread(
+                self._precompute_query_vectors, questions, thinking_process
+            )
+
+            # 统计本次请求的检索结果缓存命中情况（to_thread会复制上下文，线程中的检索同样计入）
+            with search_cache_scope() as cache_stats:
+                # === 并发优化：根据配置选择串行或并发检索 ===
+                if self.enable_concurrent:
+                    logger.info(f"[PineconeRetrieveNode] 🚀 使用并发模式检索 {len(questions)} 个问题")
+                    retrieval_results, no_material_found, overall_year_distribution = await self._retrieve_all_concurrent(
+                        questions, parameters, thinking_process,
+                        query_vector_map=query_vector_map
+                    )
+                else:
+                    logger.info(f"[PineconeRetrieveNode] 使用串行模式检索 {len(questions)} 个问题")
+                    retrieval_results, no_material_found, overall_year_distribution = await asyncio.to_thread(
+                        self._retrieve_all_sequential,
+                        questions, parameters, thinking_process,
+                        query_vector_map=query_vector_map
+                    )
 
             # 总结检索情况
             thinking_process.append("\n=== 检索总结 ===")
             thinking_process.append(f"总文档数: {sum(len(r['chunks']) for r in retrieval_results)}")
             thinking_process.append(f"整体年份分布: {overall_year_distribution}")
             thinking_process.append(f"找到材料: {'是' if not no_material_found else '否'}")
+            if cache_stats.lookups:
+                thinking_process.append(
+                    f"检索结果缓存: 命中{cache_stats.hits}/{cache_stats.lookups}次 "
+                    f"(命中率{cache_stats.hit_rate:.0%})"
+                )
 
             # 记录性能监控
             end_time = time.time()
@@ -257,25 +304,137 @@ class PineconeRetrieveNode:
                 next_node="exception"
             )
 
+    def _precompute_query_vectors(
+        self,
+        questions: List,
+        thinking_process: List[str]
+    ) -> Dict[str, List[float]]:
+        """
+        预计算所有查询向量（检索开始前的批量Embedding）
+
+        收集所有子问题（含KG扩展查询）的全部查询变体，去重后一次性向量化，
+        避免每个变体单独调用embed_text（CPU上BGE-M3单次前向代价很高）
+
+        Args:
+            questions: 问题列表（字符串或字典）
+            thinking_process: 思考过程列表
+
+        Returns:
+            {查询文本: 向量} 映射（QueryVectorMap，启用混合检索时同时带有原始问题的稀疏词项权重），
+            失败时返回空字典（检索时回退为逐个embedding）
+        """
+        import time
+
+        # 收集所有查询文本（保持顺序去重）
+        query_texts = []
+        question_texts = []
+        seen = set()
+        for question_item in questions:
+            if isinstance(question_item, dict):
+                question_text = question_item.get("question", "")
+            else:
+                question_text = question_item
+            if not question_text:
+                continue
+            question_texts.append(question_text)
+            for variant in self._generate_query_variants(question_text):
+                if variant not in seen:
+                    seen.add(variant)
+                    query_texts.append(variant)
+
+        if not query_texts:
+            return {}
+
+        # 自定义embedding客户端可能没有embed_queries，回退为逐个embedding
+        if not hasattr(self.embedding_client, "embed_queries"):
+            return {}
+
+        # 混合检索需要原始问题的稀疏词项权重：与稠密向量在同一次前向计算中得到
+        sparse_texts = question_texts if self._hybrid_search_available() else []
+
+        start_time = time.time()
+        try:
+            if sparse_texts and hasattr(self.embedding_client, "embed_queries_with_sparse"):
+                vectors, lexical_weights = self.embedding_client.embed_queries_with_sparse(query_texts, sparse_texts)
+            else:
+                vectors, lexical_weights = self.embedding_client.embed_queries(query_texts), {}
+        except Exception as e:
+            logger.warning(f"[PineconeRetrieveNode] 批量Embedding失败，回退为逐个embedding: {e}")
+            return {}
+
+        duration = time.time() - start_time
+        get_performance_monitor().record_timing("Query批量Embedding", duration)
+
+        logger.info(
+            f"[PineconeRetrieveNode] 批量Embedding完成: {len(questions)}个问题 -> "
+            f"{len(query_texts)}个唯一查询, 耗时{duration:.2f}秒"
+        )
+        thinking_process.append(
+            f"批量Embedding: {len(query_texts)}个唯一查询变体, 一次调用, 耗时{duration:.2f}秒"
+        )
+
+        return QueryVectorMap(zip(query_texts, vectors), lexical_weights=lexical_weights)
+
     def _retrieve_for_question(
         self,
         question: str,
         parameters: Dict,
         thinking_process: List[str],
-        question_metadata: Dict = None
+        question_metadata: Dict = None,
+        query_vector_map: Optional[Dict[str, List[float]]] = None
     ) -> tuple[List[Dict], Dict[str, int], str]:
         """
         为单个问题检索材料（支持单年针对性检索 + Query扩展）
 
+        计划 -> 执行 -> 整理，多问题场景由_retrieve_all_concurrent共用同一个检索计划
+
         Args:
             question: 问题
             parameters: 提取的参数
             thinking_process: 思考过程列表(用于记录)
             question_metadata: 子问题元数据（包含target_year等）
+            query_vector_map: 预计算的 {查询文本: 向量}（缺失的变体会单独embedding）
 
         Returns:
             (检索结果列表, 年份分布, 检索方法)
         """
+        planner = RetrievalPlanner()
+        plan = self._plan_question(
+            question, parameters, thinking_process, question_metadata, query_vector_map, planner
+        )
+        planner.execute(self.retriever)
+        all_results = self._collect_planned_results(plan, planner, thinking_process)
+
+        # 【Phase 4 修复】降级策略：当speaker+party过滤返回0结果时，只用speaker重试
+        if not all_results and self._plan_fallback(plan, planner, thinking_process):
+            planner.execute(self.retriever)
+            all_results = self._collect_planned_results(plan, planner, thinking_process, fallback=True)
+
+        return self._finalize_question_results(plan, all_results, thinking_process)
+
+    def _plan_question(
+        self,
+        question: str,
+        parameters: Dict,
+        thinking_process: List[str],
+        question_metadata: Optional[Dict],
+        query_vector_map: Optional[Dict[str, List[float]]],
+        planner: RetrievalPlanner
+    ) -> Dict:
+        """
+        生成单个问题的检索计划（只登记检索请求，不执行）
+
+        Args:
+            question: 问题
+            parameters: 提取的参数
+            thinking_process: 思考过程列表
+            question_metadata: 子问题元数据（包含target_year等）
+            query_vector_map: 预计算的 {查询文本: 向量}
+            planner: 检索计划器
+
+        Returns:
+            检索计划 {"steps": [(说明, 请求ID, 是否可选)], "retrieval_method", "strategy", "filters", ...}
+        """
         # === Phase 4: Query扩展策略 ===
         # 生成查询变体以提高召回率
         query_variants = self._generate_query_variants(question)
@@ -283,10 +442,13 @@ class PineconeRetrieveNode:
         for i, variant in enumerate(query_variants, 1):
             thinking_process.append(f"   变体{i}: {variant[:80]}...")
 
-        # 为每个变体生成向量
+        # 为每个变体获取向量（优先使用预计算结果）
+        query_vector_map = query_vector_map or {}
         query_vectors = []
         for variant in query_variants:
-            vector = self.embedding_client.embed_text(variant)
+            vector = query_vector_map.get(variant)
+            if vector is None:
+                vector = self.embedding_client.embed_text(variant)
             query_vectors.append((variant, vector))
 
         # ===  新增：单年针对性检索策略 ===
@@ -296,8 +458,7 @@ class PineconeRetrieveNode:
         target_year = question_metadata.get("target_year")
         retrieval_strategy = question_metadata.get("retrieval_strategy", "multi_year")
 
-        # 存储所有变体的检索结果
-        all_results = []
+        plan = {"steps": [], "query_vectors": query_vectors, "fallback_steps": []}
 
         # 策略1: 单年检索（优先）
         if target_year and retrieval_strategy == "single_year":
@@ -310,18 +471,23 @@ class PineconeRetrieveNode:
 
             thinking_process.append(f"单年过滤条件: {filters}")
 
+            # 稠密+稀疏混合检索（精确实体词直接命中倒排表）
+            self._plan_hybrid_search(
+                plan, question, query_vectors[0][1], filters, planner,
+                lexical_weights=getattr(query_vector_map, "lexical_weights", {}).get(question)
+            )
+
             # 对每个查询变体执行检索
             for i, (variant_text, variant_vector) in enumerate(query_vectors, 1):
-                variant_results = self.retriever.search(
-                    query_vector=variant_vector,
+                request_id = planner.add(
+                    "search", variant_vector,
                     limit=20,  # 每个变体召回20个，总共最多60个
                     filters=filters if filters else None
                 )
-                thinking_process.append(f"   变体{i}召回: {len(variant_results)}个文档")
-                all_results.extend(variant_results)
+                plan["steps"].append((f"变体{i}召回", request_id, False))
 
-            retrieval_method = f"single_year_expanded(year={target_year}, variants={len(query_vectors)})"
-            thinking_process.append(f"单年扩展检索完成，总计 {len(all_results)} 个文档（去重前）")
+            plan["strategy"] = "single_year"
+            plan["retrieval_method"] = f"single_year_expanded(year={target_year}, variants={len(query_vectors)})"
 
         # 策略2: 多年检索（原有逻辑）
         else:
@@ -342,59 +508,129 @@ class PineconeRetrieveNode:
 
             if use_multi_year:
                 thinking_process.append(f"检测到{len(years)}年跨度，使用多年份分层检索策略")
-                retrieval_method = f"multi_year_stratified_expanded(years={len(years)}, variants={len(query_vectors)})"
+                plan["strategy"] = "multi_year"
+                plan["retrieval_method"] = f"multi_year_stratified_expanded(years={len(years)}, variants={len(query_vectors)})"
 
                 # 提取其他过滤条件（去除year）
                 other_filters = {k: v for k, v in filters.items() if k != 'year'}
 
                 # 对每个查询变体执行多年份检索
                 for i, (variant_text, variant_vector) in enumerate(query_vectors, 1):
-                    variant_results = self.retriever.search_multi_year_parallel(
-                        query_vector=variant_vector,
+                    request_id = planner.add(
+                        "search_multi_year_parallel", variant_vector,
                         years=years,
                         limit_per_year=self.limit_per_year,
                         other_filters=other_filters if other_filters else None
                     )
-                    thinking_process.append(f"   变体{i}召回: {len(variant_results)}个文档")
-                    all_results.extend(variant_results)
+                    plan["steps"].append((f"变体{i}召回", request_id, False))
             else:
                 thinking_process.append(f"使用标准检索 + Query扩展")
-                retrieval_method = f"standard_expanded(variants={len(query_vectors)})"
+                plan["strategy"] = "standard"
+                plan["retrieval_method"] = f"standard_expanded(variants={len(query_vectors)})"
+
+                # 稠密+稀疏混合检索（精确实体词直接命中倒排表）
+                self._plan_hybrid_search(
+                    plan, question, query_vectors[0][1], filters, planner,
+                    lexical_weights=getattr(query_vector_map, "lexical_weights", {}).get(question)
+                )
 
                 # 对每个查询变体执行标准检索
                 for i, (variant_text, variant_vector) in enumerate(query_vectors, 1):
-                    variant_results = self.retriever.search(
-                        query_vector=variant_vector,
+                    request_id = planner.add(
+                        "search", variant_vector,
                         limit=20,  # 每个变体20个
                         filters=filters if filters else None
                     )
-                    thinking_process.append(f"   变体{i}召回: {len(variant_results)}个文档")
-                    all_results.extend(variant_results)
-
-                # 【Phase 4 修复】降级策略：当speaker+party过滤返回0结果时，只用speaker重试
-                if len(all_results) == 0 and filters and 'speaker' in filters and 'party' in filters:
-                    logger.warning(f"[PineconeRetrieveNode] speaker+party过滤返回0结果，尝试只用speaker降级检索")
-                    thinking_process.append(f"⚠️ 降级策略: 移除party过滤，只用speaker重试")
-
-                    # 创建只有speaker的过滤条件
-                    fallback_filters = {'speaker': filters['speaker']}
-                    if 'year' in filters:
-                        fallback_filters['year'] = filters['year']
-
-                    thinking_process.append(f"降级过滤条件: {fallback_filters}")
-
-                    for i, (variant_text, variant_vector) in enumerate(query_vectors, 1):
-                        variant_results = self.retriever.search(
-                            query_vector=variant_vector,
-                            limit=20,
-                            filters=fallback_filters
-                        )
-                        thinking_process.append(f"   降级变体{i}召回: {len(variant_results)}个文档")
-                        all_results.extend(variant_results)
+                    plan["steps"].append((f"变体{i}召回", request_id, False))
+
+        plan["filters"] = filters
+        return plan
+
+    def _plan_fallback(self, plan: Dict, planner: RetrievalPlanner, thinking_process: List[str]) -> bool:
+        """
+        登记降级检索（标准检索中speaker+party过滤返回0结果时，只用speaker重试）
+
+        Returns:
+            是否登记了降级检索
+        """
+        filters = plan.get("filters") or {}
+        if plan.get("strategy") != "standard" or 'speaker' not in filters or 'party' not in filters:
+            return False
+
+        logger.warning(f"[PineconeRetrieveNode] speaker+party过滤返回0结果，尝试只用speaker降级检索")
+        thinking_process.append(f"⚠️ 降级策略: 移除party过滤，只用speaker重试")
+
+        # 创建只有speaker的过滤条件
+        fallback_filters = {'speaker': filters['speaker']}
+        if 'year' in filters:
+            fallback_filters['year'] = filters['year']
+
+        thinking_process.append(f"降级过滤条件: {fallback_filters}")
+
+        for i, (variant_text, variant_vector) in enumerate(plan["query_vectors"], 1):
+            request_id = planner.add("search", variant_vector, limit=20, filters=fallback_filters)
+            plan["fallback_steps"].append((f"降级变体{i}召回", request_id, False))
+        return True
+
+    def _collect_planned_results(
+        self,
+        plan: Dict,
+        planner: RetrievalPlanner,
+        thinking_process: List[str],
+        fallback: bool = False
+    ) -> List[Dict]:
+        """
+        从已执行的检索计划中取回该问题的结果
+
+        Args:
+            plan: 检索计划
+            planner: 已执行的检索计划器
+            thinking_process: 思考过程列表
+            fallback: 是否取回降级检索的结果
 
-                    if all_results:
-                        retrieval_method = f"standard_expanded_fallback(variants={len(query_vectors)})"
-                        logger.info(f"[PineconeRetrieveNode] 降级策略成功，召回 {len(all_results)} 个文档")
+        Returns:
+            合并前的检索结果列表（必选检索失败时抛出异常）
+        """
+        all_results = []
+        for label, request_id, optional in plan["fallback_steps" if fallback else "steps"]:
+            try:
+                results = planner.results(request_id)
+            except Exception as e:
+                if not optional:
+                    raise
+                logger.warning(f"[PineconeRetrieveNode] 混合检索失败，仅使用稠密检索: {e}")
+                continue
+
+            if label == "混合检索召回":
+                lexical_hits = sum(1 for result in results if result.get("sparse_score", 0) > 0)
+                thinking_process.append(
+                    f"   混合检索召回: {len(results)}个文档（其中{lexical_hits}个命中查询词项）"
+                )
+            else:
+                thinking_process.append(f"   {label}: {len(results)}个文档")
+            all_results.extend(results)
+
+        if fallback:
+            if all_results:
+                plan["retrieval_method"] = f"standard_expanded_fallback(variants={len(plan['query_vectors'])})"
+                logger.info(f"[PineconeRetrieveNode] 降级策略成功，召回 {len(all_results)} 个文档")
+        elif plan.get("strategy") == "single_year":
+            thinking_process.append(f"单年扩展检索完成，总计 {len(all_results)} 个文档（去重前）")
+        return all_results
+
+    def _finalize_question_results(
+        self,
+        plan: Dict,
+        all_results: List[Dict],
+        thinking_process: List[str]
+    ) -> tuple[List[Dict], Dict[str, int], str]:
+        """
+        去重、排序并格式化单个问题的检索结果
+
+        Returns:
+            (检索结果列表, 年份分布, 检索方法)
+        """
+        retrieval_method = plan["retrieval_method"]
 
         # 去重并按相似度重新排序
         results = self._deduplicate_and_rerank(all_results, top_k=self.top_k)
@@ -645,6 +881,59 @@ class PineconeRetrieveNode:
         # 如果没有匹配的关键词，返回关键词版本
         return base
 
+    def _hybrid_search_available(self) -> bool:
+        """检索器有稀疏倒排索引、Embedding客户端能输出BGE-M3词项权重，且配置开启混合检索"""
+        return (
+            settings.hybrid_search_enabled
+            and getattr(self.retriever, "supports_hybrid", False)
+            and getattr(self.embedding_client, "supports_sparse", False)
+        )
+
+    def _plan_hybrid_search(
+        self,
+        plan: Dict,
+        question: str,
+        query_vector: List[float],
+        filters: Dict,
+        planner: RetrievalPlanner,
+        limit: int = 20,
+        lexical_weights: Optional[Dict[int, float]] = None
+    ):
+        """
+        为原始问题登记一次稠密+稀疏混合检索
+
+        只在_hybrid_search_available时生效，否则不登记（不影响原有的变体检索）；
+        混合检索失败时只记录警告
+
+        Args:
+            plan: 当前问题的检索计划
+            question: 原始问题
+            query_vector: 原始问题的向量
+            filters: 过滤条件
+            planner: 检索计划器
+            limit: 返回结果数量
+            lexical_weights: 预计算的问题稀疏词项权重（缺失时单独计算）
+        """
+        if not self._hybrid_search_available():
+            return
+
+        if lexical_weights is None:
+            try:
+                lexical_weights = self.embedding_client.embed_query_sparse(question)
+            except Exception as e:
+                logger.warning(f"[PineconeRetrieveNode] 稀疏权重计算失败，仅使用稠密检索: {e}")
+                return
+
+        request_id = planner.add(
+            "hybrid_search", query_vector,
+            query_lexical_weights=lexical_weights,
+            limit=limit,
+            filters=filters if filters else None,
+            dense_weight=settings.hybrid_dense_weight,
+            sparse_weight=settings.hybrid_sparse_weight
+        )
+        plan["steps"].append(("混合检索召回", request_id, True))
+
     def _deduplicate_and_rerank(self, results: List[Dict], top_k: int) -> List[Dict]:
         """
         去重并按相似度重新排序
@@ -676,7 +965,8 @@ class PineconeRetrieveNode:
         self,
         questions: List,
         parameters: Dict,
-        thinking_process: List[str]
+        thinking_process: List[str],
+        query_vector_map: Optional[Dict[str, List[float]]] = None
     ) -> tuple[List[Dict], bool, Dict[str, int]]:
         """
         串行模式：逐个检索问题（原有逻辑）
@@ -685,6 +975,7 @@ class PineconeRetrieveNode:
             questions: 问题列表
             parameters: 参数
             thinking_process: 思考过程列表
+            query_vector_map: 预计算的查询向量
 
         Returns:
             (检索结果列表, 是否未找到材料, 整体年份分布)
@@ -695,16 +986,7 @@ class PineconeRetrieveNode:
 
         for i, question_item in enumerate(questions, 1):
             # 支持字典和字符串两种格式
-            if isinstance(question_item, dict):
-                question_text = question_item.get("question", question_item)
-                question_metadata = question_item
-            else:
-                question_text = question_item
-                question_metadata = {
-                    "question": question_text,
-                    "target_year": None,
-                    "retrieval_strategy": "multi_year"
-                }
+            question_text, question_metadata = self._normalize_question_item(question_item)
 
             logger.info(f"[PineconeRetrieveNode] 检索问题 {i}/{len(questions)}: {question_text}")
             thinking_process.append(f"\n--- 子问题 {i} ---")
@@ -715,7 +997,8 @@ class PineconeRetrieveNode:
 
             # 检索（传入元数据）
             chunks, year_dist, retrieval_method = self._retrieve_for_question(
-                question_text, parameters, thinking_process, question_metadata
+                question_text, parameters, thinking_process, question_metadata,
+                query_vector_map=query_vector_map
             )
 
             if chunks:
@@ -752,114 +1035,112 @@ class PineconeRetrieveNode:
         questions: List,
         parameters: Dict,
         thinking_process: List[str],
-        max_retries: int = 2  # 单个查询最大重试次数
+        max_retries: int = 2,  # 单个检索最大重试次数
+        query_vector_map: Optional[Dict[str, List[float]]] = None
     ) -> tuple[List[Dict], bool, Dict[str, int]]:
         """
-        并发模式：同时检索所有问题（3-4倍速度提升），带重试机制
+        并发模式：先为所有问题生成检索计划，合并重复检索后统一并发执行，再把结果分发回各问题
+
+        不同子问题、不同查询变体之间常有完全相同的检索（KG扩展查询与模板子问题重叠、
+        关键词变体相同），或只有limit不同的检索，合并后只执行唯一检索集合
 
         Args:
             questions: 问题列表
             parameters: 参数
             thinking_process: 思考过程列表
-            max_retries: 单个查询失败时的最大重试次数
+            max_retries: 单个检索失败时的最大重试次数
+            query_vector_map: 预计算的查询向量
 
         Returns:
             (检索结果列表, 是否未找到材料, 整体年份分布)
         """
-        import time as time_module
-
-        async def retrieve_single(idx: int, question_item, retry_count: int = 0):
-            """异步检索单个问题，带重试机制"""
-            # 支持字典和字符串两种格式
-            if isinstance(question_item, dict):
-                question_text = question_item.get("question", question_item)
-                question_metadata = question_item
-            else:
-                question_text = question_item
-                question_metadata = {
+        planner = RetrievalPlanner()
+        entries = []
+
+        def plan_all():
+            """为所有问题生成检索计划（缺失的查询向量和稀疏权重在这里计算，放在线程中执行）"""
+            for idx, question_item in enumerate(questions, 1):
+                question_text, question_metadata = self._normalize_question_item(question_item)
+
+                # 每个问题独立的思考过程列表，最后按顺序合并
+                question_thinking = []
+                question_thinking.append(f"\n--- 子问题 {idx} ---")
+                question_thinking.append(f"问题: {question_text}")
+                if question_metadata.get("target_year"):
+                    question_thinking.append(f"目标年份: {question_metadata['target_year']}")
+                    question_thinking.append(f"检索策略: {question_metadata.get('retrieval_strategy', 'single_year')}")
+
+                entry = {
                     "question": question_text,
-                    "target_year": None,
-                    "retrieval_strategy": "multi_year"
+                    "question_metadata": question_metadata,
+                    "thinking": question_thinking,
+                    "plan": None,
+                    "error": None
                 }
-
-            logger.debug(f"[PineconeRetrieveNode] 并发检索问题 {idx}/{len(questions)}: {question_text[:50]}...")
-
-            # 创建该问题的独立思考过程列表（避免并发写入冲突）
-            question_thinking = []
-            question_thinking.append(f"\n--- 子问题 {idx} ---")
-            question_thinking.append(f"问题: {question_text}")
-            if question_metadata.get("target_year"):
-                question_thinking.append(f"目标年份: {question_metadata['target_year']}")
-                question_thinking.append(f"检索策略: {question_metadata.get('retrieval_strategy', 'single_year')}")
-
-            try:
-                # 在executor中执行检索（因为_retrieve_for_question是同步的）
-                loop = asyncio.get_event_loop()
-                chunks, year_dist, retrieval_method = await loop.run_in_executor(
-                    None,
-                    lambda: self._retrieve_for_question(
-                        question_text, parameters, question_thinking, question_metadata
+                try:
+                    entry["plan"] = self._plan_question(
+                        question_text, parameters, question_thinking, question_metadata,
+                        query_vector_map, planner
                     )
-                )
+                except Exception as e:
+                    entry["error"] = e
+                entries.append(entry)
 
-                question_thinking.append(f"检索到文档数: {len(chunks)}")
-                question_thinking.append(f"年份分布: {year_dist}")
-                question_thinking.append(f"检索方法: {retrieval_method}")
-                if chunks:
-                    question_thinking.append(f"最高相似度: {chunks[0]['score']:.4f}")
+        await asyncio.to_thread(plan_all)
 
-                logger.info(
-                    f"[PineconeRetrieveNode] 问题{idx}检索完成: {len(chunks)} chunks, "
-                    f"年份分布={year_dist}"
-                )
+        logger.info(
+            f"[PineconeRetrieveNode] 检索计划: {len(questions)}个问题, {planner.request_count}个检索请求 "
+            f"-> 合并为{planner.unique_count}个唯一检索"
+        )
+        thinking_process.append(
+            f"检索计划: {planner.request_count}个检索请求 -> 合并为{planner.unique_count}个唯一检索 "
+            f"(并发上限{settings.retrieval_max_concurrency})"
+        )
 
-                return {
-                    "question": question_text,
-                    "question_metadata": question_metadata,
-                    "chunks": chunks,
-                    "answer": None,
-                    "year_distribution": year_dist,
-                    "retrieval_method": retrieval_method,
-                    "top_similarity_score": chunks[0]['score'] if chunks else 0.0,
-                    "thinking": question_thinking  # 返回思考过程
-                }
+        await planner.aexecute(
+            self.retriever,
+            max_concurrency=settings.retrieval_max_concurrency,
+            max_retries=max_retries
+        )
 
+        # 分发结果；speaker+party过滤无结果的问题登记降级检索，统一执行第二轮
+        fallback_entries = []
+        for entry in entries:
+            if entry["error"] is not None:
+                continue
+            try:
+                entry["results"] = self._collect_planned_results(entry["plan"], planner, entry["thinking"])
             except Exception as e:
-                # 重试机制
-                if retry_count < max_retries:
-                    wait_time = min(2 ** (retry_count + 1), 8)  # 指数退避，最多等待8秒
-                    logger.warning(
-                        f"🔄 [PineconeRetrieveNode] 问题{idx}检索失败，"
-                        f"等待{wait_time}秒后重试 ({retry_count + 1}/{max_retries}): {str(e)[:100]}"
-                    )
-                    await asyncio.sleep(wait_time)
-                    return await retrieve_single(idx, question_item, retry_count + 1)
-                else:
-                    # 所有重试都失败
-                    logger.error(
-                        f"❌ [PineconeRetrieveNode] 问题{idx}检索失败，"
-                        f"已重试{max_retries}次: {str(e)}"
+                entry["error"] = e
+                continue
+            if not entry["results"] and self._plan_fallback(entry["plan"], planner, entry["thinking"]):
+                fallback_entries.append(entry)
+
+        if fallback_entries:
+            await planner.aexecute(
+                self.retriever,
+                max_concurrency=settings.retrieval_max_concurrency,
+                max_retries=max_retries
+            )
+            for entry in fallback_entries:
+                try:
+                    entry["results"] = self._collect_planned_results(
+                        entry["plan"], planner, entry["thinking"], fallback=True
                     )
-                    raise
+                except Exception as e:
+                    entry["error"] = e
 
-        # 创建并发任务
-        logger.info(f"[PineconeRetrieveNode] 启动 {len(questions)} 个并发检索任务...")
-        tasks = [retrieve_single(idx, q) for idx, q in enumerate(questions, 1)]
-
-        # 并发执行
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        # 处理结果
+        # 整理结果
         retrieval_results = []
         no_material_found = True
         overall_year_distribution = {}
 
-        for idx, result in enumerate(results, 1):
-            if isinstance(result, Exception):
-                logger.error(f"[PineconeRetrieveNode] 问题{idx}检索失败: {result}")
+        for idx, entry in enumerate(entries, 1):
+            if entry["error"] is not None:
+                logger.error(f"[PineconeRetrieveNode] 问题{idx}检索失败: {entry['error']}")
                 # 添加失败占位符
                 retrieval_results.append({
-                    "question": questions[idx-1] if isinstance(questions[idx-1], str) else questions[idx-1].get("question", ""),
+                    "question": entry["question"],
                     "question_metadata": {},
                     "chunks": [],
                     "answer": None,
@@ -867,23 +1148,56 @@ class PineconeRetrieveNode:
                     "retrieval_method": "failed",
                     "top_similarity_score": 0.0
                 })
-            else:
-                # 成功的结果
-                if result["chunks"]:
-                    no_material_found = False
+                continue
+
+            question_thinking = entry["thinking"]
+            chunks, year_dist, retrieval_method = self._finalize_question_results(
+                entry["plan"], entry["results"], question_thinking
+            )
+
+            question_thinking.append(f"检索到文档数: {len(chunks)}")
+            question_thinking.append(f"年份分布: {year_dist}")
+            question_thinking.append(f"检索方法: {retrieval_method}")
+            if chunks:
+                question_thinking.append(f"最高相似度: {chunks[0]['score']:.4f}")
+                no_material_found = False
+
+            logger.info(
+                f"[PineconeRetrieveNode] 问题{idx}检索完成: {len(chunks)} chunks, "
+                f"年份分布={year_dist}"
+            )
 
-                # 合并年份分布
-                for year, count in result["year_distribution"].items():
-                    overall_year_distribution[year] = overall_year_distribution.get(year, 0) + count
+            # 合并年份分布
+            for year, count in year_dist.items():
+                overall_year_distribution[year] = overall_year_distribution.get(year, 0) + count
 
-                # 合并思考过程到主列表
-                thinking_process.extend(result.pop("thinking"))
+            # 合并思考过程到主列表
+            thinking_process.extend(question_thinking)
 
-                retrieval_results.append(result)
+            retrieval_results.append({
+                "question": entry["question"],
+                "question_metadata": entry["question_metadata"],
+                "chunks": chunks,
+                "answer": None,
+                "year_distribution": year_dist,
+                "retrieval_method": retrieval_method,
+                "top_similarity_score": chunks[0]['score'] if chunks else 0.0
+            })
 
         logger.info(f"[PineconeRetrieveNode] ✅ 并发检索完成，共处理 {len(retrieval_results)} 个问题")
         return retrieval_results, no_material_found, overall_year_distribution
 
+    @staticmethod
+    def _normalize_question_item(question_item) -> tuple[str, Dict]:
+        """将问题（字符串或子问题字典）统一为 (问题文本, 问题元数据)"""
+        if isinstance(question_item, dict):
+            return question_item.get("question", question_item), question_item
+        return question_item, {
+            "question": question_item,
+            "target_year": None,
+            "retrieval_strategy": "multi_year"
+        }
+
     # ========== 【架构解耦】知识图谱扩展相关方法 ==========
 
     def _apply_kg_expansion_for_simple_question(
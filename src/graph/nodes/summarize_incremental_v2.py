@@ -4,11 +4,17 @@
 目标：防止信息遗漏，保持原文关键短语
 """
 
+import asyncio
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional, Tuple
+from ...config import settings
 from ...llm.client import GeminiLLMClient
 from ...utils.logger import logger
+from ...utils.performance_monitor import get_performance_monitor
 from ..state import GraphState, update_state
+from ..streaming import get_token_sink
 
 
 class IncrementalSummarizeNodeV2:
@@ -25,9 +31,20 @@ class IncrementalSummarizeNodeV2:
     - 鲁棒：强制结构化，防止LLM遗漏关键信息
     """
 
-    def __init__(self, llm_client: GeminiLLMClient = None):
-        """初始化增量式总结节点"""
+    def __init__(
+        self,
+        llm_client: GeminiLLMClient = None,
+        max_concurrency: Optional[int] = None
+    ):
+        """
+        初始化增量式总结节点
+
+        Args:
+            llm_client: LLM客户端,如果为None则自动创建
+            max_concurrency: 阶段1最大并发提取数,默认从配置读取（1表示串行）
+        """
         self.llm = llm_client or GeminiLLMClient()
+        self.max_concurrency = max(1, max_concurrency or settings.summarize_extraction_concurrency)
 
     def __call__(self, state: GraphState) -> GraphState:
         """
@@ -39,6 +56,52 @@ class IncrementalSummarizeNodeV2:
         Returns:
             更新后的状态
         """
+        question, question_type, processing_results = self._prepare(state)
+
+        # 检查是否有材料
+        if not processing_results:
+            return self._no_material_state(state)
+
+        try:
+            # 执行两阶段总结
+            final_answer = self._two_stage_summarize(
+                question=question,
+                question_type=question_type,
+                processing_results=processing_results
+            )
+            return self._answer_state(state, final_answer)
+
+        except Exception as e:
+            return self._error_state(state, e)
+
+    async def acall(self, state: GraphState) -> GraphState:
+        """
+        执行两阶段总结（异步版本，LLM调用使用ainvoke，不占用线程）
+
+        Args:
+            state: 当前状态
+
+        Returns:
+            更新后的状态
+        """
+        question, question_type, processing_results = self._prepare(state)
+
+        if not processing_results:
+            return self._no_material_state(state)
+
+        try:
+            final_answer = await self._atwo_stage_summarize(
+                question=question,
+                question_type=question_type,
+                processing_results=processing_results
+            )
+            return self._answer_state(state, final_answer)
+
+        except Exception as e:
+            return self._error_state(state, e)
+
+    def _prepare(self, state: GraphState) -> Tuple[str, str, List[Dict]]:
+        """读取问题、问题类型和待总结的检索结果"""
         question = state["question"]
         question_type = state.get("question_type", "")
         reranked_results = state.get("reranked_results", [])
@@ -51,48 +114,45 @@ class IncrementalSummarizeNodeV2:
         logger.info(f"[IncrementalSummarizeV2] 问题类型: {question_type}")
         logger.info(f"[IncrementalSummarizeV2] 处理结果数: {len(processing_results)}")
 
-        try:
-            # 检查是否有材料
-            if not processing_results:
-                logger.warning("[IncrementalSummarizeV2] 无检索结果")
-                return update_state(
-                    state,
-                    error="未找到相关材料",
-                    error_type="NO_MATERIAL",
-                    no_material_found=True,
-                    current_node="summarize",
-                    next_node="exception"
-                )
-
-            # 执行两阶段总结
-            final_answer = self._two_stage_summarize(
-                question=question,
-                question_type=question_type,
-                processing_results=processing_results
-            )
+        return question, question_type, processing_results
+
+    def _no_material_state(self, state: GraphState) -> GraphState:
+        """无检索结果时的状态"""
+        logger.warning("[IncrementalSummarizeV2] 无检索结果")
+        return update_state(
+            state,
+            error="未找到相关材料",
+            error_type="NO_MATERIAL",
+            no_material_found=True,
+            current_node="summarize",
+            next_node="exception"
+        )
 
-            logger.info(f"[IncrementalSummarizeV2] 总结完成")
-            logger.info(f"[IncrementalSummarizeV2] 答案长度: {len(final_answer)} 字符")
+    def _answer_state(self, state: GraphState, final_answer: str) -> GraphState:
+        """总结成功时的状态"""
+        logger.info(f"[IncrementalSummarizeV2] 总结完成")
+        logger.info(f"[IncrementalSummarizeV2] 答案长度: {len(final_answer)} 字符")
 
-            return update_state(
-                state,
-                final_answer=final_answer,
-                current_node="summarize",
-                next_node="end"
-            )
+        return update_state(
+            state,
+            final_answer=final_answer,
+            current_node="summarize",
+            next_node="end"
+        )
 
-        except Exception as e:
-            logger.error(f"[IncrementalSummarizeV2] 总结失败: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
-
-            return update_state(
-                state,
-                error=f"总结失败: {str(e)}",
-                error_type="SUMMARIZE_ERROR",
-                current_node="summarize",
-                next_node="exception"
-            )
+    def _error_state(self, state: GraphState, e: Exception) -> GraphState:
+        """总结失败时的状态"""
+        logger.error(f"[IncrementalSummarizeV2] 总结失败: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
+
+        return update_state(
+            state,
+            error=f"总结失败: {str(e)}",
+            error_type="SUMMARIZE_ERROR",
+            current_node="summarize",
+            next_node="exception"
+        )
 
     def _two_stage_summarize(
         self,
@@ -131,6 +191,29 @@ class IncrementalSummarizeNodeV2:
 
         return final_answer
 
+    async def _atwo_stage_summarize(
+        self,
+        question: str,
+        question_type: str,
+        processing_results: List[Dict]
+    ) -> str:
+        """两阶段总结（异步版本）"""
+        logger.info("[IncrementalSummarizeV2] 阶段1: 结构化提取")
+        extracted_info = await self._aextract_structured_info(
+            question=question,
+            processing_results=processing_results
+        )
+
+        logger.info(f"[IncrementalSummarizeV2] 提取信息: {len(extracted_info)} 个子问题")
+
+        logger.info("[IncrementalSummarizeV2] 阶段2: 基于结构生成答案")
+        return await self._agenerate_from_structured(
+            question=question,
+            question_type=question_type,
+            extracted_info=extracted_info,
+            processing_results=processing_results
+        )
+
     def _extract_structured_info(
         self,
         question: str,
@@ -139,6 +222,8 @@ class IncrementalSummarizeNodeV2:
         """
         阶段1：从每个子问题的文档中提取结构化信息
 
+        各子问题的提取互相独立，按max_concurrency并发调用LLM，结果保持检索结果顺序
+
         Args:
             question: 原始问题
             processing_results: 检索结果（按子问题分组）
@@ -146,8 +231,60 @@ class IncrementalSummarizeNodeV2:
         Returns:
             提取的结构化信息列表
         """
-        extracted_list = []
+        tasks = self._collect_extraction_tasks(question, processing_results)
+        total = len(processing_results)
+        workers = min(self.max_concurrency, len(tasks))
+        stage_start = time.time()
 
+        if workers <= 1:
+            extracted_list = [self._extract_single(idx, total, sub_question, chunks) for idx, sub_question, chunks in tasks]
+        else:
+            logger.info(f"[IncrementalSummarizeV2] 并发提取 {len(tasks)} 个子问题 (并发数: {workers})")
+            # executor.map按提交顺序返回结果，保证子问题顺序与检索结果一致
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                extracted_list = list(executor.map(lambda task: self._extract_single(task[0], total, task[1], task[2]), tasks))
+
+        get_performance_monitor().record_timing("总结阶段1提取", time.time() - stage_start)
+
+        return extracted_list
+
+    async def _aextract_structured_info(
+        self,
+        question: str,
+        processing_results: List[Dict]
+    ) -> List[Dict]:
+        """
+        阶段1（异步版本）：用信号量限制并发数，asyncio.gather保持结果顺序
+
+        Args:
+            question: 原始问题
+            processing_results: 检索结果（按子问题分组）
+
+        Returns:
+            提取的结构化信息列表
+        """
+        tasks = self._collect_extraction_tasks(question, processing_results)
+        total = len(processing_results)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        stage_start = time.time()
+
+        async def extract(task):
+            async with semaphore:
+                return await self._aextract_single(task[0], total, task[1], task[2])
+
+        extracted_list = list(await asyncio.gather(*(extract(task) for task in tasks)))
+
+        get_performance_monitor().record_timing("总结阶段1提取", time.time() - stage_start)
+
+        return extracted_list
+
+    def _collect_extraction_tasks(
+        self,
+        question: str,
+        processing_results: List[Dict]
+    ) -> List[Tuple[int, str, List[Dict]]]:
+        """收集需要提取的子问题（保持原顺序，跳过无文档的子问题）"""
+        tasks = []
         for idx, result in enumerate(processing_results):
             sub_question = result.get("question", question)
             chunks = result.get("chunks", [])
@@ -156,43 +293,101 @@ class IncrementalSummarizeNodeV2:
                 logger.warning(f"[IncrementalSummarizeV2] 子问题 {idx+1} 无文档")
                 continue
 
-            logger.info(f"[IncrementalSummarizeV2] 提取子问题 {idx+1}/{len(processing_results)}: {len(chunks)} 个文档")
+            tasks.append((idx, sub_question, chunks))
+        return tasks
 
-            # 构造提取prompt
-            extraction_prompt = self._build_extraction_prompt(
-                sub_question=sub_question,
-                chunks=chunks
-            )
+    def _extract_single(
+        self,
+        idx: int,
+        total: int,
+        sub_question: str,
+        chunks: List[Dict]
+    ) -> Dict:
+        """
+        提取单个子问题的结构化信息
 
-            # 调用LLM提取
-            try:
-                extracted_text = self.llm.invoke(extraction_prompt)
-
-                # 尝试解析JSON（如果LLM返回JSON格式）
-                try:
-                    extracted_json = json.loads(extracted_text)
-                    logger.info(f"[IncrementalSummarizeV2] 子问题 {idx+1} 提取成功（JSON格式）")
-                except json.JSONDecodeError:
-                    # 如果不是JSON，保留原文
-                    extracted_json = {"raw_extraction": extracted_text}
-                    logger.info(f"[IncrementalSummarizeV2] 子问题 {idx+1} 提取成功（文本格式）")
-
-                extracted_list.append({
-                    "sub_question": sub_question,
-                    "extracted_info": extracted_json,
-                    "num_chunks": len(chunks)
-                })
-
-            except Exception as e:
-                logger.error(f"[IncrementalSummarizeV2] 子问题 {idx+1} 提取失败: {e}")
-                # 失败时仍然添加空结构，避免遗漏子问题
-                extracted_list.append({
-                    "sub_question": sub_question,
-                    "extracted_info": {"error": str(e)},
-                    "num_chunks": len(chunks)
-                })
+        瞬时错误的重试由LLM客户端负责（ChatOpenAI max_retries），这里不再叠加一层重试
 
-        return extracted_list
+        Args:
+            idx: 子问题序号（从0开始）
+            total: 子问题总数
+            sub_question: 子问题
+            chunks: 子问题的检索文档
+
+        Returns:
+            提取结果；调用失败时返回包含error的结构，避免遗漏子问题
+        """
+        extraction_prompt, start_time = self._begin_extraction(idx, total, sub_question, chunks)
+        try:
+            extracted_json = self._parse_extraction(idx, self.llm.invoke(extraction_prompt))
+        except Exception as e:
+            extracted_json = self._extraction_error(idx, e)
+        return self._finish_extraction(idx, sub_question, chunks, extracted_json, start_time)
+
+    async def _aextract_single(
+        self,
+        idx: int,
+        total: int,
+        sub_question: str,
+        chunks: List[Dict]
+    ) -> Dict:
+        """提取单个子问题的结构化信息（异步版本，与_extract_single共用prompt构造和结果解析）"""
+        extraction_prompt, start_time = self._begin_extraction(idx, total, sub_question, chunks)
+        try:
+            extracted_json = self._parse_extraction(idx, await self.llm.ainvoke(extraction_prompt))
+        except Exception as e:
+            extracted_json = self._extraction_error(idx, e)
+        return self._finish_extraction(idx, sub_question, chunks, extracted_json, start_time)
+
+    def _begin_extraction(
+        self,
+        idx: int,
+        total: int,
+        sub_question: str,
+        chunks: List[Dict]
+    ) -> Tuple[str, float]:
+        """构造阶段1提取prompt并记录开始时间"""
+        logger.info(f"[IncrementalSummarizeV2] 提取子问题 {idx+1}/{total}: {len(chunks)} 个文档")
+        extraction_prompt = self._build_extraction_prompt(
+            sub_question=sub_question,
+            chunks=chunks
+        )
+        return extraction_prompt, time.time()
+
+    def _extraction_error(self, idx: int, e: Exception) -> Dict:
+        """提取失败时的占位结构"""
+        logger.error(f"[IncrementalSummarizeV2] 子问题 {idx+1} 提取失败: {e}")
+        return {"error": str(e)}
+
+    def _finish_extraction(
+        self,
+        idx: int,
+        sub_question: str,
+        chunks: List[Dict],
+        extracted_json: Dict,
+        start_time: float
+    ) -> Dict:
+        """记录子问题耗时并组装提取结果"""
+        get_performance_monitor().record_breakdown(
+            "总结阶段1提取", f"子问题{idx+1}", time.time() - start_time
+        )
+        return {
+            "sub_question": sub_question,
+            "extracted_info": extracted_json,
+            "num_chunks": len(chunks)
+        }
+
+    def _parse_extraction(self, idx: int, extracted_text: str) -> Dict:
+        """解析阶段1的LLM输出（优先JSON，否则保留原文）"""
+        # 尝试解析JSON（如果LLM返回JSON格式）
+        try:
+            extracted_json = json.loads(extracted_text)
+            logger.info(f"[IncrementalSummarizeV2] 子问题 {idx+1} 提取成功（JSON格式）")
+        except json.JSONDecodeError:
+            # 如果不是JSON，保留原文
+            extracted_json = {"raw_extraction": extracted_text}
+            logger.info(f"[IncrementalSummarizeV2] 子问题 {idx+1} 提取成功（文本格式）")
+        return extracted_json
 
     def _build_extraction_prompt(
         self,
@@ -301,6 +496,64 @@ class IncrementalSummarizeNodeV2:
             最终答案（德语，包含Quellen引用）
         """
         # 构造结构化信息的文本表示
+        structured_text = self._build_structured_text(extracted_info)
+
+        # 构造生成prompt
+        generation_prompt = self._build_generation_prompt(
+            question=question,
+            question_type=question_type,
+            structured_text=structured_text,
+            processing_results=processing_results
+        )
+
+        # 调用LLM生成答案（流式请求时逐片段推送给调用方）
+        sink = get_token_sink()
+        if sink is None:
+            final_answer = self.llm.invoke(generation_prompt)
+        else:
+            parts = []
+            for chunk in self.llm.stream_invoke(generation_prompt):
+                parts.append(chunk)
+                sink(chunk)
+            final_answer = "".join(parts)
+
+        return final_answer
+
+    async def _agenerate_from_structured(
+        self,
+        question: str,
+        question_type: str,
+        extracted_info: List[Dict],
+        processing_results: List[Dict]
+    ) -> str:
+        """阶段2（异步版本）：ainvoke生成，流式请求时使用astream_invoke"""
+        generation_prompt = self._build_generation_prompt(
+            question=question,
+            question_type=question_type,
+            structured_text=self._build_structured_text(extracted_info),
+            processing_results=processing_results
+        )
+
+        sink = get_token_sink()
+        if sink is None:
+            return await self.llm.ainvoke(generation_prompt)
+
+        parts = []
+        async for chunk in self.llm.astream_invoke(generation_prompt):
+            parts.append(chunk)
+            sink(chunk)
+        return "".join(parts)
+
+    def _build_structured_text(self, extracted_info: List[Dict]) -> str:
+        """
+        构造阶段1结构化信息的文本表示
+
+        Args:
+            extracted_info: 阶段1提取的结构化信息
+
+        Returns:
+            Markdown格式的结构化文本
+        """
         structured_text = ""
         for idx, item in enumerate(extracted_info, 1):
             sub_q = item.get("sub_question", "")
@@ -330,18 +583,7 @@ class IncrementalSummarizeNodeV2:
                 # 原始文本格式
                 structured_text += f"{extracted.get('raw_extraction', str(extracted))}\n"
 
-        # 构造生成prompt
-        generation_prompt = self._build_generation_prompt(
-            question=question,
-            question_type=question_type,
-            structured_text=structured_text,
-            processing_results=processing_results
-        )
-
-        # 调用LLM生成答案
-        final_answer = self.llm.invoke(generation_prompt)
-
-        return final_answer
+        return structured_text
 
     def _build_generation_prompt(
         self,
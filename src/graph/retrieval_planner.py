@@ -0,0 +1,239 @@
+"""
+检索计划器
+先收集一次请求中所有子问题、所有查询变体将要发起的检索，合并后再统一执行
+
+合并规则:
+- 检索方法、查询向量（float16量化）、过滤条件、年份等参数都相同的请求视为同一检索
+- 只有数量参数（limit / limit_per_year）不同时，较小的请求被较大的请求覆盖：
+  只执行limit最大的一次，较小的请求取其结果的前N条（多年份检索按年份各取前N条）
+
+执行:
+- 唯一检索集合在全局并发上限内执行（asyncio.Semaphore + 线程），失败时指数退避重试
+- 检索器支持分组检索（本地引擎的search_grouped）时，年份和数量相同的多年份检索合并为一次分组检索，
+  多个查询向量共用一次打分
+- 结果按请求ID分发回各子问题
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from ..utils.logger import logger
+from ..vectordb.search_cache import SearchResultCache
+
+
+# 检索方法 -> 数量参数名
+LIMIT_FIELDS = {
+    "search": "limit",
+    "hybrid_search": "limit",
+    "search_multi_year_parallel": "limit_per_year",
+}
+
+
+class RetrievalPlanner:
+    """
+    检索计划器
+
+    用法:
+        planner = RetrievalPlanner()
+        request_id = planner.add("search", vector, limit=20, filters={...})
+        await planner.aexecute(retriever, max_concurrency=8)
+        results = planner.results(request_id)
+    """
+
+    def __init__(self):
+        # 唯一检索: {合并键: {"method", "query_vector", "kwargs", "limit", "results", "error"}}
+        self._unique: Dict[str, Dict[str, Any]] = {}
+        # 原始请求: [(合并键, 请求的数量)]
+        self._requests: List[tuple] = []
+
+    @property
+    def request_count(self) -> int:
+        """原始请求数"""
+        return len(self._requests)
+
+    @property
+    def unique_count(self) -> int:
+        """合并后的唯一检索数"""
+        return len(self._unique)
+
+    def add(self, method: str, query_vector: List[float], **kwargs) -> int:
+        """
+        登记一次检索
+
+        Args:
+            method: 检索器方法名（search / search_multi_year_parallel / hybrid_search）
+            query_vector: 查询向量
+            **kwargs: 检索参数（与检索器方法参数相同）
+
+        Returns:
+            请求ID（用于执行后取回结果）
+        """
+        if method not in LIMIT_FIELDS:
+            raise ValueError(f"不支持的检索方法: {method}")
+
+        limit_field = LIMIT_FIELDS[method]
+        limit = kwargs.pop(limit_field)
+        key = SearchResultCache.make_key("", method, query_vector, params=kwargs)
+
+        entry = self._unique.get(key)
+        if entry is None:
+            self._unique[key] = {
+                "method": method,
+                "query_vector": query_vector,
+                "kwargs": kwargs,
+                "limit": limit,
+                "results": None,
+                "error": None
+            }
+        elif limit > entry["limit"]:
+            entry["limit"] = limit
+            # 已执行的检索数量不足时重新执行（如降级检索轮次中登记了更大的limit）
+            entry["results"] = None
+            entry["error"] = None
+
+        self._requests.append((key, limit))
+        return len(self._requests) - 1
+
+    def execute(self, retriever, max_retries: int = 0):
+        """
+        同步执行全部未执行的唯一检索（串行模式使用）
+
+        Args:
+            retriever: 检索器
+            max_retries: 单个检索失败时的最大重试次数
+        """
+        for batch in self._batches(retriever):
+            for attempt in range(max_retries + 1):
+                try:
+                    self._run_batch(retriever, batch)
+                    break
+                except Exception as e:
+                    _set_error(batch, e)
+                    if attempt < max_retries:
+                        time.sleep(min(2 ** (attempt + 1), 8))
+
+    async def aexecute(self, retriever, max_concurrency: int = 8, max_retries: int = 2):
+        """
+        并发执行全部未执行的唯一检索
+
+        Args:
+            retriever: 检索器
+            max_concurrency: 全局并发上限
+            max_retries: 单个检索失败时的最大重试次数（指数退避，最多等待8秒）
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def run_batch(batch: List[Dict[str, Any]]):
+            method = batch[0]["method"]
+            for attempt in range(max_retries + 1):
+                try:
+                    async with semaphore:
+                        await asyncio.to_thread(self._run_batch, retriever, batch)
+                    return
+                except Exception as e:
+                    _set_error(batch, e)
+                    if attempt < max_retries:
+                        wait_time = min(2 ** (attempt + 1), 8)
+                        logger.warning(
+                            f"🔄 [RetrievalPlanner] {method}检索失败，"
+                            f"等待{wait_time}秒后重试 ({attempt + 1}/{max_retries}): {str(e)[:100]}"
+                        )
+                        await asyncio.sleep(wait_time)
+            logger.error(f"❌ [RetrievalPlanner] {method}检索失败，已重试{max_retries}次: {batch[0]['error']}")
+
+        await asyncio.gather(*[run_batch(batch) for batch in self._batches(retriever)])
+
+    def results(self, request_id: int) -> List[Dict[str, Any]]:
+        """
+        取回请求的检索结果（按请求自身的数量截取）
+
+        Raises:
+            检索最终失败时抛出原始异常
+        """
+        key, limit = self._requests[request_id]
+        entry = self._unique[key]
+        if entry["error"] is not None:
+            raise entry["error"]
+        if entry["results"] is None:
+            raise RuntimeError("检索计划尚未执行")
+
+        results = entry["results"]
+        if limit >= entry["limit"]:
+            return [dict(result) for result in results]
+        if entry["method"] == "search_multi_year_parallel":
+            return _top_per_year(results, limit)
+        return [dict(result) for result in results[:limit]]
+
+    def _pending(self) -> List[Dict[str, Any]]:
+        """尚未执行的唯一检索（已最终失败的不再重复执行）"""
+        return [
+            entry for entry in self._unique.values()
+            if entry["results"] is None and entry["error"] is None
+        ]
+
+    def _batches(self, retriever) -> List[List[Dict[str, Any]]]:
+        """
+        将未执行的唯一检索分成执行批次
+
+        检索器支持分组检索时，参数（年份、过滤条件）和数量都相同的多年份检索
+        只是查询向量不同，合并为一批；其余检索各自一批
+        """
+        grouped = getattr(retriever, "supports_grouped_search", False)
+        batches: List[List[Dict[str, Any]]] = []
+        multi_year: Dict[tuple, List[Dict[str, Any]]] = {}
+        for entry in self._pending():
+            if grouped and entry["method"] == "search_multi_year_parallel":
+                params = SearchResultCache.make_key("", "search_grouped", [], params=entry["kwargs"])
+                batch = multi_year.get((params, entry["limit"]))
+                if batch is None:
+                    batch = multi_year[(params, entry["limit"])] = []
+                    batches.append(batch)
+                batch.append(entry)
+            else:
+                batches.append([entry])
+        return batches
+
+    @classmethod
+    def _run_batch(cls, retriever, batch: List[Dict[str, Any]]):
+        """执行一个批次并写回结果"""
+        if len(batch) == 1:
+            results = [cls._run(retriever, batch[0])]
+        else:
+            kwargs = batch[0]["kwargs"]
+            results = retriever.search_grouped(
+                [entry["query_vector"] for entry in batch],
+                group_by="year",
+                k_per_group=batch[0]["limit"],
+                groups=kwargs["years"],
+                filters=kwargs.get("other_filters")
+            )
+        for entry, entry_results in zip(batch, results):
+            entry["results"] = entry_results
+            entry["error"] = None
+
+    @staticmethod
+    def _run(retriever, entry: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """调用检索器执行一次唯一检索"""
+        method = getattr(retriever, entry["method"])
+        kwargs = dict(entry["kwargs"])
+        kwargs[LIMIT_FIELDS[entry["method"]]] = entry["limit"]
+        return method(query_vector=entry["query_vector"], **kwargs)
+
+
+def _set_error(batch: List[Dict[str, Any]], error: Exception):
+    """批次失败时记录到批次内每个检索"""
+    for entry in batch:
+        entry["error"] = error
+
+
+def _top_per_year(results: List[Dict[str, Any]], limit_per_year: int) -> List[Dict[str, Any]]:
+    """多年份检索结果（按得分降序）中每个年份保留前N条"""
+    counts: Dict[Optional[str], int] = {}
+    kept = []
+    for result in results:
+        year = (result.get("metadata") or {}).get("year")
+        if counts.get(year, 0) < limit_per_year:
+            counts[year] = counts.get(year, 0) + 1
+            kept.append(dict(result))
+    return kept
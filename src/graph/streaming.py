@@ -0,0 +1,89 @@
+"""
+流式输出支持
+通过contextvars把token回调传递给节点，节点签名和GraphState保持不变
+
+用法:
+    with token_sink(lambda text: queue.put(text)):
+        for update in workflow.graph.stream(initial_state, stream_mode="updates"):
+            ...
+
+在token_sink作用域内，总结节点的阶段2生成改为stream_invoke，并把每个片段交给回调；
+作用域外（/api/v1/ask、Streamlit、脚本）行为不变
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+
+TokenCallback = Callable[[str], None]
+
+_token_sink: ContextVar[Optional[TokenCallback]] = ContextVar("token_sink", default=None)
+
+
+def get_token_sink() -> Optional[TokenCallback]:
+    """获取当前上下文的token回调（未设置时返回None）"""
+    return _token_sink.get()
+
+
+@contextmanager
+def token_sink(callback: TokenCallback):
+    """
+    在当前上下文中设置token回调
+
+    Args:
+        callback: 接收每个生成片段的回调函数
+    """
+    token = _token_sink.set(callback)
+    try:
+        yield
+    finally:
+        _token_sink.reset(token)
+
+
+# 节点名称 -> 对外的流式事件阶段名称
+NODE_STAGES = {
+    "answer_cache": "cache",
+    "intent_analysis": "intent",
+    "classify": "classify",
+    "extract": "extract",
+    "decompose": "decompose",
+    "retrieve": "retrieve",
+    "summarize": "summarize",
+    "exception": "exception",
+}
+
+
+def summarize_node_progress(node_name: str, state: dict) -> dict:
+    """
+    生成节点完成事件的摘要（只包含前端展示所需的少量字段）
+
+    Args:
+        node_name: 节点名称
+        state: 节点输出的状态
+
+    Returns:
+        进度事件数据
+    """
+    event = {"node": node_name, "stage": NODE_STAGES.get(node_name, node_name)}
+
+    if node_name == "answer_cache":
+        event["hit"] = bool((state.get("metadata") or {}).get("answer_cache", {}).get("hit"))
+    elif node_name == "intent_analysis":
+        event["intent"] = state.get("intent")
+    elif node_name == "classify":
+        event["question_type"] = state.get("question_type")
+    elif node_name == "extract":
+        event["parameters"] = state.get("parameters")
+    elif node_name == "decompose":
+        event["sub_questions"] = state.get("sub_questions")
+    elif node_name == "retrieve":
+        results = state.get("retrieval_results") or []
+        event["sub_question_count"] = len(results)
+        event["sources_count"] = sum(len(result.get("chunks", [])) for result in results)
+        event["no_material_found"] = state.get("no_material_found", False)
+
+    if state.get("error"):
+        event["error"] = state.get("error")
+
+    return event
@@ -4,6 +4,7 @@ LangGraph工作流编排
 """
 
 from typing import Literal
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 from .state import GraphState, create_initial_state
 from .nodes import (
@@ -18,6 +19,9 @@ from .nodes.decompose_enhanced import EnhancedDecomposeNode as DecomposeNode
 # 【Phase 2】使用两阶段增量式总结节点V2（替换原有的EnhancedSummarizeNode）
 from .nodes.summarize_incremental_v2 import IncrementalSummarizeNodeV2 as SummarizeNode
 from .nodes.extract_enhanced import EnhancedExtractNode as ExtractNode
+from .nodes.answer_cache import AnswerCacheLookupNode, AnswerCacheStoreNode
+from .nodes.rerank import ReRankNode
+from ..config import settings
 from ..utils.logger import logger
 from ..utils.performance_monitor import get_performance_monitor, performance_timer
 
@@ -37,49 +41,58 @@ class QuestionAnswerWorkflow:
        - 正常问题继续后续流程
     2. Classify - 问题分类 (变化类/总结类/对比类/事实查询/趋势分析)
     3. Extract - 参数提取 (时间/党派/议员/主题)
+    3.5 AnswerCache - 语义答案缓存 (相似问题且提取的参数一致时直接返回已缓存答案)
     4. Decompose - 问题拆解 (模板化/自由拆解)
     5. Retrieve - 数据检索 (混合检索)
-    6. ReRank - 文档重排序 (Cohere重排)
+    6. ReRank - 文档重排序 (可选，本地Cross-Encoder批量重排，由rerank_enabled开启)
     7. Summarize - 总结 (单问题/多问题)
     8. Exception - 异常处理 (无材料/LLM错误/检索错误等)
     
     路由规则:
     - Intent -> END (特殊情况) 或 Classify/Extract (正常问题)
     - Classify -> Extract
-    - Extract -> Decompose (需要拆解) 或 Retrieve (不需要拆解)
+    - Extract -> AnswerCache
+    - AnswerCache -> END (命中) 或 Decompose (需要拆解) 或 Retrieve (不需要拆解)
     - Decompose -> Retrieve
-    - Retrieve -> ReRank (找到材料) 或 Exception (未找到材料)
+    - Retrieve -> ReRank (找到材料且开启重排) 或 Summarize (找到材料) 或 Exception (未找到材料)
     - ReRank -> Summarize (重排成功) 或 Exception (重排失败)
-    - Summarize -> END
+    - Summarize -> AnswerCacheStore -> END
     - Exception -> END
     """
     
+    # 重排序节点（未开启rerank_enabled时为None，图中不包含rerank节点）
+    rerank_node = None
+    
     def __init__(self):
         """初始化工作流"""
         logger.info("[Workflow] 开始初始化工作流...")
 
         try:
-            # 创建LLM客户端
-            logger.info("[Workflow] 创建LLM客户端...")
-            from ..llm.client import GeminiLLMClient
+            # 获取LLM客户端（从进程级资源注册表获取，与其他入口共用）
+            logger.info("[Workflow] 获取LLM客户端...")
+            from ..resources import get_llm_client
 
             # Flash模型客户端 (用于简单任务: Intent/Classify/Extract)
-            flash_client = GeminiLLMClient(model_name="gemini-2.5-flash", temperature=0.0)
-            logger.info("[Workflow] ⚡ Flash客户端已创建: gemini-2.5-flash (用于Intent/Classify/Extract)")
+            flash_client = get_llm_client(model_name="gemini-2.5-flash", temperature=0.0)
+            logger.info("[Workflow] ⚡ Flash客户端已就绪: gemini-2.5-flash (用于Intent/Classify/Extract)")
 
-            # Pro模型客户端 (用于复杂任务: Decompose/Summarize)
-            # 节点会在初始化时自动创建Pro客户端,无需显式传入
+            # Pro模型客户端 (用于复杂任务: Decompose)
+            pro_client = get_llm_client(temperature=0.0)
 
             # 创建节点
             logger.info("[Workflow] 创建节点...")
             self.intent_node = IntentNode(llm_client=flash_client)
             self.classify_node = ClassifyNode(llm_client=flash_client)
             self.extract_node = ExtractNode(llm_client=flash_client)
-            self.decompose_node = DecomposeNode()  # 使用默认Pro模型
-            self.retrieve_node = RetrieveNode()  # 【修复】使用PineconeRetrieveNode
-            # 【Phase 4】已移除ReRankNode，直接使用BGE-M3检索结果
+            self.decompose_node = DecomposeNode(llm_client=pro_client)  # 使用默认Pro模型
+            self.retrieve_node = RetrieveNode()  # 【修复】使用PineconeRetrieveNode（检索器和Embedding客户端来自资源注册表）
+            # 【Phase 4】默认不重排，直接使用BGE-M3检索结果；开启后使用本地Cross-Encoder（无网络依赖）
+            self.rerank_node = ReRankNode() if settings.rerank_enabled else None
             self.summarize_node = SummarizeNode(llm_client=flash_client)  # 使用Flash模型加速
             self.exception_node = ExceptionNode()
+            # 语义答案缓存（与检索节点共用Embedding客户端）
+            self.answer_cache_node = AnswerCacheLookupNode(embedding_client=self.retrieve_node.embedding_client)
+            self.answer_cache_store_node = AnswerCacheStoreNode(embedding_client=self.retrieve_node.embedding_client)
             
             logger.info("[Workflow] 所有节点创建成功")
             
@@ -104,14 +117,18 @@ class QuestionAnswerWorkflow:
         workflow = StateGraph(GraphState)
         
         # 添加节点
-        workflow.add_node("intent_analysis", self.intent_node)
-        workflow.add_node("classify", self.classify_node)
-        workflow.add_node("extract", self.extract_node)
-        workflow.add_node("decompose", self.decompose_node)
-        workflow.add_node("retrieve", self.retrieve_node)
-        # 【Phase 4】移除rerank节点，直接使用BGE-M3检索结果
-        workflow.add_node("summarize", self.summarize_node)
-        workflow.add_node("exception", self.exception_node)
+        workflow.add_node("answer_cache", self._as_node(self.answer_cache_node))
+        workflow.add_node("intent_analysis", self._as_node(self.intent_node))
+        workflow.add_node("classify", self._as_node(self.classify_node))
+        workflow.add_node("extract", self._as_node(self.extract_node))
+        workflow.add_node("decompose", self._as_node(self.decompose_node))
+        workflow.add_node("retrieve", self._as_node(self.retrieve_node))
+        # 【Phase 4】默认不加入rerank节点，直接使用BGE-M3检索结果
+        if self.rerank_node is not None:
+            workflow.add_node("rerank", self._as_node(self.rerank_node))
+        workflow.add_node("summarize", self._as_node(self.summarize_node))
+        workflow.add_node("exception", self._as_node(self.exception_node))
+        workflow.add_node("answer_cache_store", self._as_node(self.answer_cache_store_node))
         
         # 设置入口点
         workflow.set_entry_point("intent_analysis")
@@ -139,14 +156,24 @@ class QuestionAnswerWorkflow:
             }
         )
         
-        # Extract -> Decompose 或 Retrieve
+        # Extract -> AnswerCache（按提取的参数查语义答案缓存）
         workflow.add_conditional_edges(
             "extract",
             self._route_after_extract,
+            {
+                "answer_cache": "answer_cache",
+                "exception": "exception",
+            }
+        )
+        
+        # AnswerCache -> END (命中) 或 Decompose / Retrieve (未命中)
+        workflow.add_conditional_edges(
+            "answer_cache",
+            self._route_after_answer_cache,
             {
                 "decompose": "decompose",
                 "retrieve": "retrieve",
-                "exception": "exception",
+                "end": END,
             }
         )
         
@@ -162,26 +189,64 @@ class QuestionAnswerWorkflow:
         
         # 【Phase 4修改】Retrieve -> Summarize (跳过ReRank，直接使用BGE-M3检索结果)
         # ReRank过滤掉了检索Top 1的文档，反而降低精准度
-        workflow.add_conditional_edges(
-            "retrieve",
-            self._route_after_retrieve,
-            {
-                "summarize": "summarize",  # 直接到Summarize
-                "exception": "exception",
-            }
-        )
-        # 【Phase 4】移除ReRank节点条件边
-        
-        # Summarize -> END
-        workflow.add_edge("summarize", END)
+        retrieve_routes = {
+            "summarize": "summarize",  # 直接到Summarize
+            "exception": "exception",
+        }
+        if self.rerank_node is not None:
+            retrieve_routes["rerank"] = "rerank"
+        workflow.add_conditional_edges("retrieve", self._route_after_retrieve, retrieve_routes)
+        
+        # ReRank -> Summarize（仅开启重排时）
+        if self.rerank_node is not None:
+            workflow.add_conditional_edges(
+                "rerank",
+                self._route_after_rerank,
+                {
+                    "summarize": "summarize",
+                    "exception": "exception",
+                }
+            )
+        
+        # Summarize -> AnswerCacheStore -> END
+        workflow.add_edge("summarize", "answer_cache_store")
+        workflow.add_edge("answer_cache_store", END)
         
         # Exception -> END
         workflow.add_edge("exception", END)
         
         return workflow.compile()
     
+    @staticmethod
+    def _as_node(node):
+        """
+        包装节点：提供acall的节点在ainvoke/astream中使用异步实现
+        
+        没有acall的节点在异步执行时由LangChain放到默认线程池中运行
+        """
+        if hasattr(node, "acall"):
+            return RunnableLambda(node, afunc=node.acall, name=type(node).__name__)
+        return node
+    
     # ========== 路由函数 ==========
     
+    def _route_after_answer_cache(self, state: GraphState) -> Literal["decompose", "retrieve", "end"]:
+        """
+        AnswerCache节点后的路由
+        
+        Args:
+            state: 当前状态
+            
+        Returns:
+            下一个节点名称
+        """
+        if (state.get("metadata") or {}).get("answer_cache", {}).get("hit"):
+            return "end"
+        
+        if state.get("is_decomposed", False):
+            return "decompose"
+        return "retrieve"
+    
     def _route_after_intent(self, state: GraphState) -> Literal["classify", "extract", "exception"]:
         """
         Intent节点后的路由
@@ -217,7 +282,7 @@ class QuestionAnswerWorkflow:
         
         return "extract"
     
-    def _route_after_extract(self, state: GraphState) -> Literal["decompose", "retrieve", "exception"]:
+    def _route_after_extract(self, state: GraphState) -> Literal["answer_cache", "exception"]:
         """
         Extract节点后的路由
         
@@ -230,12 +295,7 @@ class QuestionAnswerWorkflow:
         if state.get("error"):
             return "exception"
         
-        is_decomposed = state.get("is_decomposed", False)
-        
-        if is_decomposed:
-            return "decompose"
-        else:
-            return "retrieve"
+        return "answer_cache"
     
     def _route_after_decompose(self, state: GraphState) -> Literal["retrieve", "exception"]:
         """
@@ -252,12 +312,12 @@ class QuestionAnswerWorkflow:
         
         return "retrieve"
     
-    def _route_after_retrieve(self, state: GraphState) -> Literal["summarize", "exception"]:
+    def _route_after_retrieve(self, state: GraphState) -> Literal["rerank", "summarize", "exception"]:
         """
         Retrieve节点后的路由
 
-        【Phase 4修改】直接到Summarize，跳过ReRank
-        理由：Cohere ReRank在德语议会语境下反而过滤了最相关文档
+        【Phase 4修改】默认直接到Summarize，跳过ReRank
+        理由：Cohere ReRank在德语议会语境下反而过滤了最相关文档；开启rerank_enabled时使用本地重排
 
         Args:
             state: 当前状态
@@ -272,6 +332,8 @@ class QuestionAnswerWorkflow:
 
         if no_material_found:
             return "exception"
+        elif self.rerank_node is not None:
+            return "rerank"
         else:
             return "summarize"  # 直接到Summarize，跳过ReRank
     
@@ -342,6 +404,56 @@ class QuestionAnswerWorkflow:
             logger.error(f"[Workflow] 工作流执行失败: {str(e)}")
             raise
     
+    async def arun(
+        self,
+        question: str,
+        deep_thinking_mode: bool = False,
+        verbose: bool = False,
+        enable_performance_monitor: bool = False
+    ) -> GraphState:
+        """
+        异步运行工作流（graph.ainvoke）
+        
+        检索和总结节点使用异步实现，一个事件循环可以同时处理多个问题，
+        LLM和向量检索调用在等待网络时互相让出，不再每个问题占用一个线程
+        
+        Args:
+            question: 用户问题
+            deep_thinking_mode: 是否启用深度分析模式
+            verbose: 是否打印详细日志
+            enable_performance_monitor: 是否启用性能监控（全局单例，并发请求时统计会互相覆盖）
+            
+        Returns:
+            最终状态
+        """
+        logger.info(f"[Workflow] 开始异步处理问题: {question}")
+        
+        monitor = None
+        if enable_performance_monitor:
+            monitor = get_performance_monitor()
+            monitor.start_session()
+        
+        initial_state = create_initial_state(question, deep_thinking_mode=deep_thinking_mode)
+        
+        try:
+            final_state = await self.graph.ainvoke(initial_state)
+            
+            if verbose:
+                self._print_result(final_state)
+            
+            logger.info(f"[Workflow] 异步处理完成")
+            
+            if monitor:
+                monitor.end_session()
+                if verbose:
+                    monitor.print_session_report()
+            
+            return final_state
+            
+        except Exception as e:
+            logger.error(f"[Workflow] 异步工作流执行失败: {str(e)}")
+            raise
+    
     def stream(self, question: str):
         """
         流式运行工作流(用于调试)
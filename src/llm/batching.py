@@ -0,0 +1,104 @@
+"""
+按token长度分桶的动态批处理
+Embedding模型把同一批次的文本补齐到批次内最长的文本，长短文本混在一起时大部分计算花在padding上
+
+做法: 按token长度排序 -> 在token预算内贪心组批（批次内文本数 × 最长长度 ≤ 预算）-> 执行 -> 还原输入顺序
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+
+@dataclass
+class BatchingStats:
+    """一次批处理的padding统计"""
+
+    texts: int = 0
+    batches: int = 0
+    real_tokens: int = 0      # 实际token数
+    padded_tokens: int = 0    # 补齐后的token数（每批 文本数 × 最长长度）
+
+    @property
+    def padding_efficiency(self) -> float:
+        """有效计算占比（1.0表示没有padding）"""
+        return self.real_tokens / self.padded_tokens if self.padded_tokens else 1.0
+
+    def to_dict(self) -> dict:
+        return {
+            "texts": self.texts,
+            "batches": self.batches,
+            "real_tokens": self.real_tokens,
+            "padded_tokens": self.padded_tokens,
+            "padding_efficiency": self.padding_efficiency
+        }
+
+
+def plan_token_batches(
+    lengths: Sequence[int],
+    token_budget: int,
+    max_batch_size: Optional[int] = None
+) -> List[List[int]]:
+    """
+    按长度排序后在token预算内组批
+
+    Args:
+        lengths: 每个文本的token长度
+        token_budget: 单批补齐后的最大token数（超过预算的单个长文本单独成批）
+        max_batch_size: 单批最大文本数（None表示不限制）
+
+    Returns:
+        批次列表，每个批次是原始下标列表（批次内长度升序）
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches: List[List[int]] = []
+    current: List[int] = []
+    for i in order:
+        # 排序后新加入的文本就是批次内最长的
+        longest = max(int(lengths[i]), 1)
+        full = max_batch_size is not None and len(current) >= max_batch_size
+        if current and (full or (len(current) + 1) * longest > token_budget):
+            batches.append(current)
+            current = []
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def batching_stats(lengths: Sequence[int], batches: List[List[int]]) -> BatchingStats:
+    """计算批次方案的padding统计"""
+    stats = BatchingStats(texts=len(lengths), batches=len(batches))
+    for batch in batches:
+        batch_lengths = [int(lengths[i]) for i in batch]
+        stats.real_tokens += sum(batch_lengths)
+        stats.padded_tokens += len(batch) * max(batch_lengths)
+    return stats
+
+
+def run_token_batches(
+    texts: Sequence[str],
+    lengths: Sequence[int],
+    encode: Callable[[List[str]], Sequence[Any]],
+    token_budget: int,
+    max_batch_size: Optional[int] = None
+) -> Tuple[List[Any], BatchingStats]:
+    """
+    分桶执行编码并还原输入顺序
+
+    Args:
+        texts: 文本列表
+        lengths: 每个文本的token长度
+        encode: 编码一个批次的函数，返回与批次一一对应的结果
+        token_budget: 单批补齐后的最大token数
+        max_batch_size: 单批最大文本数
+
+    Returns:
+        (与texts一一对应的结果列表, BatchingStats)
+    """
+    batches = plan_token_batches(lengths, token_budget, max_batch_size)
+    results: List[Any] = [None] * len(texts)
+    for batch in batches:
+        outputs = encode([texts[i] for i in batch])
+        for i, output in zip(batch, outputs):
+            results[i] = output
+    return results, batching_stats(lengths, batches)
@@ -3,11 +3,14 @@ LLM客户端模块
 封装Gemini 2.5 Pro的调用
 """
 
+import asyncio
+import json
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 from typing import List, Dict, Any, Optional
 from src.config import settings
 from src.utils import logger
+from src.llm.response_cache import get_llm_response_cache
 
 
 class GeminiLLMClient:
@@ -17,8 +20,9 @@ class GeminiLLMClient:
     功能:
     1. 封装Gemini 2.5 Pro调用
     2. 支持系统提示词
-    3. 支持流式输出
+    3. 支持流式输出（同步/异步）
     4. 错误处理和重试
+    5. temperature=0时缓存响应（相同模型+提示词直接返回缓存结果）
     """
     
     def __init__(
@@ -59,9 +63,12 @@ class GeminiLLMClient:
             max_retries=2  # 失败时重试2次
         )
         
+        # 响应缓存：只对确定性调用（temperature=0）启用
+        self.response_cache = get_llm_response_cache() if self.temperature == 0 else None
+        
         logger.info(
             f"初始化LLM客户端: model={self.model_name}, "
-            f"temperature={self.temperature}"
+            f"temperature={self.temperature}, 响应缓存={'启用' if self.response_cache else '禁用'}"
         )
     
     def invoke(
@@ -89,20 +96,7 @@ class GeminiLLMClient:
         # 添加用户消息
         chat_messages.append(HumanMessage(content=prompt))
         
-        try:
-            # 调用LLM
-            response = self.llm.invoke(chat_messages)
-            
-            # 提取回复内容
-            reply = response.content
-            
-            logger.debug(f"LLM调用成功,回复长度: {len(reply)} 字符")
-            
-            return reply
-            
-        except Exception as e:
-            logger.error(f"LLM调用失败: {e}")
-            raise
+        return self._invoke_cached(chat_messages, system_prompt, prompt)
     
     def invoke_with_messages(
         self,
@@ -138,6 +132,32 @@ class GeminiLLMClient:
             elif role == 'assistant':
                 chat_messages.append(AIMessage(content=content))
         
+        # 多轮对话以完整消息列表作为缓存键
+        cache_prompt = json.dumps(messages, ensure_ascii=False, sort_keys=True)
+        return self._invoke_cached(chat_messages, system_prompt, cache_prompt)
+    
+    def _invoke_cached(
+        self,
+        chat_messages: List,
+        system_prompt: Optional[str],
+        cache_prompt: str
+    ) -> str:
+        """
+        调用LLM（先查响应缓存）
+        
+        Args:
+            chat_messages: 已构建的消息列表
+            system_prompt: 系统提示词(用于缓存键)
+            cache_prompt: 提示词(用于缓存键)
+        
+        Returns:
+            LLM的回复文本
+        """
+        cache_args = self._cache_args(system_prompt, cache_prompt)
+        cached = self._cache_get(cache_args)
+        if cached is not None:
+            return cached
+        
         try:
             # 调用LLM
             response = self.llm.invoke(chat_messages)
@@ -147,12 +167,76 @@ class GeminiLLMClient:
             
             logger.debug(f"LLM调用成功,回复长度: {len(reply)} 字符")
             
+            self._cache_put(cache_args, reply)
+            
             return reply
             
         except Exception as e:
             logger.error(f"LLM调用失败: {e}")
             raise
     
+    def _cache_args(self, system_prompt: Optional[str], cache_prompt: str) -> tuple:
+        """响应缓存键参数（模型 + 采样参数 + 提示词）"""
+        return (self.model_name, self.temperature, self.max_tokens, system_prompt, cache_prompt)
+    
+    def _cache_get(self, cache_args: tuple) -> Optional[str]:
+        """查询响应缓存（未启用或未命中时返回None）"""
+        if self.response_cache is None:
+            return None
+        cached = self.response_cache.get(*cache_args)
+        if cached is not None:
+            logger.debug(f"LLM响应缓存命中,回复长度: {len(cached)} 字符")
+        return cached
+    
+    def _cache_put(self, cache_args: tuple, reply: str):
+        """写入响应缓存（空回复不缓存，通常是截断或服务端异常）"""
+        if self.response_cache is not None and reply:
+            self.response_cache.put(*cache_args, reply)
+    
+    async def ainvoke(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None
+    ) -> str:
+        """
+        异步调用LLM获取回复（与invoke相同，但不占用线程等待网络响应）
+        
+        Args:
+            prompt: 用户提示词（字符串）
+            system_prompt: 系统提示词(可选)
+        
+        Returns:
+            LLM的回复文本
+        """
+        chat_messages = []
+        
+        if system_prompt:
+            chat_messages.append(SystemMessage(content=system_prompt))
+        
+        chat_messages.append(HumanMessage(content=prompt))
+        
+        # 响应缓存是SQLite磁盘缓存，在线程池中读写，不阻塞事件循环
+        cache_args = self._cache_args(system_prompt, prompt)
+        if self.response_cache is not None:
+            cached = await asyncio.to_thread(self._cache_get, cache_args)
+            if cached is not None:
+                return cached
+        
+        try:
+            response = await self.llm.ainvoke(chat_messages)
+            reply = response.content
+            
+            logger.debug(f"异步LLM调用成功,回复长度: {len(reply)} 字符")
+            
+            if self.response_cache is not None and reply:
+                await asyncio.to_thread(self._cache_put, cache_args, reply)
+            
+            return reply
+            
+        except Exception as e:
+            logger.error(f"异步LLM调用失败: {e}")
+            raise
+    
     def invoke_with_prompt(
         self,
         user_message: str,
@@ -204,6 +288,39 @@ class GeminiLLMClient:
         except Exception as e:
             logger.error(f"流式LLM调用失败: {e}")
             raise
+    
+    async def astream_invoke(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None
+    ):
+        """
+        异步流式调用LLM（字符串版本）
+        
+        Args:
+            prompt: 用户提示词
+            system_prompt: 系统提示词(可选)
+        
+        Yields:
+            LLM的流式回复片段
+        """
+        chat_messages = []
+        
+        if system_prompt:
+            chat_messages.append(SystemMessage(content=system_prompt))
+        
+        chat_messages.append(HumanMessage(content=prompt))
+        
+        try:
+            async for chunk in self.llm.astream(chat_messages):
+                if hasattr(chunk, 'content'):
+                    yield chunk.content
+            
+            logger.debug("异步流式LLM调用完成")
+            
+        except Exception as e:
+            logger.error(f"异步流式LLM调用失败: {e}")
+            raise
 
 
 if __name__ == "__main__":
@@ -0,0 +1,134 @@
+"""
+查询向量缓存模块
+两级缓存：进程内LRU（内存） + SQLite持久化存储（磁盘）
+
+缓存键: (embedding模式, 模型名称@推理后端-精度, 规范化文本)
+适用于 local / deepinfra / openai 所有模式，模板化子问题和重复问题直接命中
+"""
+
+import hashlib
+import unicodedata
+from array import array
+from typing import List, Optional
+
+from src.llm.persistent_cache import CacheSingleton, PersistentLRUCache
+
+
+def normalize_text(text: str) -> str:
+    """
+    规范化查询文本（用于缓存键）
+
+    - Unicode NFC规范化（德语变音符号的组合/预组合形式统一）
+    - 去除首尾空白，合并连续空白
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_model_name(model: str, backend: Optional[str] = None, precision: Optional[str] = None) -> str:
+    """
+    缓存键中的模型标识
+
+    同一模型在不同推理后端/精度下（torch fp32 与 ONNX int8）输出的向量存在数值差异，
+    需要分开缓存，否则会把一种后端的向量返回给另一种后端的调用方
+
+    Examples:
+        cache_model_name("BAAI/bge-m3", "onnx", "int8") -> "BAAI/bge-m3@onnx-int8"
+        cache_model_name("text-embedding-3-small") -> "text-embedding-3-small"
+    """
+    if not backend:
+        return model
+    return f"{model}@{backend}-{precision}" if precision else f"{model}@{backend}"
+
+
+class EmbeddingCache(PersistentLRUCache):
+    """
+    查询向量缓存
+
+    功能:
+    1. 内存LRU缓存（有界，按最近使用淘汰）
+    2. SQLite磁盘缓存（跨进程重启保留，超过上限时按最近使用时间淘汰）
+    3. 命中/未命中统计，同步上报PerformanceMonitor
+    """
+
+    MONITOR_NAME = "Embedding缓存"
+    TABLE = "embeddings"
+    COLUMNS = (
+        ("mode", "TEXT NOT NULL"),
+        ("model", "TEXT NOT NULL"),
+        ("dim", "INTEGER NOT NULL"),
+        ("vector", "BLOB NOT NULL")
+    )
+    VALUE_COLUMN = "vector"
+
+    def __init__(
+        self,
+        db_path: Optional[str] = "./cache/embedding_cache.sqlite",
+        max_memory_items: int = 10000,
+        max_disk_items: int = 500000
+    ):
+        """
+        初始化向量缓存
+
+        Args:
+            db_path: SQLite文件路径，None表示只使用内存缓存
+            max_memory_items: 内存LRU最大条目数
+            max_disk_items: 磁盘缓存最大条目数
+        """
+        super().__init__(db_path, max_memory_items, max_disk_items)
+
+    @staticmethod
+    def make_key(mode: str, model: str, text: str) -> str:
+        """生成缓存键: sha256(模式 + 模型 + 规范化文本)"""
+        raw = f"{mode}\x00{model}\x00{normalize_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, mode: str, model: str, text: str) -> Optional[List[float]]:
+        """
+        查询缓存
+
+        Returns:
+            命中时返回向量，否则返回None
+        """
+        return self._lookup(self.make_key(mode, model, text))
+
+    def put(self, mode: str, model: str, text: str, vector: List[float]):
+        """写入缓存（内存 + 磁盘）"""
+        self.put_many(mode, model, [text], [vector])
+
+    def put_many(self, mode: str, model: str, texts: List[str], vectors: List[List[float]]):
+        """批量写入缓存"""
+        entries = []
+        for text, vector in zip(texts, vectors):
+            vector = list(vector)
+            entries.append((
+                self.make_key(mode, model, text),
+                vector,
+                (mode, model, len(vector), array("f", vector).tobytes())
+            ))
+        self._store(entries)
+
+    def _decode(self, raw: bytes) -> List[float]:
+        return array("f", raw).tolist()
+
+
+# 进程级缓存实例（按需创建）
+_embedding_cache: CacheSingleton[EmbeddingCache] = CacheSingleton()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    获取全局向量缓存
+
+    Returns:
+        EmbeddingCache实例；配置关闭缓存时返回None
+    """
+    from src.config import settings
+
+    return _embedding_cache.get(
+        settings.embedding_cache_enabled,
+        lambda: EmbeddingCache(
+            db_path=settings.embedding_cache_path or None,
+            max_memory_items=settings.embedding_cache_memory_items,
+            max_disk_items=settings.embedding_cache_disk_items
+        )
+    )
@@ -0,0 +1,146 @@
+"""
+查询Embedding微批处理调度器
+并发请求各自调用embed_text时，共享的本地模型会背靠背执行大量batch=1的前向计算
+
+调度器把短时间窗口内（几毫秒，或达到最大批次）到达的文本合并为一次encode调用，
+每个调用方通过Future拿到自己的向量；模型忙时到达的请求自然累积到下一批
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+from src.utils import logger
+
+
+class EmbeddingDispatcher:
+    """
+    Embedding微批处理调度器
+
+    用法:
+        dispatcher = EmbeddingDispatcher(lambda texts: client.embed_batch(texts))
+        vector = dispatcher.embed("Wie steht die SPD zur Migration?")   # 阻塞直到所在批次完成
+        future = dispatcher.submit("...")                              # 或异步获取Future
+    """
+
+    def __init__(
+        self,
+        encode_batch: Callable[[List[str]], List[List[float]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        name: str = "embedding"
+    ):
+        """
+        Args:
+            encode_batch: 批量编码函数（输入文本列表，返回一一对应的向量列表）
+            max_batch_size: 单批最大文本数
+            max_wait_ms: 第一条文本到达后最多等待多久再执行（毫秒）
+            name: 调度线程名称
+        """
+        self.encode_batch = encode_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+
+        # 队列元素: (文本, Future)；None表示停止
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        self.batches = 0
+        self.items = 0
+
+        logger.info(
+            f"[EmbeddingDispatcher] 初始化完成: 最大批次={self.max_batch_size}, 等待窗口={max_wait_ms}ms"
+        )
+
+    def submit(self, text: str) -> Future:
+        """提交一条文本，返回在所在批次完成后得到向量的Future"""
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str) -> List[float]:
+        """提交一条文本并等待向量"""
+        return self.submit(text).result()
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """提交多条文本并等待全部向量（可与其他请求的文本合并到同一批）"""
+        futures = [self.submit(text) for text in texts]
+        return [future.result() for future in futures]
+
+    def close(self):
+        """停止调度线程（已提交的文本会先处理完）"""
+        with self._start_lock:
+            if self._worker is not None:
+                self._queue.put(None)
+                self._worker.join()
+                self._worker = None
+
+    def get_stats(self) -> Dict:
+        """获取调度统计信息"""
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0
+        }
+
+    def _ensure_worker(self):
+        """首次提交时启动调度线程"""
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name=f"{self.name}-dispatcher", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self):
+        """调度循环：取第一条后在等待窗口内继续收集，然后合并执行"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            stopping = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._process(batch)
+            if stopping:
+                return
+
+    def _process(self, batch: List[tuple]):
+        """执行一批（相同文本只编码一次），把结果或异常分发给各调用方"""
+        unique_texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vectors = self.encode_batch(unique_texts)
+            if len(vectors) != len(unique_texts):
+                raise RuntimeError(f"批量编码返回{len(vectors)}个向量，期望{len(unique_texts)}个")
+        except Exception as e:
+            logger.error(f"[EmbeddingDispatcher] 批量编码失败（{len(batch)}条）: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        by_text = dict(zip(unique_texts, vectors))
+        for text, future in batch:
+            future.set_result(list(by_text[text]))
+
+        self.batches += 1
+        self.items += len(batch)
+        logger.debug(f"[EmbeddingDispatcher] 合并执行: {len(batch)}条请求 -> {len(unique_texts)}条文本")
@@ -5,13 +5,15 @@ Embedding客户端模块
 """
 
 from langchain_openai import OpenAIEmbeddings
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
 import requests
 import json
 from src.config import settings
 from src.utils import logger
+from src.llm.embedding_cache import cache_model_name, get_embedding_cache
+from src.llm.embedding_dispatcher import EmbeddingDispatcher
 
 # 延迟导入 LocalEmbeddingClient，避免循环导入
 _local_client = None
@@ -26,6 +28,29 @@ def _get_local_client():
     return _local_client
 
 
+def resolve_embedding_model(
+    embedding_mode: str,
+    model_name: Optional[str] = None,
+    dimensions: Optional[int] = None
+) -> Tuple[str, int]:
+    """
+    按Embedding模式补全模型名称和向量维度的配置默认值
+
+    Args:
+        embedding_mode: Embedding模式
+        model_name: 模型名称，None时从配置读取
+        dimensions: 向量维度，None时从配置读取
+
+    Returns:
+        (模型名称, 向量维度)；不支持的模式按OpenAI处理
+    """
+    if embedding_mode == "local":
+        return model_name or settings.local_embedding_model, dimensions or settings.local_embedding_dimension
+    if embedding_mode == "deepinfra":
+        return model_name or settings.deepinfra_embedding_model, dimensions or settings.deepinfra_embedding_dimension
+    return model_name or settings.openai_embedding_model, dimensions or settings.openai_embedding_dimension
+
+
 class GeminiEmbeddingClient:
     """
     Gemini Embedding客户端
@@ -52,42 +77,63 @@ class GeminiEmbeddingClient:
         """
         # 从配置读取embedding模式
         self.embedding_mode = embedding_mode or settings.embedding_mode
+
+        self.model_name, self.dimensions = resolve_embedding_model(self.embedding_mode, model_name, dimensions)
+
+        # 查询向量缓存（配置关闭时为None）
+        self.cache = get_embedding_cache()
         
         # 根据模式选择配置
         if self.embedding_mode == "local":
             # 本地模式：使用 LocalEmbeddingClient
-            self.model_name = model_name or settings.local_embedding_model
-            self.dimensions = dimensions or settings.local_embedding_dimension
             logger.info("✅ 使用本地 Embedding 模型（完全免费，支持 GPU 加速）")
             
             # 导入并初始化本地客户端
             LocalEmbeddingClient = _get_local_client()
-            self.local_client = LocalEmbeddingClient(model_name=self.model_name)
+            self.local_client = LocalEmbeddingClient(
+                model_name=self.model_name,
+                backend=settings.local_embedding_backend,
+                onnx_model_path=settings.local_embedding_onnx_path,
+                onnx_quantized=settings.local_embedding_onnx_quantized,
+                onnx_threads=settings.local_embedding_onnx_threads or None
+            )
             self.dimensions = self.local_client.dimensions  # 从实际模型获取维度
+            # 不同推理后端/量化的向量存在数值差异，缓存键中区分
+            if settings.local_embedding_backend == "onnx":
+                self.cache_model = cache_model_name(
+                    self.model_name, "onnx", "int8" if settings.local_embedding_onnx_quantized else "fp32"
+                )
+            else:
+                self.cache_model = cache_model_name(self.model_name, settings.local_embedding_backend, "fp32")
+            # 并发请求的查询embedding合并为一次前向计算
+            self.dispatcher = None
+            if settings.embedding_dispatcher_enabled:
+                self.dispatcher = EmbeddingDispatcher(
+                    lambda texts: self.local_client.embed_batch(texts, batch_size=len(texts)),
+                    max_batch_size=settings.embedding_dispatcher_max_batch_size,
+                    max_wait_ms=settings.embedding_dispatcher_max_wait_ms
+                )
             self.embeddings = None
             self.api_key = None
             self.api_url = None
             
         elif self.embedding_mode == "deepinfra":
-            self.model_name = model_name or settings.deepinfra_embedding_model
-            self.dimensions = dimensions or settings.deepinfra_embedding_dimension
             api_key = settings.deepinfra_embedding_api_key
             base_url = settings.deepinfra_embedding_base_url
             logger.info("✅ 使用DeepInfra Embedding API（速度更快、价格更便宜）")
         elif self.embedding_mode == "openai":
-            self.model_name = model_name or settings.openai_embedding_model
-            self.dimensions = dimensions or settings.openai_embedding_dimension
             api_key = settings.openai_embedding_api_key
             base_url = settings.openai_embedding_base_url
             logger.info("✅ 使用OpenAI官方API")
         else:
             # 其他模式暂不支持，使用OpenAI作为fallback
             logger.warning(f"⚠️  不支持的embedding模式: {self.embedding_mode}，使用OpenAI作为fallback")
-            self.model_name = model_name or settings.openai_embedding_model
-            self.dimensions = dimensions or settings.openai_embedding_dimension
             api_key = settings.openai_embedding_api_key
             base_url = settings.openai_embedding_base_url
         
+        if self.embedding_mode != "local":
+            self.cache_model = cache_model_name(self.model_name)
+
         # 根据模式记录日志
         if self.embedding_mode == "local":
             logger.info(
@@ -246,16 +292,27 @@ class GeminiEmbeddingClient:
         Returns:
             文本的向量表示(list of floats)
         """
+        if self.cache is not None:
+            cached = self.cache.get(self.embedding_mode, self.cache_model, text)
+            if cached is not None:
+                return cached
+
         try:
             if self.embedding_mode == "local":
-                # 本地模式使用 LocalEmbeddingClient
-                vector = self.local_client.embed_text(text)
+                # 本地模式使用 LocalEmbeddingClient（开启调度器时与其他并发请求合并为一批）
+                if self.dispatcher is not None:
+                    vector = self.dispatcher.embed(text)
+                else:
+                    vector = self.local_client.embed_text(text)
             elif self.embedding_mode == "deepinfra":  # DeepInfra使用requests
                 response_data = self._call_deepinfra_api(text)
                 vector = response_data["data"][0]["embedding"]
             else:  # 其他模式使用LangChain
                 vector = self.embeddings.embed_query(text)
             
+            if self.cache is not None:
+                self.cache.put(self.embedding_mode, self.cache_model, text, vector)
+            
             logger.debug(
                 f"文本embedding成功: 文本长度={len(text)}, "
                 f"向量维度={len(vector)}"
@@ -266,7 +323,165 @@ class GeminiEmbeddingClient:
         except Exception as e:
             logger.error(f"文本embedding失败: {e}")
             raise
+
+    @property
+    def last_batching_stats(self):
+        """本地模式最近一次批量embedding的padding统计（BatchingStats，其他模式为None）"""
+        if self.embedding_mode != "local":
+            return None
+        return self.local_client.last_batching_stats
+
+    @property
+    def supports_sparse(self) -> bool:
+        """是否能输出BGE-M3稀疏词项权重（仅本地BGE-M3模式）"""
+        return self.embedding_mode == "local" and getattr(self.local_client, "use_bge_m3", False)
+
+    def embed_query_sparse(self, text: str) -> Optional[Dict[int, float]]:
+        """
+        查询的BGE-M3稀疏词项权重（用于混合检索）
+
+        Args:
+            text: 查询文本
+
+        Returns:
+            {词项ID: 权重}；当前模式不支持稀疏权重时返回None
+        """
+        if not self.supports_sparse:
+            return None
+        return self.local_client.embed_query_sparse(text)
+
+    def embed_batch_with_sparse(
+        self,
+        texts: List[str],
+        batch_size: int = 128,
+        max_workers: int = 1,  # 本地模型不需要并发，保持与embed_batch参数兼容
+        token_budget: Optional[int] = None
+    ) -> Tuple[List[List[float]], List[Dict[int, float]]]:
+        """
+        批量向量化，同时返回BGE-M3稀疏词项权重（索引构建时一次前向计算，用于稀疏倒排索引）
+
+        Args:
+            texts: 文本列表
+            batch_size: 单批最大文本数
+            max_workers: 未使用（保持接口兼容）
+            token_budget: 单批补齐后的最大token数，默认从配置读取
+
+        Returns:
+            (向量列表, 词项权重列表 {词项ID: 权重})
+
+        Raises:
+            ValueError: 当前模式不支持稀疏权重
+        """
+        if not self.supports_sparse:
+            raise ValueError(f"当前Embedding模式不支持稀疏词项权重: mode={self.embedding_mode}")
+        return self.local_client.embed_batch_with_sparse(texts, batch_size=batch_size, token_budget=token_budget)
+
+    def embed_queries_with_sparse(
+        self,
+        texts: List[str],
+        sparse_texts: List[str]
+    ) -> Tuple[List[List[float]], Dict[str, Dict[int, float]]]:
+        """
+        查询向量化，同时计算部分查询的BGE-M3稀疏词项权重（检索节点预计算用）
+
+        未命中缓存的查询与需要稀疏权重的查询合并为一次前向计算（稀疏权重不缓存）；
+        当前模式不支持稀疏权重时等同于embed_queries
+
+        Args:
+            texts: 查询文本列表
+            sparse_texts: 需要稀疏权重的查询（混合检索使用的原始问题）
+
+        Returns:
+            (向量列表（与texts顺序一致）, {查询文本: 词项权重})
+        """
+        if not self.supports_sparse or not sparse_texts:
+            return self.embed_queries(texts), {}
+
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        if self.cache is not None:
+            for i, text in enumerate(texts):
+                vectors[i] = self.cache.get(self.embedding_mode, self.cache_model, text)
+        missing_texts = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+
+        encode_texts = list(dict.fromkeys(missing_texts + list(sparse_texts)))
+        encoded_vectors, encoded_weights = self.local_client.embed_batch_with_sparse(
+            encode_texts, batch_size=len(encode_texts)
+        )
+        encoded = dict(zip(encode_texts, encoded_vectors))
+
+        for i, text in enumerate(texts):
+            if vectors[i] is None:
+                vectors[i] = encoded[text]
+        if self.cache is not None and missing_texts:
+            self.cache.put_many(
+                self.embedding_mode, self.cache_model, missing_texts, [encoded[text] for text in missing_texts]
+            )
+
+        wanted = set(sparse_texts)
+        lexical_weights = {text: weights for text, weights in zip(encode_texts, encoded_weights) if text in wanted}
+        logger.debug(
+            f"查询批量embedding（含稀疏权重）成功: {len(texts)}个查询, "
+            f"缓存命中{len(texts) - len(missing_texts)}个, 稀疏权重{len(lexical_weights)}个"
+        )
+        return vectors, lexical_weights
     
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        查询向量化：一次调用处理全部查询文本（检索节点预计算用）
+
+        与embed_batch不同，不做分批/并发/延迟控制，适合几十条以内的短查询，
+        本地模式下只触发一次模型前向计算
+
+        Args:
+            texts: 查询文本列表
+
+        Returns:
+            向量列表,与输入顺序一致
+        """
+        if not texts:
+            return []
+
+        # 先查缓存，只对未命中的查询做embedding
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        if self.cache is not None:
+            for i, text in enumerate(texts):
+                vectors[i] = self.cache.get(self.embedding_mode, self.cache_model, text)
+
+        missing_indices = [i for i, vector in enumerate(vectors) if vector is None]
+        if not missing_indices:
+            logger.debug(f"查询批量embedding全部命中缓存: {len(texts)}个查询")
+            return vectors
+
+        missing_texts = [texts[i] for i in missing_indices]
+
+        try:
+            if self.embedding_mode == "local":
+                if self.dispatcher is not None:
+                    computed = self.dispatcher.embed_many(missing_texts)
+                else:
+                    computed = self.local_client.embed_batch(missing_texts, batch_size=len(missing_texts))
+            elif self.embedding_mode == "deepinfra":
+                response_data = self._call_deepinfra_api(missing_texts)
+                computed = [data["embedding"] for data in response_data["data"]]
+            else:
+                computed = self.embeddings.embed_documents(missing_texts)
+
+            for i, vector in zip(missing_indices, computed):
+                vectors[i] = vector
+
+            if self.cache is not None:
+                self.cache.put_many(self.embedding_mode, self.cache_model, missing_texts, computed)
+
+            logger.debug(
+                f"查询批量embedding成功: {len(texts)}个查询, "
+                f"缓存命中{len(texts) - len(missing_indices)}个"
+            )
+            return vectors
+
+        except Exception as e:
+            logger.error(f"查询批量embedding失败: {e}")
+            raise
+
     def embed_batch(
         self,
         texts: List[str],
@@ -289,10 +504,10 @@ class GeminiEmbeddingClient:
             向量列表,每个向量对应一个文本
         """
         try:
-            # 🔧 重要修复：本地GPU模型不支持并发，强制使用单线程
+            # 本地模式：全部文本交给本地客户端按token长度分桶组批（batch_size作为单批最大条数），
+            # 外层按条数切批会把长短文本混在同一批，大部分计算花在padding上
             if self.embedding_mode == "local":
-                max_workers = 1
-                logger.warning("⚠️  本地GPU模式检测到，自动禁用并发（max_workers=1）以避免GPU资源竞争")
+                return self.local_client.embed_batch(texts, batch_size=batch_size)
 
             total = len(texts)
             total_batches = (total + batch_size - 1) // batch_size
@@ -1,12 +1,14 @@
 """
 本地 Embedding 客户端
 支持 sentence-transformers 和 BGE-M3 模型，完全免费，无需 API Key
-支持 GPU 加速
+支持 GPU 加速；无GPU的节点可使用 BGE-M3 ONNX int8 后端（见 onnx_embeddings.py）
 """
 
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 import torch
 from src.utils import logger
+from src.vectordb.sparse_index import lexical_weights_to_dict
+from src.llm.batching import BatchingStats, batching_stats, run_token_batches
 
 # 尝试导入不同的模型库
 try:
@@ -49,7 +51,11 @@ class LocalEmbeddingClient:
         self,
         model_name: str = "BAAI/bge-m3",
         use_gpu: Optional[bool] = None,
-        device: Optional[str] = None
+        device: Optional[str] = None,
+        backend: str = "torch",
+        onnx_model_path: Optional[str] = None,
+        onnx_quantized: bool = True,
+        onnx_threads: Optional[int] = None
     ):
         """
         初始化本地 Embedding 模型
@@ -62,9 +68,32 @@ class LocalEmbeddingClient:
                 - distiluse-base-multilingual-cased-v2: sentence-transformers 模型，512维
             use_gpu: 是否使用 GPU（None 时自动检测）
             device: 指定设备（如 'cuda:0'），优先级高于 use_gpu
+            backend: 推理后端
+                - torch: PyTorch（FlagEmbedding / sentence-transformers）
+                - onnx: BGE-M3 ONNX 图（CPU，默认使用int8量化模型，不支持稀疏词项权重）
+            onnx_model_path: ONNX 导出目录（backend="onnx" 时必填）
+            onnx_quantized: 是否使用int8量化模型
+            onnx_threads: ONNX Runtime线程数（None表示由ONNX Runtime决定）
         """
         logger.info(f"🔄 加载本地 Embedding 模型: {model_name}")
         
+        self.model_name = model_name
+        self.use_bge_m3 = False
+        self.use_onnx = False
+        # 最近一次批量 embedding 的padding统计
+        self.last_batching_stats: Optional[BatchingStats] = None
+        
+        if backend == "onnx":
+            if not onnx_model_path:
+                raise ValueError("ONNX 后端需要指定 onnx_model_path")
+            from src.llm.onnx_embeddings import OnnxBGEM3Encoder
+            logger.info(f"🔧 使用 BGE-M3 ONNX 后端（{'int8' if onnx_quantized else 'fp32'}，CPU）")
+            self.device = 'cpu'
+            self.use_onnx = True
+            self.model = OnnxBGEM3Encoder(onnx_model_path, quantized=onnx_quantized, num_threads=onnx_threads)
+            self.dimensions = 1024  # 与 PyTorch 版本 BGE-M3 相同
+            return
+        
         # 自动检测 GPU
         if device is None:
             if use_gpu is None:
@@ -73,8 +102,6 @@ class LocalEmbeddingClient:
             device = 'cuda:0' if use_gpu else 'cpu'
         
         self.device = device
-        self.model_name = model_name
-        self.use_bge_m3 = False
         
         # 判断是否使用 BGE-M3 模型
         if 'bge-m3' in model_name.lower() or 'bge_m3' in model_name.lower():
@@ -163,7 +190,9 @@ class LocalEmbeddingClient:
         Returns:
             向量
         """
-        if self.use_bge_m3:
+        if self.use_onnx:
+            return self.model.encode([text])[0].tolist()
+        elif self.use_bge_m3:
             # BGE-M3 使用 encode 方法，返回 dense embeddings
             embeddings = self.model.encode([text], return_dense=True)
             vector = embeddings['dense_vecs'][0]
@@ -190,47 +219,125 @@ class LocalEmbeddingClient:
         texts: List[str],
         batch_size: int = 32,
         max_workers: int = 1,  # 本地模型不需要并发，保持接口兼容
-        request_delay: float = 0.0  # 本地模型不需要延迟，保持接口兼容
+        request_delay: float = 0.0,  # 本地模型不需要延迟，保持接口兼容
+        token_budget: Optional[int] = None
     ) -> List[List[float]]:
         """
         批量处理
         
+        按token长度分桶组批（见 batching.py），批次内长度相近以减少padding，
+        padding统计保存在 last_batching_stats
+        
         Args:
             texts: 文本列表
-            batch_size: 批次大小（GPU 可以设置更大，如 64 或 128）
+            batch_size: 单批最大文本数（GPU 可以设置更大，如 64 或 128）
             max_workers: 并发数（本地模型不使用，保持接口兼容）
             request_delay: 延迟时间（本地模型不使用，保持接口兼容）
+            token_budget: 单批补齐后的最大token数，默认从配置读取；0表示按batch_size固定分批
             
         Returns:
             向量列表
         """
         logger.info(f"📦 批量 embedding: {len(texts)} 个文本，批次大小: {batch_size}")
         
-        if self.use_bge_m3:
+        if self.use_onnx:
+            encode = lambda batch: self.model.encode(batch, batch_size=len(batch))
+        elif self.use_bge_m3:
             # BGE-M3 批量处理
-            all_vectors = []
-            for i in range(0, len(texts), batch_size):
-                batch = texts[i:i + batch_size]
-                embeddings = self.model.encode(batch, return_dense=True)
-                vectors = embeddings['dense_vecs']
-                all_vectors.extend([v.tolist() for v in vectors])
-            
-            logger.success(f"✅ 批量 embedding 完成: {len(all_vectors)} 个向量")
-            return all_vectors
+            encode = lambda batch: self.model.encode(batch, batch_size=len(batch), return_dense=True)['dense_vecs']
         else:
             # sentence-transformers 批量处理
-            all_vectors = []
-            for i in range(0, len(texts), batch_size):
-                batch = texts[i:i + batch_size]
-                vectors = self.model.encode(
-                    batch,
-                    show_progress_bar=False,
-                    batch_size=batch_size
-                )
-                all_vectors.extend([v.tolist() for v in vectors])
+            encode = lambda batch: self.model.encode(batch, show_progress_bar=False, batch_size=len(batch))
+        
+        outputs = self._run_batches(texts, encode, batch_size, token_budget)
+        all_vectors = [v.tolist() for v in outputs]
+        
+        logger.success(f"✅ 批量 embedding 完成: {len(all_vectors)} 个向量")
+        return all_vectors
+    
+    def embed_batch_with_sparse(
+        self,
+        texts: List[str],
+        batch_size: int = 32,
+        token_budget: Optional[int] = None
+    ) -> Tuple[List[List[float]], List[Dict[int, float]]]:
+        """
+        批量 embedding，同时返回 BGE-M3 的稀疏词项权重（一次前向计算，用于构建稀疏倒排索引）
+        
+        Args:
+            texts: 文本列表
+            batch_size: 单批最大文本数
+            token_budget: 单批补齐后的最大token数，默认从配置读取；0表示按batch_size固定分批
             
-            logger.success(f"✅ 批量 embedding 完成: {len(all_vectors)} 个向量")
-            return all_vectors
+        Returns:
+            (向量列表, 词项权重列表 {词项ID: 权重})
+        """
+        if not self.use_bge_m3:
+            raise ValueError("稀疏词项权重只有 BGE-M3 PyTorch 后端支持")
+        
+        logger.info(f"📦 批量 embedding（稠密+稀疏）: {len(texts)} 个文本，批次大小: {batch_size}")
+        
+        def encode(batch):
+            embeddings = self.model.encode(batch, batch_size=len(batch), return_dense=True, return_sparse=True)
+            return list(zip(embeddings['dense_vecs'], embeddings['lexical_weights']))
+        
+        outputs = self._run_batches(texts, encode, batch_size, token_budget)
+        all_vectors = [vector.tolist() for vector, _ in outputs]
+        all_weights = [lexical_weights_to_dict(weights) for _, weights in outputs]
+        
+        logger.success(f"✅ 批量 embedding 完成: {len(all_vectors)} 个向量（含稀疏权重）")
+        return all_vectors, all_weights
+    
+    def _run_batches(self, texts: List[str], encode, batch_size: int, token_budget: Optional[int]) -> list:
+        """
+        分批执行编码，结果按输入顺序返回
+        
+        token_budget > 0 时按token长度排序，在预算内组批；否则按输入顺序每 batch_size 个一批
+        """
+        if token_budget is None:
+            from src.config import settings
+            token_budget = settings.local_embedding_token_budget
+        
+        lengths = self._token_lengths(texts)
+        if token_budget and token_budget > 0:
+            outputs, stats = run_token_batches(texts, lengths, encode, token_budget, max_batch_size=batch_size)
+        else:
+            batches = [list(range(i, min(i + batch_size, len(texts)))) for i in range(0, len(texts), batch_size)]
+            outputs = []
+            for batch in batches:
+                outputs.extend(encode([texts[i] for i in batch]))
+            stats = batching_stats(lengths, batches)
+        
+        self.last_batching_stats = stats
+        if texts:
+            logger.info(
+                f"   分批: {stats.batches} 批，padding效率 {stats.padding_efficiency:.1%} "
+                f"({stats.real_tokens}/{stats.padded_tokens} tokens)"
+            )
+        return outputs
+    
+    def _token_lengths(self, texts: List[str]) -> List[int]:
+        """每个文本的token长度（模型没有tokenizer时按字符数估算）"""
+        tokenizer = getattr(self.model, 'tokenizer', None)
+        if tokenizer is None or not texts:
+            return [len(text) // 4 + 2 for text in texts]
+        encoded = tokenizer(list(texts), add_special_tokens=True, truncation=True, max_length=8192)
+        return [len(ids) for ids in encoded['input_ids']]
+    
+    def embed_query_sparse(self, text: str) -> Dict[int, float]:
+        """
+        查询的 BGE-M3 稀疏词项权重
+        
+        Args:
+            text: 查询文本
+            
+        Returns:
+            {词项ID: 权重}
+        """
+        if not self.use_bge_m3:
+            raise ValueError("稀疏词项权重只有 BGE-M3 PyTorch 后端支持")
+        embeddings = self.model.encode([text], return_dense=False, return_sparse=True)
+        return lexical_weights_to_dict(embeddings['lexical_weights'][0])
     
     def embed_chunks(
         self,
@@ -238,7 +345,8 @@ class LocalEmbeddingClient:
         text_key: str = 'text',
         batch_size: int = 32,
         max_workers: int = 1,  # 本地模型不需要并发，保持接口兼容
-        request_delay: float = 0.0  # 本地模型不需要延迟，保持接口兼容
+        request_delay: float = 0.0,  # 本地模型不需要延迟，保持接口兼容
+        with_sparse: bool = False
     ) -> List[dict]:
         """
         Chunks embedding
@@ -249,9 +357,10 @@ class LocalEmbeddingClient:
             batch_size: 批次大小（GPU 可以设置更大，如 64 或 128）
             max_workers: 并发数（本地模型不使用，保持接口兼容）
             request_delay: 延迟时间（本地模型不使用，保持接口兼容）
+            with_sparse: 是否同时保存 BGE-M3 稀疏词项权重（lexical_weights 字段）
             
         Returns:
-            添加了 vector 字段的 chunks
+            添加了 vector 字段（以及可选的 lexical_weights 字段）的 chunks
         """
         logger.info(f"📚 开始对 {len(chunks)} 个 chunks 进行 embedding")
         
@@ -259,13 +368,19 @@ class LocalEmbeddingClient:
         texts = [chunk[text_key] for chunk in chunks]
         
         # 批量 embedding
-        vectors = self.embed_batch(texts, batch_size=batch_size, max_workers=max_workers, request_delay=request_delay)
+        lexical_weights = None
+        if with_sparse:
+            vectors, lexical_weights = self.embed_batch_with_sparse(texts, batch_size=batch_size)
+        else:
+            vectors = self.embed_batch(texts, batch_size=batch_size, max_workers=max_workers, request_delay=request_delay)
         
         # 添加向量到 chunks
         embedded_chunks = []
-        for chunk, vector in zip(chunks, vectors):
+        for i, (chunk, vector) in enumerate(zip(chunks, vectors)):
             embedded_chunk = chunk.copy()
             embedded_chunk['vector'] = vector
+            if lexical_weights is not None:
+                embedded_chunk['lexical_weights'] = lexical_weights[i]
             embedded_chunks.append(embedded_chunk)
         
         logger.success(f"✅ Chunks embedding 完成: {len(embedded_chunks)} 个")
@@ -0,0 +1,329 @@
+"""
+本地 Cross-Encoder 重排序
+使用 bge-reranker 系列模型在本地CPU上为 (问题, 文档) 对打分，替代远程Cohere Rerank API
+
+推理后端（按可用性选择）:
+1. ONNX Runtime - 指定导出的ONNX模型目录时使用（model.onnx + tokenizer文件），CPU推理最快
+2. sentence-transformers CrossEncoder - 未指定ONNX模型时使用（PyTorch）
+
+优化:
+- 一次请求中所有子问题的 (问题, 文档) 对合并打分，按文本长度排序后分批，减少padding
+- 分数按 (问题哈希, 文档ID) 缓存，相同子问题/重叠文档不重复推理
+- 可指定截止时间，在批次之间检查，超时后停止推理（已完成批次的分数仍写入缓存）
+"""
+
+import hashlib
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.utils import logger
+from src.utils.performance_monitor import get_performance_monitor
+
+try:
+    import onnxruntime as ort
+    from transformers import AutoTokenizer
+    ONNX_RUNTIME_AVAILABLE = True
+except ImportError:
+    ONNX_RUNTIME_AVAILABLE = False
+
+try:
+    from sentence_transformers import CrossEncoder
+    CROSS_ENCODER_AVAILABLE = True
+except ImportError:
+    CROSS_ENCODER_AVAILABLE = False
+
+
+# 重排请求: (问题, 文档文本列表, 文档ID列表)
+RerankRequest = Tuple[str, Sequence[str], Sequence[str]]
+
+
+class RerankTimeoutError(TimeoutError):
+    """推理超过截止时间（已完成批次的分数已写入缓存）"""
+
+
+class LocalCrossEncoderReranker:
+    """
+    本地 Cross-Encoder 重排序器
+
+    返回格式与Cohere Rerank API相同: [{"index": 原始位置, "relevance_score": 分数}]，
+    分数经sigmoid归一化到0-1之间
+    """
+
+    MONITOR_NAME = "重排分数缓存"
+
+    def __init__(
+        self,
+        model_name: str = "BAAI/bge-reranker-v2-m3",
+        onnx_model_path: Optional[str] = None,
+        max_length: int = 512,
+        batch_size: int = 32,
+        cache_max_entries: int = 20000,
+        num_threads: Optional[int] = None
+    ):
+        """
+        初始化本地重排序模型
+
+        Args:
+            model_name: 模型名称（未指定ONNX模型时通过sentence-transformers加载）
+            onnx_model_path: 导出的ONNX模型目录（包含model.onnx和tokenizer文件）
+            max_length: 单个 (问题, 文档) 对的最大token数
+            batch_size: 单次推理的最大对数
+            cache_max_entries: 分数缓存最大条目数
+            num_threads: ONNX Runtime线程数（None表示由ONNX Runtime决定）
+        """
+        self.model_name = model_name
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.cache_max_entries = cache_max_entries
+
+        # {(问题哈希, 文档ID): 分数}
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # 推理会话不保证线程安全，串行执行
+        self._infer_lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        self._load_model(onnx_model_path, num_threads)
+
+    def _load_model(self, onnx_model_path: Optional[str], num_threads: Optional[int]):
+        """加载推理后端（指定ONNX模型目录时使用ONNX Runtime，否则使用CrossEncoder）"""
+        if onnx_model_path:
+            if not ONNX_RUNTIME_AVAILABLE:
+                raise ImportError("ONNX重排序需要 onnxruntime 和 transformers。请运行: pip install onnxruntime transformers")
+            model_file = os.path.join(onnx_model_path, "model.onnx")
+            options = ort.SessionOptions()
+            if num_threads:
+                options.intra_op_num_threads = num_threads
+            self.tokenizer = AutoTokenizer.from_pretrained(onnx_model_path)
+            self.session = ort.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+            self._input_names = {item.name for item in self.session.get_inputs()}
+            self.backend = "onnx"
+            logger.info(f"✅ [LocalReranker] ONNX重排序模型加载成功: {model_file}")
+        else:
+            if not CROSS_ENCODER_AVAILABLE:
+                raise ImportError("本地重排序需要 sentence-transformers。请运行: pip install sentence-transformers")
+            self.model = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+            self._activation_kwarg = _activation_kwarg(self.model.predict)
+            self.backend = "cross_encoder"
+            logger.info(f"✅ [LocalReranker] CrossEncoder重排序模型加载成功: {self.model_name}")
+
+    def rerank(
+        self,
+        query: str,
+        documents: Sequence[str],
+        doc_ids: Optional[Sequence[str]] = None,
+        top_n: Optional[int] = None,
+        deadline: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        对单个问题的文档重排序
+
+        Args:
+            query: 问题
+            documents: 文档文本列表
+            doc_ids: 文档ID列表（用于分数缓存，默认使用文本哈希）
+            top_n: 返回前N个结果
+            deadline: 截止时间（time.monotonic()），None表示不限时
+
+        Returns:
+            [{"index": 原始位置, "relevance_score": 分数}]，按分数降序
+        """
+        return self.rerank_batch([(query, documents, doc_ids)], top_n=top_n, deadline=deadline)[0]
+
+    def rerank_batch(
+        self,
+        requests: Sequence[RerankRequest],
+        top_n: Optional[int] = None,
+        deadline: Optional[float] = None
+    ) -> List[List[Dict]]:
+        """
+        多个问题一次重排序（所有 (问题, 文档) 对合并打分）
+
+        Args:
+            requests: [(问题, 文档文本列表, 文档ID列表或None)]
+            top_n: 每个问题返回前N个结果
+            deadline: 截止时间（time.monotonic()），None表示不限时
+
+        Returns:
+            与requests一一对应的重排结果
+
+        Raises:
+            RerankTimeoutError: 推理超过截止时间
+        """
+        pairs = []
+        for query, documents, doc_ids in requests:
+            doc_ids = doc_ids or [None] * len(documents)
+            pairs.extend((query, text, doc_id) for text, doc_id in zip(documents, doc_ids))
+
+        scores = self.score_pairs(pairs, deadline=deadline)
+
+        results = []
+        offset = 0
+        for _, documents, _ in requests:
+            question_scores = scores[offset:offset + len(documents)]
+            offset += len(documents)
+            order = np.argsort(-question_scores, kind="stable")
+            if top_n is not None:
+                order = order[:top_n]
+            results.append([
+                {"index": int(i), "relevance_score": float(question_scores[i])} for i in order
+            ])
+        return results
+
+    def score_pairs(
+        self,
+        pairs: Sequence[Tuple[str, str, Optional[str]]],
+        deadline: Optional[float] = None
+    ) -> np.ndarray:
+        """
+        为 (问题, 文档文本, 文档ID) 对打分（命中缓存的对不再推理）
+
+        Args:
+            pairs: [(问题, 文档文本, 文档ID或None)]
+            deadline: 截止时间（time.monotonic()），每个推理批次开始前检查
+
+        Returns:
+            与pairs一一对应的分数数组
+
+        Raises:
+            RerankTimeoutError: 推理超过截止时间
+        """
+        scores = np.zeros(len(pairs), dtype=np.float32)
+        keys = [
+            (_text_hash(query), doc_id or _text_hash(text)) for query, text, doc_id in pairs
+        ]
+
+        missing: Dict[Tuple[str, str], List[int]] = {}
+        with self._cache_lock:
+            for i, key in enumerate(keys):
+                score = self._cache.get(key)
+                if score is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    scores[i] = score
+
+        hit_count = len(pairs) - sum(len(rows) for rows in missing.values())
+        self._record(hit_count, len(pairs) - hit_count)
+
+        if missing:
+            # 同一 (问题, 文档) 只推理一次；按长度排序后分批，同一批次内长度相近
+            unique = [(key, rows[0]) for key, rows in missing.items()]
+            unique.sort(key=lambda item: len(pairs[item[1]][0]) + len(pairs[item[1]][1]))
+
+            computed = np.empty(len(unique), dtype=np.float32)
+            done = 0
+            with self._infer_lock:
+                for start in range(0, len(unique), self.batch_size):
+                    if deadline is not None and time.monotonic() >= deadline:
+                        break
+                    batch = unique[start:start + self.batch_size]
+                    computed[start:start + len(batch)] = self._predict(
+                        [pairs[row][0] for _, row in batch],
+                        [pairs[row][1] for _, row in batch]
+                    )
+                    done = start + len(batch)
+
+            with self._cache_lock:
+                for (key, _), score in zip(unique[:done], computed[:done]):
+                    for row in missing[key]:
+                        scores[row] = score
+                    self._cache[key] = float(score)
+                    self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_max_entries:
+                    self._cache.popitem(last=False)
+
+            if done < len(unique):
+                logger.warning(f"[LocalReranker] ⏰ 超过截止时间，已推理{done}/{len(unique)}个文档对")
+                raise RerankTimeoutError(f"重排序超时（已推理{done}/{len(unique)}个文档对）")
+
+            logger.info(
+                f"[LocalReranker] 推理{len(unique)}个文档对（缓存命中{hit_count}/{len(pairs)}）"
+            )
+
+        return scores
+
+    def _predict(self, queries: List[str], texts: List[str]) -> np.ndarray:
+        """推理一个批次，返回sigmoid归一化的相关性分数"""
+        if self.backend == "onnx":
+            encoded = self.tokenizer(
+                queries, texts,
+                padding=True, truncation=True, max_length=self.max_length, return_tensors="np"
+            )
+            inputs = {
+                name: value.astype(np.int64) for name, value in encoded.items() if name in self._input_names
+            }
+            logits = self.session.run(None, inputs)[0].reshape(-1)
+        else:
+            logits = np.asarray(
+                self.model.predict(
+                    list(zip(queries, texts)), batch_size=len(queries), **{self._activation_kwarg: _identity}
+                )
+            ).reshape(-1)
+        return 1.0 / (1.0 + np.exp(-logits.astype(np.float32)))
+
+    def clear_cache(self):
+        """清空分数缓存"""
+        with self._cache_lock:
+            self._cache.clear()
+        logger.info("[LocalReranker] 分数缓存已清空")
+
+    def get_stats(self) -> Dict:
+        """获取缓存统计信息"""
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def _record(self, hits: int, misses: int):
+        """上报缓存命中情况"""
+        monitor = get_performance_monitor()
+        with self._cache_lock:
+            self.hits += hits
+            self.misses += misses
+        for _ in range(hits):
+            monitor.record_cache_access(self.MONITOR_NAME, hit=True)
+        for _ in range(misses):
+            monitor.record_cache_access(self.MONITOR_NAME, hit=False)
+
+
+def _text_hash(text: str) -> str:
+    """文本哈希（用作缓存键）"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _identity(x):
+    """CrossEncoder输出原始logits（统一在_predict中做sigmoid）"""
+    return x
+
+
+def _activation_kwarg(predict) -> str:
+    """CrossEncoder.predict的激活函数参数名（sentence-transformers 4.0起为activation_fn，之前为activation_fct）"""
+    return "activation_fn" if "activation_fn" in inspect.signature(predict).parameters else "activation_fct"
+
+
+if __name__ == "__main__":
+    print("=== 本地重排序测试 ===")
+
+    reranker = LocalCrossEncoderReranker()
+    query = "Wie steht die SPD zur Migrationspolitik?"
+    documents = [
+        "Die SPD fordert ein modernes Einwanderungsgesetz.",
+        "Der Haushalt 2019 wurde verabschiedet.",
+        "Die Fraktion der SPD setzt sich für sichere Fluchtwege ein."
+    ]
+    for result in reranker.rerank(query, documents):
+        print(f"{result['relevance_score']:.3f}  {documents[result['index']]}")
+    print(reranker.get_stats())
@@ -0,0 +1,275 @@
+"""
+BGE-M3 ONNX 推理后端
+将 BGE-M3 导出为 ONNX 图并做动态 int8 量化，在无GPU的查询节点上用 ONNX Runtime 推理
+
+- 输出与 PyTorch 版本相同的 1024 维归一化稠密向量（CLS池化 + L2归一化），无需重建索引
+- 导出/量化/一致性检查: python -m src.llm.onnx_embeddings --export --check
+"""
+
+import argparse
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.utils import logger
+
+try:
+    import onnxruntime as ort
+    from transformers import AutoTokenizer
+    ONNX_RUNTIME_AVAILABLE = True
+except ImportError:
+    ONNX_RUNTIME_AVAILABLE = False
+
+
+# 导出目录中的模型文件
+FP32_MODEL_FILE = "model.onnx"
+INT8_MODEL_FILE = "model_int8.onnx"
+
+# 一致性检查的默认样本（德语/中文混合，覆盖短查询和长段落）
+PARITY_SAMPLE_TEXTS = [
+    "Wie hat sich die Position der SPD zur Migrationspolitik entwickelt?",
+    "Der Deutsche Bundestag hat heute das Klimaschutzgesetz in zweiter und dritter Lesung beraten.",
+    "Frau Präsidentin! Meine sehr verehrten Damen und Herren! Die Digitalisierung der Verwaltung "
+    "kommt nicht voran, und die Bürgerinnen und Bürger warten weiterhin auf funktionierende Onlinedienste.",
+    "2019年德国联邦议院关于难民政策的主要争论是什么？",
+    "绿党在气候保护问题上的立场",
+]
+
+
+class OnnxBGEM3Encoder:
+    """
+    BGE-M3 ONNX 编码器
+
+    接受两种导出图:
+    - 输出最后一层隐藏状态 (batch, seq, 1024)：取CLS向量
+    - 直接输出稠密向量 (batch, 1024)
+    两种情况都在此处做L2归一化
+    """
+
+    def __init__(
+        self,
+        model_dir: str,
+        quantized: bool = True,
+        num_threads: Optional[int] = None,
+        max_length: int = 8192
+    ):
+        """
+        加载 ONNX 模型
+
+        Args:
+            model_dir: 导出目录（包含ONNX模型和tokenizer文件）
+            quantized: 是否使用int8量化模型（不存在时回退到fp32模型）
+            num_threads: ONNX Runtime线程数（None表示由ONNX Runtime决定）
+            max_length: 最大token数（BGE-M3支持8192）
+        """
+        self.model_dir = model_dir
+        self.max_length = max_length
+        self.model_file = _resolve_model_file(model_dir, quantized)
+        self._load(num_threads)
+        logger.success(f"✅ BGE-M3 ONNX 模型加载成功: {self.model_file}")
+
+    def _load(self, num_threads: Optional[int]):
+        """创建推理会话和tokenizer"""
+        if not ONNX_RUNTIME_AVAILABLE:
+            raise ImportError("ONNX 后端需要 onnxruntime 和 transformers。请运行: pip install onnxruntime transformers")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+        self.session = ort.InferenceSession(self.model_file, options, providers=["CPUExecutionProvider"])
+        self.input_names = {item.name for item in self.session.get_inputs()}
+
+    def encode(self, texts: Sequence[str], batch_size: int = 32) -> np.ndarray:
+        """
+        批量编码
+
+        文本按长度排序后分批（同一批次长度相近，减少padding），结果按输入顺序返回
+
+        Args:
+            texts: 文本列表
+            batch_size: 批次大小
+
+        Returns:
+            归一化稠密向量矩阵 (文本数, 1024)
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        batches = []
+        for start in range(0, len(order), batch_size):
+            batch_rows = order[start:start + batch_size]
+            batches.append(self._encode_batch([texts[i] for i in batch_rows]))
+
+        sorted_vectors = np.concatenate(batches, axis=0)
+        vectors = np.empty_like(sorted_vectors)
+        vectors[order] = sorted_vectors
+        return vectors
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        """编码一个批次"""
+        encoded = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="np"
+        )
+        inputs = {name: value.astype(np.int64) for name, value in encoded.items() if name in self.input_names}
+        output = np.asarray(self.session.run(None, inputs)[0], dtype=np.float32)
+        dense = output[:, 0] if output.ndim == 3 else output
+        norms = np.linalg.norm(dense, axis=1, keepdims=True)
+        return dense / np.maximum(norms, 1e-12)
+
+
+def _resolve_model_file(model_dir: str, quantized: bool) -> str:
+    """选择导出目录中的模型文件"""
+    candidates = [INT8_MODEL_FILE, FP32_MODEL_FILE] if quantized else [FP32_MODEL_FILE]
+    for name in candidates:
+        path = os.path.join(model_dir, name)
+        if os.path.exists(path):
+            if quantized and name != INT8_MODEL_FILE:
+                logger.warning(f"⚠️  未找到int8量化模型，使用fp32模型: {path}")
+            return path
+    raise FileNotFoundError(
+        f"ONNX模型不存在: {model_dir}。请先运行: python -m src.llm.onnx_embeddings --export --output {model_dir}"
+    )
+
+
+def export_bge_m3_onnx(
+    model_name: str = "BAAI/bge-m3",
+    output_dir: str = "./models/bge-m3-onnx",
+    quantize: bool = True,
+    opset: int = 17
+) -> str:
+    """
+    导出 BGE-M3 为 ONNX 图，并做动态 int8 量化
+
+    Args:
+        model_name: HuggingFace模型名称或本地路径
+        output_dir: 输出目录
+        quantize: 是否生成int8量化模型
+        opset: ONNX opset版本
+
+    Returns:
+        输出目录
+    """
+    import torch
+    from transformers import AutoModel
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    os.makedirs(output_dir, exist_ok=True)
+    logger.info(f"🔄 导出 BGE-M3 ONNX 模型: {model_name} -> {output_dir}")
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+
+    sample = tokenizer(["Der Deutsche Bundestag"], return_tensors="pt")
+    fp32_path = os.path.join(output_dir, FP32_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=opset,
+        )
+    tokenizer.save_pretrained(output_dir)
+    logger.success(f"✅ fp32 ONNX 模型已导出: {fp32_path}")
+
+    if quantize:
+        int8_path = os.path.join(output_dir, INT8_MODEL_FILE)
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        logger.success(
+            f"✅ int8 量化完成: {int8_path} "
+            f"({os.path.getsize(fp32_path) / 1e6:.0f}MB -> {os.path.getsize(int8_path) / 1e6:.0f}MB)"
+        )
+
+    return output_dir
+
+
+def compare_vectors(reference: np.ndarray, candidate: np.ndarray, threshold: float = 0.99) -> Dict:
+    """
+    逐行比较两组向量的余弦相似度
+
+    Args:
+        reference: 参考向量 (PyTorch输出)
+        candidate: 待检查向量 (ONNX输出)
+        threshold: 每个向量要求的最小余弦相似度
+
+    Returns:
+        {"min_cosine", "mean_cosine", "passed"}
+    """
+    reference = np.asarray(reference, dtype=np.float32)
+    candidate = np.asarray(candidate, dtype=np.float32)
+    if reference.shape != candidate.shape:
+        raise ValueError(f"向量形状不一致: {reference.shape} vs {candidate.shape}")
+
+    cosines = np.sum(reference * candidate, axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    )
+    min_cosine = float(cosines.min())
+    return {
+        "min_cosine": min_cosine,
+        "mean_cosine": float(cosines.mean()),
+        "passed": min_cosine >= threshold
+    }
+
+
+def check_parity(
+    onnx_model_dir: str,
+    model_name: str = "BAAI/bge-m3",
+    texts: Optional[List[str]] = None,
+    quantized: bool = True,
+    threshold: float = 0.99
+) -> Dict:
+    """
+    ONNX 向量与 PyTorch 向量一致性检查（余弦相似度 ≥ threshold 才可替换线上后端）
+
+    Args:
+        onnx_model_dir: ONNX导出目录
+        model_name: PyTorch参考模型
+        texts: 检查样本，默认使用PARITY_SAMPLE_TEXTS
+        quantized: 检查int8量化模型还是fp32模型
+        threshold: 最小余弦相似度
+
+    Returns:
+        compare_vectors的结果
+    """
+    from src.llm.local_embeddings import LocalEmbeddingClient
+
+    texts = texts or PARITY_SAMPLE_TEXTS
+    reference = np.asarray(
+        LocalEmbeddingClient(model_name=model_name, use_gpu=False).embed_batch(texts), dtype=np.float32
+    )
+    candidate = OnnxBGEM3Encoder(onnx_model_dir, quantized=quantized).encode(texts)
+
+    result = compare_vectors(reference, candidate, threshold=threshold)
+    status = "✅ 通过" if result["passed"] else "❌ 未通过"
+    logger.info(
+        f"{status} ONNX一致性检查: 最小余弦={result['min_cosine']:.4f}, "
+        f"平均余弦={result['mean_cosine']:.4f} (阈值 {threshold})"
+    )
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BGE-M3 ONNX 导出与一致性检查")
+    parser.add_argument("--model", default="BAAI/bge-m3", help="模型名称或本地路径")
+    parser.add_argument("--output", default="./models/bge-m3-onnx", help="ONNX导出目录")
+    parser.add_argument("--export", action="store_true", help="导出并量化模型")
+    parser.add_argument("--no-quantize", action="store_true", help="只导出fp32模型")
+    parser.add_argument("--check", action="store_true", help="与PyTorch向量做一致性检查")
+    parser.add_argument("--threshold", type=float, default=0.99, help="最小余弦相似度")
+    args = parser.parse_args()
+
+    if args.export:
+        export_bge_m3_onnx(args.model, args.output, quantize=not args.no_quantize)
+    if args.check:
+        parity = check_parity(args.output, args.model, quantized=not args.no_quantize, threshold=args.threshold)
+        raise SystemExit(0 if parity["passed"] else 1)
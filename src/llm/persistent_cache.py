@@ -0,0 +1,211 @@
+"""
+两级持久化缓存基类
+进程内LRU（内存） + SQLite持久化存储（磁盘），查询向量缓存与LLM响应缓存共用
+
+子类只需定义表结构（TABLE / COLUMNS / VALUE_COLUMN）、缓存键以及磁盘值的解码方式
+"""
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+from src.utils import logger
+from src.utils.performance_monitor import get_performance_monitor
+
+
+class PersistentLRUCache:
+    """
+    两级缓存基类
+
+    功能:
+    1. 内存LRU缓存（有界，按最近使用淘汰）
+    2. SQLite磁盘缓存（跨进程重启保留，超过上限时按最近使用时间淘汰）
+    3. 命中/未命中统计，同步上报PerformanceMonitor
+
+    磁盘条目数只在打开时COUNT一次，之后按写入时实际新增的行数维护计数，
+    写入路径上不再执行全表COUNT(*)（多个进程共用同一文件时只统计本进程的写入，下次打开时重新校准）
+    """
+
+    MONITOR_NAME = ""
+    # 表名、除key/last_used外的列定义（列名, 类型）以及保存缓存值的列
+    TABLE = ""
+    COLUMNS: Sequence[Tuple[str, str]] = ()
+    VALUE_COLUMN = ""
+
+    def __init__(self, db_path: Optional[str], max_memory_items: int, max_disk_items: int):
+        """
+        Args:
+            db_path: SQLite文件路径，None表示只使用内存缓存
+            max_memory_items: 内存LRU最大条目数
+            max_disk_items: 磁盘缓存最大条目数
+        """
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        columns = [name for name, _ in self.COLUMNS]
+        self._update_sql = (
+            f"UPDATE {self.TABLE} SET {', '.join(f'{name} = ?' for name in columns)}, last_used = ? WHERE key = ?"
+        )
+        self._insert_sql = (
+            f"INSERT OR IGNORE INTO {self.TABLE} (key, {', '.join(columns)}, last_used) "
+            f"VALUES ({', '.join('?' * (len(columns) + 2))})"
+        )
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_items = 0
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            column_defs = ", ".join(f"{name} {type_}" for name, type_ in self.COLUMNS)
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.TABLE} "
+                f"(key TEXT PRIMARY KEY, {column_defs}, last_used REAL NOT NULL)"
+            )
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_last_used ON {self.TABLE}(last_used)")
+            self._conn.commit()
+            self._disk_items = self._conn.execute(f"SELECT COUNT(*) FROM {self.TABLE}").fetchone()[0]
+
+        logger.info(
+            f"[{type(self).__name__}] 初始化完成: 内存上限={max_memory_items}, "
+            f"磁盘={'禁用' if not db_path else db_path}, 磁盘上限={max_disk_items}"
+        )
+
+    def _decode(self, raw: Any) -> Any:
+        """磁盘中保存的值 -> 缓存值（默认原样返回）"""
+        return raw
+
+    def _lookup(self, key: str) -> Optional[Any]:
+        """
+        依次查询内存和磁盘
+
+        Returns:
+            命中时返回缓存值，否则返回None
+        """
+        monitor = get_performance_monitor()
+
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                monitor.record_cache_access(self.MONITOR_NAME, hit=True)
+                return value
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    f"SELECT {self.VALUE_COLUMN} FROM {self.TABLE} WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value = self._decode(row[0])
+                    self._conn.execute(
+                        f"UPDATE {self.TABLE} SET last_used = ? WHERE key = ?", (time.time(), key)
+                    )
+                    self._conn.commit()
+                    self._remember(key, value)
+                    self.disk_hits += 1
+                    monitor.record_cache_access(self.MONITOR_NAME, hit=True)
+                    return value
+
+            self.misses += 1
+            monitor.record_cache_access(self.MONITOR_NAME, hit=False)
+            return None
+
+    def _store(self, entries: List[Tuple[str, Any, tuple]]):
+        """
+        写入缓存（内存 + 磁盘）
+
+        Args:
+            entries: [(缓存键, 缓存值, 与COLUMNS顺序一致的列值)]
+        """
+        if not entries:
+            return
+
+        now = time.time()
+        with self._lock:
+            for key, value, _ in entries:
+                self._remember(key, value)
+
+            if self._conn is not None:
+                # 已存在的键原地更新，其余插入；插入的行数即新增条目数
+                self._conn.executemany(
+                    self._update_sql, [(*columns, now, key) for key, _, columns in entries]
+                )
+                inserted = self._conn.executemany(
+                    self._insert_sql, [(key, *columns, now) for key, _, columns in entries]
+                ).rowcount
+                self._disk_items += max(inserted, 0)
+                self._evict_disk()
+                self._conn.commit()
+
+    def get_stats(self) -> Dict:
+        """获取缓存统计信息"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        with self._lock:
+            disk_items = self._disk_items
+            memory_items = len(self._memory)
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_items": memory_items,
+            "disk_items": disk_items
+        }
+
+    def clear(self):
+        """清空内存和磁盘缓存"""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute(f"DELETE FROM {self.TABLE}")
+                self._conn.commit()
+                self._disk_items = 0
+        logger.info(f"[{type(self).__name__}] 缓存已清空")
+
+    def _remember(self, key: str, value: Any):
+        """写入内存LRU（调用方持有锁）"""
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        """磁盘条目超过上限时，删除最久未使用的条目（调用方持有锁）"""
+        overflow = self._disk_items - self.max_disk_items
+        if overflow > 0:
+            deleted = self._conn.execute(
+                f"DELETE FROM {self.TABLE} WHERE key IN "
+                f"(SELECT key FROM {self.TABLE} ORDER BY last_used ASC, rowid ASC LIMIT ?)",
+                (overflow,)
+            ).rowcount
+            self._disk_items -= deleted
+            logger.debug(f"[{type(self).__name__}] 磁盘缓存淘汰 {deleted} 条")
+
+
+CacheT = TypeVar("CacheT")
+
+
+class CacheSingleton(Generic[CacheT]):
+    """进程级缓存实例（按需创建；配置关闭缓存时返回None）"""
+
+    def __init__(self):
+        self._instance: Optional[CacheT] = None
+        self._lock = threading.Lock()
+
+    def get(self, enabled: bool, factory: Callable[[], CacheT]) -> Optional[CacheT]:
+        if not enabled:
+            return None
+        with self._lock:
+            if self._instance is None:
+                self._instance = factory()
+        return self._instance
@@ -0,0 +1,118 @@
+"""
+LLM响应缓存模块
+两级缓存：进程内LRU（内存） + SQLite持久化存储（磁盘）
+
+缓存键: (模型, temperature, max_tokens, 系统提示词, 提示词)
+只用于temperature=0的确定性调用（Intent/Classify/Extract等Flash调用），
+重复问题的校验Prompt和回归测试不再重复请求远程API
+"""
+
+import hashlib
+from typing import Optional
+
+from src.llm.persistent_cache import CacheSingleton, PersistentLRUCache
+
+
+class LLMResponseCache(PersistentLRUCache):
+    """
+    LLM响应缓存
+
+    功能:
+    1. 内存LRU缓存（有界，按最近使用淘汰）
+    2. SQLite磁盘缓存（跨进程重启保留，超过上限时按最近使用时间淘汰）
+    3. 命中/未命中统计，同步上报PerformanceMonitor
+    """
+
+    MONITOR_NAME = "LLM响应缓存"
+    TABLE = "responses"
+    COLUMNS = (
+        ("model", "TEXT NOT NULL"),
+        ("response", "TEXT NOT NULL")
+    )
+    VALUE_COLUMN = "response"
+
+    def __init__(
+        self,
+        db_path: Optional[str] = "./cache/llm_response_cache.sqlite",
+        max_memory_items: int = 2000,
+        max_disk_items: int = 100000
+    ):
+        """
+        初始化LLM响应缓存
+
+        Args:
+            db_path: SQLite文件路径，None表示只使用内存缓存
+            max_memory_items: 内存LRU最大条目数
+            max_disk_items: 磁盘缓存最大条目数
+        """
+        super().__init__(db_path, max_memory_items, max_disk_items)
+
+    @staticmethod
+    def make_key(
+        model: str,
+        temperature: float,
+        max_tokens: Optional[int],
+        system_prompt: Optional[str],
+        prompt: str
+    ) -> str:
+        """生成缓存键: sha256(模型 + temperature + max_tokens + 系统提示词 + 提示词)"""
+        raw = "\x00".join([
+            model,
+            repr(float(temperature)),
+            str(max_tokens),
+            system_prompt or "",
+            prompt
+        ])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(
+        self,
+        model: str,
+        temperature: float,
+        max_tokens: Optional[int],
+        system_prompt: Optional[str],
+        prompt: str
+    ) -> Optional[str]:
+        """
+        查询缓存
+
+        Returns:
+            命中时返回缓存的回复，否则返回None
+        """
+        return self._lookup(self.make_key(model, temperature, max_tokens, system_prompt, prompt))
+
+    def put(
+        self,
+        model: str,
+        temperature: float,
+        max_tokens: Optional[int],
+        system_prompt: Optional[str],
+        prompt: str,
+        response: str
+    ):
+        """写入缓存（内存 + 磁盘）"""
+        key = self.make_key(model, temperature, max_tokens, system_prompt, prompt)
+        self._store([(key, response, (model, response))])
+
+
+# 进程级缓存实例（按需创建）
+_llm_response_cache: CacheSingleton[LLMResponseCache] = CacheSingleton()
+
+
+def get_llm_response_cache() -> Optional[LLMResponseCache]:
+    """
+    获取全局LLM响应缓存
+
+    Returns:
+        LLMResponseCache实例；配置关闭缓存时返回None
+    """
+    from src.config import settings
+
+    return _llm_response_cache.get(
+        settings.llm_cache_enabled,
+        lambda: LLMResponseCache(
+            db_path=settings.llm_cache_path or None,
+            max_memory_items=settings.llm_cache_memory_items,
+            max_disk_items=settings.llm_cache_disk_items
+        )
+    )
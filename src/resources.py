@@ -0,0 +1,201 @@
+"""
+进程级资源注册表
+统一创建并复用重量级资源，所有入口（API服务、Streamlit、命令行）共用同一份实例
+
+1. Embedding客户端 - 本地模式下持有BGE-M3模型（数GB内存，加载耗时数秒），每个配置只加载一次
+2. 向量检索器 - Pinecone连接或进程内LocalVectorRetriever，每个(后端, 索引)只创建一次
+3. LLM客户端 - 按(模型, temperature, max_tokens)池化
+4. 本地重排序模型 - Cross-Encoder模型，每个(模型, ONNX路径)只加载一次
+5. 问答工作流 - 进程内单例，节点共用上述资源
+
+所有获取函数都是懒加载且线程安全的，首次调用时才创建资源；
+资源键使用补全配置默认值后的参数，省略参数与显式传入默认值的调用方共用同一实例
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from src.utils import logger
+
+
+_resources: Dict[Hashable, Any] = {}
+_registry_lock = threading.Lock()
+_key_locks: Dict[Hashable, threading.Lock] = {}
+
+
+def get_or_create_resource(key: Hashable, factory: Callable[[], Any]) -> Any:
+    """
+    获取已注册的资源，不存在时调用factory创建（入口脚本的自定义组件也可通过此函数注册）
+
+    每个键单独加锁：加载BGE-M3时不会阻塞其他资源（如LLM客户端）的获取，
+    同一资源的并发首次请求只会创建一次
+
+    Args:
+        key: 资源键
+        factory: 创建函数
+
+    Returns:
+        资源实例
+    """
+    resource = _resources.get(key)
+    if resource is not None:
+        return resource
+
+    with _registry_lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        resource = _resources.get(key)
+        if resource is None:
+            resource = factory()
+            _resources[key] = resource
+            logger.info(f"[ResourceRegistry] 已创建共享资源: {key}")
+    return resource
+
+
+def get_embedding_client(
+    embedding_mode: Optional[str] = None,
+    model_name: Optional[str] = None,
+    dimensions: Optional[int] = None
+):
+    """
+    获取共享的Embedding客户端
+
+    Args:
+        embedding_mode: Embedding模式，默认从配置读取
+        model_name: 模型名称，默认从配置读取
+        dimensions: 向量维度，默认从配置读取
+
+    Returns:
+        GeminiEmbeddingClient实例
+    """
+    from src.config import settings
+    from src.llm.embeddings import GeminiEmbeddingClient, resolve_embedding_model
+
+    mode = embedding_mode or settings.embedding_mode
+    model_name, dimensions = resolve_embedding_model(mode, model_name, dimensions)
+    key = ("embedding", mode, model_name, dimensions)
+    return get_or_create_resource(
+        key,
+        lambda: GeminiEmbeddingClient(model_name=model_name, dimensions=dimensions, embedding_mode=mode)
+    )
+
+
+def get_vector_retriever(
+    index_name: str = "german-bge",
+    default_limit: int = 50,
+    backend: Optional[str] = None
+):
+    """
+    获取共享的向量检索器
+
+    Args:
+        index_name: 索引名称
+        default_limit: 默认检索数量
+        backend: 检索后端（pinecone/local），默认从配置读取
+
+    Returns:
+        PineconeRetriever或LocalVectorRetriever实例
+    """
+    from src.config import settings
+    from src.vectordb.pinecone_retriever import create_pinecone_retriever
+
+    # 与create_pinecone_retriever相同: 除local外都使用Pinecone；本地索引按目录区分
+    backend = "local" if (backend or settings.vector_backend) == "local" else "pinecone"
+    index_dir = settings.local_index_dir if backend == "local" else None
+    key = ("retriever", backend, index_dir, index_name, default_limit)
+    return get_or_create_resource(
+        key,
+        lambda: create_pinecone_retriever(index_name=index_name, default_limit=default_limit, backend=backend)
+    )
+
+
+def get_llm_client(
+    model_name: Optional[str] = None,
+    temperature: float = 0.0,
+    max_tokens: Optional[int] = None
+):
+    """
+    获取池化的LLM客户端（相同模型和参数的调用方共用一个客户端）
+
+    Args:
+        model_name: 模型名称，默认从配置读取
+        temperature: 温度参数
+        max_tokens: 最大token数，默认从配置读取
+
+    Returns:
+        GeminiLLMClient实例
+    """
+    from src.config import settings
+    from src.llm.client import GeminiLLMClient
+
+    model_name = model_name or settings.third_party_model_name
+    max_tokens = max_tokens or settings.llm_max_tokens
+    key = ("llm", model_name, float(temperature), max_tokens)
+    return get_or_create_resource(
+        key,
+        lambda: GeminiLLMClient(model_name=model_name, temperature=temperature, max_tokens=max_tokens)
+    )
+
+
+def get_reranker():
+    """
+    获取共享的本地重排序模型
+
+    Returns:
+        LocalCrossEncoderReranker实例
+    """
+    from src.config import settings
+    from src.llm.local_reranker import LocalCrossEncoderReranker
+
+    model_name = settings.local_reranker_model
+    onnx_path = settings.local_reranker_onnx_path or None
+    key = ("reranker", model_name, onnx_path)
+    return get_or_create_resource(
+        key,
+        lambda: LocalCrossEncoderReranker(
+            model_name=model_name,
+            onnx_model_path=onnx_path,
+            max_length=settings.rerank_max_length,
+            batch_size=settings.rerank_batch_size
+        )
+    )
+
+
+def get_workflow():
+    """
+    获取共享的问答工作流
+
+    Returns:
+        QuestionAnswerWorkflow实例
+    """
+    from src.graph.workflow import QuestionAnswerWorkflow
+
+    return get_or_create_resource(("workflow",), QuestionAnswerWorkflow)
+
+
+def get_registry_stats() -> Dict[str, int]:
+    """获取已创建的资源数量（按类型统计）"""
+    stats: Dict[str, int] = {}
+    for key in list(_resources):
+        kind = key[0] if isinstance(key, tuple) else str(key)
+        stats[kind] = stats.get(kind, 0) + 1
+    return stats
+
+
+def reset_resources():
+    """清空注册表（测试或配置变更后使用，已持有的实例不受影响）"""
+    with _registry_lock:
+        _resources.clear()
+        _key_locks.clear()
+    logger.info("[ResourceRegistry] 注册表已清空")
+
+
+if __name__ == "__main__":
+    print("=== 资源注册表测试 ===")
+
+    first = get_embedding_client()
+    second = get_embedding_client()
+    print(f"Embedding客户端复用: {first is second}")
+
+    print(f"注册表统计: {get_registry_stats()}")
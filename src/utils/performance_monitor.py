@@ -5,6 +5,7 @@
 
 import time
 import functools
+import threading
 from typing import Dict, List, Any, Optional
 from collections import defaultdict
 from ..utils.logger import logger
@@ -19,12 +20,20 @@ class PerformanceMonitor:
         self.current_session: Dict[str, float] = {}
         self.session_start_time: Optional[float] = None
         self.session_end_time: Optional[float] = None
+        # 缓存命中统计: {缓存名称: {"hits": n, "misses": n}}
+        self.cache_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self._cache_lock = threading.Lock()
+        # 阶段内明细耗时: {阶段名称: {条目名称: 耗时}}（如每个子问题的提取耗时，不计入已测量时间）
+        self.breakdowns: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._breakdown_lock = threading.Lock()
         
     def start_session(self):
         """开始一个新的监控会话"""
         self.session_start_time = time.time()
         self.session_end_time = None
         self.current_session.clear()
+        self.cache_stats.clear()
+        self.breakdowns.clear()
         logger.debug("[Performance] 性能监控会话开始")
     
     def end_session(self):
@@ -38,6 +47,35 @@ class PerformanceMonitor:
         self.current_session[stage_name] = duration
         logger.debug(f"[Performance] {stage_name}: {duration:.3f}s")
     
+    def record_cache_access(self, cache_name: str, hit: bool):
+        """记录一次缓存访问（命中或未命中）"""
+        with self._cache_lock:
+            self.cache_stats[cache_name]["hits" if hit else "misses"] += 1
+    
+    def record_breakdown(self, stage_name: str, item_name: str, duration: float):
+        """记录某个阶段内单个条目的耗时（并发执行的条目时间会重叠，因此单独统计）"""
+        with self._breakdown_lock:
+            self.breakdowns[stage_name][item_name] = duration
+        logger.debug(f"[Performance] {stage_name} / {item_name}: {duration:.3f}s")
+    
+    def get_breakdown_report(self) -> Dict[str, Dict[str, float]]:
+        """获取当前会话各阶段的明细耗时"""
+        with self._breakdown_lock:
+            return {stage_name: dict(items) for stage_name, items in self.breakdowns.items()}
+    
+    def get_cache_report(self) -> Dict[str, Dict[str, Any]]:
+        """获取当前会话各缓存的命中统计"""
+        report = {}
+        with self._cache_lock:
+            for cache_name, stats in self.cache_stats.items():
+                lookups = stats["hits"] + stats["misses"]
+                report[cache_name] = {
+                    "hits": stats["hits"],
+                    "misses": stats["misses"],
+                    "hit_rate": stats["hits"] / lookups if lookups else 0.0
+                }
+        return report
+    
     def get_session_report(self) -> Dict[str, Any]:
         """获取当前会话的性能报告"""
         if not self.session_start_time:
@@ -68,6 +106,12 @@ class PerformanceMonitor:
             "measurement_coverage": (stage_total / total_time * 100) if total_time > 0 else 0
         }
         
+        # 添加缓存命中统计
+        report["caches"] = self.get_cache_report()
+        
+        # 添加阶段明细耗时
+        report["breakdowns"] = self.get_breakdown_report()
+        
         return report
     
     def print_session_report(self):
@@ -99,6 +143,22 @@ class PerformanceMonitor:
         print(f"已测量时间     : {summary['measured_time']:.2f}秒 ({summary['measurement_coverage']:.1f}%)")
         print(f"未测量时间     : {summary['unmeasured_time']:.2f}秒")
         
+        # 显示缓存命中率
+        if report["caches"]:
+            print("-" * 50)
+            for cache_name, stats in report["caches"].items():
+                print(
+                    f"{cache_name:15s}: 命中 {stats['hits']} / 未命中 {stats['misses']} "
+                    f"(命中率 {stats['hit_rate'] * 100:.1f}%)"
+                )
+        
+        # 显示阶段明细耗时
+        for stage_name, items in report["breakdowns"].items():
+            print("-" * 50)
+            print(f"{stage_name}明细:")
+            for item_name, duration in items.items():
+                print(f"  {item_name:13s}: {duration:6.2f}秒")
+        
         # 瓶颈识别
         if stages:
             bottleneck = stages[0]
@@ -18,11 +18,23 @@ def __getattr__(name):
     elif name == "PineconeRetriever":
         from .pinecone_retriever import PineconeRetriever
         return PineconeRetriever
+    elif name == "LocalVectorRetriever":
+        from .local_retriever import LocalVectorRetriever
+        return LocalVectorRetriever
+    elif name == "SparseInvertedIndex":
+        from .sparse_index import SparseInvertedIndex
+        return SparseInvertedIndex
+    elif name == "EmbeddingArtifactStore":
+        from .artifact_store import EmbeddingArtifactStore
+        return EmbeddingArtifactStore
     raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 __all__ = [
     "MilvusClient",
     "MilvusCollectionManager",
     "MilvusRetriever",
-    "PineconeRetriever"
+    "PineconeRetriever",
+    "LocalVectorRetriever",
+    "SparseInvertedIndex",
+    "EmbeddingArtifactStore"
 ]
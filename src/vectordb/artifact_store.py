@@ -0,0 +1,512 @@
+"""
+Embedding产物存储（Arrow列式文件，按年份分区）
+
+向量原来只保存在目标向量库中: 在Milvus / Qdrant / Pinecone之间切换或灾难恢复时只能全部重新embedding。
+这里把chunk文本、元数据列和float16向量写入本地Arrow IPC文件，任何后端都可以从中批量导入（纯I/O）:
+
+    artifacts/
+      store.json                    # 模型名称 / 维度 / 精度
+      year=2019/part-00000.arrow    # 列: id, chunk_key, text, metadata_json, year, month, ..., vector
+      year=2020/part-00000.arrow    #     [, sparse_terms, sparse_weights]
+
+- 向量列为 fixed_size_list<float16>[维度]，体积为float32的一半
+- 记录带有BGE-M3稀疏词项权重（lexical_weights）时保存为 sparse_terms / sparse_weights 两个列表列，
+  导入本地索引时同时构建稀疏倒排索引（混合检索）
+- 读取时内存映射文件，向量列直接以numpy float16视图返回（零拷贝），不把整个年份读入内存
+- 使用Arrow IPC而不是Parquet: Parquet读取需要解码页数据，无法零拷贝内存映射
+
+pyarrow为可选依赖（pip install pyarrow）
+"""
+
+import json
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from .bulk_writer import BulkWriter
+from .index_epoch import bump_index_epoch
+from ..utils.logger import logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+# 单独成列的元数据字段（字符串），便于不解析JSON直接统计/过滤；完整元数据保存在metadata_json列
+METADATA_COLUMNS = ("year", "month", "day", "speaker", "group", "session", "lp")
+
+STORE_INFO_FILE = "store.json"
+
+
+@dataclass
+class ArtifactBatch:
+    """一批产物记录（vectors为float16视图，来自内存映射时为零拷贝）"""
+    ids: List[str]
+    texts: List[str]
+    metadatas: List[Dict[str, Any]]
+    vectors: np.ndarray
+    # BGE-M3稀疏词项权重 {词项ID: 权重}，分区文件没有稀疏列时为None
+    lexical_weights: Optional[List[Dict[int, float]]] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class EmbeddingArtifactStore:
+    """
+    按年份分区的Embedding产物存储
+
+    用法:
+        store = EmbeddingArtifactStore("./artifacts/bge-m3", model_name="BAAI/bge-m3")
+        store.write_year("2019", records)          # records: {id, text, metadata, vector[, chunk_key, lexical_weights]}
+        for batch in store.iter_batches(years=["2019"], batch_size=1000):
+            ... batch.ids / batch.texts / batch.metadatas / batch.vectors ...
+    """
+
+    def __init__(self, root_dir: str, model_name: str = "", part_rows: int = 50000):
+        """
+        Args:
+            root_dir: 存储根目录
+            model_name: Embedding模型名称（与已有存储不一致时报错，避免混入不同模型的向量）
+            part_rows: 每个分区文件的最大行数
+        """
+        if not PYARROW_AVAILABLE:
+            raise ImportError("Embedding产物存储需要pyarrow: pip install pyarrow")
+
+        self.root_dir = Path(root_dir)
+        self.part_rows = max(1, part_rows)
+        self._lock = threading.Lock()
+
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        info_path = self.root_dir / STORE_INFO_FILE
+        self.info: Dict[str, Any] = {}
+        if info_path.exists():
+            with open(info_path, 'r', encoding='utf-8') as f:
+                self.info = json.load(f)
+        if model_name and self.info.get("model_name") not in (None, model_name):
+            raise ValueError(f"产物存储的模型为 {self.info['model_name']}，与 {model_name} 不一致: {self.root_dir}")
+        if model_name:
+            self.info.setdefault("model_name", model_name)
+
+        logger.info(f"[EmbeddingArtifactStore] 初始化完成: {self.root_dir} (年份={self.years()})")
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return self.info.get("dimension")
+
+    # ========== 写入 ==========
+
+    def write_year(self, year: str, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        写入（替换）一个年份的全部产物
+
+        先写入临时目录，完成后替换原目录，写入中途失败不影响已有数据
+
+        Args:
+            year: 年份
+            records: 记录，每条包含 id / text / metadata / vector，可选 chunk_key / lexical_weights
+
+        Returns:
+            写入的记录数
+        """
+        year = str(year)
+        tmp_dir = self.root_dir / f".tmp-year={year}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+
+        count = 0
+        part = 0
+        buffer: List[Dict[str, Any]] = []
+        for record in records:
+            buffer.append(record)
+            if len(buffer) >= self.part_rows:
+                count += self._write_part(tmp_dir / f"part-{part:05d}.arrow", buffer)
+                part += 1
+                buffer = []
+        if buffer:
+            count += self._write_part(tmp_dir / f"part-{part:05d}.arrow", buffer)
+
+        year_dir = self._year_dir(year)
+        with self._lock:
+            shutil.rmtree(year_dir, ignore_errors=True)
+            os.replace(tmp_dir, year_dir)
+            self._save_info()
+
+        logger.info(f"[EmbeddingArtifactStore] 💾 写入{year}年: {count:,}条")
+        return count
+
+    def append(self, year: str, records: List[Dict[str, Any]]) -> int:
+        """
+        追加一个分区文件到年份（流水线写入使用；同一年份内的ID应唯一）
+
+        Returns:
+            写入的记录数
+        """
+        if not records:
+            return 0
+        year_dir = self._year_dir(str(year))
+        with self._lock:
+            year_dir.mkdir(parents=True, exist_ok=True)
+            existing = sorted(year_dir.glob("part-*.arrow"))
+            part = int(existing[-1].stem.split("-")[1]) + 1 if existing else 0
+            path = year_dir / f"part-{part:05d}.arrow"
+            # 先占位，其他线程看到的下一个序号不会冲突
+            path.touch()
+        count = self._write_part(path, records)
+        with self._lock:
+            self._save_info()
+        return count
+
+    def clear_year(self, year: str):
+        """删除一个年份的全部产物"""
+        with self._lock:
+            shutil.rmtree(self._year_dir(str(year)), ignore_errors=True)
+
+    # ========== 读取 ==========
+
+    def years(self) -> List[str]:
+        """已有产物的年份"""
+        return sorted(
+            path.name.split("=", 1)[1]
+            for path in self.root_dir.glob("year=*")
+            if path.is_dir()
+        )
+
+    def count(self, year: Optional[str] = None) -> int:
+        """记录数（只读取文件元数据）"""
+        total = 0
+        for path in self._part_files([str(year)] if year is not None else None):
+            with pa.memory_map(str(path), 'r') as source:
+                reader = pa.ipc.open_file(source)
+                total += sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+        return total
+
+    def iter_batches(
+        self,
+        years: Optional[Iterable[str]] = None,
+        batch_size: int = 1000,
+        include_text: bool = True
+    ) -> Iterator[ArtifactBatch]:
+        """
+        按批读取产物（内存映射，向量零拷贝）
+
+        Args:
+            years: 年份列表，None表示全部
+            batch_size: 每批最大记录数
+            include_text: 是否读取文本列
+
+        Yields:
+            ArtifactBatch（vectors视图只在本批次处理期间有效，需要保留时请copy）
+        """
+        for path in self._part_files([str(y) for y in years] if years is not None else None):
+            with pa.memory_map(str(path), 'r') as source:
+                reader = pa.ipc.open_file(source)
+                for i in range(reader.num_record_batches):
+                    record_batch = reader.get_batch(i)
+                    for start in range(0, record_batch.num_rows, batch_size):
+                        yield self._to_batch(record_batch.slice(start, batch_size), include_text)
+
+    def load_year(self, year: str) -> ArtifactBatch:
+        """读取一个年份的全部产物（向量复制为连续的float16矩阵）"""
+        batches = list(self.iter_batches(years=[year], batch_size=self.part_rows))
+        if not batches:
+            return ArtifactBatch([], [], [], np.zeros((0, self.dimension or 0), dtype=np.float16))
+        has_sparse = all(b.lexical_weights is not None for b in batches)
+        return ArtifactBatch(
+            ids=[i for b in batches for i in b.ids],
+            texts=[t for b in batches for t in b.texts],
+            metadatas=[m for b in batches for m in b.metadatas],
+            vectors=np.concatenate([b.vectors for b in batches]),
+            lexical_weights=[w for b in batches for w in b.lexical_weights] if has_sparse else None
+        )
+
+    # ========== 内部方法 ==========
+
+    def _year_dir(self, year: str) -> Path:
+        return self.root_dir / f"year={year}"
+
+    def _part_files(self, years: Optional[List[str]]) -> List[Path]:
+        files = []
+        for year in (years if years is not None else self.years()):
+            files.extend(sorted(
+                path for path in self._year_dir(year).glob("part-*.arrow") if path.stat().st_size > 0
+            ))
+        return files
+
+    def _write_part(self, path: Path, records: List[Dict[str, Any]]) -> int:
+        """写入一个分区文件（先写临时文件再重命名）"""
+        vectors = np.asarray([record["vector"] for record in records], dtype=np.float16)
+        if vectors.ndim != 2:
+            raise ValueError(f"向量维度不一致: {vectors.shape}")
+        dimension = int(vectors.shape[1])
+        if self.info.get("dimension") not in (None, dimension):
+            raise ValueError(f"向量维度 {dimension} 与产物存储的 {self.info['dimension']} 不一致")
+        self.info["dimension"] = dimension
+
+        metadatas = [record.get("metadata", {}) for record in records]
+        columns = {
+            "id": pa.array([str(record["id"]) for record in records], type=pa.string()),
+            "chunk_key": pa.array([record.get("chunk_key") for record in records], type=pa.string()),
+            "text": pa.array([record.get("text", "") for record in records], type=pa.large_string()),
+            "metadata_json": pa.array(
+                [json.dumps(metadata, ensure_ascii=False) for metadata in metadatas], type=pa.large_string()
+            ),
+        }
+        for field in METADATA_COLUMNS:
+            columns[field] = pa.array(
+                [str(metadata[field]) if metadata.get(field) is not None else None for metadata in metadatas],
+                type=pa.string()
+            )
+        columns["vector"] = pa.FixedSizeListArray.from_arrays(pa.array(vectors.reshape(-1)), dimension)
+
+        if any(record.get("lexical_weights") is not None for record in records):
+            weights = [record.get("lexical_weights") or {} for record in records]
+            columns["sparse_terms"] = pa.array([[int(t) for t in w] for w in weights], type=pa.list_(pa.int32()))
+            columns["sparse_weights"] = pa.array(
+                [[float(v) for v in w.values()] for w in weights], type=pa.list_(pa.float32())
+            )
+
+        table = pa.table(columns)
+        tmp_path = path.with_suffix(".arrow.tmp")
+        with pa.OSFile(str(tmp_path), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table, max_chunksize=self.part_rows)
+        os.replace(tmp_path, path)
+        return len(records)
+
+    def _save_info(self):
+        self.info["dtype"] = "float16"
+        with open(self.root_dir / STORE_INFO_FILE, 'w', encoding='utf-8') as f:
+            json.dump(self.info, f, ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def _to_batch(record_batch: "pa.RecordBatch", include_text: bool) -> ArtifactBatch:
+        vector_column = record_batch.column("vector")
+        dimension = vector_column.type.list_size
+        vectors = vector_column.flatten().to_numpy(zero_copy_only=True).reshape(-1, dimension)
+        lexical_weights = None
+        if "sparse_terms" in record_batch.schema.names:
+            lexical_weights = [
+                dict(zip(terms, weights))
+                for terms, weights in zip(
+                    record_batch.column("sparse_terms").to_pylist(),
+                    record_batch.column("sparse_weights").to_pylist()
+                )
+            ]
+        return ArtifactBatch(
+            ids=record_batch.column("id").to_pylist(),
+            texts=record_batch.column("text").to_pylist() if include_text else [],
+            metadatas=[json.loads(m) for m in record_batch.column("metadata_json").to_pylist()],
+            vectors=vectors,
+            lexical_weights=lexical_weights
+        )
+
+
+# ========== 导出到向量库 ==========
+
+def export_to_pinecone(
+    store: EmbeddingArtifactStore,
+    index,
+    years: Optional[Iterable[str]] = None,
+    batch_size: int = 100,
+    max_text_chars: int = 1000,
+    max_in_flight: int = 4
+) -> int:
+    """
+    导入Pinecone索引（元数据包含截断的text字段，与迁移脚本一致）
+
+    Args:
+        store: 产物存储
+        index: Pinecone Index对象
+        years: 年份列表，None表示全部
+        batch_size: 初始upsert批次大小（BulkWriter按延迟和请求体大小调整）
+        max_text_chars: 元数据中text字段的最大长度（Pinecone单条元数据上限40KB）
+        max_in_flight: 最多同时在途的请求数
+
+    Returns:
+        写入的向量数
+    """
+    items = (
+        {
+            "id": vector_id,
+            "values": vector.astype(np.float32).tolist(),
+            "metadata": {**metadata, "text": _truncate(text, max_text_chars)}
+        }
+        for batch in store.iter_batches(years, batch_size=1000)
+        for vector_id, text, metadata, vector in zip(batch.ids, batch.texts, batch.metadatas, batch.vectors)
+    )
+    writer = BulkWriter(
+        lambda vectors: index.upsert(vectors=vectors),
+        max_in_flight=max_in_flight,
+        initial_batch_size=batch_size,
+        name="artifacts-pinecone"
+    )
+    report = writer.write(items)
+    logger.info(f"[EmbeddingArtifactStore] 📤 导入Pinecone: {report.written:,}条 (失败 {report.failed:,}条)")
+    if report.written > 0:
+        bump_index_epoch(f"产物导入Pinecone: {report.written}条")
+    return report.written
+
+
+def export_to_qdrant(
+    store: EmbeddingArtifactStore,
+    client,
+    collection_name: str,
+    years: Optional[Iterable[str]] = None,
+    batch_size: int = 256
+) -> int:
+    """
+    导入Qdrant集合（点ID由向量ID确定性生成UUID）
+
+    Args:
+        store: 产物存储
+        client: src.vectordb.qdrant_client.QdrantClient
+        collection_name: 集合名称（不存在时创建）
+        years: 年份列表，None表示全部
+        batch_size: 初始upsert批次大小
+
+    Returns:
+        写入的点数
+    """
+    from .qdrant_client import qdrant_point_id
+
+    client.create_collection_for_german_parliament(collection_name=collection_name, vector_size=store.dimension)
+    points = (
+        {
+            "id": qdrant_point_id(vector_id),
+            "vector": vector.astype(np.float32).tolist(),
+            "payload": {**metadata, "text": text, "vector_id": vector_id}
+        }
+        for batch in store.iter_batches(years, batch_size=1000)
+        for vector_id, text, metadata, vector in zip(batch.ids, batch.texts, batch.metadatas, batch.vectors)
+    )
+    report = client.bulk_upsert_german_parliament_data(collection_name, points, batch_size=batch_size)
+    logger.info(f"[EmbeddingArtifactStore] 📤 导入Qdrant {collection_name}: {report.written:,}条 (失败 {report.failed:,}条)")
+    if report.written > 0:
+        bump_index_epoch(f"产物导入Qdrant {collection_name}: {report.written}条")
+    return report.written
+
+
+def export_to_milvus(
+    store: EmbeddingArtifactStore,
+    collection_manager,
+    years: Optional[Iterable[str]] = None,
+    batch_size: int = 5000
+) -> int:
+    """
+    导入Milvus Collection（MilvusCollectionManager.insert_data的chunk格式）
+
+    Args:
+        store: 产物存储
+        collection_manager: 已create_collection的MilvusCollectionManager
+        years: 年份列表，None表示全部
+        batch_size: 每次插入的条数
+
+    Returns:
+        写入的条数
+    """
+    total = 0
+    for batch in store.iter_batches(years, batch_size=batch_size):
+        collection_manager.insert_data([
+            {"vector": vector.astype(np.float32).tolist(), "text": text, "metadata": metadata}
+            for text, metadata, vector in zip(batch.texts, batch.metadatas, batch.vectors)
+        ], batch_size=batch_size)
+        total += len(batch)
+    logger.info(f"[EmbeddingArtifactStore] 📤 导入Milvus: {total:,}条")
+    if total > 0:
+        bump_index_epoch(f"产物导入Milvus: {total}条")
+    return total
+
+
+def export_to_local_index(
+    store: EmbeddingArtifactStore,
+    index_dir: str,
+    years: Optional[Iterable[str]] = None,
+    max_text_chars: int = 1000
+) -> int:
+    """
+    构建本地向量索引（LocalVectorRetriever.build_index）
+
+    所有分区文件都带有稀疏词项权重时同时构建稀疏倒排索引（支持混合检索）
+
+    Args:
+        store: 产物存储
+        index_dir: 本地索引目录
+        years: 年份列表，None表示全部
+        max_text_chars: 元数据中text字段的最大长度（与Pinecone一致）
+
+    Returns:
+        写入的向量数
+    """
+    from .local_retriever import LocalVectorRetriever
+
+    ids, vectors, metadatas = [], [], []
+    lexical_weights: Optional[List[Dict[int, float]]] = []
+    for batch in store.iter_batches(years, batch_size=store.part_rows):
+        ids.extend(batch.ids)
+        vectors.append(np.array(batch.vectors))
+        metadatas.extend(
+            {**metadata, "text": _truncate(text, max_text_chars)}
+            for text, metadata in zip(batch.texts, batch.metadatas)
+        )
+        if lexical_weights is not None and batch.lexical_weights is not None:
+            lexical_weights.extend(batch.lexical_weights)
+        else:
+            lexical_weights = None
+    if not ids:
+        logger.warning("[EmbeddingArtifactStore] 没有可导出的产物")
+        return 0
+    if lexical_weights is None:
+        logger.info("[EmbeddingArtifactStore] 部分产物没有稀疏词项权重，只构建稠密索引")
+
+    LocalVectorRetriever.build_index(
+        index_dir, ids, np.concatenate(vectors), metadatas, lexical_weights=lexical_weights
+    )
+    return len(ids)
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    return text[:max_chars] + "..." if len(text) > max_chars else text
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="从Embedding产物存储导入向量库（不重新embedding）")
+    parser.add_argument("root_dir", help="产物存储目录")
+    parser.add_argument("--target", choices=["pinecone", "qdrant", "milvus", "local"], required=True)
+    parser.add_argument("--years", nargs="*", help="年份（默认全部）")
+    parser.add_argument("--index-name", default="german-bge", help="Pinecone索引名称")
+    parser.add_argument("--collection", default="german_parliament", help="Qdrant / Milvus集合名称")
+    parser.add_argument("--index-dir", default="./local_index/german-bge", help="本地索引目录")
+    args = parser.parse_args()
+
+    store = EmbeddingArtifactStore(args.root_dir)
+    for year in store.years():
+        print(f"  {year}: {store.count(year):,}条")
+
+    if args.target == "pinecone":
+        from pinecone import Pinecone
+        pc = Pinecone(api_key=os.getenv("PINECONE_VECTOR_DATABASE_API_KEY"))
+        export_to_pinecone(store, pc.Index(args.index_name), args.years)
+    elif args.target == "qdrant":
+        from src.vectordb.qdrant_client import create_qdrant_client
+        export_to_qdrant(store, create_qdrant_client(), args.collection, args.years)
+    elif args.target == "milvus":
+        from src.vectordb.client import MilvusClient
+        from src.vectordb.collection import MilvusCollectionManager
+        with MilvusClient():
+            manager = MilvusCollectionManager(collection_name=args.collection)
+            manager.create_collection(dimension=store.dimension)
+            export_to_milvus(store, manager, args.years)
+            manager.create_index()
+    else:
+        export_to_local_index(store, args.index_dir, args.years)
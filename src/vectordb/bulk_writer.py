@@ -0,0 +1,258 @@
+"""
+向量库批量写入器
+原有迁移脚本逐批串行upsert，上传时间主要花在网络往返上；单次请求过大又会触发请求体大小限制
+
+BulkWriter:
+- 按条数和估算的请求体字节数切分批次（Pinecone单次upsert上限约2MB）
+- 同时保持N个请求在途
+- AIMD调整批次大小: 成功且延迟低于目标时加性增大，失败或延迟过高时减半
+- 失败的批次按当前（已减小的）批次大小拆分后退避重试
+- 统计写入速度（向量/秒）
+
+send函数与具体向量库无关，测试时可以传入本地假存储
+"""
+
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from ..utils.logger import logger
+
+
+def estimate_payload_bytes(item: Any) -> int:
+    """
+    估算单条记录在JSON请求体中的字节数
+
+    向量按每个分量约12字节估算（不实际序列化向量），其余字段序列化后计算
+    """
+    if not isinstance(item, dict):
+        return len(json.dumps(item, ensure_ascii=False, default=str).encode("utf-8"))
+    size = 0
+    rest = {}
+    for key, value in item.items():
+        if key in ("values", "vector") and value is not None:
+            size += 12 * len(value)
+        else:
+            rest[key] = value
+    return size + len(json.dumps(rest, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+@dataclass
+class BulkWriteReport:
+    """批量写入结果"""
+    written: int = 0
+    failed: int = 0
+    requests: int = 0
+    retries: int = 0
+    elapsed: float = 0.0
+    final_batch_size: int = 0
+    failed_items: List[Any] = field(default_factory=list)
+
+    @property
+    def vectors_per_second(self) -> float:
+        return self.written / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "written": self.written,
+            "failed": self.failed,
+            "requests": self.requests,
+            "retries": self.retries,
+            "elapsed": self.elapsed,
+            "vectors_per_second": self.vectors_per_second,
+            "final_batch_size": self.final_batch_size
+        }
+
+
+class BulkWriter:
+    """
+    并发批量写入器（AIMD批次大小）
+
+    用法:
+        writer = BulkWriter(lambda batch: index.upsert(vectors=batch), max_in_flight=4)
+        report = writer.write(vector_items, on_batch_written=lambda batch: ...)   # 例如记入增量清单
+        print(report.vectors_per_second)
+    """
+
+    def __init__(
+        self,
+        send: Callable[[List[Any]], Any],
+        max_in_flight: int = 4,
+        initial_batch_size: int = 100,
+        min_batch_size: int = 1,
+        max_batch_size: int = 1000,
+        max_payload_bytes: int = 2 * 1024 * 1024,
+        target_latency: float = 2.0,
+        increase_step: Optional[int] = None,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+        size_of: Callable[[Any], int] = estimate_payload_bytes,
+        name: str = "bulk"
+    ):
+        """
+        Args:
+            send: 写入一批记录的函数（失败时抛出异常）
+            max_in_flight: 最多同时在途的请求数
+            initial_batch_size: 初始批次大小（条）
+            min_batch_size: 最小批次大小
+            max_batch_size: 最大批次大小
+            max_payload_bytes: 单个请求的最大估算字节数（单条超过时单独发送）
+            target_latency: 目标请求延迟（秒），超过时减小批次
+            increase_step: 加性增大的步长，默认为初始批次大小的1/10
+            max_retries: 单批最大重试次数
+            retry_backoff: 重试退避基数（秒），第n次重试前等待 retry_backoff * 2^(n-1)
+            size_of: 单条记录字节数估算函数
+            name: 名称（用于日志和线程名）
+        """
+        self.send = send
+        self.max_in_flight = max(1, max_in_flight)
+        self.min_batch_size = max(1, min_batch_size)
+        self.max_batch_size = max(self.min_batch_size, max_batch_size)
+        self.batch_size = min(max(initial_batch_size, self.min_batch_size), self.max_batch_size)
+        self.max_payload_bytes = max_payload_bytes
+        self.target_latency = target_latency
+        self.increase_step = max(1, increase_step or initial_batch_size // 10)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.size_of = size_of
+        self.name = name
+
+    def write(
+        self,
+        items: Iterable[Any],
+        on_batch_written: Optional[Callable[[List[Any]], None]] = None
+    ) -> BulkWriteReport:
+        """
+        写入全部记录
+
+        Args:
+            items: 记录（可以是迭代器，按需读取，不会全部读入内存）
+            on_batch_written: 每批写入成功后在调用线程中回调（例如记入增量清单）
+
+        Returns:
+            BulkWriteReport（重试耗尽的记录在failed_items中，不抛出异常）
+        """
+        report = BulkWriteReport()
+        start = time.perf_counter()
+        iterator = iter(items)
+        pending: Set[Future] = set()
+        tasks: Dict[Future, tuple] = {}
+        retry_queue: List[tuple] = []
+        carry: List[Any] = []
+        exhausted = False
+        last_log = start
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix=f"{self.name}-writer") as executor:
+            while True:
+                # 补充在途请求：优先重试，其次读取新记录
+                while len(pending) < self.max_in_flight:
+                    if retry_queue:
+                        batch, attempt = retry_queue.pop(0)
+                    elif not exhausted:
+                        batch, carry, exhausted = self._next_batch(iterator, carry)
+                        attempt = 0
+                        if not batch:
+                            continue
+                    else:
+                        break
+                    future = executor.submit(self._send, batch, attempt)
+                    tasks[future] = (batch, attempt)
+                    pending.add(future)
+
+                if not pending:
+                    break
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch, attempt = tasks.pop(future)
+                    self._handle(future, batch, attempt, report, retry_queue, on_batch_written)
+
+                now = time.perf_counter()
+                if now - last_log >= 10:
+                    last_log = now
+                    logger.info(
+                        f"[BulkWriter] {self.name}: 已写入 {report.written:,} 条, "
+                        f"{report.written / (now - start):.1f} 向量/秒, 批次大小 {self.batch_size}"
+                    )
+
+        report.elapsed = time.perf_counter() - start
+        report.final_batch_size = self.batch_size
+        logger.info(
+            f"[BulkWriter] {self.name}: ✅ 写入 {report.written:,} 条, 失败 {report.failed:,} 条, "
+            f"请求 {report.requests} 次 (重试 {report.retries}), 耗时 {report.elapsed:.1f}秒, "
+            f"{report.vectors_per_second:.1f} 向量/秒, 最终批次大小 {self.batch_size}"
+        )
+        return report
+
+    def _next_batch(self, iterator, carry: List[Any]):
+        """按当前批次大小和字节上限从迭代器取下一批；返回 (批次, 留给下一批的记录, 是否读完)"""
+        batch: List[Any] = []
+        batch_bytes = 0
+        pending_items = list(carry)
+        exhausted = False
+        while len(batch) < self.batch_size:
+            if pending_items:
+                item = pending_items.pop(0)
+            else:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+            item_bytes = self.size_of(item)
+            if batch and batch_bytes + item_bytes > self.max_payload_bytes:
+                pending_items.insert(0, item)
+                break
+            batch.append(item)
+            batch_bytes += item_bytes
+        return batch, pending_items, exhausted and not pending_items
+
+    def _send(self, batch: List[Any], attempt: int) -> float:
+        """在写入线程中发送一批，返回请求延迟"""
+        if attempt > 0:
+            time.sleep(self.retry_backoff * (2 ** (attempt - 1)))
+        start = time.perf_counter()
+        self.send(batch)
+        return time.perf_counter() - start
+
+    def _handle(
+        self,
+        future: Future,
+        batch: List[Any],
+        attempt: int,
+        report: BulkWriteReport,
+        retry_queue: List[tuple],
+        on_batch_written
+    ):
+        """处理完成的请求并调整批次大小（AIMD）"""
+        report.requests += 1
+        try:
+            latency = future.result()
+        except Exception as e:
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+            if attempt >= self.max_retries:
+                logger.error(f"[BulkWriter] {self.name}: ❌ {len(batch)}条重试{attempt}次后仍失败: {e}")
+                report.failed += len(batch)
+                report.failed_items.extend(batch)
+                return
+            logger.warning(
+                f"[BulkWriter] {self.name}: ⚠️  {len(batch)}条写入失败（第{attempt + 1}次）: {e}，"
+                f"批次大小降为 {self.batch_size}"
+            )
+            report.retries += 1
+            # 按减小后的批次大小拆分重试（请求体过大时拆分后可以成功）
+            for i in range(0, len(batch), self.batch_size):
+                retry_queue.append((batch[i:i + self.batch_size], attempt + 1))
+            return
+
+        report.written += len(batch)
+        if latency > self.target_latency:
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+        elif len(batch) >= self.batch_size:
+            # 只有满批次的成功才说明可以继续增大
+            self.batch_size = min(self.max_batch_size, self.batch_size + self.increase_step)
+
+        if on_batch_written is not None:
+            on_batch_written(batch)
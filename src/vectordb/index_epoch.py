@@ -0,0 +1,71 @@
+"""
+索引版本号（epoch）
+每次重建/迁移索引后递增，所有依赖检索结果的缓存以此判断条目是否过期
+
+版本号保存在一个小文件中（默认 ./cache/index_epoch），
+迁移脚本与API服务在不同进程中运行时也能感知索引变化
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from ..utils.logger import logger
+
+
+_lock = threading.Lock()
+_cached_epoch: Optional[str] = None
+_cached_mtime: Optional[int] = None
+
+
+def _epoch_path() -> Path:
+    from ..config import settings
+    return Path(settings.index_epoch_path)
+
+
+def get_index_epoch() -> str:
+    """
+    获取当前索引版本号
+
+    只在文件修改时间变化时重新读取，热路径上只有一次stat调用
+
+    Returns:
+        版本号字符串；文件不存在时返回"0"
+    """
+    global _cached_epoch, _cached_mtime
+
+    path = _epoch_path()
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return "0"
+
+    with _lock:
+        if _cached_epoch is None or mtime != _cached_mtime:
+            _cached_epoch = path.read_text(encoding="utf-8").strip() or "0"
+            _cached_mtime = mtime
+        return _cached_epoch
+
+
+def bump_index_epoch(reason: str = "") -> str:
+    """
+    递增索引版本号（重建索引、迁移数据、批量更新元数据后调用）
+
+    Args:
+        reason: 变更原因（仅用于日志）
+
+    Returns:
+        新的版本号
+    """
+    path = _epoch_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    new_epoch = str(time.time_ns())
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(new_epoch, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+    logger.info(f"[IndexEpoch] 索引版本号已更新: {new_epoch} {f'({reason})' if reason else ''}")
+    return new_epoch
@@ -0,0 +1,676 @@
+"""
+本地向量检索器
+在进程内加载BGE-M3向量矩阵（内存映射），无需网络往返
+
+与PineconeRetriever保持相同的检索接口:
+- search / search_multi_year / search_multi_year_parallel / get_stats
+- 返回统一格式: {"id", "score", "text", "metadata"}
+
+另外提供hybrid_search：融合稠密向量得分与BGE-M3稀疏词项得分（需要构建时提供lexical_weights）
+
+索引目录结构:
+    {index_dir}/
+    ├── index_info.json      # 维度、向量数、存储精度
+    ├── vectors.bin          # float16/float32 向量矩阵（行已L2归一化）
+    ├── records.jsonl        # 每行一个 {"id": ..., "metadata": {...}}
+    ├── bitmaps.npz          # 元数据字段位图（year/group/speaker，np.packbits压缩）
+    └── sparse_*.npy         # 可选: BGE-M3稀疏倒排索引（见sparse_index.py）
+"""
+
+import json
+from pathlib import Path
+from typing import List, Dict, Optional, Any, Iterable, Mapping
+
+import numpy as np
+
+from ..utils.logger import logger
+from .index_epoch import bump_index_epoch
+from .sparse_index import SPARSE_FILES, SparseInvertedIndex
+
+
+# 预计算位图的元数据字段（Pinecone中党派字段名为group）
+BITMAP_FIELDS = ("year", "group", "speaker")
+
+# 分块打分的行数（避免一次性把float16矩阵整体转换为float32）
+SCORE_BLOCK_ROWS = 65536
+
+
+class LocalVectorRetriever:
+    """
+    本地向量检索器
+
+    功能:
+    1. 内存映射的向量矩阵（float16/float32），多进程共享页缓存
+    2. 基于预计算位图的元数据过滤（年份、党派、发言人）
+    3. 多年份分层检索 / 分组检索（多个查询向量一次打分，按分组区间取top-k）
+    4. 与PineconeRetriever相同的调用方式，可直接替换
+    5. 稠密+稀疏混合检索（索引包含BGE-M3词项权重时可用）
+    """
+
+    def __init__(
+        self,
+        index_dir: str,
+        index_name: str = "german-bge",
+        default_limit: int = 50
+    ):
+        """
+        初始化本地检索器
+
+        Args:
+            index_dir: 索引目录（由build_index生成）
+            index_name: 索引名称（仅用于日志和缓存键）
+            default_limit: 默认返回结果数
+        """
+        self.index_dir = Path(index_dir)
+        self.index_name = index_name
+        self.default_limit = default_limit
+
+        info_path = self.index_dir / "index_info.json"
+        if not info_path.exists():
+            raise FileNotFoundError(f"本地向量索引不存在: {info_path}")
+
+        with open(info_path, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+
+        self.dimension = int(info["dimension"])
+        self.count = int(info["count"])
+        self.dtype = info.get("dtype", "float16")
+
+        # 内存映射向量矩阵（只读）
+        self.vectors = np.memmap(
+            self.index_dir / "vectors.bin",
+            dtype=self.dtype,
+            mode='r',
+            shape=(self.count, self.dimension)
+        )
+
+        # 加载id和元数据
+        self.ids: List[str] = []
+        self.metadatas: List[Dict] = []
+        with open(self.index_dir / "records.jsonl", 'r', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                self.ids.append(record["id"])
+                self.metadatas.append(record.get("metadata") or {})
+
+        if len(self.ids) != self.count:
+            raise ValueError(
+                f"索引文件不一致: index_info.count={self.count}, records={len(self.ids)}"
+            )
+
+        # 加载位图（缺失时根据元数据重建）
+        self.bitmaps = self._load_bitmaps()
+
+        # 分组检索的行号布局（按需计算）
+        self._group_layouts: Dict[str, tuple] = {}
+
+        # 加载稀疏倒排索引（可选）
+        self.sparse_index: Optional[SparseInvertedIndex] = None
+        if SparseInvertedIndex.exists(self.index_dir):
+            self.sparse_index = SparseInvertedIndex(self.index_dir, self.count)
+
+        logger.info(
+            f"[LocalVectorRetriever] 初始化完成: index={index_name}, 向量数={self.count:,}, "
+            f"维度={self.dimension}, 精度={self.dtype}, default_limit={default_limit}, "
+            f"稀疏索引={'已加载' if self.sparse_index is not None else '无'}"
+        )
+
+    @property
+    def supports_hybrid(self) -> bool:
+        """是否支持稠密+稀疏混合检索"""
+        return self.sparse_index is not None
+
+    @property
+    def supports_grouped_search(self) -> bool:
+        """是否支持search_grouped分组检索"""
+        return True
+
+    # ========== 索引构建 ==========
+
+    @staticmethod
+    def build_index(
+        index_dir: str,
+        ids: List[str],
+        vectors: Iterable[List[float]],
+        metadatas: List[Dict],
+        dtype: str = "float16",
+        lexical_weights: Optional[List[Mapping]] = None
+    ) -> Path:
+        """
+        构建本地向量索引
+
+        Args:
+            index_dir: 输出目录
+            ids: 向量ID列表
+            vectors: 向量列表（会被L2归一化后写入）
+            metadatas: 元数据列表（应包含text字段，与Pinecone一致）
+            dtype: 存储精度（float16 或 float32）
+            lexical_weights: BGE-M3词项权重列表（与ids一一对应），提供时同时构建稀疏倒排索引
+
+        Returns:
+            索引目录路径
+        """
+        if dtype not in ("float16", "float32"):
+            raise ValueError(f"不支持的存储精度: {dtype}")
+
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[0] != len(ids) or len(ids) != len(metadatas):
+            raise ValueError(
+                f"输入长度不一致: ids={len(ids)}, vectors={matrix.shape}, metadatas={len(metadatas)}"
+            )
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix = matrix / norms
+
+        out_dir = Path(index_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        matrix.astype(dtype).tofile(out_dir / "vectors.bin")
+
+        with open(out_dir / "records.jsonl", 'w', encoding='utf-8') as f:
+            for vector_id, metadata in zip(ids, metadatas):
+                f.write(json.dumps({"id": vector_id, "metadata": metadata}, ensure_ascii=False) + "\n")
+
+        bitmaps = _compute_bitmaps(metadatas)
+        np.savez(out_dir / "bitmaps.npz", **_flatten_bitmaps(bitmaps))
+
+        if lexical_weights is not None:
+            if len(lexical_weights) != len(ids):
+                raise ValueError(f"输入长度不一致: ids={len(ids)}, lexical_weights={len(lexical_weights)}")
+            SparseInvertedIndex.build(out_dir, lexical_weights)
+        else:
+            # 重建为纯稠密索引时删除旧的稀疏索引，避免行号错位
+            for name in SPARSE_FILES:
+                (out_dir / name).unlink(missing_ok=True)
+
+        with open(out_dir / "index_info.json", 'w', encoding='utf-8') as f:
+            json.dump({
+                "dimension": int(matrix.shape[1]),
+                "count": int(matrix.shape[0]),
+                "dtype": dtype,
+                "bitmap_fields": list(BITMAP_FIELDS),
+                "sparse": lexical_weights is not None
+            }, f, ensure_ascii=False, indent=2)
+
+        logger.info(
+            f"[LocalVectorRetriever] 索引构建完成: {out_dir}, 向量数={matrix.shape[0]:,}, 精度={dtype}"
+        )
+        bump_index_epoch(f"本地索引重建: {out_dir}")
+        return out_dir
+
+    def _load_bitmaps(self) -> Dict[str, Dict[str, np.ndarray]]:
+        """加载位图文件，不存在时从元数据重新计算"""
+        bitmap_path = self.index_dir / "bitmaps.npz"
+        if not bitmap_path.exists():
+            logger.warning("[LocalVectorRetriever] 未找到bitmaps.npz，从元数据重建位图")
+            return _compute_bitmaps(self.metadatas)
+
+        bitmaps: Dict[str, Dict[str, np.ndarray]] = {field: {} for field in BITMAP_FIELDS}
+        with np.load(bitmap_path, allow_pickle=False) as data:
+            keys = data["__keys__"]
+            for i, key in enumerate(keys):
+                field, value = json.loads(str(key))
+                bitmaps.setdefault(field, {})[value] = data[f"b{i}"]
+        return bitmaps
+
+    # ========== 检索接口 ==========
+
+    def search(
+        self,
+        query_vector: List[float],
+        limit: Optional[int] = None,
+        filters: Optional[Dict] = None,
+        include_metadata: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        执行向量搜索
+
+        Args:
+            query_vector: 查询向量
+            limit: 返回结果数量
+            filters: 元数据过滤条件（与PineconeRetriever相同的输入格式）
+            include_metadata: 是否包含元数据
+
+        Returns:
+            检索结果列表（统一格式）
+        """
+        limit = limit or self.default_limit
+        rows = self._filter_rows(filters)
+        scores = self._score_rows(self._normalize(query_vector), rows)
+
+        top = _top_k(scores, limit)
+        results = [
+            self._format_result(int(rows[i]) if rows is not None else int(i), float(scores[i]), include_metadata)
+            for i in top
+        ]
+        logger.info(f"[LocalVectorRetriever] 检索成功，返回{len(results)}个结果")
+        return results
+
+    def hybrid_search(
+        self,
+        query_vector: List[float],
+        query_lexical_weights: Optional[Mapping],
+        limit: Optional[int] = None,
+        filters: Optional[Dict] = None,
+        dense_weight: float = 1.0,
+        sparse_weight: float = 0.3,
+        candidate_multiplier: int = 3
+    ) -> List[Dict[str, Any]]:
+        """
+        稠密+稀疏混合检索
+
+        候选集 = 稠密top-(limit×倍数) ∪ 稀疏top-(limit×倍数)，
+        按 融合得分 = dense_weight × 余弦相似度 + sparse_weight × 词项匹配得分
+        （BGE-M3论文中的加权求和）选出limit个结果，精确实体词（如"Georgien Visum"）只需查几条倒排表即可召回
+
+        融合得分没有上界、与余弦相似度不在同一尺度，只用于选择结果；
+        结果的score仍为余弦相似度，可以与稠密检索结果一起排序和按相似度阈值过滤
+
+        Args:
+            query_vector: 查询向量
+            query_lexical_weights: 查询的BGE-M3词项权重 {词项ID: 权重}
+            limit: 返回结果数量
+            filters: 元数据过滤条件（与search相同）
+            dense_weight: 稠密得分权重
+            sparse_weight: 稀疏得分权重
+            candidate_multiplier: 每路候选数相对limit的倍数
+
+        Returns:
+            检索结果列表（按融合得分降序；score为余弦相似度，额外包含dense_score/sparse_score/fused_score）
+        """
+        limit = limit or self.default_limit
+        if self.sparse_index is None or not query_lexical_weights:
+            return self.search(query_vector, limit=limit, filters=filters)
+
+        mask = self._build_mask(filters) if filters else None
+        rows = None if mask is None else np.flatnonzero(mask)
+        pool = limit * max(1, candidate_multiplier)
+        query = self._normalize(query_vector)
+
+        # 稠密候选
+        dense_scores = self._score_rows(query, rows)
+        dense_top = _top_k(dense_scores, pool)
+        dense_rows = dense_top if rows is None else rows[dense_top]
+
+        # 稀疏候选（只读取查询词项的倒排表）
+        sparse_all = self.sparse_index.score(query_lexical_weights, mask)
+        sparse_top = _top_k(sparse_all, pool)
+        sparse_rows = sparse_top[sparse_all[sparse_top] > 0]
+
+        candidates = np.union1d(dense_rows, sparse_rows).astype(np.int64)
+        if len(candidates) == 0:
+            return []
+
+        candidate_dense = self._score_rows(query, candidates)
+        candidate_sparse = sparse_all[candidates]
+        fused = dense_weight * candidate_dense + sparse_weight * candidate_sparse
+
+        results = []
+        for i in _top_k(fused, limit):
+            result = self._format_result(int(candidates[i]), float(candidate_dense[i]))
+            result["dense_score"] = float(candidate_dense[i])
+            result["sparse_score"] = float(candidate_sparse[i])
+            result["fused_score"] = float(fused[i])
+            results.append(result)
+
+        logger.info(
+            f"[LocalVectorRetriever] 混合检索成功，返回{len(results)}个结果 "
+            f"(稠密候选={len(dense_rows)}, 稀疏候选={len(sparse_rows)})"
+        )
+        return results
+
+    def search_multi_year(
+        self,
+        query_vector: List[float],
+        years: List[str],
+        limit_per_year: int = 5,
+        other_filters: Optional[Dict] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        多年份分层检索（每年取top-k后合并）
+
+        基于search_grouped：所有年份的候选行一次打分，再按年份分段取top-k
+
+        Args:
+            query_vector: 查询向量
+            years: 年份列表
+            limit_per_year: 每年返回的文档数
+            other_filters: 其他过滤条件(党派、发言人等)
+
+        Returns:
+            合并后的检索结果，按相似度排序
+        """
+        all_results = self.search_grouped(
+            [query_vector],
+            group_by="year",
+            k_per_group=limit_per_year,
+            groups=years,
+            filters=other_filters
+        )[0]
+
+        year_distribution = {}
+        for result in all_results:
+            year = result['metadata'].get('year')
+            year_distribution[year] = year_distribution.get(year, 0) + 1
+
+        logger.info(
+            f"[LocalVectorRetriever] 多年份检索完成: 共{len(all_results)}个文档, "
+            f"年份分布={year_distribution}"
+        )
+        return all_results
+
+    def search_grouped(
+        self,
+        query_vectors: List[List[float]],
+        group_by: str = "year",
+        k_per_group: int = 5,
+        groups: Optional[List[str]] = None,
+        filters: Optional[Dict] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        分组top-k检索（多个查询向量共用一次打分）
+
+        行号按分组字段预先排序，每个分组对应一段连续区间；
+        候选行（所选分组 ∩ 过滤条件）与全部查询向量做一次矩阵乘法，
+        再在每个分组区间内用argpartition同时为所有查询选出top-k
+
+        Args:
+            query_vectors: 查询向量列表（如同一问题的多个查询变体）
+            group_by: 分组字段（year / group / speaker 等元数据字段）
+            k_per_group: 每个分组返回的文档数
+            groups: 参与检索的分组值，None表示全部分组（不含缺少该字段的行）
+            filters: 其他过滤条件（与search相同的输入格式）
+
+        Returns:
+            与query_vectors一一对应的结果列表，每个列表按相似度降序
+        """
+        if not query_vectors:
+            return []
+
+        queries = np.stack([self._normalize(vector) for vector in query_vectors])
+        values, starts, ends, sorted_rows = self._group_layout(group_by)
+        mask = self._build_mask(filters) if filters else None
+
+        # 收集每个分组的候选行（连续区间，过滤后仍保持分组连续）
+        wanted = None if groups is None else {str(group) for group in groups}
+        segments = []
+        for value, start, end in zip(values, starts, ends):
+            if value == '' or (wanted is not None and value not in wanted):
+                continue
+            group_rows = sorted_rows[start:end]
+            if mask is not None:
+                group_rows = group_rows[mask[group_rows]]
+            if len(group_rows):
+                segments.append(group_rows)
+
+        results: List[List[Dict[str, Any]]] = [[] for _ in query_vectors]
+        if not segments or k_per_group <= 0:
+            return results
+
+        rows = np.concatenate(segments)
+        scores = self._score_rows_multi(queries, rows)
+
+        offset = 0
+        for group_rows in segments:
+            length = len(group_rows)
+            block = scores[offset:offset + length]
+            k = min(k_per_group, length)
+            if k < length:
+                top = np.argpartition(-block, k - 1, axis=0)[:k]
+            else:
+                top = np.repeat(np.arange(length)[:, None], len(query_vectors), axis=1)
+
+            for q in range(len(query_vectors)):
+                for i in top[:, q]:
+                    results[q].append(self._format_result(int(group_rows[i]), float(block[i, q])))
+            offset += length
+
+        for query_results in results:
+            query_results.sort(key=lambda x: x['score'], reverse=True)
+        return results
+
+    def search_multi_year_parallel(
+        self,
+        query_vector: List[float],
+        years: List[str],
+        limit_per_year: int = 5,
+        other_filters: Optional[Dict] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        多年份分层检索（与PineconeRetriever接口兼容）
+
+        本地检索没有网络等待，无需线程池并行，直接复用search_multi_year
+        """
+        return self.search_multi_year(
+            query_vector=query_vector,
+            years=years,
+            limit_per_year=limit_per_year,
+            other_filters=other_filters
+        )
+
+    def get_stats(self) -> Dict:
+        """
+        获取索引统计信息
+
+        Returns:
+            统计信息字典（与PineconeRetriever.get_stats字段一致）
+        """
+        return {
+            'total_vectors': self.count,
+            'dimension': self.dimension,
+            'index_fullness': 0.0,
+            'sparse_postings': len(self.sparse_index.rows) if self.sparse_index is not None else 0
+        }
+
+    # ========== 内部方法 ==========
+
+    def _normalize(self, query_vector: List[float]) -> np.ndarray:
+        """将查询向量转换为归一化的float32数组"""
+        query = np.asarray(query_vector, dtype=np.float32)
+        if query.shape != (self.dimension,):
+            raise ValueError(f"查询向量维度错误: 期望{self.dimension}, 实际{query.shape}")
+        norm = np.linalg.norm(query)
+        return query / norm if norm > 0 else query
+
+    def _score_rows(self, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """
+        计算余弦相似度（向量已归一化，即内积）
+
+        Args:
+            query: 归一化查询向量
+            rows: 候选行号，None表示全部行
+
+        Returns:
+            与rows一一对应的相似度数组
+        """
+        if rows is None:
+            scores = np.empty(self.count, dtype=np.float32)
+            for start in range(0, self.count, SCORE_BLOCK_ROWS):
+                end = min(start + SCORE_BLOCK_ROWS, self.count)
+                scores[start:end] = self.vectors[start:end].astype(np.float32) @ query
+            return scores
+
+        if len(rows) == 0:
+            return np.empty(0, dtype=np.float32)
+
+        scores = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), SCORE_BLOCK_ROWS):
+            block = rows[start:start + SCORE_BLOCK_ROWS]
+            scores[start:start + len(block)] = self.vectors[block].astype(np.float32) @ query
+        return scores
+
+    def _score_rows_multi(self, queries: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """
+        多个查询向量同时打分
+
+        Args:
+            queries: 归一化查询矩阵 (查询数, 维度)
+            rows: 候选行号
+
+        Returns:
+            相似度矩阵 (候选行数, 查询数)
+        """
+        scores = np.empty((len(rows), len(queries)), dtype=np.float32)
+        for start in range(0, len(rows), SCORE_BLOCK_ROWS):
+            block = rows[start:start + SCORE_BLOCK_ROWS]
+            scores[start:start + len(block)] = self.vectors[block].astype(np.float32) @ queries.T
+        return scores
+
+    def _group_layout(self, field: str):
+        """
+        按字段值排序的行号布局（首次使用时计算并缓存）
+
+        Returns:
+            (分组值列表, 起始位置数组, 结束位置数组, 按分组排序的行号)
+        """
+        layout = self._group_layouts.get(field)
+        if layout is None:
+            field_values = np.array([str(m.get(field, '') or '') for m in self.metadatas], dtype=object)
+            values, inverse, counts = np.unique(field_values, return_inverse=True, return_counts=True)
+            sorted_rows = np.argsort(inverse, kind='stable')
+            ends = np.cumsum(counts)
+            layout = (list(values), ends - counts, ends, sorted_rows)
+            self._group_layouts[field] = layout
+        return layout
+
+    def _filter_rows(self, filters: Optional[Dict]) -> Optional[np.ndarray]:
+        """将过滤条件转换为候选行号（None表示不过滤）"""
+        if not filters:
+            return None
+        mask = self._build_mask(filters)
+        return None if mask is None else np.flatnonzero(mask)
+
+    def _build_mask(self, filters: Optional[Dict]) -> Optional[np.ndarray]:
+        """
+        将过滤条件转换为布尔掩码
+
+        输入格式与PineconeRetriever._convert_to_pinecone_filter相同:
+        {
+            "year": "2015" 或 ["2015", "2016"],
+            "party": "CDU/CSU" 或 [...],
+            "speaker": "Angela Merkel",
+            "topic": "..."
+        }
+        """
+        if not filters:
+            return None
+
+        # 输入字段 -> 元数据字段（党派在索引中存储为group）
+        field_mapping = {"year": "year", "party": "group", "speaker": "speaker", "topic": "topic"}
+
+        mask = None
+        for key, value in filters.items():
+            field = field_mapping.get(key, key)
+            values = value if isinstance(value, list) else [value]
+            field_mask = self._field_mask(field, [str(v) for v in values])
+            mask = field_mask if mask is None else (mask & field_mask)
+        return mask
+
+    def _field_mask(self, field: str, values: List[str]) -> np.ndarray:
+        """单字段多值（OR）掩码，有位图时按位运算，否则扫描元数据"""
+        if field in self.bitmaps:
+            packed = None
+            for value in values:
+                bitmap = self.bitmaps[field].get(value)
+                if bitmap is None:
+                    continue
+                packed = bitmap if packed is None else (packed | bitmap)
+            if packed is None:
+                return np.zeros(self.count, dtype=bool)
+            return np.unpackbits(packed, count=self.count).astype(bool)
+
+        value_set = set(values)
+        return np.fromiter(
+            (str(m.get(field, '')) in value_set for m in self.metadatas),
+            dtype=bool,
+            count=self.count
+        )
+
+    def _format_result(self, row: int, score: float, include_metadata: bool = True) -> Dict[str, Any]:
+        """将行号转换为统一结果格式"""
+        metadata = self.metadatas[row] if include_metadata else {}
+        return {
+            "id": self.ids[row],
+            "score": score,
+            "text": metadata.get('text', ''),
+            "metadata": metadata
+        }
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """返回分数最高的k个位置（降序）"""
+    if len(scores) == 0 or k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+def _compute_bitmaps(metadatas: List[Dict]) -> Dict[str, Dict[str, np.ndarray]]:
+    """为BITMAP_FIELDS中的字段计算压缩位图 {field: {value: packed_bits}}"""
+    count = len(metadatas)
+    rows_by_value: Dict[str, Dict[str, List[int]]] = {field: {} for field in BITMAP_FIELDS}
+
+    for row, metadata in enumerate(metadatas):
+        for field in BITMAP_FIELDS:
+            value = metadata.get(field)
+            if value is None or value == '':
+                continue
+            rows_by_value[field].setdefault(str(value), []).append(row)
+
+    bitmaps: Dict[str, Dict[str, np.ndarray]] = {}
+    for field, value_rows in rows_by_value.items():
+        bitmaps[field] = {}
+        for value, rows in value_rows.items():
+            bits = np.zeros(count, dtype=bool)
+            bits[rows] = True
+            bitmaps[field][value] = np.packbits(bits)
+    return bitmaps
+
+
+def _flatten_bitmaps(bitmaps: Dict[str, Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """将嵌套位图展开为np.savez可保存的扁平结构（字段值可能含'/'等字符，单独保存键表）"""
+    keys = []
+    arrays = {}
+    for field, values in bitmaps.items():
+        for value, packed in values.items():
+            arrays[f"b{len(keys)}"] = packed
+            keys.append(json.dumps([field, value], ensure_ascii=False))
+    arrays["__keys__"] = np.array(keys, dtype=str)
+    return arrays
+
+
+if __name__ == "__main__":
+    # 测试本地检索器
+    import tempfile
+
+    print("=== 本地向量检索器测试 ===")
+
+    rng = np.random.default_rng(0)
+    test_vectors = rng.normal(size=(100, 16)).astype(np.float32)
+    test_ids = [f"doc_{i}" for i in range(100)]
+    test_metadatas = [
+        {
+            "year": str(2015 + i % 5),
+            "group": ["CDU/CSU", "SPD"][i % 2],
+            "speaker": f"Speaker {i % 7}",
+            "text": f"Dokument {i}"
+        }
+        for i in range(100)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        LocalVectorRetriever.build_index(tmp_dir, test_ids, test_vectors, test_metadatas)
+        retriever = LocalVectorRetriever(tmp_dir)
+        print(f"✅ 索引统计: {retriever.get_stats()}")
+
+        hits = retriever.search(test_vectors[3].tolist(), limit=3, filters={"party": "SPD"})
+        print(f"✅ 过滤检索: {[h['id'] for h in hits]}")
+
+        hits = retriever.search_multi_year_parallel(
+            test_vectors[0].tolist(), years=["2015", "2016"], limit_per_year=2
+        )
+        print(f"✅ 多年份检索: {[(h['id'], h['metadata']['year']) for h in hits]}")
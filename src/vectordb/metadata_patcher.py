@@ -0,0 +1,202 @@
+"""
+向量元数据差异补丁
+原有update_pinecone_metadata脚本对每个向量调用一次index.update（每个向量一次HTTP请求），
+而大部分向量的元数据其实不需要修改
+
+MetadataPatcher:
+- 按页列出向量ID并fetch（一次请求取回一页向量及其元数据）
+- 由调用方根据原始JSON计算期望的元数据字段，与当前元数据比较
+- 只有确实变化的向量才写回: 复用fetch得到的向量值，通过BulkWriter批量并发upsert
+- dry_run模式只统计差异，不写入
+- 有向量被写回时递增索引版本号，使依赖元数据的答案缓存/检索缓存失效
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from .bulk_writer import BulkWriter
+from .index_epoch import bump_index_epoch
+from ..utils.logger import logger
+
+
+def _same_value(current: Any, desired: Any) -> bool:
+    """比较元数据值（Pinecone把数字存为浮点数，1和1.0视为相同）"""
+    numeric = (int, float)
+    if (isinstance(current, numeric) and isinstance(desired, numeric)
+            and not isinstance(current, bool) and not isinstance(desired, bool)):
+        return float(current) == float(desired)
+    return current == desired
+
+
+def metadata_changes(current: Optional[Dict[str, Any]], desired: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    计算需要修改的元数据字段
+
+    Args:
+        current: 向量当前的元数据
+        desired: 期望的字段（只比较这些字段，其余字段保持不变）
+
+    Returns:
+        {字段: 期望值}，没有变化时为空
+    """
+    current = current or {}
+    return {
+        key: value for key, value in desired.items()
+        if key not in current or not _same_value(current[key], value)
+    }
+
+
+def _field(obj: Any, name: str, default=None):
+    """fetch结果的向量可能是对象也可能是字典"""
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+@dataclass
+class PatchReport:
+    """元数据补丁结果"""
+    dry_run: bool = False
+    scanned: int = 0
+    unchanged: int = 0
+    changed: int = 0
+    skipped: int = 0
+    patched: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+    field_counts: Dict[str, int] = field(default_factory=dict)
+    failed_ids: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "dry_run": self.dry_run,
+            "scanned": self.scanned,
+            "unchanged": self.unchanged,
+            "changed": self.changed,
+            "skipped": self.skipped,
+            "patched": self.patched,
+            "failed": self.failed,
+            "elapsed": self.elapsed,
+            "field_counts": dict(self.field_counts)
+        }
+
+
+class MetadataPatcher:
+    """
+    基于差异的批量元数据补丁（Pinecone风格的index: list / fetch / upsert）
+
+    用法:
+        patcher = MetadataPatcher(index, desired_metadata=lambda vector_id, metadata: {...})
+        report = patcher.patch_prefix("2016_", dry_run=True)
+    """
+
+    def __init__(
+        self,
+        index,
+        desired_metadata: Callable[[str, Dict[str, Any]], Optional[Dict[str, Any]]],
+        max_in_flight: int = 4,
+        batch_size: int = 100,
+        sample_size: int = 3,
+        name: str = "metadata"
+    ):
+        """
+        Args:
+            index: 向量索引（需要fetch(ids=...)和upsert(vectors=...)，patch_prefix还需要list(prefix=...)）
+            desired_metadata: (向量ID, 当前元数据) -> 期望的字段；返回None表示找不到原始数据，跳过
+            max_in_flight: 同时在途的upsert请求数
+            batch_size: 初始upsert批次大小
+            sample_size: 日志中展示的差异样本数
+            name: 名称（用于日志）
+        """
+        self.index = index
+        self.desired_metadata = desired_metadata
+        self.max_in_flight = max_in_flight
+        self.batch_size = batch_size
+        self.sample_size = sample_size
+        self.name = name
+
+    def patch_prefix(self, prefix: str, dry_run: bool = False) -> PatchReport:
+        """修补ID以prefix开头的全部向量（例如 "2016_"）"""
+        return self.patch(self.index.list(prefix=prefix), dry_run=dry_run)
+
+    def patch(self, id_pages: Iterable[List[str]], dry_run: bool = False) -> PatchReport:
+        """
+        修补给定的向量
+
+        Args:
+            id_pages: 向量ID分页（每页一次fetch）
+            dry_run: 只统计差异，不写入
+
+        Returns:
+            PatchReport
+        """
+        report = PatchReport(dry_run=dry_run)
+        start = time.perf_counter()
+        patches = self._plan(id_pages, report)
+
+        if dry_run:
+            for _ in patches:
+                pass
+        else:
+            writer = BulkWriter(
+                lambda batch: self.index.upsert(vectors=batch),
+                max_in_flight=self.max_in_flight,
+                initial_batch_size=self.batch_size,
+                name=self.name
+            )
+            write_report = writer.write(patches)
+            report.patched = write_report.written
+            report.failed = write_report.failed
+            report.failed_ids = [item["id"] for item in write_report.failed_items]
+            if report.patched > 0:
+                # 缓存中的检索结果/答案带有旧元数据（例如source_reference）
+                bump_index_epoch(f"元数据补丁 {self.name}: {report.patched}个向量")
+
+        report.elapsed = time.perf_counter() - start
+        logger.info(
+            f"[MetadataPatcher] {self.name}: {'🔍 [dry-run] ' if dry_run else '✅ '}"
+            f"扫描 {report.scanned:,} 个向量, 需要修改 {report.changed:,}, 未变化 {report.unchanged:,}, "
+            f"缺少原始数据 {report.skipped:,}, 已写入 {report.patched:,}, 失败 {report.failed:,}, "
+            f"耗时 {report.elapsed:.1f}秒"
+        )
+        if report.field_counts:
+            logger.info(f"[MetadataPatcher] {self.name}: 各字段修改数: {report.field_counts}")
+        return report
+
+    def _plan(self, id_pages: Iterable[List[str]], report: PatchReport) -> Iterator[Dict[str, Any]]:
+        """逐页fetch并比较，产出需要upsert的向量（复用原向量值，元数据为当前元数据合并修改字段）"""
+        for page in id_pages:
+            ids = list(page)
+            if not ids:
+                continue
+            vectors = _field(self.index.fetch(ids=ids), "vectors", {}) or {}
+
+            for vector_id in ids:
+                vector = vectors.get(vector_id)
+                if vector is None:
+                    continue
+                report.scanned += 1
+                current = dict(_field(vector, "metadata") or {})
+
+                desired = self.desired_metadata(vector_id, current)
+                if desired is None:
+                    report.skipped += 1
+                    continue
+
+                changes = metadata_changes(current, desired)
+                if not changes:
+                    report.unchanged += 1
+                    continue
+
+                report.changed += 1
+                for key in changes:
+                    report.field_counts[key] = report.field_counts.get(key, 0) + 1
+                if report.changed <= self.sample_size:
+                    logger.info(f"[MetadataPatcher] {self.name}: 样本 {vector_id}: {changes}")
+
+                item = {"id": vector_id, "values": list(_field(vector, "values")), "metadata": {**current, **changes}}
+                sparse_values = _field(vector, "sparse_values")
+                if sparse_values:
+                    item["sparse_values"] = sparse_values
+                yield item
@@ -5,7 +5,6 @@ Pinecone检索器
 
 import os
 from typing import List, Dict, Optional, Any
-from pinecone import Pinecone
 from ..utils.logger import logger
 
 
@@ -43,6 +42,9 @@ class PineconeRetriever:
         if not api_key:
             raise ValueError("PINECONE_VECTOR_DATABASE_API_KEY未设置")
 
+        # 延迟导入：本地检索后端无需安装pinecone
+        from pinecone import Pinecone
+
         self.pc = Pinecone(api_key=api_key)
         self.index = self.pc.Index(index_name)
 
@@ -379,18 +381,36 @@ class PineconeRetriever:
 
 def create_pinecone_retriever(
     index_name: str = "german-bge",
-    default_limit: int = 50
-) -> PineconeRetriever:
+    default_limit: int = 50,
+    backend: Optional[str] = None
+):
     """
-    创建Pinecone检索器的工厂函数
+    创建检索器的工厂函数
+
+    根据配置vector_backend选择检索后端:
+    - pinecone: 云端Pinecone索引
+    - local: 进程内LocalVectorRetriever（接口相同，可直接替换）
 
     Args:
         index_name: 索引名称
         default_limit: 默认检索数量
+        backend: 检索后端，默认从配置读取
 
     Returns:
-        PineconeRetriever实例
+        PineconeRetriever或LocalVectorRetriever实例
     """
+    from ..config import settings
+
+    backend = backend or settings.vector_backend
+
+    if backend == "local":
+        from .local_retriever import LocalVectorRetriever
+        return LocalVectorRetriever(
+            index_dir=settings.local_index_dir,
+            index_name=index_name,
+            default_limit=default_limit
+        )
+
     return PineconeRetriever(
         index_name=index_name,
         default_limit=default_limit
@@ -5,16 +5,18 @@ Qdrant向量数据库客户端封装
 
 import os
 import time
-from typing import List, Dict, Any, Optional, Union
+import uuid
+from typing import List, Dict, Any, Iterable, Optional, Union
 from pathlib import Path
 
 from qdrant_client import QdrantClient as QdrantClientBase
 from qdrant_client.models import (
     VectorParams, Distance, PointStruct, 
-    Filter, FieldCondition, MatchValue, Range
+    Filter, FieldCondition, MatchValue, Range, FilterSelector
 )
 from qdrant_client.http.exceptions import ResponseHandlingException
 
+from .bulk_writer import BulkWriter, BulkWriteReport
 from ..utils.logger import logger
 
 
@@ -256,6 +258,69 @@ class QdrantClient:
         
         return _upsert_data()
     
+    def bulk_upsert_german_parliament_data(
+        self,
+        collection_name: str,
+        data_points: Iterable[Dict[str, Any]],
+        max_in_flight: int = 4,
+        batch_size: int = 200,
+        max_payload_bytes: int = 16 * 1024 * 1024
+    ) -> BulkWriteReport:
+        """
+        并发分批插入德国议会数据（数据点格式同upsert_german_parliament_data）
+        
+        按条数和请求体大小切分，保持多个请求在途，失败或延迟过高时自动减小批次
+        
+        Args:
+            collection_name: 集合名称
+            data_points: 数据点（可以是迭代器）
+            max_in_flight: 最多同时在途的请求数
+            batch_size: 初始批次大小
+            max_payload_bytes: 单个请求的最大估算字节数
+            
+        Returns:
+            BulkWriteReport（failed > 0 表示部分数据点重试后仍失败）
+        """
+        writer = BulkWriter(
+            lambda batch: self.upsert_german_parliament_data(collection_name, batch),
+            max_in_flight=max_in_flight,
+            initial_batch_size=batch_size,
+            max_batch_size=max(batch_size * 4, batch_size),
+            max_payload_bytes=max_payload_bytes,
+            name=f"qdrant-{collection_name}"
+        )
+        return writer.write(data_points)
+    
+    def delete_by_source_file(self, collection_name: str, source_file: str) -> int:
+        """
+        删除来自某个数据文件的全部数据点（按payload中的source_file过滤）
+        
+        Args:
+            collection_name: 集合名称
+            source_file: 数据文件名
+            
+        Returns:
+            int: 删除的数据点数
+        """
+        @self.with_retry(f"删除 {collection_name} 中 {source_file} 的数据")
+        def _delete():
+            source_filter = Filter(
+                must=[FieldCondition(key="source_file", match=MatchValue(value=source_file))]
+            )
+            count = self.client.count(
+                collection_name=collection_name, count_filter=source_filter, exact=True
+            ).count
+            if count:
+                self.client.delete(
+                    collection_name=collection_name,
+                    points_selector=FilterSelector(filter=source_filter),
+                    wait=True
+                )
+                logger.info(f"[QdrantClient] 已删除 {collection_name} 中 {source_file} 的 {count} 条数据")
+            return count
+        
+        return _delete()
+    
     def search_german_parliament(
         self,
         collection_name: str,
@@ -404,6 +469,19 @@ class QdrantClient:
         self._client = None
 
 
+def qdrant_point_id(vector_id: str) -> str:
+    """
+    Qdrant点ID只能是整数或UUID: 由字符串向量ID（与Pinecone一致）确定性生成UUID
+
+    Args:
+        vector_id: 向量ID，例如 "2019_3f2a..."
+
+    Returns:
+        UUID字符串（同一向量ID总是得到同一个点ID，重复upsert覆盖）
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, vector_id))
+
+
 # 工厂函数：根据环境变量创建客户端
 def create_qdrant_client() -> QdrantClient:
     """
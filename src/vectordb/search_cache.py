@@ -0,0 +1,427 @@
+"""
+检索结果缓存
+缓存检索器的返回结果，避免同一请求内（KG扩展查询与子问题重叠、关键词相同）
+以及不同用户之间（模板化问题）重复发起相同的向量检索
+
+缓存键: (索引名称, 检索方法, 量化后的查询向量哈希, 规范化过滤条件, top_k, 其他参数)
+失效条件: TTL过期、LRU淘汰、索引版本号（epoch）变化
+"""
+
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..utils.logger import logger
+from ..utils.performance_monitor import get_performance_monitor
+from .index_epoch import get_index_epoch
+
+
+class SearchCacheStats:
+    """单个请求的缓存命中统计（检索在多个线程中并发执行，计数需要加锁）"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @property
+    def lookups(self) -> int:
+        return self.hits + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+
+_request_stats: ContextVar[Optional[SearchCacheStats]] = ContextVar("search_cache_stats", default=None)
+
+
+@contextmanager
+def search_cache_scope():
+    """
+    统计当前请求的检索缓存命中情况
+
+    用法:
+        with search_cache_scope() as stats:
+            ...  # 检索（asyncio.to_thread中的调用同样计入）
+        print(stats.hits, stats.misses)
+    """
+    stats = SearchCacheStats()
+    token = _request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_stats.reset(token)
+
+
+def canonicalize_filter(value: Any) -> Any:
+    """规范化过滤条件：字典按键排序，列表按内容排序（["2016", "2015"]与["2015", "2016"]等价）"""
+    if isinstance(value, dict):
+        return {str(k): canonicalize_filter(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple, set)):
+        items = [canonicalize_filter(v) for v in value]
+        return sorted(items, key=lambda v: json.dumps(v, sort_keys=True, ensure_ascii=False, default=str))
+    return value
+
+
+class SearchResultCache:
+    """
+    检索结果缓存
+
+    功能:
+    1. 查询向量量化为float16后哈希（同一文本的向量在不同进程/批次中的微小数值差异不影响命中）
+    2. TTL过期 + 条目数上限（LRU淘汰）
+    3. 索引版本号变化时自动清空
+    """
+
+    MONITOR_NAME = "检索结果缓存"
+
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 2000):
+        """
+        初始化检索结果缓存
+
+        Args:
+            ttl_seconds: 条目有效期（秒）
+            max_entries: 最大条目数
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        # {缓存键: (写入时间, 结果列表)}
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._epoch = get_index_epoch()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        logger.info(f"[SearchResultCache] 初始化完成: TTL={ttl_seconds}秒, 最大条目数={max_entries}")
+
+    @staticmethod
+    def make_key(
+        index_name: str,
+        method: str,
+        query_vector: List[float],
+        filters: Optional[Dict] = None,
+        top_k: Optional[int] = None,
+        **extra
+    ) -> str:
+        """
+        生成缓存键
+
+        Args:
+            index_name: 索引名称
+            method: 检索方法（search / search_multi_year / hybrid_search 等）
+            query_vector: 查询向量
+            filters: 过滤条件
+            top_k: 返回数量
+            **extra: 其他影响结果的参数（年份列表、稀疏权重等）
+        """
+        vector_bytes = np.asarray(query_vector, dtype=np.float16).tobytes()
+        params = json.dumps(
+            canonicalize_filter({"filters": filters or {}, "top_k": top_k, **extra}),
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str
+        )
+        digest = hashlib.sha256()
+        digest.update(f"{index_name}\x00{method}\x00".encode("utf-8"))
+        digest.update(vector_bytes)
+        digest.update(params.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """
+        查询缓存
+
+        Returns:
+            命中时返回结果副本，否则返回None
+        """
+        now = time.time()
+        with self._lock:
+            self._check_epoch()
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+
+        self._record(entry is not None)
+        return copy.deepcopy(entry[1]) if entry is not None else None
+
+    def put(self, key: str, results: List[Dict]):
+        """写入缓存"""
+        with self._lock:
+            self._check_epoch()
+            self._entries[key] = (time.time(), copy.deepcopy(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+        logger.info("[SearchResultCache] 缓存已清空")
+
+    def get_stats(self) -> Dict:
+        """获取缓存统计信息"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def _check_epoch(self):
+        """索引版本号变化时清空全部条目（调用方持有锁）"""
+        epoch = get_index_epoch()
+        if epoch != self._epoch:
+            count = len(self._entries)
+            self._entries.clear()
+            self._epoch = epoch
+            logger.info(f"[SearchResultCache] 索引版本号变化，清除{count}个条目")
+
+    def _record(self, hit: bool):
+        """上报命中情况（全局监控 + 当前请求统计）"""
+        get_performance_monitor().record_cache_access(self.MONITOR_NAME, hit=hit)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.record(hit)
+
+
+class CachedRetriever:
+    """
+    带结果缓存的检索器包装
+
+    接口与被包装的检索器（PineconeRetriever / LocalVectorRetriever）相同，
+    search / search_multi_year / search_multi_year_parallel / hybrid_search / search_grouped 走缓存，
+    不支持分组检索的检索器的多年份检索按年份逐个缓存（单个年份失败时不缓存部分结果），
+    其他属性和方法（index、get_stats、supports_hybrid等）直接转发
+    """
+
+    def __init__(self, retriever, cache: SearchResultCache):
+        """
+        Args:
+            retriever: 被包装的检索器
+            cache: 检索结果缓存
+        """
+        self.retriever = retriever
+        self.cache = cache
+        self.index_name = getattr(retriever, "index_name", "")
+
+    def __getattr__(self, name):
+        return getattr(self.retriever, name)
+
+    def search(
+        self,
+        query_vector: List[float],
+        limit: Optional[int] = None,
+        filters: Optional[Dict] = None,
+        include_metadata: bool = True
+    ) -> List[Dict[str, Any]]:
+        limit = limit or self.retriever.default_limit
+        key = self.cache.make_key(
+            self.index_name, "search", query_vector, filters, limit, include_metadata=include_metadata
+        )
+        return self._cached(key, lambda: self.retriever.search(
+            query_vector=query_vector, limit=limit, filters=filters, include_metadata=include_metadata
+        ))
+
+    def search_multi_year(
+        self,
+        query_vector: List[float],
+        years: List[str],
+        limit_per_year: int = 5,
+        other_filters: Optional[Dict] = None
+    ) -> List[Dict[str, Any]]:
+        # 分组检索一次为所有年份打分，失败时直接抛出异常，不会产生部分结果，整体缓存
+        if getattr(self.retriever, "supports_grouped_search", False):
+            key = self._multi_year_key(query_vector, years, limit_per_year, other_filters)
+            return self._cached(key, lambda: self.retriever.search_multi_year(
+                query_vector=query_vector, years=years, limit_per_year=limit_per_year, other_filters=other_filters
+            ))
+        return self._search_per_year(query_vector, years, limit_per_year, other_filters, max_workers=1)
+
+    def search_multi_year_parallel(
+        self,
+        query_vector: List[float],
+        years: List[str],
+        limit_per_year: int = 5,
+        other_filters: Optional[Dict] = None
+    ) -> List[Dict[str, Any]]:
+        # 与search_multi_year结果相同，共用缓存键
+        if getattr(self.retriever, "supports_grouped_search", False):
+            key = self._multi_year_key(query_vector, years, limit_per_year, other_filters)
+            return self._cached(key, lambda: self.retriever.search_multi_year_parallel(
+                query_vector=query_vector, years=years, limit_per_year=limit_per_year, other_filters=other_filters
+            ))
+        return self._search_per_year(query_vector, years, limit_per_year, other_filters, max_workers=20)
+
+    def hybrid_search(
+        self,
+        query_vector: List[float],
+        query_lexical_weights: Optional[Dict],
+        limit: Optional[int] = None,
+        filters: Optional[Dict] = None,
+        **kwargs
+    ) -> List[Dict[str, Any]]:
+        limit = limit or self.retriever.default_limit
+        lexical = sorted((int(t), round(float(w), 4)) for t, w in (query_lexical_weights or {}).items())
+        key = self.cache.make_key(
+            self.index_name, "hybrid_search", query_vector, filters, limit, lexical=lexical, **kwargs
+        )
+        return self._cached(key, lambda: self.retriever.hybrid_search(
+            query_vector=query_vector, query_lexical_weights=query_lexical_weights,
+            limit=limit, filters=filters, **kwargs
+        ))
+
+    def search_grouped(
+        self,
+        query_vectors: List[List[float]],
+        group_by: str = "year",
+        k_per_group: int = 5,
+        groups: Optional[List[str]] = None,
+        filters: Optional[Dict] = None
+    ) -> List[List[Dict[str, Any]]]:
+        # 按年份分组且指定年份时与search_multi_year结果相同，共用缓存键；
+        # 逐个查询向量查缓存，未命中的向量合并为一次分组检索
+        def make_key(query_vector):
+            if group_by == "year" and groups is not None:
+                return self.cache.make_key(
+                    self.index_name, "search_multi_year", query_vector, filters, k_per_group,
+                    years=[str(group) for group in groups]
+                )
+            return self.cache.make_key(
+                self.index_name, "search_grouped", query_vector, filters, k_per_group,
+                group_by=group_by, groups=[str(group) for group in groups] if groups is not None else None
+            )
+
+        keys = [make_key(query_vector) for query_vector in query_vectors]
+        results = [self.cache.get(key) for key in keys]
+        missing = [i for i, cached in enumerate(results) if cached is None]
+        if missing:
+            computed = self.retriever.search_grouped(
+                [query_vectors[i] for i in missing],
+                group_by=group_by, k_per_group=k_per_group, groups=groups, filters=filters
+            )
+            for i, query_results in zip(missing, computed):
+                self.cache.put(keys[i], query_results)
+                results[i] = query_results
+        return results
+
+    def _multi_year_key(self, query_vector, years, limit_per_year, other_filters) -> str:
+        """多年份检索的整体缓存键（与按年份分组的search_grouped共用）"""
+        return self.cache.make_key(
+            self.index_name, "search_multi_year", query_vector, other_filters, limit_per_year,
+            years=[str(year) for year in years]
+        )
+
+    def _search_per_year(
+        self,
+        query_vector: List[float],
+        years: List[str],
+        limit_per_year: int,
+        other_filters: Optional[Dict],
+        max_workers: int
+    ) -> List[Dict[str, Any]]:
+        """
+        逐年缓存的多年份检索（用于不支持分组检索的检索器，例如PineconeRetriever）
+
+        PineconeRetriever的多年份检索会吞掉单个年份的异常并返回部分结果，整体缓存会把
+        部分/空结果保存到TTL过期。这里每个年份是一次search（与search共用缓存键），
+        未命中的年份并行检索，只缓存成功的年份；失败的年份本次结果为空，下次重新检索
+        """
+        years = [str(year) for year in years]
+        per_year: Dict[str, List[Dict[str, Any]]] = {}
+        pending = []
+        for year in years:
+            filters = {**(other_filters or {}), "year": year}
+            key = self.cache.make_key(
+                self.index_name, "search", query_vector, filters, limit_per_year, include_metadata=True
+            )
+            cached = self.cache.get(key)
+            if cached is None:
+                pending.append((year, key, filters))
+            else:
+                per_year[year] = cached
+
+        def search_year(filters):
+            return self.retriever.search(
+                query_vector=query_vector, limit=limit_per_year, filters=filters, include_metadata=True
+            )
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=max(1, min(len(pending), max_workers))) as executor:
+                futures = {executor.submit(search_year, filters): (year, key) for year, key, filters in pending}
+                for future in as_completed(futures):
+                    year, key = futures[future]
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        logger.warning(f"[CachedRetriever] {year}年检索失败，该年份结果不写入缓存: {str(e)}")
+                        per_year[year] = []
+                        continue
+                    self.cache.put(key, results)
+                    per_year[year] = results
+
+        all_results = [result for year in years for result in per_year[year]]
+        all_results.sort(key=lambda x: x['score'], reverse=True)
+        return all_results
+
+    def _cached(self, key: str, compute) -> List[Dict[str, Any]]:
+        """查缓存，未命中时执行检索并写入"""
+        results = self.cache.get(key)
+        if results is None:
+            results = compute()
+            self.cache.put(key, results)
+        return results
+
+
+# 检索结果缓存单例
+_search_cache: Optional[SearchResultCache] = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_result_cache() -> Optional[SearchResultCache]:
+    """
+    获取检索结果缓存单例
+
+    Returns:
+        SearchResultCache实例；配置关闭时返回None
+    """
+    global _search_cache
+    from ..config import settings
+
+    if not settings.search_cache_enabled:
+        return None
+
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = SearchResultCache(
+                ttl_seconds=settings.search_cache_ttl_seconds,
+                max_entries=settings.search_cache_max_entries
+            )
+    return _search_cache
@@ -0,0 +1,146 @@
+"""
+BGE-M3稀疏倒排索引
+保存BGE-M3在编码时计算的词项权重（lexical weights），用于精确词项匹配
+
+BGE-M3的稀疏得分 = Σ 查询词权重 × 文档词权重（只对共同词项求和），
+因此只需按查询中的词项读取对应的倒排表即可，不需要扫描全部文档
+
+索引文件（与向量索引放在同一目录）:
+    sparse_terms.npy     # 排序后的词项ID (int32)
+    sparse_offsets.npy   # 每个词项倒排表在postings中的起始位置 (int64, 长度=词项数+1)
+    sparse_rows.npy      # 倒排表: 文档行号 (int32)
+    sparse_weights.npy   # 倒排表: 词项权重 (float16)
+"""
+
+from pathlib import Path
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+import numpy as np
+
+from ..utils.logger import logger
+
+
+SPARSE_FILES = ("sparse_terms.npy", "sparse_offsets.npy", "sparse_rows.npy", "sparse_weights.npy")
+
+
+class SparseInvertedIndex:
+    """
+    稀疏倒排索引（词项ID -> [(行号, 权重)]）
+
+    功能:
+    1. 从BGE-M3 lexical_weights构建紧凑的CSR格式倒排表
+    2. 内存映射加载，多进程共享页缓存
+    3. 按查询词项累加得分，支持行过滤掩码
+    """
+
+    def __init__(self, index_dir: str, count: int):
+        """
+        加载稀疏索引
+
+        Args:
+            index_dir: 索引目录
+            count: 文档总数（与向量索引行数一致）
+        """
+        index_dir = Path(index_dir)
+        self.count = count
+        self.terms = np.load(index_dir / "sparse_terms.npy", mmap_mode='r')
+        self.offsets = np.load(index_dir / "sparse_offsets.npy", mmap_mode='r')
+        self.rows = np.load(index_dir / "sparse_rows.npy", mmap_mode='r')
+        self.weights = np.load(index_dir / "sparse_weights.npy", mmap_mode='r')
+
+        logger.info(
+            f"[SparseInvertedIndex] 加载完成: 词项数={len(self.terms):,}, 倒排条目数={len(self.rows):,}"
+        )
+
+    @staticmethod
+    def exists(index_dir: str) -> bool:
+        """索引目录中是否存在稀疏索引"""
+        return all((Path(index_dir) / name).exists() for name in SPARSE_FILES)
+
+    @staticmethod
+    def build(index_dir: str, lexical_weights: Iterable[Optional[Mapping]]) -> int:
+        """
+        构建稀疏倒排索引
+
+        Args:
+            index_dir: 输出目录
+            lexical_weights: 按行顺序排列的词项权重 {词项ID: 权重}（BGE-M3输出的键为字符串）
+
+        Returns:
+            倒排条目总数
+        """
+        term_parts, row_parts, weight_parts = [], [], []
+        for row, weights in enumerate(lexical_weights):
+            if not weights:
+                continue
+            term_parts.append(np.fromiter((int(t) for t in weights.keys()), dtype=np.int32, count=len(weights)))
+            weight_parts.append(np.fromiter((float(w) for w in weights.values()), dtype=np.float32, count=len(weights)))
+            row_parts.append(np.full(len(weights), row, dtype=np.int32))
+
+        if term_parts:
+            term_ids = np.concatenate(term_parts)
+            rows = np.concatenate(row_parts)
+            weights = np.concatenate(weight_parts)
+        else:
+            term_ids = np.empty(0, dtype=np.int32)
+            rows = np.empty(0, dtype=np.int32)
+            weights = np.empty(0, dtype=np.float32)
+
+        # 按(词项, 行号)排序，得到CSR格式倒排表
+        order = np.lexsort((rows, term_ids))
+        term_ids, rows, weights = term_ids[order], rows[order], weights[order]
+
+        unique_terms, starts = np.unique(term_ids, return_index=True)
+        offsets = np.append(starts, len(term_ids)).astype(np.int64)
+
+        out_dir = Path(index_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        np.save(out_dir / "sparse_terms.npy", unique_terms.astype(np.int32))
+        np.save(out_dir / "sparse_offsets.npy", offsets)
+        np.save(out_dir / "sparse_rows.npy", rows)
+        np.save(out_dir / "sparse_weights.npy", weights.astype(np.float16))
+
+        logger.info(
+            f"[SparseInvertedIndex] 构建完成: 词项数={len(unique_terms):,}, 倒排条目数={len(rows):,}"
+        )
+        return int(len(rows))
+
+    def postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        获取词项的倒排表
+
+        Returns:
+            (行号数组, 权重数组)，词项不存在时返回空数组
+        """
+        pos = int(np.searchsorted(self.terms, term_id))
+        if pos >= len(self.terms) or int(self.terms[pos]) != term_id:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float16)
+        start, end = int(self.offsets[pos]), int(self.offsets[pos + 1])
+        return self.rows[start:end], self.weights[start:end]
+
+    def score(self, query_weights: Mapping, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        计算全部文档的稀疏得分
+
+        Args:
+            query_weights: 查询词项权重 {词项ID: 权重}
+            mask: 行过滤掩码（False的行得分置0）
+
+        Returns:
+            长度为count的得分数组（无共同词项的文档为0）
+        """
+        scores = np.zeros(self.count, dtype=np.float32)
+        for term_id, query_weight in query_weights.items():
+            rows, weights = self.postings(int(term_id))
+            if len(rows):
+                np.add.at(scores, rows, weights.astype(np.float32) * float(query_weight))
+        if mask is not None:
+            scores[~mask] = 0.0
+        return scores
+
+
+def lexical_weights_to_dict(weights: Optional[Mapping]) -> Dict[int, float]:
+    """将BGE-M3输出的 {"token_id": np.float} 转换为 {int: float}（可JSON序列化、可跨进程传递）"""
+    if not weights:
+        return {}
+    return {int(term_id): float(weight) for term_id, weight in weights.items()}
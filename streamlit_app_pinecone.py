@@ -142,23 +142,19 @@ def run_complete_workflow_with_progress(question: str, enable_rerank: bool = Tru
         with progress_container.container():
             update_progress(st, "初始化系统", "running", "加载模型和配置...")
 
-        from src.llm.embeddings import GeminiEmbeddingClient
-        from src.llm.client import GeminiLLMClient
-        from pinecone import Pinecone
+        from src.resources import get_embedding_client, get_llm_client, get_vector_retriever
         import requests
 
-        # 初始化组件
-        embedding_client = GeminiEmbeddingClient(
+        # 获取共享组件（首次提问时加载，之后的问题直接复用BGE-M3模型和Pinecone连接）
+        embedding_client = get_embedding_client(
             embedding_mode="local",
             model_name="BAAI/bge-m3",
             dimensions=1024
         )
 
-        api_key = os.getenv("PINECONE_VECTOR_DATABASE_API_KEY")
-        pc = Pinecone(api_key=api_key)
-        index = pc.Index("german-bge")
+        index = get_vector_retriever(index_name="german-bge", backend="pinecone").index
 
-        llm = GeminiLLMClient(temperature=0.0)
+        llm = get_llm_client(temperature=0.0)
 
         cohere_api_key = os.getenv("COHERE_API_KEY")
 
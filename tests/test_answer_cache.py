@@ -0,0 +1,146 @@
+"""
+语义答案缓存测试
+验证参数签名、相似度阈值、TTL/索引版本号失效以及缓存节点路由（不需要LLM和Embedding服务）
+"""
+
+import sys
+import os
+import tempfile
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import settings
+from src.graph.answer_cache import SemanticAnswerCache, parameter_signature
+from src.graph.nodes.answer_cache import AnswerCacheLookupNode, AnswerCacheStoreNode
+from src.graph.state import create_initial_state, update_state
+from src.vectordb.index_epoch import bump_index_epoch
+
+
+class FakeEmbeddingClient:
+    """按问题文本返回固定向量"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_text(self, text):
+        return self.vectors[text]
+
+
+def _extracted(question, years, parties, speakers=(), question_type="事实查询", deep_thinking_mode=False):
+    """模拟经过Extract节点的状态"""
+    return update_state(
+        create_initial_state(question, deep_thinking_mode=deep_thinking_mode),
+        question_type=question_type,
+        parameters={
+            "time_range": {"start_year": None, "end_year": None, "specific_years": list(years)},
+            "parties": list(parties),
+            "speakers": list(speakers),
+            "topics": ["数字化"],
+            "keywords": []
+        },
+        is_decomposed=False
+    )
+
+
+def test_parameter_signature():
+    """测试1: 签名来自Extract提取的参数（年份、党派、发言人），与问题措辞和列表顺序无关"""
+    print("\n【测试1: 参数签名】")
+
+    signature = parameter_signature(_extracted("2019年CDU和Grünen的立场?", ["2019"], ["Grüne", "CDU/CSU"]))
+    assert signature == (("2019",), ("CDU/CSU", "Grüne"), (), "事实查询", False)
+
+    # 措辞不同（中文别名/德文）但提取结果一致 -> 签名相同
+    assert parameter_signature(_extracted("基民盟在2019年的立场", ["2019"], ["CDU/CSU"])) == \
+        parameter_signature(_extracted("CSU 2019 Position", ["2019"], ["CDU/CSU"]))
+    assert parameter_signature(_extracted("2017年AfD的观点", ["2017"], ["AfD"])) != \
+        parameter_signature(_extracted("2019年AfD的观点", ["2019"], ["AfD"]))
+
+    # 没有具体年份时使用起止年份；深度模式参与签名
+    state = _extracted("2015到2018年AfD的变化", [], ["AfD"], question_type="变化类", deep_thinking_mode=True)
+    state["parameters"]["time_range"].update(start_year="2015", end_year="2018")
+    assert parameter_signature(state) == (("2015", "2018"), ("AfD",), (), "变化类", True)
+    assert parameter_signature(create_initial_state("问题")) == ((), (), (), "", False)
+    print("✅ 参数签名正确")
+
+
+def test_threshold_signature_and_expiry():
+    """测试2: 相似度阈值、参数不一致、TTL过期和索引版本号失效"""
+    print("\n【测试2: 命中条件与失效】")
+
+    afd_2019 = parameter_signature(_extracted("2019年AfD的难民政策立场?", ["2019"], ["AfD"]))
+    afd_2017 = parameter_signature(_extracted("2017年AfD的难民政策立场?", ["2017"], ["AfD"]))
+
+    original_path = settings.index_epoch_path
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        settings.index_epoch_path = os.path.join(tmp_dir, "index_epoch")
+        try:
+            cache = SemanticAnswerCache(similarity_threshold=0.95, ttl_seconds=60, max_entries=10)
+            cache.store("2019年AfD的难民政策立场?", [1.0, 0.0], {"final_answer": "A"}, afd_2019)
+
+            state, hit_info = cache.lookup("2019年AfD在难民政策上的立场?", [0.99, 0.05], afd_2019)
+            assert state["final_answer"] == "A"
+            assert hit_info["similarity"] >= 0.95
+
+            # 参数不同（年份），即使向量完全相同也不命中
+            assert cache.lookup("2017年AfD的难民政策立场?", [1.0, 0.0], afd_2017) is None
+            # 相似度低于阈值
+            assert cache.lookup("2019年AfD的难民政策立场?", [0.5, 0.5], afd_2019) is None
+
+            # 索引重建后失效
+            bump_index_epoch("测试")
+            assert cache.lookup("2019年AfD的难民政策立场?", [1.0, 0.0], afd_2019) is None
+            assert cache.get_stats()["entries"] == 0
+
+            # TTL过期
+            cache.store("2019年AfD的难民政策立场?", [1.0, 0.0], {"final_answer": "B"}, afd_2019)
+            cache._entries[next(iter(cache._entries))]["created_at"] = time.time() - 120
+            assert cache.lookup("2019年AfD的难民政策立场?", [1.0, 0.0], afd_2019) is None
+        finally:
+            settings.index_epoch_path = original_path
+    print("✅ 命中条件与失效正确")
+
+
+def test_lookup_and_store_nodes():
+    """测试3: 写入节点缓存成功答案，查询节点按提取的参数命中后替换问题并标记命中，未命中时路由到检索"""
+    print("\n【测试3: 缓存节点】")
+
+    embedding_client = FakeEmbeddingClient({
+        "2020年SPD的数字化政策?": [1.0, 0.0],
+        "社民党去年的数字化政策是什么?": [0.99, 0.02],
+        "2020年FDP的数字化政策?": [1.0, 0.0],
+    })
+    cache = SemanticAnswerCache(similarity_threshold=0.95)
+    lookup_node = AnswerCacheLookupNode(embedding_client=embedding_client, cache=cache)
+    store_node = AnswerCacheStoreNode(embedding_client=embedding_client, cache=cache)
+
+    # 未命中 -> 继续正常流程（不需要拆解时进入Retrieve）
+    state = lookup_node(_extracted("2020年SPD的数字化政策?", ["2020"], ["SPD"]))
+    assert state["metadata"]["answer_cache"] == {"hit": False}
+    assert state["next_node"] == "retrieve"
+
+    # 有错误的状态不缓存
+    store_node(update_state(state, final_answer="X", error="LLM错误"))
+    assert cache.get_stats()["entries"] == 0
+
+    store_node(update_state(state, final_answer="SPD的答案"))
+    assert cache.get_stats()["entries"] == 1
+
+    # 问题中没有年份和党派名称，但提取出的参数一致 -> 命中
+    hit_state = lookup_node(_extracted("社民党去年的数字化政策是什么?", ["2020"], ["SPD"]))
+    assert hit_state["metadata"]["answer_cache"]["hit"] is True
+    assert hit_state["final_answer"] == "SPD的答案"
+    assert hit_state["question"] == "社民党去年的数字化政策是什么?"
+
+    miss_state = lookup_node(_extracted("2020年FDP的数字化政策?", ["2020"], ["FDP"]))
+    assert miss_state["metadata"]["answer_cache"]["hit"] is False
+
+    decomposed = update_state(_extracted("2020年FDP的数字化政策?", ["2020"], ["FDP"]), is_decomposed=True)
+    assert lookup_node(decomposed)["next_node"] == "decompose"
+    print("✅ 缓存节点正确")
+
+
+if __name__ == "__main__":
+    test_parameter_signature()
+    test_threshold_signature_and_expiry()
+    test_lookup_and_store_nodes()
+    print("\n🎉 所有测试通过！")
@@ -0,0 +1,152 @@
+"""
+Embedding产物存储测试
+验证按年份分区写入/读取、float16向量零拷贝视图，以及从产物导入本地索引和Pinecone/Milvus（假对象，不需要向量库）
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src.config import settings
+from src.vectordb.artifact_store import (
+    EmbeddingArtifactStore, export_to_local_index, export_to_milvus, export_to_pinecone
+)
+from src.vectordb.index_epoch import get_index_epoch
+from src.vectordb.local_retriever import LocalVectorRetriever
+
+
+def _records(year, n, dim=8, seed=0, sparse=False):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    records = [
+        {
+            "id": f"{year}_{i}",
+            "chunk_key": f"ID{year}{i}#0",
+            "text": f"Rede {year} Nummer {i}",
+            "metadata": {"year": year, "speaker": f"Redner {i % 3}", "group": "SPD", "chunk_id": 0},
+            "vector": vectors[i]
+        }
+        for i in range(n)
+    ]
+    if sparse:
+        for i, record in enumerate(records):
+            record["lexical_weights"] = {1000 + i: 0.5, 7: 0.125}
+    return records, vectors
+
+
+def test_write_and_read():
+    """测试1: 分区写入与读取；向量为float16零拷贝视图；替换年份与模型校验"""
+    print("\n【测试1: 写入与读取】")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = EmbeddingArtifactStore(tmp_dir, model_name="BAAI/bge-m3", part_rows=40)
+        records_2019, vectors_2019 = _records("2019", 100)
+        records_2020, _ = _records("2020", 30, seed=1)
+
+        assert store.write_year("2019", records_2019) == 100
+        assert store.append("2020", records_2020[:20]) == 20
+        assert store.append("2020", records_2020[20:]) == 10
+        assert store.years() == ["2019", "2020"]
+        assert store.count("2019") == 100 and store.count() == 130
+        assert len(list((store.root_dir / "year=2019").glob("part-*.arrow"))) == 3
+
+        batches = list(store.iter_batches(years=["2019"], batch_size=25))
+        assert [len(b) for b in batches] == [25, 15, 25, 15, 20]
+        assert batches[0].vectors.dtype == np.float16
+        assert not batches[0].vectors.flags.owndata
+
+        loaded = store.load_year("2019")
+        assert loaded.ids == [r["id"] for r in records_2019]
+        assert loaded.metadatas[5] == records_2019[5]["metadata"]
+        np.testing.assert_allclose(loaded.vectors.astype(np.float32), vectors_2019, atol=1e-2)
+
+        # 替换年份
+        store.write_year("2019", records_2019[:10])
+        assert store.count("2019") == 10
+
+        # 重新打开: 维度与模型信息保留，模型不一致时拒绝
+        reopened = EmbeddingArtifactStore(tmp_dir)
+        assert reopened.dimension == 8 and reopened.info["model_name"] == "BAAI/bge-m3"
+        with pytest.raises(ValueError):
+            EmbeddingArtifactStore(tmp_dir, model_name="other-model")
+    print("✅ 写入与读取正确")
+
+
+class FakePineconeIndex:
+    def __init__(self):
+        self.vectors = {}
+
+    def upsert(self, vectors):
+        for vector in vectors:
+            self.vectors[vector["id"]] = vector
+
+
+class FakeMilvusManager:
+    def __init__(self):
+        self.chunks = []
+
+    def insert_data(self, chunks, batch_size=5000):
+        self.chunks.extend(chunks)
+        return list(range(len(chunks)))
+
+
+def test_exporters():
+    """测试2: 从产物导入本地索引/Pinecone/Milvus，不调用Embedding；导入向量库后索引版本号递增"""
+    print("\n【测试2: 导出】")
+
+    original_path = settings.index_epoch_path
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        settings.index_epoch_path = os.path.join(tmp_dir, "index_epoch")
+        try:
+            store = EmbeddingArtifactStore(os.path.join(tmp_dir, "artifacts"))
+            records, vectors = _records("2019", 50)
+            store.write_year("2019", records)
+            store.write_year("2020", _records("2020", 20, seed=2)[0])
+
+            index_dir = os.path.join(tmp_dir, "index")
+            assert export_to_local_index(store, index_dir, years=["2019"]) == 50
+            retriever = LocalVectorRetriever(index_dir)
+            results = retriever.search(vectors[7].tolist(), limit=1)
+            assert results[0]["id"] == "2019_7"
+            assert results[0]["metadata"]["text"] == "Rede 2019 Nummer 7"
+            assert not retriever.supports_hybrid
+
+            # 带稀疏词项权重的产物: 导入本地索引时构建稀疏倒排索引
+            sparse_store = EmbeddingArtifactStore(os.path.join(tmp_dir, "sparse-artifacts"), part_rows=16)
+            sparse_records, _ = _records("2021", 40, seed=3, sparse=True)
+            sparse_store.write_year("2021", sparse_records)
+            assert sparse_store.load_year("2021").lexical_weights[5] == {1005: 0.5, 7: 0.125}
+            sparse_dir = os.path.join(tmp_dir, "sparse-index")
+            assert export_to_local_index(sparse_store, sparse_dir) == 40
+            sparse_retriever = LocalVectorRetriever(sparse_dir)
+            assert sparse_retriever.supports_hybrid
+            hits = sparse_retriever.hybrid_search(vectors[0].tolist(), {1023: 1.0}, limit=3, sparse_weight=10.0)
+            assert hits[0]["id"] == "2021_23"
+
+            index = FakePineconeIndex()
+            epoch = get_index_epoch()
+            assert export_to_pinecone(store, index, batch_size=16) == 70
+            assert len(index.vectors["2020_3"]["values"]) == 8
+            assert index.vectors["2019_1"]["metadata"]["speaker"] == "Redner 1"
+            assert get_index_epoch() != epoch
+
+            manager = FakeMilvusManager()
+            epoch = get_index_epoch()
+            assert export_to_milvus(store, manager, years=["2020"]) == 20
+            assert manager.chunks[0]["metadata"]["year"] == "2020"
+            assert get_index_epoch() != epoch
+        finally:
+            settings.index_epoch_path = original_path
+    print("✅ 导出正确")
+
+
+if __name__ == "__main__":
+    test_write_and_read()
+    test_exporters()
+    print("\n🎉 所有测试通过！")
@@ -0,0 +1,136 @@
+"""
+异步工作流测试
+验证节点异步实现、QuestionAnswerWorkflow.arun以及API在同一事件循环中并发处理问题（不需要LLM和检索服务）
+"""
+
+import sys
+import os
+import asyncio
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.graph.nodes.summarize_incremental_v2 import IncrementalSummarizeNodeV2
+from src.graph.state import update_state
+from src.graph.workflow import QuestionAnswerWorkflow
+
+
+class FakeAsyncLLM:
+    """ainvoke异步等待后返回，记录最大并发数"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+
+    def invoke(self, prompt):
+        raise AssertionError("异步路径不应调用同步invoke")
+
+    async def ainvoke(self, prompt):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        for marker in ("Q1", "Q2", "Q3", "Q4"):
+            if f"问题：{marker}" in prompt or f"问题: {marker}" in prompt:
+                return '{"answer": "%s"}' % marker
+        return "Antwort"
+
+
+def _results(n):
+    return [
+        {"question": f"Q{i}", "chunks": [{"text": f"Rede {i}", "metadata": {"year": "2020"}, "score": 0.9}]}
+        for i in range(1, n + 1)
+    ]
+
+
+def test_summarize_acall():
+    """测试1: 总结节点异步实现使用ainvoke，并发受限且顺序不变"""
+    print("\n【测试1: 总结节点异步实现】")
+
+    llm = FakeAsyncLLM()
+    node = IncrementalSummarizeNodeV2(llm_client=llm, max_concurrency=2)
+
+    extracted = asyncio.run(node._aextract_structured_info("Frage", _results(4)))
+    assert [item["sub_question"] for item in extracted] == ["Q1", "Q2", "Q3", "Q4"]
+    assert llm.max_active == 2
+
+    state = asyncio.run(node.acall({"question": "Frage", "question_type": "事实查询", "retrieval_results": _results(2)}))
+    assert state["final_answer"] and not state.get("error")
+    print("✅ 总结节点异步实现正确")
+
+
+class SlowAsyncNode:
+    """同步和异步实现返回不同标记，用于确认ainvoke走acall"""
+
+    def __call__(self, state):
+        return update_state(state, final_answer="sync")
+
+    async def acall(self, state):
+        await asyncio.sleep(0.2)
+        return update_state(state, final_answer="async")
+
+
+def _fake_workflow():
+    workflow = QuestionAnswerWorkflow.__new__(QuestionAnswerWorkflow)
+    passthrough = lambda state: update_state(state)
+    workflow.answer_cache_node = lambda state: update_state(state, metadata={"answer_cache": {"hit": False}})
+    workflow.intent_node = lambda state: update_state(state, intent="simple")
+    workflow.classify_node = passthrough
+    workflow.extract_node = lambda state: update_state(state, is_decomposed=False)
+    workflow.decompose_node = passthrough
+    workflow.retrieve_node = lambda state: update_state(state, no_material_found=False)
+    workflow.summarize_node = SlowAsyncNode()
+    workflow.exception_node = passthrough
+    workflow.answer_cache_store_node = passthrough
+    workflow.graph = workflow._build_graph()
+    return workflow
+
+
+def test_arun_uses_async_nodes_concurrently():
+    """测试2: arun走异步实现，多个问题在同一事件循环中并发执行"""
+    print("\n【测试2: arun并发】")
+
+    workflow = _fake_workflow()
+    assert workflow.graph.invoke({"question": "q", "metadata": {}})["final_answer"] == "sync"
+
+    async def run_many():
+        return await asyncio.gather(*(workflow.arun(f"Frage {i}") for i in range(8)))
+
+    start = time.time()
+    states = asyncio.run(run_many())
+    elapsed = time.time() - start
+
+    assert [state["final_answer"] for state in states] == ["async"] * 8
+    # 8个问题各等待0.2秒，并发执行总耗时应远小于1.6秒
+    assert elapsed < 1.0
+    print(f"✅ 8个问题并发完成，耗时 {elapsed:.2f}秒")
+
+
+def test_api_ask_uses_arun():
+    """测试3: /api/v1/ask 通过arun处理问题"""
+    print("\n【测试3: API异步问答】")
+
+    try:
+        from fastapi.testclient import TestClient
+    except ImportError:
+        print("⚠️ 未安装fastapi，跳过")
+        return
+
+    import api_server
+
+    api_server.workflow = _fake_workflow()
+    try:
+        response = TestClient(api_server.app).post("/api/v1/ask", json={"question": "SPD 2020?"})
+    finally:
+        api_server.workflow = None
+
+    assert response.status_code == 200
+    assert response.json()["answer"] == "async"
+    print("✅ API异步问答正确")
+
+
+if __name__ == "__main__":
+    test_summarize_acall()
+    test_arun_uses_async_nodes_concurrently()
+    test_api_ask_uses_arun()
+    print("\n🎉 所有测试通过！")
@@ -0,0 +1,104 @@
+"""
+向量库批量写入器测试
+验证并发在途请求、按字节数切分批次、AIMD批次大小调整以及失败重试（使用本地假存储，不需要向量库）
+"""
+
+import sys
+import os
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.vectordb.bulk_writer import BulkWriter, estimate_payload_bytes
+
+
+class FakeStore:
+    """
+    假向量库: 每次请求固定延迟；批次超过max_batch条时拒绝（模拟请求体过大）；
+    id在broken_ids中的记录总是失败
+    """
+
+    def __init__(self, latency=0.02, max_batch=None, broken_ids=()):
+        self.latency = latency
+        self.max_batch = max_batch
+        self.broken_ids = set(broken_ids)
+        self.vectors = {}
+        self.batch_sizes = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def upsert(self, batch):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            if self.max_batch is not None and len(batch) > self.max_batch:
+                raise RuntimeError("request payload too large")
+            if any(item["id"] in self.broken_ids for item in batch):
+                raise RuntimeError("invalid vector")
+            with self.lock:
+                self.batch_sizes.append(len(batch))
+                for item in batch:
+                    self.vectors[item["id"]] = item
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def _items(n, dim=4):
+    return ({"id": f"v{i}", "values": [0.1] * dim, "metadata": {"text": "x"}} for i in range(n))
+
+
+def test_concurrency_and_byte_limit():
+    """测试1: 多个请求同时在途；批次不超过字节上限；全部记录恰好写入一次"""
+    print("\n【测试1: 并发与字节上限】")
+
+    store = FakeStore(latency=0.02)
+    writer = BulkWriter(
+        store.upsert, max_in_flight=4, initial_batch_size=50, max_batch_size=50,
+        max_payload_bytes=10 * 100, size_of=lambda item: 100
+    )
+    written = []
+    report = writer.write(_items(400), on_batch_written=lambda batch: written.extend(item["id"] for item in batch))
+
+    assert report.written == 400 and report.failed == 0
+    assert sorted(written) == sorted(store.vectors) and len(store.vectors) == 400
+    assert max(store.batch_sizes) <= 10
+    assert 1 < store.max_in_flight <= 4
+    # 40个请求 × 20ms 串行需要0.8秒
+    assert report.elapsed < 0.5
+    assert report.vectors_per_second > 0 and report.to_dict()["requests"] == 40
+    assert estimate_payload_bytes({"id": "a", "values": [0.0] * 1024}) > 12 * 1024
+    print(f"✅ {report.vectors_per_second:.0f} 向量/秒, 最大在途 {store.max_in_flight}")
+
+
+def test_aimd_and_retries():
+    """测试2: 请求过大时减半重试并最终成功；快速成功时批次增大；无法写入的记录重试耗尽后报告"""
+    print("\n【测试2: AIMD与重试】")
+
+    store = FakeStore(latency=0.0, max_batch=30)
+    writer = BulkWriter(store.upsert, max_in_flight=2, initial_batch_size=200, max_batch_size=400, retry_backoff=0)
+    report = writer.write(_items(500))
+    assert report.written == 500 and report.failed == 0 and report.retries > 0
+    assert len(store.vectors) == 500
+    assert report.final_batch_size <= 60
+
+    store = FakeStore(latency=0.0)
+    writer = BulkWriter(store.upsert, max_in_flight=1, initial_batch_size=10, max_batch_size=40, increase_step=5)
+    writer.write(_items(300))
+    assert store.batch_sizes[0] == 10 and max(store.batch_sizes) == 40
+
+    store = FakeStore(latency=0.0, broken_ids={"v7"})
+    writer = BulkWriter(store.upsert, max_in_flight=2, initial_batch_size=8, max_retries=3, retry_backoff=0)
+    report = writer.write(_items(64))
+    assert [item["id"] for item in report.failed_items] == ["v7"]
+    assert report.failed == 1 and report.written == 63 and "v7" not in store.vectors
+    print("✅ AIMD与重试正确")
+
+
+if __name__ == "__main__":
+    test_concurrency_and_byte_limit()
+    test_aimd_and_retries()
+    print("\n🎉 所有测试通过！")
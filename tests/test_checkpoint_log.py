@@ -0,0 +1,91 @@
+"""
+迁移检查点日志测试
+验证重启后从第一个未确认的批次继续、崩溃留下的半行被忽略，以及指纹变化时丢弃旧记录
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_loader.checkpoint import CheckpointLog, fingerprint
+
+
+def _migrate(log, scope, total, batch_size, fp, fail_at=None):
+    """模拟迁移循环，返回本次处理的批次起点；fail_at处模拟中断"""
+    processed = []
+    start = log.begin(scope, fingerprint=fp)
+    for i in range(start, total, batch_size):
+        end = min(i + batch_size, total)
+        if log.is_acknowledged(scope, i, end):
+            continue
+        if i == fail_at:
+            return processed
+        processed.append(i)
+        log.acknowledge(scope, i, end, vectors=end - i)
+    log.complete(scope)
+    return processed
+
+
+def test_resume_after_crash():
+    """测试1: 中断后重启跳过已确认的批次；写了一半的记录被忽略"""
+    print("\n【测试1: 中断恢复】")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "checkpoint.jsonl")
+        fp = fingerprint("pp_2019.json", 123, 4000, 800)
+
+        log = CheckpointLog(path)
+        assert _migrate(log, "2019", 1000, 100, fp, fail_at=600) == [0, 100, 200, 300, 400, 500]
+        assert log.in_progress("2019") and not log.is_complete("2019")
+        log.close()
+
+        # 模拟崩溃时写了一半的确认记录
+        with open(path, "ab") as f:
+            f.write(b'{"type": "ack", "scope": "2019", "sta')
+
+        log = CheckpointLog(path)
+        assert log.first_unacknowledged("2019") == 600
+        assert _migrate(log, "2019", 1000, 100, fp) == [600, 700, 800, 900]
+        assert log.is_complete("2019")
+        log.close()
+
+        # 再次打开: 半行之后的记录仍然有效
+        log = CheckpointLog(path)
+        assert log.is_complete("2019") and log.acknowledged_count("2019") == 1000
+        log.close()
+    print("✅ 中断恢复正确")
+
+
+def test_fingerprint_and_gaps():
+    """测试2: 指纹变化或不恢复时从头开始；中间失败的批次在重启后补写"""
+    print("\n【测试2: 指纹与空洞】")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "checkpoint.jsonl")
+        log = CheckpointLog(path)
+        log.begin("2020", fingerprint="a")
+        for start in (0, 100, 300):  # 200-300 上传失败
+            log.acknowledge("2020", start, start + 100)
+        log.close()
+
+        log = CheckpointLog(path)
+        assert log.begin("2020", fingerprint="a") == 200
+        assert not log.is_acknowledged("2020", 200, 300)
+        assert log.is_acknowledged("2020", 300, 400)
+        assert _migrate(log, "2020", 400, 100, "a") == [200]
+
+        assert log.begin("2020", fingerprint="b") == 0
+        assert log.acknowledged_count("2020") == 0
+        log.acknowledge("2020", 0, 100)
+        assert log.begin("2020", fingerprint="b", resume=False) == 0
+        log.close()
+
+        assert CheckpointLog(path).acknowledged_count("2020") == 0
+    print("✅ 指纹与空洞处理正确")
+
+
+if __name__ == "__main__":
+    test_resume_after_crash()
+    test_fingerprint_and_gaps()
+    print("\n🎉 所有测试通过！")
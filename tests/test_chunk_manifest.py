@@ -0,0 +1,179 @@
+"""
+增量索引清单测试
+验证首次构建全部写入、重建时只处理新增/变化的chunk、孤儿向量检测、模型/分块参数变化触发重新embedding，
+只有元数据变化时不重新embedding，以及索引工具共用的chunk键和向量库元数据
+"""
+
+import sys
+import os
+import sqlite3
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_loader.manifest import ChunkManifest, build_chunk, chunk_payload, make_chunk_key
+
+
+PARAMS = {"chunk_size": 4000, "chunk_overlap": 800}
+MODEL = "BAAI/bge-m3"
+
+
+def _chunks(texts, year="2019"):
+    """{演讲ID: [chunk文本]} -> manifest输入格式"""
+    return [
+        {"chunk_key": make_chunk_key(text_id, j), "year": year, "text": text}
+        for text_id, chunk_texts in texts.items()
+        for j, text in enumerate(chunk_texts)
+    ]
+
+
+def test_incremental_rebuild():
+    """测试1: 首次全部写入；重建时只处理变化的chunk，删除孤儿，向量ID保持不变"""
+    print("\n【测试1: 增量重建】")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manifest = ChunkManifest(os.path.join(tmp_dir, "manifest.sqlite"), index_name="german-bge")
+        first = {"ID191": ["Rede A1", "Rede A2"], "ID192": ["Rede B1"], "ID193": ["Rede C1"]}
+
+        plan = manifest.plan(_chunks(first), PARAMS, MODEL)
+        assert plan.summary() == {"to_embed": 4, "metadata_only": 0, "unchanged": 0, "orphaned": 0}
+        assert all(c["vector_id"].startswith("2019_") for c in plan.to_embed)
+        ids = {c["chunk_key"]: c["vector_id"] for c in plan.to_embed}
+        manifest.commit(plan.to_embed)
+        assert manifest.count("2019") == 4
+        # 清单中的向量ID（用于找出索引中清单之外的旧版向量）
+        assert manifest.vector_ids("2019") == set(ids.values())
+        assert manifest.vector_ids("2015") == set()
+
+        # 相同数据: 没有任何工作
+        assert manifest.plan(_chunks(first), PARAMS, MODEL).is_empty
+
+        # ID191第2块修改、ID193删除、新增ID194
+        second = {"ID191": ["Rede A1", "Rede A2 korrigiert"], "ID192": ["Rede B1"], "ID194": ["Rede D1"]}
+        plan = manifest.plan(_chunks(second), PARAMS, MODEL)
+        assert sorted(c["chunk_key"] for c in plan.to_embed) == ["ID191#1", "ID194#0"]
+        assert plan.unchanged == 2
+        assert plan.orphaned_ids == [ids["ID193#0"]]
+        # 内容变化的chunk沿用原向量ID
+        changed = next(c for c in plan.to_embed if c["chunk_key"] == "ID191#1")
+        assert changed["vector_id"] == ids["ID191#1"]
+
+        manifest.commit(plan.to_embed)
+        manifest.remove(plan.orphaned_ids)
+        assert manifest.plan(_chunks(second), PARAMS, MODEL).is_empty
+        assert manifest.count("2019") == 4
+        manifest.close()
+    print("✅ 增量重建正确")
+
+
+def test_scope_and_hash_inputs():
+    """测试2: 孤儿只在本次年份内查找；模型或分块参数变化时全部重新embedding；不同索引互不影响"""
+    print("\n【测试2: 范围与哈希输入】")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "manifest.sqlite")
+        manifest = ChunkManifest(path, index_name="german-bge")
+        manifest.commit(manifest.plan(_chunks({"ID151": ["Rede 2015"]}, year="2015"), PARAMS, MODEL).to_embed)
+        manifest.commit(manifest.plan(_chunks({"ID191": ["Rede 2019"]}), PARAMS, MODEL).to_embed)
+
+        # 只处理2019年时，2015年的条目不算孤儿
+        plan = manifest.plan(_chunks({"ID191": ["Rede 2019"]}), PARAMS, MODEL, years=["2019"])
+        assert plan.is_empty
+
+        assert len(manifest.plan(_chunks({"ID191": ["Rede 2019"]}), PARAMS, "other-model").to_embed) == 1
+        assert len(manifest.plan(_chunks({"ID191": ["Rede 2019"]}), {**PARAMS, "chunk_size": 1000}, MODEL).to_embed) == 1
+
+        # 持久化并按索引隔离
+        manifest.close()
+        reopened = ChunkManifest(path, index_name="german-bge")
+        assert reopened.count() == 2
+        assert ChunkManifest(path, index_name="local").count() == 0
+        reopened.close()
+    print("✅ 范围与哈希输入正确")
+
+
+def test_shared_chunk_and_payload():
+    """测试3: chunk键取transcript的text_id，文本去除首尾空白，元数据包含引用和修补元数据需要的字段"""
+    print("\n【测试3: 共用的chunk键与元数据】")
+
+    metadata = {"text_id": "pp_19_100_00001", "id": "ID19100", "year": "2019", "month": "03", "day": "14",
+                "speaker": "Redner", "group": "SPD", "session": "100", "lp": "19", "file": "pp_2019.json",
+                "chunk_id": 2, "total_chunks": 3, "chunk_size": 12}
+    chunk = build_chunk({"text": "  Rede Teil 3 \n", "metadata": metadata})
+
+    assert chunk["chunk_key"] == "pp_19_100_00001#2" and chunk["year"] == "2019"
+    assert chunk["text"] == "Rede Teil 3" and chunk["metadata"]["chunk_size"] == len("Rede Teil 3")
+    assert chunk["metadata"]["source_reference"] == "ID19100 | Redner | 2019-03-14"
+    assert "file" not in chunk["metadata"]
+
+    payload = chunk_payload({**chunk, "text": "x" * 1200}, max_text_chars=1000)
+    assert payload["original_text_id"] == "pp_19_100_00001" and payload["chunk_index"] == 2
+    assert payload["chunk_key"] == chunk["chunk_key"] and payload["text"] == "x" * 1000 + "..."
+    assert payload["id"] == "ID19100" and payload["total_chunks"] == 3
+
+    # 没有text_id时退回到metadata中的id；没有year时使用数据文件的年份
+    fallback = build_chunk({"text": "Rede", "metadata": {"id": "ID15001", "chunk_id": 0}}, default_year="2015")
+    assert fallback["chunk_key"] == "ID15001#0" and fallback["year"] == "2015"
+    print("✅ 共用的chunk键与元数据正确")
+
+
+def test_metadata_only_change():
+    """测试4: 只有元数据变化时不重新embedding，沿用原向量ID；旧版清单（没有元数据哈希列）自动升级"""
+    print("\n【测试4: 只有元数据变化】")
+
+    def with_date(chunks, day):
+        return [{**c, "metadata": {"year": "2019", "month": "03", "day": day}} for c in chunks]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "manifest.sqlite")
+        manifest = ChunkManifest(path, index_name="german-bge")
+        chunks = _chunks({"ID191": ["Rede A1", "Rede A2"], "ID192": ["Rede B1"]})
+        plan = manifest.plan(with_date(chunks, "14"), PARAMS, MODEL)
+        ids = {c["chunk_key"]: c["vector_id"] for c in plan.to_embed}
+        manifest.commit(plan.to_embed)
+        assert manifest.plan(with_date(chunks, "14"), PARAMS, MODEL).is_empty
+
+        # 修正日期: 全部只更新元数据
+        plan = manifest.plan(with_date(chunks, "15"), PARAMS, MODEL)
+        assert plan.summary() == {"to_embed": 0, "metadata_only": 3, "unchanged": 0, "orphaned": 0}
+        assert {c["chunk_key"]: c["vector_id"] for c in plan.metadata_only} == ids
+        manifest.commit(plan.metadata_only)
+        assert manifest.plan(with_date(chunks, "15"), PARAMS, MODEL).is_empty
+
+        # 文本和元数据同时变化时重新embedding
+        changed = with_date(chunks, "16")
+        changed[0] = {**changed[0], "text": "Rede A1 korrigiert"}
+        plan = manifest.plan(changed, PARAMS, MODEL)
+        assert [c["chunk_key"] for c in plan.to_embed] == ["ID191#0"] and len(plan.metadata_only) == 2
+        entries = manifest.load_entries(["2019"])
+        manifest.close()
+
+        # 旧版清单: 补充元数据哈希列，已有条目按元数据变化处理一次（不重新embedding）
+        legacy_path = os.path.join(tmp_dir, "legacy.sqlite")
+        conn = sqlite3.connect(legacy_path)
+        conn.execute(
+            "CREATE TABLE chunks (index_name TEXT NOT NULL, chunk_key TEXT NOT NULL, vector_id TEXT NOT NULL, "
+            "content_hash TEXT NOT NULL, year TEXT NOT NULL, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (index_name, chunk_key))"
+        )
+        conn.executemany(
+            "INSERT INTO chunks VALUES (?, ?, ?, ?, ?, 0)",
+            [("german-bge", key, vector_id, digest, "2019") for key, (vector_id, digest, _) in entries.items()]
+        )
+        conn.commit()
+        conn.close()
+        legacy = ChunkManifest(legacy_path, index_name="german-bge")
+        assert legacy.count("2019") == 3
+        plan = legacy.plan(with_date(chunks, "15"), PARAMS, MODEL)
+        assert plan.summary() == {"to_embed": 0, "metadata_only": 3, "unchanged": 0, "orphaned": 0}
+        legacy.commit(plan.metadata_only)
+        assert legacy.plan(with_date(chunks, "15"), PARAMS, MODEL).is_empty
+        legacy.close()
+    print("✅ 只有元数据变化时只更新元数据")
+
+
+if __name__ == "__main__":
+    test_incremental_rebuild()
+    test_scope_and_hash_inputs()
+    test_shared_chunk_and_payload()
+    test_metadata_only_change()
+    print("\n🎉 所有测试通过！")
@@ -0,0 +1,83 @@
+"""
+数据加载器流式/并行加载测试
+验证流式加载、多进程并行加载与一次性加载结果一致（使用临时JSON文件）
+"""
+
+import sys
+import os
+import json
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_loader import loader as loader_module
+from src.data_loader import ParliamentDataLoader
+
+
+def _write_year(data_dir, year, count):
+    transcript = [{"type": "header", "text": "Sitzung"}]
+    transcript.append({
+        "type": "text_block",
+        "metadata": {"speaker": "Vizepräsident Müller", "group": None, "year": year},
+        "speech": "Das Wort hat ..."
+    })
+    for i in range(count):
+        transcript.append({
+            "type": "text_block",
+            "metadata": {"speaker": f"„Redner {i}\"", "group": "SPD", "year": year, "seq": i},
+            "speech": f"Rede {year}-{i}"
+        })
+    transcript.append({"type": "text_block", "metadata": {"speaker": "Leer", "year": year}, "speech": "  "})
+
+    with open(os.path.join(data_dir, f"pp_{year}.json"), "w", encoding="utf-8") as f:
+        json.dump({"session": year, "transcript": transcript}, f, ensure_ascii=False)
+
+
+def _make_loader(data_dir, mode="ALL", years=None):
+    return ParliamentDataLoader(data_dir=data_dir, data_mode=mode, years=years or ["2019"])
+
+
+def test_streaming_matches_load_data():
+    """测试1: 流式加载与一次性加载结果一致，主持人和空演讲被跳过"""
+    print("\n【测试1: 流式加载】")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        for year, count in (("2019", 3), ("2020", 2), ("2021", 4)):
+            _write_year(data_dir, year, count)
+
+        loader = _make_loader(data_dir)
+        expected = loader.load_data()
+
+        assert len(expected) == 9
+        assert expected[0]["metadata"]["speaker"] == "Redner 0"
+        assert all(not item["metadata"]["is_moderator"] for item in expected)
+
+        assert list(loader.iter_speeches(incremental=False)) == expected
+        if loader_module.IJSON_AVAILABLE:
+            assert list(loader.iter_speeches(incremental=True)) == expected
+    print("✅ 流式加载结果一致")
+
+
+def test_parallel_keeps_file_order():
+    """测试2: 多进程并行加载保持文件顺序，PART模式只加载指定年份"""
+    print("\n【测试2: 并行加载】")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        for year, count in (("2017", 5), ("2018", 1), ("2019", 3), ("2020", 2)):
+            _write_year(data_dir, year, count)
+
+        loader = _make_loader(data_dir)
+        expected = loader.load_data()
+        parallel = list(loader.iter_speeches_parallel(max_workers=2, max_pending_files=2))
+        assert parallel == expected
+        assert loader.load_data(parallel=True, max_workers=2) == expected
+
+        part_loader = _make_loader(data_dir, mode="PART", years=["2020", "2018", "2030"])
+        years = [item["metadata"]["year"] for item in part_loader.iter_speeches_parallel(max_workers=2)]
+        assert years == ["2020", "2020", "2018"]
+    print("✅ 并行加载顺序正确")
+
+
+if __name__ == "__main__":
+    test_streaming_matches_load_data()
+    test_parallel_keeps_file_order()
+    print("\n🎉 所有测试通过！")
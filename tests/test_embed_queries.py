@@ -0,0 +1,89 @@
+"""
+查询批量向量化测试
+验证embed_queries的缓存命中/未命中拆分、输出顺序以及本地模式只触发一次前向计算（使用假本地模型，不需要Embedding服务）
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.llm.embedding_cache import EmbeddingCache
+from src.llm.embeddings import GeminiEmbeddingClient
+
+
+class FakeLocalClient:
+    """假本地模型: 向量为[文本长度, 序号]，记录每次前向计算的输入"""
+
+    use_bge_m3 = True
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_batch(self, texts, batch_size=32):
+        self.calls.append(list(texts))
+        return [[float(len(text)), float(i)] for i, text in enumerate(texts)]
+
+    def embed_batch_with_sparse(self, texts, batch_size=32):
+        self.calls.append(list(texts))
+        vectors = [[float(len(text)), float(i)] for i, text in enumerate(texts)]
+        return vectors, [{len(text): 1.0} for text in texts]
+
+
+def _client(cache):
+    """跳过模型加载，直接组装本地模式的客户端"""
+    client = GeminiEmbeddingClient.__new__(GeminiEmbeddingClient)
+    client.embedding_mode = "local"
+    client.cache = cache
+    client.cache_model = "BAAI/bge-m3@torch-fp32"
+    client.local_client = FakeLocalClient()
+    client.dispatcher = None
+    client.embeddings = None
+    return client
+
+
+def test_cache_split_and_order():
+    """测试1: 只对未命中的查询做一次前向计算，结果按输入顺序合并并写回缓存"""
+    print("\n【测试1: 缓存拆分与顺序】")
+
+    cache = EmbeddingCache(db_path=None)
+    cache.put("local", "BAAI/bge-m3@torch-fp32", "Rente", [9.0, 9.0])
+    cache.put("local", "BAAI/bge-m3@torch-fp32", "Klimaschutz", [8.0, 8.0])
+    client = _client(cache)
+
+    texts = ["Migration", "Rente", "Digitalisierung", "Klimaschutz", "Bildung"]
+    vectors = client.embed_queries(texts)
+
+    assert client.local_client.calls == [["Migration", "Digitalisierung", "Bildung"]]
+    assert vectors == [[9.0, 0.0], [9.0, 9.0], [15.0, 1.0], [8.0, 8.0], [7.0, 2.0]]
+    assert cache.get("local", "BAAI/bge-m3@torch-fp32", "Digitalisierung") == [15.0, 1.0]
+
+    # 再次调用全部命中缓存，不再触发前向计算
+    assert client.embed_queries(texts) == vectors
+    assert len(client.local_client.calls) == 1
+    assert client.embed_queries([]) == []
+    print("✅ 缓存拆分与顺序正确")
+
+
+def test_single_forward_pass_without_cache():
+    """测试2: 关闭缓存时本地模式所有查询只触发一次前向计算；稀疏权重与未命中查询合并计算"""
+    print("\n【测试2: 单次前向计算】")
+
+    client = _client(None)
+    texts = [f"Frage {i}" for i in range(12)]
+    vectors = client.embed_queries(texts)
+    assert client.local_client.calls == [texts]
+    assert [vector[1] for vector in vectors] == [float(i) for i in range(12)]
+
+    client = _client(EmbeddingCache(db_path=None))
+    client.cache.put("local", client.cache_model, "Rente", [1.0, 1.0])
+    vectors, weights = client.embed_queries_with_sparse(["Rente", "Rente 2019", "Migration"], ["Rente"])
+    assert client.local_client.calls == [["Rente 2019", "Migration", "Rente"]]
+    assert vectors == [[1.0, 1.0], [10.0, 0.0], [9.0, 1.0]]
+    assert weights == {"Rente": {5: 1.0}}
+    print("✅ 单次前向计算正确")
+
+
+if __name__ == "__main__":
+    test_cache_split_and_order()
+    test_single_forward_pass_without_cache()
+    print("\n🎉 所有测试通过！")
@@ -0,0 +1,109 @@
+"""
+查询向量缓存测试
+验证内存LRU、SQLite持久化、文本规范化和命中统计（不需要Embedding服务）
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.llm.embedding_cache import EmbeddingCache, cache_model_name
+from src.utils.performance_monitor import get_performance_monitor
+
+
+def test_normalized_keys_and_mode_isolation():
+    """测试1: 空白差异命中同一条目，不同模式/模型/推理后端互不干扰"""
+    print("\n【测试1: 缓存键规范化】")
+
+    cache = EmbeddingCache(db_path=None)
+    cache.put("local", "BAAI/bge-m3", "Was ist die Position  von CDU/CSU?", [0.1, 0.2])
+
+    assert cache.get("local", "BAAI/bge-m3", " Was ist die Position von CDU/CSU? ") == [0.1, 0.2]
+    assert cache.get("deepinfra", "BAAI/bge-m3", "Was ist die Position von CDU/CSU?") is None
+    assert cache.get("local", "text-embedding-3-small", "Was ist die Position von CDU/CSU?") is None
+
+    # 同一模型的不同推理后端/精度互不命中
+    torch_model = cache_model_name("BAAI/bge-m3", "torch", "fp32")
+    onnx_model = cache_model_name("BAAI/bge-m3", "onnx", "int8")
+    assert onnx_model == "BAAI/bge-m3@onnx-int8" and cache_model_name("BAAI/bge-m3") == "BAAI/bge-m3"
+    cache.put("local", torch_model, "Rente", [0.3, 0.4])
+    assert cache.get("local", onnx_model, "Rente") is None
+    assert cache.get("local", cache_model_name("BAAI/bge-m3", "onnx", "fp32"), "Rente") is None
+    assert cache.get("local", torch_model, "Rente") == [0.3, 0.4]
+    print("✅ 键规范化和模式隔离正确")
+
+
+def test_lru_eviction_and_disk_persistence():
+    """测试2: 内存LRU淘汰后仍可从磁盘命中，重启后数据保留"""
+    print("\n【测试2: LRU淘汰与磁盘持久化】")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "cache.sqlite")
+        cache = EmbeddingCache(db_path=db_path, max_memory_items=2, max_disk_items=3)
+        cache.put_many("local", "m", ["a", "b", "c", "d"], [[1.0], [2.0], [3.0], [4.0]])
+
+        stats = cache.get_stats()
+        assert stats["memory_items"] == 2
+        assert stats["disk_items"] == 3
+
+        # "a"最早写入，超过磁盘上限后被淘汰；"b"已被内存淘汰，但磁盘中仍存在
+        assert cache.get("local", "m", "b") == [2.0]
+        assert cache.disk_hits == 1
+
+        reopened = EmbeddingCache(db_path=db_path)
+        assert reopened.get("local", "m", "d") == [4.0]
+        assert reopened.get("local", "m", "a") is None
+        print(f"✅ 统计: {cache.get_stats()}")
+
+
+def test_monitor_hit_rate():
+    """测试3: 命中统计上报PerformanceMonitor"""
+    print("\n【测试3: PerformanceMonitor命中率】")
+
+    monitor = get_performance_monitor()
+    monitor.start_session()
+
+    cache = EmbeddingCache(db_path=None)
+    cache.get("openai", "m", "x")
+    cache.put("openai", "m", "x", [1.0])
+    cache.get("openai", "m", "x")
+
+    report = monitor.get_cache_report()[EmbeddingCache.MONITOR_NAME]
+    assert report == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+    print(f"✅ 监控报告: {report}")
+
+
+def test_disk_counter_without_count_queries():
+    """测试4: 写入路径不执行COUNT(*)，覆盖已有键不增加条目数，计数与磁盘实际行数一致"""
+    print("\n【测试4: 磁盘条目计数】")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "cache.sqlite")
+        cache = EmbeddingCache(db_path=db_path, max_memory_items=1, max_disk_items=4)
+        statements = []
+        cache._conn.set_trace_callback(statements.append)
+
+        cache.put_many("local", "m", ["a", "b", "c"], [[1.0], [2.0], [3.0]])
+        cache.put_many("local", "m", ["b", "c", "d"], [[2.5], [3.5], [4.0]])
+        assert cache.get_stats()["disk_items"] == 4
+        cache.put_many("local", "m", ["e", "f"], [[5.0], [6.0]])
+        assert not any("COUNT" in statement.upper() for statement in statements)
+
+        # 覆盖写入的值生效；超过上限时淘汰最久未使用的"a"和"b"
+        assert cache.get_stats()["disk_items"] == 4
+        assert cache.get("local", "m", "c") == [3.5]
+        assert cache.get("local", "m", "a") is None
+        reopened = EmbeddingCache(db_path=db_path)
+        assert reopened.get_stats()["disk_items"] == 4
+        cache.clear()
+        assert cache.get_stats()["disk_items"] == 0
+    print("✅ 磁盘条目计数正确")
+
+
+if __name__ == "__main__":
+    test_normalized_keys_and_mode_isolation()
+    test_lru_eviction_and_disk_persistence()
+    test_monitor_hit_rate()
+    test_disk_counter_without_count_queries()
+    print("\n🎉 所有测试通过！")
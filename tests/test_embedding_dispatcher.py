@@ -0,0 +1,80 @@
+"""
+查询Embedding微批处理调度器测试
+验证并发调用合并为少量批次、每个调用方拿到自己的向量、相同文本只编码一次以及异常传播（不需要模型）
+"""
+
+import sys
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.llm.embedding_dispatcher import EmbeddingDispatcher
+
+
+class SlowEncoder:
+    """每次调用耗时固定的假模型（模拟一次前向计算），向量为 [文本长度, 文本编号]"""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self.lock:
+            self.calls.append(list(texts))
+        time.sleep(self.delay)
+        return [[float(len(text)), float(text.split("-")[-1])] for text in texts]
+
+
+def test_concurrent_calls_are_batched():
+    """测试1: 24个并发调用合并为少量批次，结果与各自输入对应"""
+    print("\n【测试1: 并发合并】")
+
+    encoder = SlowEncoder()
+    dispatcher = EmbeddingDispatcher(encoder, max_batch_size=16, max_wait_ms=20)
+    texts = [f"frage-{i}" for i in range(24)]
+
+    with ThreadPoolExecutor(max_workers=24) as executor:
+        vectors = list(executor.map(dispatcher.embed, texts))
+
+    assert vectors == [[float(len(text)), float(i)] for i, text in enumerate(texts)]
+    assert len(encoder.calls) < 24 // 2
+    assert max(len(call) for call in encoder.calls) <= 16
+    stats = dispatcher.get_stats()
+    assert stats["items"] == 24 and stats["avg_batch_size"] > 2
+    dispatcher.close()
+    print(f"✅ 24个调用合并为{len(encoder.calls)}批")
+
+
+def test_duplicates_and_errors():
+    """测试2: 同一批内相同文本只编码一次；编码失败时所有调用方收到异常"""
+    print("\n【测试2: 去重与异常】")
+
+    encoder = SlowEncoder(delay=0.0)
+    dispatcher = EmbeddingDispatcher(encoder, max_batch_size=8, max_wait_ms=20)
+    vectors = dispatcher.embed_many(["a-1", "a-1", "b-2"])
+    assert vectors == [[3.0, 1.0], [3.0, 1.0], [3.0, 2.0]]
+    assert encoder.calls == [["a-1", "b-2"]]
+    dispatcher.close()
+
+    def broken(texts):
+        raise RuntimeError("模型不可用")
+
+    dispatcher = EmbeddingDispatcher(broken, max_wait_ms=1)
+    futures = [dispatcher.submit(f"x-{i}") for i in range(3)]
+    for future in futures:
+        try:
+            future.result(timeout=5)
+            assert False, "应抛出异常"
+        except RuntimeError as e:
+            assert "模型不可用" in str(e)
+    dispatcher.close()
+    print("✅ 去重与异常传播正确")
+
+
+if __name__ == "__main__":
+    test_concurrent_calls_are_batched()
+    test_duplicates_and_errors()
+    print("\n🎉 所有测试通过！")
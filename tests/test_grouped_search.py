@@ -0,0 +1,127 @@
+"""
+分组检索测试
+验证search_grouped与逐年暴力检索结果一致，以及检索计划器把多年份检索合并为一次分组检索（不需要Pinecone）
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from src.graph.retrieval_planner import RetrievalPlanner
+from src.vectordb.local_retriever import LocalVectorRetriever
+from src.vectordb.search_cache import CachedRetriever, SearchResultCache
+
+
+def _build_index(tmp_dir: str):
+    """构建测试索引: 300个向量，年份2015-2020（部分文档缺少年份）"""
+    rng = np.random.default_rng(11)
+    vectors = rng.normal(size=(300, 16)).astype(np.float32)
+    ids = [f"doc_{i}" for i in range(300)]
+    metadatas = []
+    for i in range(300):
+        metadata = {"group": ["CDU/CSU", "SPD", "GRÜNE"][i % 3], "text": f"Dokument {i}"}
+        if i % 17:
+            metadata["year"] = str(2015 + (i * 7) % 6)
+        metadatas.append(metadata)
+    LocalVectorRetriever.build_index(tmp_dir, ids, vectors, metadatas, dtype="float32")
+    return vectors, metadatas
+
+
+def _brute_force(vectors, metadatas, query, years, k, group=None):
+    """逐年暴力计算top-k"""
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    query = np.asarray(query, dtype=np.float32)
+    scores = normalized @ (query / np.linalg.norm(query))
+    expected = []
+    for year in years:
+        rows = [
+            i for i, m in enumerate(metadatas)
+            if m.get("year") == year and (group is None or m["group"] == group)
+        ]
+        rows.sort(key=lambda i: scores[i], reverse=True)
+        expected.extend(f"doc_{i}" for i in rows[:k])
+    return set(expected)
+
+
+def test_grouped_matches_per_year_brute_force():
+    """测试1: 多个查询向量一次分组检索，与逐年暴力结果一致"""
+    print("\n【测试1: 分组检索正确性】")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vectors, metadatas = _build_index(tmp_dir)
+        retriever = LocalVectorRetriever(tmp_dir)
+        queries = np.random.default_rng(3).normal(size=(4, 16)).astype(np.float32).tolist()
+        years = ["2016", "2018", "2019", "1990"]
+
+        grouped = retriever.search_grouped(queries, group_by="year", k_per_group=5, groups=years)
+        assert len(grouped) == 4
+        for query, results in zip(queries, grouped):
+            assert {r["id"] for r in results} == _brute_force(vectors, metadatas, query, years, 5)
+            assert [r["score"] for r in results] == sorted((r["score"] for r in results), reverse=True)
+
+        # 过滤条件与分组同时生效
+        filtered = retriever.search_grouped(
+            queries[:1], k_per_group=3, groups=years, filters={"group": "SPD"}
+        )[0]
+        assert {r["id"] for r in filtered} == _brute_force(vectors, metadatas, queries[0], years, 3, group="SPD")
+
+        # groups=None时检索全部年份（缺少年份的文档不参与）
+        all_years = retriever.search_grouped(queries[:1], k_per_group=2)[0]
+        assert len(all_years) == 12
+        assert all(r["metadata"].get("year") for r in all_years)
+
+        # search_multi_year与单查询分组检索一致
+        multi_year = retriever.search_multi_year(queries[1], years, limit_per_year=5)
+        assert [r["id"] for r in multi_year] == [r["id"] for r in grouped[1]]
+    print("✅ 分组检索与暴力检索一致")
+
+
+def test_planner_batches_multi_year_searches():
+    """测试2: 检索计划器把年份相同的多年份检索合并为一次分组检索，缓存按查询向量命中"""
+    print("\n【测试2: 计划器批量分组检索】")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _build_index(tmp_dir)
+        retriever = LocalVectorRetriever(tmp_dir)
+        calls = []
+        original = retriever.search_grouped
+
+        def counting_search_grouped(query_vectors, **kwargs):
+            calls.append(len(query_vectors))
+            return original(query_vectors, **kwargs)
+
+        retriever.search_grouped = counting_search_grouped
+        cached = CachedRetriever(retriever, SearchResultCache())
+        queries = np.random.default_rng(5).normal(size=(3, 16)).astype(np.float32).tolist()
+
+        planner = RetrievalPlanner()
+        request_ids = [
+            planner.add("search_multi_year_parallel", query, years=["2015", "2016"], limit_per_year=4)
+            for query in queries
+        ]
+        other = planner.add("search_multi_year_parallel", queries[0], years=["2017"], limit_per_year=4)
+        asyncio.run(planner.aexecute(cached))
+
+        assert sorted(calls) == [1, 3]
+        for query, request_id in zip(queries, request_ids):
+            expected = original([query], k_per_group=4, groups=["2015", "2016"])[0]
+            assert [r["id"] for r in planner.results(request_id)] == [r["id"] for r in expected]
+        assert {r["metadata"]["year"] for r in planner.results(other)} == {"2017"}
+
+        # 第二次相同计划全部命中缓存
+        planner = RetrievalPlanner()
+        for query in queries:
+            planner.add("search_multi_year_parallel", query, years=["2015", "2016"], limit_per_year=4)
+        asyncio.run(planner.aexecute(cached))
+        assert sorted(calls) == [1, 3]
+    print("✅ 多年份检索已合并")
+
+
+if __name__ == "__main__":
+    test_grouped_matches_per_year_brute_force()
+    test_planner_batches_multi_year_searches()
+    print("\n🎉 所有测试通过！")
@@ -0,0 +1,128 @@
+"""
+稀疏倒排索引与混合检索测试
+使用随机向量和人工构造的词项权重构建临时索引，验证倒排表得分与暴力计算一致（不需要BGE-M3模型）
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from src.vectordb.local_retriever import LocalVectorRetriever
+from src.vectordb.sparse_index import SparseInvertedIndex, SPARSE_FILES
+
+
+# 模拟"Georgien"和"Visum"的词项ID（只出现在doc_77中）
+GEORGIEN_TERM = 90001
+VISUM_TERM = 90002
+
+
+def _build_hybrid_index(tmp_dir: str):
+    """构建测试索引: 200个向量，每个文档3个常见词项；doc_77额外包含两个稀有实体词项"""
+    rng = np.random.default_rng(7)
+    vectors = rng.normal(size=(200, 32)).astype(np.float32)
+    ids = [f"doc_{i}" for i in range(200)]
+    metadatas = [
+        {"year": str(2015 + i % 5), "group": ["CDU/CSU", "SPD"][i % 2], "text": f"Dokument {i}"}
+        for i in range(200)
+    ]
+    lexical_weights = []
+    for i in range(200):
+        # BGE-M3输出的键是字符串
+        weights = {str(t): float(rng.uniform(0.05, 0.2)) for t in rng.choice(50, size=3, replace=False)}
+        if i == 77:
+            weights[str(GEORGIEN_TERM)] = 0.35
+            weights[str(VISUM_TERM)] = 0.3
+        lexical_weights.append(weights)
+
+    LocalVectorRetriever.build_index(
+        tmp_dir, ids, vectors, metadatas, dtype="float32", lexical_weights=lexical_weights
+    )
+    return vectors, metadatas, lexical_weights
+
+
+def test_sparse_scores_match_brute_force():
+    """测试1: 倒排表累加得分与逐文档计算一致"""
+    print("\n【测试1: 稀疏得分】")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _, _, lexical_weights = _build_hybrid_index(tmp_dir)
+        index = SparseInvertedIndex(tmp_dir, count=200)
+
+        query = {3: 0.4, 17: 0.2, GEORGIEN_TERM: 0.5}
+        scores = index.score(query)
+
+        expected = np.array([
+            sum(float(w) * query.get(int(t), 0.0) for t, w in weights.items())
+            for weights in lexical_weights
+        ])
+        # 文档权重以float16存储
+        assert np.allclose(scores, expected, atol=1e-3)
+
+        rows, weights = index.postings(GEORGIEN_TERM)
+        assert list(rows) == [77] and abs(float(weights[0]) - 0.35) < 1e-3
+        assert len(index.postings(123456)[0]) == 0
+    print("✅ 稀疏得分正确")
+
+
+def test_hybrid_search_recovers_exact_entity():
+    """测试2: 稠密检索漏掉的精确实体文档，混合检索排在第一"""
+    print("\n【测试2: 混合检索召回精确实体】")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vectors, _, _ = _build_hybrid_index(tmp_dir)
+        retriever = LocalVectorRetriever(tmp_dir, default_limit=10)
+        assert retriever.supports_hybrid
+
+        # 查询向量与doc_77几乎正交：纯稠密检索召回不到
+        query_vector = np.random.default_rng(1).normal(size=32).astype(np.float32)
+        query_vector -= vectors[77] * float(query_vector @ vectors[77] / (vectors[77] @ vectors[77]))
+        dense_ids = [r["id"] for r in retriever.search(query_vector.tolist(), limit=10)]
+        assert "doc_77" not in dense_ids
+
+        query_weights = {GEORGIEN_TERM: 0.5, VISUM_TERM: 0.5}
+        results = retriever.hybrid_search(
+            query_vector.tolist(), query_weights, limit=10, dense_weight=1.0, sparse_weight=3.0
+        )
+        assert results[0]["id"] == "doc_77"
+        assert results[0]["sparse_score"] > 0
+        assert abs(results[0]["fused_score"] - (results[0]["dense_score"] + 3.0 * results[0]["sparse_score"])) < 1e-4
+        # score保持余弦相似度尺度，可与稠密检索结果混合排序
+        assert all(r["score"] == r["dense_score"] and -1.0 <= r["score"] <= 1.0 for r in results)
+        assert [r["fused_score"] for r in results] == sorted((r["fused_score"] for r in results), reverse=True)
+
+        # 过滤条件对稀疏候选同样生效（doc_77是2017年、SPD）
+        filtered = retriever.hybrid_search(
+            query_vector.tolist(), query_weights, limit=10, filters={"year": "2016"}, sparse_weight=3.0
+        )
+        assert all(r["metadata"]["year"] == "2016" for r in filtered)
+        assert "doc_77" not in [r["id"] for r in filtered]
+
+        # 没有查询词项时退化为纯稠密检索
+        assert [r["id"] for r in retriever.hybrid_search(query_vector.tolist(), {}, limit=10)] == dense_ids
+    print("✅ 混合检索正确")
+
+
+def test_rebuild_without_sparse_removes_stale_index():
+    """测试3: 重建为纯稠密索引时删除旧稀疏索引"""
+    print("\n【测试3: 重建索引】")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vectors, metadatas, _ = _build_hybrid_index(tmp_dir)
+        assert SparseInvertedIndex.exists(tmp_dir)
+
+        LocalVectorRetriever.build_index(
+            tmp_dir, [f"doc_{i}" for i in range(200)], vectors, metadatas, dtype="float32"
+        )
+        assert not any(os.path.exists(os.path.join(tmp_dir, name)) for name in SPARSE_FILES)
+        assert not LocalVectorRetriever(tmp_dir).supports_hybrid
+    print("✅ 旧稀疏索引已删除")
+
+
+if __name__ == "__main__":
+    test_sparse_scores_match_brute_force()
+    test_hybrid_search_recovers_exact_entity()
+    test_rebuild_without_sparse_removes_stale_index()
+    print("\n🎉 所有测试通过！")
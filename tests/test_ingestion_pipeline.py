@@ -0,0 +1,286 @@
+"""
+流水线式数据摄取测试
+验证各阶段并行重叠（总耗时接近最慢阶段）、背压、异常传播，以及run_ingestion的增量重建和清单之外向量的检查（不需要模型和向量库）
+"""
+
+import sys
+import os
+import tempfile
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from src.data_loader.manifest import ChunkManifest, find_untracked_vector_ids
+from src.data_loader.pipeline import IngestionPipeline, SpeechChunker, Stage, UntrackedVectorsError, run_ingestion
+from src.data_loader.splitter import ParliamentTextSplitter
+
+
+def _sleeping(delay):
+    def fn(batch):
+        time.sleep(delay)
+        return batch
+    return fn
+
+
+def test_stages_overlap():
+    """测试1: 三个耗时相近的阶段同时运行，总耗时明显小于串行之和"""
+    print("\n【测试1: 阶段重叠】")
+
+    collected = []
+    lock = threading.Lock()
+
+    def sink(batch):
+        time.sleep(0.02)
+        with lock:
+            collected.extend(batch)
+        return batch
+
+    pipeline = IngestionPipeline([
+        Stage("parse", _sleeping(0.02), batch_size=4),
+        Stage("embed", _sleeping(0.02), batch_size=4),
+        Stage("upsert", sink, workers=2, batch_size=4)
+    ], queue_size=8)
+    report = pipeline.run(range(80))
+
+    assert sorted(collected) == list(range(80))
+    # 串行约 3 × 20批 × 20ms = 1.2秒
+    assert report.elapsed < 0.9
+    assert report.stage("embed").batches == 20
+    assert report.stage("upsert").items_out == 80
+    assert report.to_dict()["stages"][0]["name"] == "load"
+    print(f"✅ 耗时 {report.elapsed:.2f}秒, 瓶颈: {report.bottleneck}")
+
+
+def test_backpressure_and_errors():
+    """测试2: 下游慢时上游阻塞（背压）；任一阶段出错时流水线停止并抛出异常"""
+    print("\n【测试2: 背压与异常】")
+
+    in_flight = []
+    produced = [0]
+    consumed = [0]
+
+    def source():
+        for i in range(60):
+            produced[0] += 1
+            in_flight.append(produced[0] - consumed[0])
+            yield i
+
+    def slow(batch):
+        time.sleep(0.005)
+        consumed[0] += len(batch)
+        return batch
+
+    report = IngestionPipeline([Stage("slow", slow)], queue_size=4).run(source())
+    assert max(in_flight) <= 4 + 2
+    assert report.stage("load").blocked_seconds > 0
+
+    def broken(batch):
+        if 13 in batch:
+            raise RuntimeError("向量库不可用")
+        return batch
+
+    start = time.time()
+    try:
+        IngestionPipeline([Stage("ok", _sleeping(0)), Stage("upsert", broken, workers=2)], queue_size=2).run(range(10000))
+        assert False, "应抛出异常"
+    except RuntimeError as e:
+        assert "向量库不可用" in str(e)
+    assert time.time() - start < 5
+    print("✅ 背压与异常传播正确")
+
+
+class FakeEmbeddingClient:
+    def __init__(self):
+        self.texts = []
+
+    def embed_batch(self, texts, **kwargs):
+        self.texts.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_batch_with_sparse(self, texts, **kwargs):
+        return self.embed_batch(texts, **kwargs), [{len(text): 0.5} for text in texts]
+
+
+class FakeSink:
+    supports_delete = True
+
+    def __init__(self):
+        self.vectors = {}
+        self.lexical_weights = {}
+
+    def upsert(self, chunks):
+        for chunk in chunks:
+            self.vectors[chunk["vector_id"]] = chunk["text"]
+            if "lexical_weights" in chunk:
+                self.lexical_weights[chunk["vector_id"]] = chunk["lexical_weights"]
+
+    def delete(self, ids):
+        for vector_id in ids:
+            self.vectors.pop(vector_id, None)
+
+
+def _speeches(texts):
+    return [
+        {"speech": text, "metadata": {"id": text_id, "year": "2019", "speaker": "Test", "group": ""}}
+        for text_id, text in texts.items()
+    ]
+
+
+def test_incremental_run_ingestion():
+    """测试3: run_ingestion首次写入全部；重建时只embedding变化的chunk，删除孤儿向量"""
+    print("\n【测试3: 增量摄取】")
+
+    splitter = ParliamentTextSplitter(chunk_size=40, chunk_overlap=5)
+    sink = FakeSink()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manifest = ChunkManifest(os.path.join(tmp_dir, "manifest.sqlite"), index_name="fake")
+        first = {"ID191": "Rede A. " * 10, "ID192": "Rede B.", "ID193": "Rede C."}
+
+        client = FakeEmbeddingClient()
+        report = run_ingestion(_speeches(first), splitter, client, sink, manifest=manifest, model_name="m", years=["2019"])
+        total = len(sink.vectors)
+        assert total > 3 and report.stage("upsert").items_out == total
+        assert manifest.count("2019") == total
+        # 分块阶段与ParliamentTextSplitter.split_speeches结果相同（chunk_key不漂移）
+        assert SpeechChunker(splitter)(_speeches(first)) == splitter.split_speeches(_speeches(first))
+
+        client = FakeEmbeddingClient()
+        second = {"ID191": "Rede A. " * 10, "ID192": "Rede B. geändert", "ID194": "Rede D."}
+        report = run_ingestion(_speeches(second), splitter, client, sink, manifest=manifest, model_name="m", years=["2019"])
+        assert sorted(client.texts) == ["Rede B. geändert", "Rede D."]
+        assert report.deleted == 1 and report.to_dict()["deleted"] == 1
+
+        # 只删除演讲时没有写入，但删除数仍然报告（调用方据此更新索引版本号）
+        third = {key: text for key, text in second.items() if key != "ID194"}
+        report = run_ingestion(_speeches(third), splitter, FakeEmbeddingClient(), sink, manifest=manifest, model_name="m", years=["2019"])
+        assert report.stage("upsert").items_out == 0 and report.deleted == 1
+        assert "Rede D." not in sink.vectors.values()
+        run_ingestion(_speeches(second), splitter, FakeEmbeddingClient(), sink, manifest=manifest, model_name="m", years=["2019"])
+        assert "Rede C." not in sink.vectors.values()
+        assert len(sink.vectors) == total and manifest.count("2019") == total
+
+        # 不能删除向量的sink不能用于增量模式
+        class AppendOnlySink:
+            supports_delete = False
+
+            def upsert(self, chunks):
+                pass
+
+        with pytest.raises(ValueError):
+            run_ingestion(_speeches(second), splitter, client, AppendOnlySink(), manifest=manifest, model_name="m")
+        manifest.close()
+
+    # 全量模式下同时生成稀疏词项权重（与向量一一对应）
+    sparse_sink = FakeSink()
+    run_ingestion(_speeches(second), splitter, FakeEmbeddingClient(), sparse_sink, with_sparse=True)
+    assert sparse_sink.lexical_weights.keys() == sparse_sink.vectors.keys()
+    assert all(weights == {len(sparse_sink.vectors[vector_id]): 0.5}
+               for vector_id, weights in sparse_sink.lexical_weights.items())
+    print("✅ 增量摄取正确")
+
+
+class ListingSink(FakeSink):
+    """能按年份列出向量ID的假向量库（Pinecone风格: ID以"年份_"开头）"""
+
+    def vector_count(self):
+        return len(self.vectors)
+
+    def untracked_ids(self, year, tracked):
+        ids = sorted(vector_id for vector_id in self.vectors if vector_id.startswith(f"{year}_"))
+        return find_untracked_vector_ids([ids[:2], ids[2:]], tracked)
+
+    def delete_untracked(self, ids):
+        self.delete(ids)
+
+
+def test_untracked_vectors_guard():
+    """测试4: 清单为空而索引有数据时拒绝；某年份有清单之外的向量时拒绝；--replace-legacy写入成功后删除旧向量"""
+    print("\n【测试4: 清单之外的向量】")
+
+    splitter = ParliamentTextSplitter(chunk_size=40, chunk_overlap=5)
+    speeches = {"ID191": "Rede A.", "ID192": "Rede B."}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manifest = ChunkManifest(os.path.join(tmp_dir, "manifest.sqlite"), index_name="fake")
+        sink = ListingSink()
+        sink.vectors = {"2019_1700000000_0": "Rede A.", "2019_1700000000_1": "Rede B."}
+
+        client = FakeEmbeddingClient()
+        with pytest.raises(UntrackedVectorsError):
+            run_ingestion(_speeches(speeches), splitter, client, sink, manifest=manifest, model_name="m", years=["2019"])
+        assert client.texts == [] and manifest.count() == 0
+
+        report = run_ingestion(_speeches(speeches), splitter, FakeEmbeddingClient(), sink, manifest=manifest,
+                               model_name="m", years=["2019"], replace_legacy=True)
+        assert report.deleted == 2 and manifest.count("2019") == 2
+        assert sorted(sink.vectors.values()) == ["Rede A.", "Rede B."]
+        assert not any("1700000000" in vector_id for vector_id in sink.vectors)
+
+        # 清单非空，但年份中混入了清单之外的向量（年份未预先给出时在首次出现时检查）
+        sink.vectors["2019_1700000000_5"] = "Rede alt"
+        with pytest.raises(UntrackedVectorsError):
+            run_ingestion(_speeches(speeches), splitter, FakeEmbeddingClient(), sink, manifest=manifest, model_name="m")
+        assert "2019_1700000000_5" in sink.vectors
+        manifest.close()
+    print("✅ 清单之外向量的检查正确")
+
+
+class PatchingSink(FakeSink):
+    """能只更新元数据的假向量库"""
+
+    def __init__(self):
+        super().__init__()
+        self.metadata = {}
+
+    def upsert(self, chunks):
+        super().upsert(chunks)
+        for chunk in chunks:
+            self.metadata[chunk["vector_id"]] = chunk["metadata"]
+
+    def update_metadata(self, chunks):
+        for chunk in chunks:
+            assert chunk["vector_id"] in self.vectors
+            self.metadata[chunk["vector_id"]] = chunk["metadata"]
+
+
+def test_metadata_only_update():
+    """测试5: 只修正元数据时不重新embedding，只更新元数据；sink不支持时跳过且不记入清单"""
+    print("\n【测试5: 只更新元数据】")
+
+    splitter = ParliamentTextSplitter(chunk_size=40, chunk_overlap=5)
+    speeches = _speeches({"ID191": "Rede A. " * 10, "ID192": "Rede B."})
+    corrected = [{**s, "metadata": {**s["metadata"], "speaker": "Korrigiert"}} for s in speeches]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manifest = ChunkManifest(os.path.join(tmp_dir, "manifest.sqlite"), index_name="fake")
+        sink = PatchingSink()
+        run_ingestion(speeches, splitter, FakeEmbeddingClient(), sink, manifest=manifest, model_name="m", years=["2019"])
+        total = len(sink.vectors)
+
+        # 不支持更新元数据的sink: 跳过，下次运行仍然检测到
+        client = FakeEmbeddingClient()
+        report = run_ingestion(corrected, splitter, client, FakeSink(), manifest=manifest, model_name="m", years=["2019"])
+        assert client.texts == [] and report.metadata_updated == 0
+
+        client = FakeEmbeddingClient()
+        report = run_ingestion(corrected, splitter, client, sink, manifest=manifest, model_name="m", years=["2019"])
+        assert client.texts == [] and report.stage("upsert").items_out == 0
+        assert report.metadata_updated == total and report.to_dict()["metadata_updated"] == total
+        assert all(metadata["speaker"] == "Korrigiert" for metadata in sink.metadata.values())
+
+        report = run_ingestion(corrected, splitter, FakeEmbeddingClient(), sink, manifest=manifest, model_name="m", years=["2019"])
+        assert report.metadata_updated == 0
+        manifest.close()
+    print("✅ 只更新元数据正确")
+
+
+if __name__ == "__main__":
+    test_stages_overlap()
+    test_backpressure_and_errors()
+    test_incremental_run_ingestion()
+    test_untracked_vectors_guard()
+    test_metadata_only_update()
+    print("\n🎉 所有测试通过！")
@@ -0,0 +1,153 @@
+"""
+LLM响应缓存测试
+验证缓存键、磁盘持久化、容量淘汰以及GeminiLLMClient的缓存接入（同步/异步共用缓存键，不需要LLM服务）
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import settings
+from src.llm.response_cache import LLMResponseCache
+
+
+class FakeChatModel:
+    """记录调用次数的假LLM"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+
+        class Response:
+            content = f"回复{self.calls}"
+        return Response()
+
+    async def ainvoke(self, messages):
+        return self.invoke(messages)
+
+
+class ThreadRecordingCache(LLMResponseCache):
+    """记录每次读写所在线程的响应缓存"""
+
+    def __init__(self):
+        super().__init__(db_path=None)
+        self.threads = []
+
+    def get(self, *args):
+        self.threads.append(threading.get_ident())
+        return super().get(*args)
+
+    def put(self, *args):
+        self.threads.append(threading.get_ident())
+        super().put(*args)
+
+
+def test_cache_keys():
+    """测试1: 模型、temperature、系统提示词、提示词任一不同都不命中"""
+    print("\n【测试1: 缓存键】")
+
+    cache = LLMResponseCache(db_path=None)
+    cache.put("gemini-2.5-flash", 0.0, 1024, "系统", "问题", "答案")
+
+    assert cache.get("gemini-2.5-flash", 0.0, 1024, "系统", "问题") == "答案"
+    assert cache.get("gemini-2.5-pro", 0.0, 1024, "系统", "问题") is None
+    assert cache.get("gemini-2.5-flash", 0.5, 1024, "系统", "问题") is None
+    assert cache.get("gemini-2.5-flash", 0.0, 1024, None, "问题") is None
+    assert cache.get("gemini-2.5-flash", 0.0, 1024, "系统", "问题2") is None
+    print("✅ 缓存键正确")
+
+
+def test_disk_persistence_and_eviction():
+    """测试2: 重启后从磁盘命中，超过上限淘汰最久未使用的条目"""
+    print("\n【测试2: 磁盘持久化与淘汰】")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "llm.sqlite")
+        cache = LLMResponseCache(db_path=db_path, max_memory_items=1, max_disk_items=2)
+        for i in range(3):
+            cache.put("m", 0.0, None, None, f"p{i}", f"r{i}")
+
+        restarted = LLMResponseCache(db_path=db_path, max_memory_items=1, max_disk_items=2)
+        assert restarted.get("m", 0.0, None, None, "p0") is None
+        assert restarted.get("m", 0.0, None, None, "p2") == "r2"
+
+        stats = restarted.get_stats()
+        assert stats["disk_hits"] == 1 and stats["misses"] == 1
+        assert stats["disk_items"] == 2
+    print("✅ 磁盘持久化与淘汰正确")
+
+
+def test_client_uses_cache_only_for_zero_temperature():
+    """测试3: temperature=0的重复调用命中缓存，非零temperature不缓存"""
+    print("\n【测试3: 客户端缓存接入】")
+
+    from src.llm.client import GeminiLLMClient
+
+    original_key = settings.openai_api_key
+    settings.openai_api_key = original_key or "test-key"
+    try:
+        client = GeminiLLMClient(model_name="gemini-2.5-flash", temperature=0.0)
+        client.llm = FakeChatModel()
+        client.response_cache = LLMResponseCache(db_path=None)
+
+        assert client.invoke("问题", system_prompt="系统") == "回复1"
+        assert client.invoke("问题", system_prompt="系统") == "回复1"
+        assert client.invoke_with_messages([{"role": "user", "content": "问题"}]) == "回复2"
+        assert client.invoke_with_messages([{"role": "user", "content": "问题"}]) == "回复2"
+        assert client.llm.calls == 2
+
+        creative = GeminiLLMClient(model_name="gemini-2.5-flash", temperature=0.7)
+        assert creative.response_cache is None
+        creative.llm = FakeChatModel()
+        creative.invoke("问题")
+        creative.invoke("问题")
+        assert creative.llm.calls == 2
+    finally:
+        settings.openai_api_key = original_key
+    print("✅ 客户端缓存接入正确")
+
+
+def test_async_client_shares_cache_off_event_loop():
+    """测试4: 异步调用与同步调用共用缓存键；缓存读写不在事件循环线程中执行"""
+    print("\n【测试4: 异步调用缓存】")
+
+    from src.llm.client import GeminiLLMClient
+
+    original_key = settings.openai_api_key
+    settings.openai_api_key = original_key or "test-key"
+    try:
+        client = GeminiLLMClient(model_name="gemini-2.5-flash", temperature=0.0)
+        client.llm = FakeChatModel()
+        client.response_cache = ThreadRecordingCache()
+
+        async def run():
+            loop_thread = threading.get_ident()
+            first = await client.ainvoke("问题", system_prompt="系统")
+            second = await client.ainvoke("问题", system_prompt="系统")
+            return loop_thread, first, second
+
+        loop_thread, first, second = asyncio.run(run())
+        assert first == second == "回复1" and client.llm.calls == 1
+        # 未命中时读+写，命中时读
+        assert len(client.response_cache.threads) == 3
+        assert loop_thread not in client.response_cache.threads
+
+        # 同步调用命中异步调用写入的缓存
+        assert client.invoke("问题", system_prompt="系统") == "回复1"
+        assert client.llm.calls == 1
+    finally:
+        settings.openai_api_key = original_key
+    print("✅ 异步调用缓存正确")
+
+
+if __name__ == "__main__":
+    test_cache_keys()
+    test_disk_persistence_and_eviction()
+    test_client_uses_cache_only_for_zero_temperature()
+    test_async_client_shares_cache_off_event_loop()
+    print("\n🎉 所有测试通过！")
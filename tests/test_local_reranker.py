@@ -0,0 +1,200 @@
+"""
+本地重排序测试
+使用按关键词打分的假模型，验证跨子问题批量打分、长度排序分批、分数缓存和重排序节点输出（不需要模型文件），
+以及CrossEncoder后端按sentence-transformers版本传入激活函数参数
+"""
+
+import sys
+import os
+import asyncio
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from src.llm import local_reranker
+from src.llm.local_reranker import LocalCrossEncoderReranker
+
+
+class KeywordReranker(LocalCrossEncoderReranker):
+    """假重排序模型: 文档中出现问题关键词越多分数越高，记录每个推理批次"""
+
+    def _load_model(self, onnx_model_path, num_threads):
+        self.backend = "fake"
+        self.batches = []
+
+    def _predict(self, queries, texts):
+        self.batches.append([len(q) + len(t) for q, t in zip(queries, texts)])
+        return np.array([
+            sum(word.lower() in text.lower() for word in query.split()) / 10
+            for query, text in zip(queries, texts)
+        ], dtype=np.float32)
+
+
+def test_batched_scoring_and_cache():
+    """测试1: 多个子问题合并打分，批次按长度排序，重复的 (问题, 文档) 命中缓存"""
+    print("\n【测试1: 批量打分与缓存】")
+
+    reranker = KeywordReranker(batch_size=3)
+    requests = [
+        ("SPD Migration", ["Haushalt", "SPD zur Migration und Asyl", "Die SPD"], ["a", "b", "c"]),
+        ("Grüne Klima", ["Klima", "Die Grünen fordern Klimaschutz und mehr", "Rente"], ["d", "e", "f"]),
+    ]
+    results = reranker.rerank_batch(requests, top_n=2)
+
+    assert [r["index"] for r in results[0]] == [1, 2]
+    assert results[1][0]["index"] == 1
+    assert all(len(r) == 2 for r in results)
+    # 6个文档对分2批推理，批次内按长度升序
+    assert [len(batch) for batch in reranker.batches] == [3, 3]
+    lengths = [length for batch in reranker.batches for length in batch]
+    assert lengths == sorted(lengths)
+
+    # 第二次相同请求全部命中缓存，不再推理
+    again = reranker.rerank("SPD Migration", ["Haushalt", "SPD zur Migration und Asyl", "Die SPD"], ["a", "b", "c"])
+    assert [r["index"] for r in again] == [1, 2, 0]
+    assert len(reranker.batches) == 2
+    stats = reranker.get_stats()
+    assert stats["hits"] == 3 and stats["misses"] == 6
+    print("✅ 批量打分与缓存正确")
+
+
+def test_rerank_node_local_backend():
+    """测试2: 重排序节点使用本地后端一次打分所有子问题，保留检索分数和文档ID"""
+    print("\n【测试2: 重排序节点】")
+
+    from src.graph.nodes.rerank import ReRankNode
+
+    reranker = KeywordReranker()
+    node = ReRankNode(backend="local", reranker=reranker, top_n=2)
+    state = {
+        "question": "SPD Migration",
+        "retrieval_results": [
+            {
+                "question": "SPD Migration",
+                "chunks": [
+                    {"id": "x1", "text": "Haushalt", "metadata": {"year": "2019"}, "score": 0.9},
+                    {"id": "x2", "text": "SPD und Migration", "metadata": {"year": "2019"}, "score": 0.5},
+                    {"id": "x3", "text": "Migration", "metadata": {"year": "2020"}, "score": 0.4},
+                ]
+            },
+            {"question": "Leere Frage", "chunks": []},
+        ]
+    }
+    result = asyncio.run(node.acall(state))
+
+    assert len(reranker.batches) == 1
+    first, second = result["reranked_results"]
+    assert [c["id"] for c in first["chunks"]] == ["x2", "x3"]
+    assert first["chunks"][0]["score"] == 0.5 and first["chunks"][0]["rerank_position"] == 1
+    assert first["original_count"] == 3 and first["reranked_count"] == 2
+    assert second["chunks"] == []
+    assert result["next_node"] == "summarize"
+
+    # 推理失败时保留原始检索排序
+    def broken(queries, texts):
+        raise RuntimeError("boom")
+
+    reranker.clear_cache()
+    reranker._predict = broken
+    fallback = node(state)["reranked_results"][0]
+    assert [c["id"] for c in fallback["chunks"]] == ["x1", "x2", "x3"]
+    assert fallback["rerank_error"] == "boom"
+    print("✅ 重排序节点正确")
+
+
+class SlowKeywordReranker(KeywordReranker):
+    """每个推理批次耗时50毫秒的假重排序模型"""
+
+    def _predict(self, queries, texts):
+        time.sleep(0.05)
+        return super()._predict(queries, texts)
+
+
+def test_rerank_node_deadline_stops_inference():
+    """测试3: 异步重排序超过截止时间后停止推理（不再在后台线程中继续），保留原始检索排序"""
+    print("\n【测试3: 重排序截止时间】")
+
+    from src.config import settings
+    from src.graph.nodes.rerank import ReRankNode
+
+    reranker = SlowKeywordReranker(batch_size=1)
+    node = ReRankNode(backend="local", reranker=reranker, top_n=2)
+    chunks = [{"id": f"x{i}", "text": f"Migration {'x' * i}", "metadata": {}, "score": 1.0 - i / 10} for i in range(10)]
+    state = {"question": "SPD Migration", "retrieval_results": [{"question": "SPD Migration", "chunks": chunks}]}
+
+    original_timeout = settings.rerank_timeout_seconds
+    settings.rerank_timeout_seconds = 0.12
+    try:
+        start = time.perf_counter()
+        result = asyncio.run(node.acall(state))
+        elapsed = time.perf_counter() - start
+    finally:
+        settings.rerank_timeout_seconds = original_timeout
+
+    fallback = result["reranked_results"][0]
+    assert [c["id"] for c in fallback["chunks"]] == [f"x{i}" for i in range(10)]
+    assert "超时" in fallback["rerank_error"] and result["next_node"] == "summarize"
+    assert elapsed < 0.3
+
+    # 推理已停止: 返回后不再有新的推理批次；已完成批次的分数写入缓存
+    finished = len(reranker.batches)
+    time.sleep(0.15)
+    assert len(reranker.batches) == finished < 10
+    assert reranker.get_stats()["entries"] == finished
+    print(f"✅ 超时前完成{finished}个批次后停止推理")
+
+
+class FakeCrossEncoder:
+    """假CrossEncoder: predict签名与sentence-transformers 2.x/3.x相同（没有**kwargs，未知参数直接报错）"""
+
+    def __init__(self, model_name, max_length=None, device=None):
+        self.calls = []
+
+    def predict(self, sentences, batch_size=32, show_progress_bar=None, num_workers=0, activation_fct=None,
+                apply_softmax=False, convert_to_numpy=True, convert_to_tensor=False):
+        self.calls.append(len(sentences))
+        logits = np.array([float(len(text) - len(query)) for query, text in sentences], dtype=np.float32)
+        return activation_fct(logits) if activation_fct is not None else 1.0 / (1.0 + np.exp(-logits))
+
+
+class FakeCrossEncoderV4(FakeCrossEncoder):
+    """sentence-transformers 4.x的predict签名（激活函数参数改名为activation_fn）"""
+
+    def predict(self, sentences, batch_size=32, show_progress_bar=None, activation_fn=None,
+                apply_softmax=False, convert_to_numpy=True, convert_to_tensor=False):
+        return super().predict(sentences, batch_size=batch_size, activation_fct=activation_fn)
+
+
+def test_cross_encoder_predict_signature():
+    """测试4: CrossEncoder后端按predict的真实签名传入激活函数，输出原始logits后统一做一次sigmoid"""
+    print("\n【测试4: CrossEncoder激活函数参数】")
+
+    original = (local_reranker.CrossEncoder if local_reranker.CROSS_ENCODER_AVAILABLE else None,
+                local_reranker.CROSS_ENCODER_AVAILABLE)
+    try:
+        local_reranker.CROSS_ENCODER_AVAILABLE = True
+        for encoder_class in (FakeCrossEncoder, FakeCrossEncoderV4):
+            local_reranker.CrossEncoder = encoder_class
+            reranker = LocalCrossEncoderReranker()
+            assert reranker.backend == "cross_encoder"
+            results = reranker.rerank("Frage", ["kurz", "ein viel längerer Text"], ["a", "b"])
+            assert [r["index"] for r in results] == [1, 0]
+            # 只做一次sigmoid: len("kurz") - len("Frage") = -1
+            assert abs(results[1]["relevance_score"] - 1.0 / (1.0 + np.exp(1.0))) < 1e-6
+            assert reranker.model.calls == [2]
+    finally:
+        if original[0] is not None:
+            local_reranker.CrossEncoder = original[0]
+        else:
+            del local_reranker.CrossEncoder
+        local_reranker.CROSS_ENCODER_AVAILABLE = original[1]
+    print("✅ CrossEncoder激活函数参数正确")
+
+
+if __name__ == "__main__":
+    test_batched_scoring_and_cache()
+    test_rerank_node_local_backend()
+    test_rerank_node_deadline_stops_inference()
+    test_cross_encoder_predict_signature()
+    print("\n🎉 所有测试通过！")
@@ -0,0 +1,105 @@
+"""
+本地向量检索器测试
+使用随机向量构建临时索引，验证检索结果与暴力计算一致（不需要Pinecone）
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from src.vectordb.local_retriever import LocalVectorRetriever
+
+
+def _build_test_index(tmp_dir: str, dtype: str = "float32"):
+    """构建测试索引: 200个向量, 5个年份, 2个党派"""
+    rng = np.random.default_rng(42)
+    vectors = rng.normal(size=(200, 32)).astype(np.float32)
+    ids = [f"doc_{i}" for i in range(200)]
+    metadatas = [
+        {
+            "year": str(2015 + i % 5),
+            "group": ["CDU/CSU", "SPD"][i % 2],
+            "speaker": f"Speaker {i % 7}",
+            "text": f"Dokument {i}"
+        }
+        for i in range(200)
+    ]
+    LocalVectorRetriever.build_index(tmp_dir, ids, vectors, metadatas, dtype=dtype)
+    return vectors, metadatas
+
+
+def _brute_force(vectors, metadatas, query, predicate, k):
+    """暴力计算余弦相似度top-k"""
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    q = query / np.linalg.norm(query)
+    scores = normed @ q
+    candidates = [i for i in range(len(metadatas)) if predicate(metadatas[i])]
+    candidates.sort(key=lambda i: scores[i], reverse=True)
+    return [f"doc_{i}" for i in candidates[:k]]
+
+
+def test_search_matches_brute_force():
+    """测试1: 无过滤/单值过滤/多值过滤与暴力计算一致"""
+    print("\n【测试1: 检索结果与暴力计算一致】")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vectors, metadatas = _build_test_index(tmp_dir)
+        retriever = LocalVectorRetriever(tmp_dir, default_limit=10)
+        query = vectors[17]
+
+        hits = retriever.search(query.tolist())
+        assert [h["id"] for h in hits] == _brute_force(vectors, metadatas, query, lambda m: True, 10)
+        assert hits[0]["id"] == "doc_17"
+        assert hits[0]["text"] == "Dokument 17"
+
+        hits = retriever.search(query.tolist(), limit=5, filters={"party": "SPD", "year": ["2016", "2018"]})
+        expected = _brute_force(
+            vectors, metadatas, query,
+            lambda m: m["group"] == "SPD" and m["year"] in ("2016", "2018"), 5
+        )
+        assert [h["id"] for h in hits] == expected
+        print(f"✅ 过滤检索结果: {[h['id'] for h in hits]}")
+
+
+def test_multi_year_stratified():
+    """测试2: 多年份分层检索每年返回limit_per_year个文档"""
+    print("\n【测试2: 多年份分层检索】")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vectors, _ = _build_test_index(tmp_dir, dtype="float16")
+        retriever = LocalVectorRetriever(tmp_dir)
+
+        hits = retriever.search_multi_year_parallel(
+            vectors[0].tolist(),
+            years=["2015", "2016", "2017"],
+            limit_per_year=3,
+            other_filters={"speaker": "Speaker 0"}
+        )
+        years = [h["metadata"]["year"] for h in hits]
+        assert sorted(years) == ["2015"] * 3 + ["2016"] * 3 + ["2017"] * 3
+        assert all(h["metadata"]["speaker"] == "Speaker 0" for h in hits)
+        assert [h["score"] for h in hits] == sorted((h["score"] for h in hits), reverse=True)
+        print(f"✅ 年份分布: {years}")
+
+
+def test_unknown_filter_value_returns_empty():
+    """测试3: 不存在的过滤值返回空结果"""
+    print("\n【测试3: 不存在的过滤值】")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vectors, _ = _build_test_index(tmp_dir)
+        retriever = LocalVectorRetriever(tmp_dir)
+
+        assert retriever.search(vectors[0].tolist(), filters={"party": "FDP"}) == []
+        assert retriever.get_stats()["total_vectors"] == 200
+        print("✅ 空结果处理正确")
+
+
+if __name__ == "__main__":
+    test_search_matches_brute_force()
+    test_multi_year_stratified()
+    test_unknown_filter_value_returns_empty()
+    print("\n🎉 所有测试通过！")
@@ -0,0 +1,128 @@
+"""
+元数据差异补丁测试
+验证只写回变化的向量、复用原向量值、dry-run不写入以及统计计数（使用假Pinecone索引，不需要向量库）
+"""
+
+import sys
+import os
+import tempfile
+from types import SimpleNamespace
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import settings
+from src.vectordb.index_epoch import get_index_epoch
+from src.vectordb.metadata_patcher import MetadataPatcher, metadata_changes
+
+
+class FakePineconeIndex:
+    """假Pinecone索引: list按页返回ID，fetch返回带values/metadata的对象，记录upsert请求"""
+
+    def __init__(self, vectors, page_size=4):
+        self.vectors = vectors
+        self.page_size = page_size
+        self.upsert_requests = []
+        self.update_calls = 0
+
+    def list(self, prefix=""):
+        ids = sorted(vector_id for vector_id in self.vectors if vector_id.startswith(prefix))
+        for i in range(0, len(ids), self.page_size):
+            yield ids[i:i + self.page_size]
+
+    def fetch(self, ids):
+        return SimpleNamespace(vectors={
+            vector_id: SimpleNamespace(values=self.vectors[vector_id]["values"],
+                                       metadata=dict(self.vectors[vector_id]["metadata"]))
+            for vector_id in ids if vector_id in self.vectors
+        })
+
+    def upsert(self, vectors):
+        self.upsert_requests.append(len(vectors))
+        for vector in vectors:
+            self.vectors[vector["id"]] = {"values": vector["values"], "metadata": vector["metadata"]}
+
+    def update(self, id, set_metadata):
+        self.update_calls += 1
+
+
+SOURCE = {f"t{i}": {"id": f"ID19{i}", "speaker": "Redner", "year": "2016", "month": "03", "day": f"{i + 1:02d}"}
+          for i in range(10)}
+
+
+def _desired(vector_id, metadata):
+    source = SOURCE.get(metadata.get("original_text_id"))
+    if source is None:
+        return None
+    return {
+        "month": source["month"],
+        "day": source["day"],
+        "source_reference": f"{source['id']} | {source['speaker']} | {source['year']}-{source['month']}-{source['day']}"
+    }
+
+
+def _index():
+    vectors = {}
+    for i in range(10):
+        metadata = {"original_text_id": f"t{i}", "text": f"Rede {i}", "month": "03", "day": f"{i + 1:02d}"}
+        metadata.update(_desired(None, metadata))
+        vectors[f"2016_{i:02d}"] = {"values": [float(i), 1.0], "metadata": metadata}
+    # 3个向量缺少字段或字段错误，1个向量找不到原始数据，1个其他年份的向量
+    del vectors["2016_01"]["metadata"]["source_reference"]
+    vectors["2016_04"]["metadata"]["day"] = "01"
+    vectors["2016_07"]["metadata"]["month"] = "3"
+    vectors["2016_09"]["metadata"]["original_text_id"] = "unknown"
+    vectors["2017_00"] = {"values": [0.0, 0.0], "metadata": {"original_text_id": "t0"}}
+    return FakePineconeIndex(vectors)
+
+
+def test_metadata_changes():
+    """测试1: 字段差异（数字1与1.0相同，未给出的字段不比较）"""
+    print("\n【测试1: 字段差异】")
+
+    assert metadata_changes({"a": 1.0, "b": "x", "c": 5}, {"a": 1, "b": "x"}) == {}
+    assert metadata_changes({"a": "1"}, {"a": 1, "d": None}) == {"a": 1, "d": None}
+    assert metadata_changes(None, {"a": True}) == {"a": True}
+    print("✅ 字段差异正确")
+
+
+def test_patch_only_changed_vectors():
+    """测试2: dry-run只统计；写入时只upsert变化的向量，向量值和其他字段保持不变，并递增索引版本号"""
+    print("\n【测试2: 差异补丁】")
+
+    original_path = settings.index_epoch_path
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        settings.index_epoch_path = os.path.join(tmp_dir, "index_epoch")
+        try:
+            index = _index()
+            patcher = MetadataPatcher(index, desired_metadata=_desired, max_in_flight=2, batch_size=2)
+            epoch = get_index_epoch()
+
+            report = patcher.patch_prefix("2016_", dry_run=True)
+            assert (report.scanned, report.changed, report.unchanged, report.skipped) == (10, 3, 6, 1)
+            assert report.patched == 0 and index.upsert_requests == []
+            assert report.field_counts == {"source_reference": 1, "day": 1, "month": 1}
+            assert get_index_epoch() == epoch
+
+            report = patcher.patch_prefix("2016_")
+            assert report.changed == 3 and report.patched == 3 and report.failed == 0
+            assert sum(index.upsert_requests) == 3 and index.update_calls == 0
+            assert index.vectors["2016_04"]["metadata"]["day"] == "05"
+            assert index.vectors["2016_04"]["metadata"]["text"] == "Rede 4"
+            assert index.vectors["2016_04"]["values"] == [4.0, 1.0]
+            assert index.vectors["2016_01"]["metadata"]["source_reference"] == "ID191 | Redner | 2016-03-02"
+            assert "month" not in index.vectors["2017_00"]["metadata"]
+            patched_epoch = get_index_epoch()
+            assert patched_epoch != epoch
+
+            # 再次运行: 没有需要修改的向量，版本号不变
+            report = patcher.patch_prefix("2016_")
+            assert report.changed == 0 and report.unchanged == 9 and report.to_dict()["patched"] == 0
+            assert get_index_epoch() == patched_epoch
+        finally:
+            settings.index_epoch_path = original_path
+    print("✅ 差异补丁正确")
+
+
+if __name__ == "__main__":
+    test_metadata_changes()
+    test_patch_only_changed_vectors()
+    print("\n🎉 所有测试通过！")
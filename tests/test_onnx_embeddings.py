@@ -0,0 +1,121 @@
+"""
+BGE-M3 ONNX 后端测试
+使用假推理会话验证CLS池化、归一化、按长度分批后的顺序还原、模型文件选择和一致性检查（不需要ONNX模型）
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from src.llm.onnx_embeddings import (
+    FP32_MODEL_FILE,
+    INT8_MODEL_FILE,
+    OnnxBGEM3Encoder,
+    compare_vectors,
+)
+
+
+class FakeTokenizer:
+    """按字符编码的假tokenizer（补齐到批次内最长文本）"""
+
+    def __call__(self, texts, padding=True, truncation=True, max_length=8192, return_tensors="np"):
+        length = max(len(text) for text in texts) + 1
+        input_ids = np.zeros((len(texts), length), dtype=np.int32)
+        attention_mask = np.zeros((len(texts), length), dtype=np.int32)
+        for i, text in enumerate(texts):
+            input_ids[i, 0] = 1
+            input_ids[i, 1:len(text) + 1] = [ord(c) for c in text]
+            attention_mask[i, :len(text) + 1] = 1
+        return {"input_ids": input_ids, "attention_mask": attention_mask, "token_type_ids": attention_mask}
+
+
+class FakeSession:
+    """输出最后一层隐藏状态的假会话: CLS位置为 [文本长度, 1, 0, 0]，记录每批的序列长度"""
+
+    def __init__(self):
+        self.batch_lengths = []
+
+    def run(self, output_names, inputs):
+        assert set(inputs) == {"input_ids", "attention_mask"}
+        assert inputs["input_ids"].dtype == np.int64
+        batch, length = inputs["input_ids"].shape
+        self.batch_lengths.append(length)
+        hidden = np.random.default_rng(0).normal(size=(batch, length, 4)).astype(np.float32)
+        hidden[:, 0] = 0
+        hidden[:, 0, 0] = inputs["attention_mask"].sum(axis=1) - 1
+        hidden[:, 0, 1] = 1
+        return [hidden]
+
+
+class FakeEncoder(OnnxBGEM3Encoder):
+    def _load(self, num_threads):
+        self.tokenizer = FakeTokenizer()
+        self.session = FakeSession()
+        self.input_names = {"input_ids", "attention_mask"}
+
+
+def test_encode_pooling_and_order():
+    """测试1: CLS池化+归一化，按长度分批后结果按输入顺序返回"""
+    print("\n【测试1: 编码】")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        open(os.path.join(tmp_dir, INT8_MODEL_FILE), "w").close()
+        encoder = FakeEncoder(tmp_dir)
+        assert encoder.model_file.endswith(INT8_MODEL_FILE)
+
+        texts = ["a" * 9, "b", "c" * 30, "dd", "e" * 10]
+        vectors = encoder.encode(texts, batch_size=2)
+
+        assert vectors.shape == (5, 4)
+        assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+        for text, vector in zip(texts, vectors):
+            expected = np.array([len(text), 1, 0, 0], dtype=np.float32)
+            assert np.allclose(vector, expected / np.linalg.norm(expected), atol=1e-6)
+        # 长度排序后分批: [1, 2], [9, 10], [30]
+        assert encoder.session.batch_lengths == [3, 11, 31]
+    print("✅ 编码正确")
+
+
+def test_model_file_selection():
+    """测试2: 缺少int8模型时回退到fp32，都不存在时报错"""
+    print("\n【测试2: 模型文件选择】")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        try:
+            FakeEncoder(tmp_dir)
+            assert False, "应抛出FileNotFoundError"
+        except FileNotFoundError:
+            pass
+
+        open(os.path.join(tmp_dir, FP32_MODEL_FILE), "w").close()
+        assert FakeEncoder(tmp_dir).model_file.endswith(FP32_MODEL_FILE)
+        assert FakeEncoder(tmp_dir, quantized=False).model_file.endswith(FP32_MODEL_FILE)
+    print("✅ 模型文件选择正确")
+
+
+def test_compare_vectors():
+    """测试3: 一致性检查按最小余弦相似度判断"""
+    print("\n【测试3: 一致性检查】")
+
+    rng = np.random.default_rng(1)
+    reference = rng.normal(size=(5, 1024)).astype(np.float32)
+
+    close = reference + rng.normal(scale=0.01, size=reference.shape).astype(np.float32)
+    result = compare_vectors(reference, close)
+    assert result["passed"] and result["min_cosine"] > 0.99
+
+    far = close.copy()
+    far[2] = rng.normal(size=1024)
+    result = compare_vectors(reference, far)
+    assert not result["passed"] and result["min_cosine"] < 0.5
+    print("✅ 一致性检查正确")
+
+
+if __name__ == "__main__":
+    test_encode_pooling_and_order()
+    test_model_file_selection()
+    test_compare_vectors()
+    print("\n🎉 所有测试通过！")
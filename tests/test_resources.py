@@ -0,0 +1,138 @@
+"""
+进程级资源注册表测试
+验证资源复用、按参数池化、省略参数与显式默认值共用实例以及并发首次获取只创建一次（不需要LLM服务和Embedding模型）
+"""
+
+import sys
+import os
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import settings
+from src import resources
+
+
+def test_get_or_create_reuses_instance():
+    """测试1: 相同键只创建一次，不同键各自创建"""
+    print("\n【测试1: 资源复用】")
+
+    resources.reset_resources()
+    created = []
+
+    def factory():
+        created.append(object())
+        return created[-1]
+
+    first = resources.get_or_create_resource(("test", "a"), factory)
+    second = resources.get_or_create_resource(("test", "a"), factory)
+    other = resources.get_or_create_resource(("test", "b"), factory)
+
+    assert first is second
+    assert other is not first
+    assert len(created) == 2
+    assert resources.get_registry_stats() == {"test": 2}
+
+    resources.reset_resources()
+    assert resources.get_or_create_resource(("test", "a"), factory) is not first
+    resources.reset_resources()
+    print("✅ 资源复用正确")
+
+
+def test_concurrent_first_access_creates_once():
+    """测试2: 多线程同时首次获取同一资源，只加载一次"""
+    print("\n【测试2: 并发首次获取】")
+
+    resources.reset_resources()
+    calls = []
+
+    def slow_factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(resources.get_or_create_resource(("model",), slow_factory)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    resources.reset_resources()
+    print("✅ 并发首次获取只创建一次")
+
+
+def test_llm_clients_pooled_by_model_and_temperature():
+    """测试3: LLM客户端按(模型, temperature)池化"""
+    print("\n【测试3: LLM客户端池化】")
+
+    resources.reset_resources()
+    original_key = settings.openai_api_key
+    settings.openai_api_key = "test-key"
+    try:
+        flash = resources.get_llm_client(model_name="gemini-2.5-flash", temperature=0.0)
+        assert resources.get_llm_client(model_name="gemini-2.5-flash", temperature=0) is flash
+        assert resources.get_llm_client(model_name="gemini-2.5-flash", temperature=0.7) is not flash
+        assert resources.get_llm_client(model_name="gemini-2.5-pro", temperature=0.0) is not flash
+        assert resources.get_llm_client(temperature=0.0) is resources.get_llm_client(
+            model_name=settings.third_party_model_name, max_tokens=settings.llm_max_tokens
+        )
+        # flash/0.0、flash/0.7、pro/0.0，加上默认模型（可能与pro相同）
+        expected = len({"gemini-2.5-flash", "gemini-2.5-pro", settings.third_party_model_name}) + 1
+        assert resources.get_registry_stats() == {"llm": expected}
+    finally:
+        settings.openai_api_key = original_key
+        resources.reset_resources()
+    print("✅ LLM客户端池化正确")
+
+
+def test_default_arguments_share_instance():
+    """测试4: 省略参数与显式传入配置默认值的Embedding客户端/检索器共用同一实例"""
+    print("\n【测试4: 默认参数归一化】")
+
+    import src.llm.embeddings as embeddings
+    import src.vectordb.pinecone_retriever as pinecone_retriever
+
+    class FakeEmbeddingClient:
+        def __init__(self, model_name=None, dimensions=None, embedding_mode=None):
+            self.model_name = model_name
+
+    original = (embeddings.GeminiEmbeddingClient, pinecone_retriever.create_pinecone_retriever,
+                settings.embedding_mode, settings.vector_backend)
+    embeddings.GeminiEmbeddingClient = FakeEmbeddingClient
+    pinecone_retriever.create_pinecone_retriever = lambda **kwargs: object()
+    resources.reset_resources()
+    try:
+        settings.embedding_mode = "local"
+        default = resources.get_embedding_client()
+        assert resources.get_embedding_client(
+            embedding_mode="local",
+            model_name=settings.local_embedding_model,
+            dimensions=settings.local_embedding_dimension
+        ) is default
+        assert resources.get_embedding_client(embedding_mode="local", model_name="other-model") is not default
+        assert resources.get_embedding_client(embedding_mode="openai") is not default
+
+        settings.vector_backend = "pinecone"
+        retriever = resources.get_vector_retriever()
+        assert resources.get_vector_retriever(index_name="german-bge", default_limit=50, backend="pinecone") is retriever
+        assert resources.get_vector_retriever(backend="local") is not retriever
+        assert resources.get_registry_stats() == {"embedding": 3, "retriever": 2}
+    finally:
+        (embeddings.GeminiEmbeddingClient, pinecone_retriever.create_pinecone_retriever,
+         settings.embedding_mode, settings.vector_backend) = original
+        resources.reset_resources()
+    print("✅ 默认参数归一化正确")
+
+
+if __name__ == "__main__":
+    test_get_or_create_reuses_instance()
+    test_concurrent_first_access_creates_once()
+    test_llm_clients_pooled_by_model_and_temperature()
+    test_default_arguments_share_instance()
+    print("\n🎉 所有测试通过！")
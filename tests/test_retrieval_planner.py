@@ -0,0 +1,200 @@
+"""
+检索计划器测试
+验证相同/被覆盖检索的合并、结果截取分发，以及检索节点跨子问题只执行唯一检索（不需要Pinecone）
+"""
+
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import settings
+from src.graph.retrieval_planner import RetrievalPlanner
+
+
+class FakeRetriever:
+    """记录调用的假检索器（结果按得分降序）"""
+
+    index_name = "german-bge"
+    default_limit = 50
+
+    def __init__(self):
+        self.calls = []
+
+    def search(self, query_vector, limit=None, filters=None, include_metadata=True):
+        self.calls.append(("search", limit))
+        return [
+            {"id": f"doc_{i}", "score": 1.0 - i * 0.01, "text": f"Text {query_vector[0]} {i}",
+             "metadata": {"year": "2019"}}
+            for i in range(limit)
+        ]
+
+    def search_multi_year_parallel(self, query_vector, years, limit_per_year=5, other_filters=None):
+        self.calls.append(("search_multi_year_parallel", limit_per_year))
+        results = [
+            {"id": f"{year}_{i}", "score": 1.0 - i * 0.1 - int(year) * 0.001,
+             "text": f"Text {query_vector[0]} {year} {i}", "metadata": {"year": year}}
+            for year in years for i in range(limit_per_year)
+        ]
+        return sorted(results, key=lambda r: r["score"], reverse=True)
+
+
+class FakeEmbeddingClient:
+    """按文本长度生成向量的假Embedding客户端"""
+
+    def embed_text(self, text):
+        return [float(len(text)), 1.0]
+
+    def embed_queries(self, texts):
+        return [self.embed_text(text) for text in texts]
+
+
+def test_merge_identical_and_dominated_requests():
+    """测试1: 相同检索合并，只有limit不同时执行最大limit并截取"""
+    print("\n【测试1: 合并与截取】")
+
+    planner = RetrievalPlanner()
+    small = planner.add("search", [1.0, 0.0], limit=5, filters={"year": ["2016", "2015"]})
+    large = planner.add("search", [1.0, 0.0], limit=20, filters={"year": ["2015", "2016"]})
+    other = planner.add("search", [1.0, 0.0], limit=5, filters={"year": "2017"})
+    years_small = planner.add("search_multi_year_parallel", [1.0, 0.0], years=["2015", "2016"], limit_per_year=2)
+    years_large = planner.add("search_multi_year_parallel", [1.0, 0.0], years=["2015", "2016"], limit_per_year=5)
+
+    assert planner.request_count == 5
+    assert planner.unique_count == 3
+
+    retriever = FakeRetriever()
+    asyncio.run(planner.aexecute(retriever, max_concurrency=2))
+    assert sorted(retriever.calls) == [("search", 5), ("search", 20), ("search_multi_year_parallel", 5)]
+
+    assert [r["id"] for r in planner.results(small)] == [f"doc_{i}" for i in range(5)]
+    assert len(planner.results(large)) == 20
+    assert len(planner.results(other)) == 5
+
+    per_year = planner.results(years_small)
+    assert len(per_year) == 4
+    assert {r["metadata"]["year"] for r in per_year} == {"2015", "2016"}
+    assert [r["id"] for r in per_year if r["metadata"]["year"] == "2015"] == ["2015_0", "2015_1"]
+    assert len(planner.results(years_large)) == 10
+
+    # 分发的是副本，修改不影响其他请求
+    planner.results(small)[0]["score"] = -1
+    assert planner.results(large)[0]["score"] == 1.0
+    print("✅ 合并与截取正确")
+
+
+def test_failed_search_raises_for_dependents():
+    """测试2: 检索最终失败时，依赖它的请求取回结果时抛出异常"""
+    print("\n【测试2: 失败传播】")
+
+    class BrokenRetriever(FakeRetriever):
+        def search(self, *args, **kwargs):
+            raise ConnectionError("timeout")
+
+    planner = RetrievalPlanner()
+    request_id = planner.add("search", [1.0], limit=5, filters=None)
+    asyncio.run(planner.aexecute(BrokenRetriever(), max_retries=0))
+    try:
+        planner.results(request_id)
+        assert False, "应抛出异常"
+    except ConnectionError:
+        pass
+    print("✅ 失败传播正确")
+
+
+def test_node_executes_unique_searches_across_sub_questions():
+    """测试3: 检索节点对重复子问题只执行唯一检索"""
+    print("\n【测试3: 检索节点跨子问题去重】")
+
+    from src.graph.nodes.retrieve_pinecone import PineconeRetrieveNode
+
+    original = settings.search_cache_enabled
+    settings.search_cache_enabled = False
+    try:
+        retriever = FakeRetriever()
+        node = PineconeRetrieveNode(
+            retriever=retriever,
+            embedding_client=FakeEmbeddingClient(),
+            enable_kg_expansion=False
+        )
+        question = "Was ist die Position von SPD zur Migration?"
+        state = {
+            "question": question,
+            "sub_questions": [question, question, {"question": question, "target_year": None}],
+            "parameters": {"time_range": {"start_year": "2015", "end_year": "2017"}},
+        }
+        result = asyncio.run(node.acall(state))
+
+        variants = len(node._generate_query_variants(question))
+        assert len(retriever.calls) == variants
+        assert len(result["retrieval_results"]) == 3
+        assert all(r["chunks"] for r in result["retrieval_results"])
+        assert f"{3 * variants}个检索请求 -> 合并为{variants}个唯一检索" in result["retrieval_thinking"]
+    finally:
+        settings.search_cache_enabled = original
+    print("✅ 只执行唯一检索")
+
+
+class FakeHybridRetriever(FakeRetriever):
+    """带稀疏倒排索引的假检索器（记录混合检索收到的查询词项权重）"""
+
+    supports_hybrid = True
+
+    def hybrid_search(self, query_vector, query_lexical_weights, limit=None, filters=None,
+                      dense_weight=1.0, sparse_weight=0.3):
+        self.calls.append(("hybrid_search", dict(query_lexical_weights)))
+        return self.search(query_vector, limit=limit, filters=filters)
+
+
+class FakeSparseEmbeddingClient(FakeEmbeddingClient):
+    """能输出稀疏词项权重的假Embedding客户端（记录前向计算次数）"""
+
+    supports_sparse = True
+
+    def __init__(self):
+        self.forward_passes = []
+
+    def embed_queries_with_sparse(self, texts, sparse_texts):
+        self.forward_passes.append((list(texts), list(sparse_texts)))
+        return self.embed_queries(texts), {text: {len(text): 1.0} for text in sparse_texts}
+
+    def embed_query_sparse(self, text):
+        raise AssertionError("稀疏权重应在批量预计算中得到")
+
+
+def test_node_folds_sparse_weights_into_batch_embedding():
+    """测试4: 混合检索所需的问题稀疏权重与查询向量在同一次批量Embedding中计算"""
+    print("\n【测试4: 稀疏权重批量预计算】")
+
+    from src.graph.nodes.retrieve_pinecone import PineconeRetrieveNode
+
+    original = (settings.search_cache_enabled, settings.hybrid_search_enabled)
+    settings.search_cache_enabled = False
+    settings.hybrid_search_enabled = True
+    try:
+        retriever = FakeHybridRetriever()
+        embedding_client = FakeSparseEmbeddingClient()
+        node = PineconeRetrieveNode(
+            retriever=retriever,
+            embedding_client=embedding_client,
+            enable_kg_expansion=False
+        )
+        questions = ["Was sagt die SPD zur Migration?", "Was sagt die CDU zur Rente?"]
+        state = {"question": questions[0], "sub_questions": questions, "parameters": {}}
+        asyncio.run(node.acall(state))
+
+        assert len(embedding_client.forward_passes) == 1
+        assert embedding_client.forward_passes[0][1] == questions
+        hybrid_weights = [weights for method, weights in retriever.calls if method == "hybrid_search"]
+        assert sorted(hybrid_weights, key=str) == sorted(({len(q): 1.0} for q in questions), key=str)
+    finally:
+        settings.search_cache_enabled, settings.hybrid_search_enabled = original
+    print("✅ 稀疏权重在批量预计算中得到")
+
+
+if __name__ == "__main__":
+    test_merge_identical_and_dominated_requests()
+    test_failed_search_raises_for_dependents()
+    test_node_executes_unique_searches_across_sub_questions()
+    test_node_folds_sparse_weights_into_batch_embedding()
+    print("\n🎉 所有测试通过！")
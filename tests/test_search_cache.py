@@ -0,0 +1,166 @@
+"""
+检索结果缓存测试
+验证缓存键规范化、TTL/LRU/索引版本号失效以及请求级命中统计（不需要Pinecone）
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import settings
+from src.vectordb.index_epoch import bump_index_epoch
+from src.vectordb.search_cache import CachedRetriever, SearchResultCache, search_cache_scope
+
+
+class FakeRetriever:
+    """记录调用次数的假检索器（failing_years中的年份检索时抛出异常）"""
+
+    index_name = "german-bge"
+    default_limit = 50
+    supports_grouped_search = True
+
+    def __init__(self, failing_years=()):
+        self.calls = 0
+        self.failing_years = set(failing_years)
+
+    def search(self, query_vector, limit=None, filters=None, include_metadata=True):
+        self.calls += 1
+        year = (filters or {}).get("year", "2019")
+        if year in self.failing_years:
+            raise RuntimeError("Pinecone timeout")
+        return [{"id": f"doc_{year}_{self.calls}", "score": 0.9 - int(year) / 1e5, "text": "", "metadata": {"year": year}}]
+
+    def search_multi_year(self, query_vector, years, limit_per_year=5, other_filters=None):
+        self.calls += 1
+        return [{"id": f"year_{y}", "score": 0.8, "text": "", "metadata": {"year": y}} for y in years]
+
+    search_multi_year_parallel = search_multi_year
+
+    def get_stats(self):
+        return {"total_vectors": 1}
+
+
+def test_key_normalization():
+    """测试1: 过滤条件顺序和向量微小误差不影响命中，top_k/索引/过滤值不同则不命中"""
+    print("\n【测试1: 缓存键】")
+
+    key = SearchResultCache.make_key
+    vector = [0.1, 0.2, 0.3]
+    base = key("german-bge", "search", vector, {"year": ["2015", "2016"], "party": "SPD"}, 20)
+
+    assert base == key("german-bge", "search", vector, {"party": "SPD", "year": ["2016", "2015"]}, 20)
+    assert base == key("german-bge", "search", [0.1 + 1e-6, 0.2, 0.3], {"party": "SPD", "year": ["2015", "2016"]}, 20)
+    assert base != key("german-bge", "search", vector, {"year": ["2015", "2016"], "party": "SPD"}, 50)
+    assert base != key("other-index", "search", vector, {"year": ["2015", "2016"], "party": "SPD"}, 20)
+    assert base != key("german-bge", "search", vector, {"year": ["2015", "2017"], "party": "SPD"}, 20)
+    assert base != key("german-bge", "search", [0.1, 0.2, 0.4], {"year": ["2015", "2016"], "party": "SPD"}, 20)
+    print("✅ 缓存键规范化正确")
+
+
+def test_ttl_lru_and_epoch():
+    """测试2: TTL过期、LRU淘汰、索引版本号变化清空"""
+    print("\n【测试2: 失效策略】")
+
+    original_path = settings.index_epoch_path
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        settings.index_epoch_path = os.path.join(tmp_dir, "index_epoch")
+        try:
+            cache = SearchResultCache(ttl_seconds=0.05, max_entries=2)
+            cache.put("a", [{"id": "1"}])
+            assert cache.get("a") == [{"id": "1"}]
+            time.sleep(0.06)
+            assert cache.get("a") is None
+
+            cache.ttl_seconds = 60
+            cache.put("a", [{"id": "1"}])
+            cache.put("b", [{"id": "2"}])
+            cache.get("a")
+            cache.put("c", [{"id": "3"}])
+            assert cache.get("b") is None
+            assert cache.get("a") is not None and cache.get("c") is not None
+
+            # 返回副本，调用方修改结果不影响缓存
+            cache.get("a")[0]["id"] = "changed"
+            assert cache.get("a") == [{"id": "1"}]
+
+            bump_index_epoch("测试")
+            assert cache.get("a") is None and cache.get("c") is None
+        finally:
+            settings.index_epoch_path = original_path
+    print("✅ 失效策略正确")
+
+
+def test_cached_retriever_and_request_stats():
+    """测试3: 包装检索器命中缓存，请求级统计在线程中同样生效"""
+    print("\n【测试3: 包装检索器与请求统计】")
+
+    retriever = FakeRetriever()
+    cached = CachedRetriever(retriever, SearchResultCache())
+    vector = [0.5, 0.5]
+
+    async def run_request():
+        with search_cache_scope() as stats:
+            await asyncio.gather(*[
+                asyncio.to_thread(cached.search, vector, 20, {"year": "2019"}) for _ in range(3)
+            ])
+            await asyncio.to_thread(cached.search_multi_year_parallel, vector, ["2015", "2016"], 5)
+            await asyncio.to_thread(cached.search_multi_year, vector, ["2016", "2015"], 5)
+        return stats
+
+    stats = asyncio.run(run_request())
+    # 并发的相同search可能同时未命中；每次未命中恰好对应一次真实检索，两次多年份检索共用缓存键
+    assert stats.lookups == 5
+    assert retriever.calls == stats.misses
+    assert cached.search_multi_year(vector, ["2015", "2016"], 5)[0]["id"] == "year_2015"
+    assert cached.get_stats() == {"total_vectors": 1}
+
+    with search_cache_scope() as second:
+        cached.search(vector, 20, {"year": "2019"})
+    assert second.hits == 1 and second.misses == 0 and second.hit_rate == 1.0
+    print("✅ 包装检索器与请求统计正确")
+
+
+class FakePineconeRetriever(FakeRetriever):
+    """不支持分组检索的假检索器（多年份检索按年份逐个缓存）"""
+
+    supports_grouped_search = False
+
+
+def test_multi_year_caches_only_successful_years():
+    """测试4: 不支持分组检索时按年份缓存；失败的年份不写入缓存，下次重新检索"""
+    print("\n【测试4: 多年份检索的部分失败】")
+
+    retriever = FakePineconeRetriever(failing_years={"2016"})
+    cached = CachedRetriever(retriever, SearchResultCache())
+    vector = [0.5, 0.5]
+
+    results = cached.search_multi_year_parallel(vector, ["2015", "2016", "2017"], 5, {"party": "SPD"})
+    assert [r["metadata"]["year"] for r in results] == ["2015", "2017"]
+    assert retriever.calls == 3
+
+    # 2015/2017命中缓存（与带年份过滤的search共用缓存键），只重新检索失败的2016年
+    retriever.failing_years.clear()
+    with search_cache_scope() as stats:
+        results = cached.search_multi_year(vector, ["2017", "2016", "2015"], 5, {"party": "SPD"})
+    assert [r["metadata"]["year"] for r in results] == ["2015", "2016", "2017"]
+    assert retriever.calls == 4 and stats.hits == 2 and stats.misses == 1
+    assert cached.search(vector, 5, {"party": "SPD", "year": "2016"}) == [results[1]]
+    assert retriever.calls == 4
+
+    # 全部年份失败: 返回空结果且不缓存
+    retriever.failing_years.add("2018")
+    assert cached.search_multi_year_parallel(vector, ["2018"], 5) == []
+    assert cached.search_multi_year_parallel(vector, ["2018"], 5) == []
+    assert retriever.calls == 6
+    print("✅ 只缓存成功的年份")
+
+
+if __name__ == "__main__":
+    test_key_normalization()
+    test_ttl_lru_and_epoch()
+    test_cached_retriever_and_request_stats()
+    test_multi_year_caches_only_successful_years()
+    print("\n🎉 所有测试通过！")
@@ -0,0 +1,63 @@
+"""
+多进程分块测试
+验证iter_chunks / split_speeches_parallel与split_speeches结果一致，且metadata按引用共享（不需要外部服务）
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_loader.splitter import ParliamentTextSplitter
+
+
+def _speeches(count):
+    speeches = []
+    for i in range(count):
+        # 长短交替：短演讲不分割，长演讲按段落/句子分割
+        text = f"Kurze Rede {i}." if i % 3 == 0 else " ".join(
+            f"Satz {j} der Rede {i} über Migration und Klimaschutz." for j in range(40 + i)
+        )
+        speeches.append({"metadata": {"speaker": f"Redner {i}", "group": "SPD", "year": "2020"}, "speech": text})
+    return speeches
+
+
+def test_parallel_matches_sequential():
+    """测试1: 多进程分块与单进程分块结果一致，顺序不变"""
+    print("\n【测试1: 多进程分块一致性】")
+
+    splitter = ParliamentTextSplitter(chunk_size=300, chunk_overlap=50)
+    speeches = _speeches(25)
+    expected = splitter.split_speeches(speeches)
+
+    chunks, metadata_table = splitter.split_speeches_parallel(speeches, max_workers=2, batch_size=4)
+    assert len(chunks) == len(expected)
+    assert [splitter.materialize_chunk(chunk, metadata_table) for chunk in chunks] == expected
+
+    in_process = list(splitter.iter_chunks(speeches, max_workers=1, batch_size=7))
+    assert in_process == chunks
+    print(f"✅ {len(speeches)}条演讲 -> {len(chunks)}个chunks，结果一致")
+
+
+def test_metadata_shared_by_reference():
+    """测试2: chunk只保存metadata_id，metadata表引用原始metadata对象"""
+    print("\n【测试2: metadata按引用共享】")
+
+    splitter = ParliamentTextSplitter(chunk_size=300, chunk_overlap=50)
+    speeches = _speeches(4)
+
+    metadata_table = []
+    chunks = list(splitter.iter_chunks(iter(speeches), metadata_table=metadata_table, max_workers=2, batch_size=2))
+
+    assert all("metadata" not in chunk for chunk in chunks)
+    assert all(metadata_table[i] is speeches[i]["metadata"] for i in range(len(speeches)))
+    assert {chunk["metadata_id"] for chunk in chunks} == set(range(len(speeches)))
+
+    stats = splitter.get_chunk_statistics(chunks)
+    assert stats["total_chunks"] == len(chunks)
+    print("✅ metadata按引用共享")
+
+
+if __name__ == "__main__":
+    test_parallel_matches_sequential()
+    test_metadata_shared_by_reference()
+    print("\n🎉 所有测试通过！")
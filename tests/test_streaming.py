@@ -0,0 +1,111 @@
+"""
+流式问答测试
+验证token回调作用域、总结节点的流式生成以及SSE接口的事件顺序（不需要LLM和检索服务）
+"""
+
+import sys
+import os
+import json
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.graph.nodes.summarize_incremental_v2 import IncrementalSummarizeNodeV2
+from src.graph.state import update_state
+from src.graph.streaming import get_token_sink, token_sink
+
+
+class FakeStreamingLLM:
+    """invoke返回提取结果，stream_invoke分片返回答案"""
+
+    def invoke(self, prompt):
+        return '{"SPD": {"立场": "dafür"}}'
+
+    def stream_invoke(self, prompt):
+        yield from ["Die ", "SPD ", "ist dafür."]
+
+
+def test_token_sink_scope():
+    """测试1: token回调只在作用域内生效"""
+    print("\n【测试1: token回调作用域】")
+
+    assert get_token_sink() is None
+    received = []
+    with token_sink(received.append):
+        get_token_sink()("a")
+    assert get_token_sink() is None
+    assert received == ["a"]
+    print("✅ token回调作用域正确")
+
+
+def test_summarize_streams_generation_tokens():
+    """测试2: 有token回调时阶段2流式生成，答案与片段拼接一致"""
+    print("\n【测试2: 总结节点流式生成】")
+
+    node = IncrementalSummarizeNodeV2(llm_client=FakeStreamingLLM(), max_concurrency=1)
+    results = [{"question": "SPD 2020?", "chunks": [{"text": "Rede", "metadata": {"year": "2020"}, "score": 0.9}]}]
+
+    received = []
+    with token_sink(received.append):
+        answer = node._two_stage_summarize("SPD 2020?", "事实查询", results)
+
+    assert received == ["Die ", "SPD ", "ist dafür."]
+    assert answer == "Die SPD ist dafür."
+    print("✅ 总结节点流式生成正确")
+
+
+class FakeGraph:
+    """按节点顺序输出状态，summarize节点通过token回调推送片段"""
+
+    async def astream(self, initial_state, stream_mode="updates"):
+        state = update_state(initial_state, intent="simple")
+        yield {"intent_analysis": state}
+        state = update_state(state, retrieval_results=[{"question": "q", "chunks": [{"text": "t", "metadata": {}}]}])
+        yield {"retrieve": state}
+        sink = get_token_sink()
+        for text in ["Ant", "wort"]:
+            sink(text)
+        yield {"summarize": update_state(state, final_answer="Antwort")}
+
+
+class FakeWorkflow:
+    graph = FakeGraph()
+
+
+def test_sse_endpoint_event_order():
+    """测试3: SSE接口依次推送进度、token和done事件"""
+    print("\n【测试3: SSE接口】")
+
+    try:
+        from fastapi.testclient import TestClient
+    except ImportError:
+        print("⚠️ 未安装fastapi，跳过")
+        return
+
+    import api_server
+
+    api_server.workflow = FakeWorkflow()
+    try:
+        client = TestClient(api_server.app)
+        response = client.post("/api/v1/ask/stream", json={"question": "SPD 2020?"})
+    finally:
+        api_server.workflow = None
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        event_line, data_line = block.split("\n")
+        events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+
+    assert [event for event, _ in events] == ["progress", "progress", "token", "token", "progress", "done"]
+    assert events[0][1]["stage"] == "intent"
+    assert events[1][1]["sources_count"] == 1
+    assert events[-1][1]["answer"] == "Antwort"
+    print("✅ SSE接口事件顺序正确")
+
+
+if __name__ == "__main__":
+    test_token_sink_scope()
+    test_summarize_streams_generation_tokens()
+    test_sse_endpoint_event_order()
+    print("\n🎉 所有测试通过！")
@@ -0,0 +1,114 @@
+"""
+两阶段总结并发提取测试
+验证阶段1并发提取的结果顺序、并发上限、失败占位和子问题耗时明细（不需要LLM服务）
+"""
+
+import asyncio
+import sys
+import os
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.graph.nodes.summarize_incremental_v2 import IncrementalSummarizeNodeV2
+from src.utils.performance_monitor import get_performance_monitor
+
+
+class FakeLLM:
+    """按提示词中的子问题返回结果，记录最大并发数和调用次数，可指定首次调用失败的子问题"""
+
+    def __init__(self, delay=0.05, fail_once=()):
+        self.delay = delay
+        self.fail_once = set(fail_once)
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def invoke(self, prompt):
+        with self.lock:
+            self.active += 1
+            self.calls += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            for marker in list(self.fail_once):
+                if marker in prompt:
+                    with self.lock:
+                        self.fail_once.discard(marker)
+                    raise RuntimeError("临时错误")
+            marker = next(m for m in ("Q1", "Q2", "Q3", "Q4", "Q5") if m in prompt)
+            return '{"answer": "%s"}' % marker
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def _results(n):
+    return [
+        {"question": f"Q{i}", "chunks": [{"text": f"Rede {i}", "metadata": {"year": "2020"}, "score": 0.9}]}
+        for i in range(1, n + 1)
+    ]
+
+
+def test_order_and_concurrency_limit():
+    """测试1: 并发提取保持顺序，且不超过并发上限"""
+    print("\n【测试1: 顺序与并发上限】")
+
+    llm = FakeLLM()
+    node = IncrementalSummarizeNodeV2(llm_client=llm, max_concurrency=2)
+    results = _results(5)
+    results.insert(2, {"question": "leer", "chunks": []})
+
+    extracted = node._extract_structured_info("Frage", results)
+
+    assert [item["sub_question"] for item in extracted] == ["Q1", "Q2", "Q3", "Q4", "Q5"]
+    assert [item["extracted_info"]["answer"] for item in extracted] == ["Q1", "Q2", "Q3", "Q4", "Q5"]
+    assert llm.max_active == 2
+    print("✅ 顺序与并发上限正确")
+
+
+def test_failure_placeholder_and_latency_breakdown():
+    """测试2: 失败的子问题不在节点层重试（由LLM客户端重试），保留错误占位，并记录每个子问题的耗时"""
+    print("\n【测试2: 失败占位与耗时明细】")
+
+    monitor = get_performance_monitor()
+    monitor.start_session()
+
+    llm = FakeLLM(delay=0.0, fail_once=("Q2",))
+    node = IncrementalSummarizeNodeV2(llm_client=llm, max_concurrency=3)
+    extracted = node._extract_structured_info("Frage", _results(3))
+
+    assert llm.calls == 3
+    assert "error" in extracted[1]["extracted_info"]
+    assert extracted[0]["extracted_info"] == {"answer": "Q1"}
+    assert extracted[2]["extracted_info"] == {"answer": "Q3"}
+
+    breakdown = monitor.get_session_report()["breakdowns"]["总结阶段1提取"]
+    assert set(breakdown) == {"子问题1", "子问题2", "子问题3"}
+    print("✅ 失败占位与耗时明细正确")
+
+
+def test_async_extraction_matches_sync():
+    """测试3: 异步提取与同步提取共用prompt和解析，失败同样保留占位"""
+    print("\n【测试3: 异步与同步一致】")
+
+    class AsyncFakeLLM(FakeLLM):
+        async def ainvoke(self, prompt):
+            return self.invoke(prompt)
+
+    llm = AsyncFakeLLM(delay=0.0, fail_once=("Q1",))
+    node = IncrementalSummarizeNodeV2(llm_client=llm, max_concurrency=2)
+    extracted = asyncio.run(node._aextract_structured_info("Frage", _results(3)))
+
+    assert llm.calls == 3
+    assert "error" in extracted[0]["extracted_info"]
+    assert extracted[1:] == node._extract_structured_info("Frage", _results(3))[1:]
+    print("✅ 异步与同步一致")
+
+
+if __name__ == "__main__":
+    test_order_and_concurrency_limit()
+    test_failure_placeholder_and_latency_breakdown()
+    test_async_extraction_matches_sync()
+    print("\n🎉 所有测试通过！")
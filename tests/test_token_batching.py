@@ -0,0 +1,61 @@
+"""
+按token长度分桶批处理测试
+验证批次不超过token预算、结果按输入顺序还原，以及padding效率高于按输入顺序固定分批
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from src.llm.batching import batching_stats, plan_token_batches, run_token_batches
+
+
+def test_batches_respect_budget():
+    """测试1: 每批补齐后的token数不超过预算，超长文本单独成批"""
+    print("\n【测试1: token预算】")
+
+    lengths = [12, 250, 40, 8000, 13, 260, 41, 900, 15]
+    batches = plan_token_batches(lengths, token_budget=1024, max_batch_size=3)
+
+    assert sorted(i for batch in batches for i in batch) == list(range(len(lengths)))
+    for batch in batches:
+        assert len(batch) <= 3
+        if len(batch) > 1:
+            assert len(batch) * max(lengths[i] for i in batch) <= 1024
+    assert [3] in batches
+    print("✅ token预算正确")
+
+
+def test_order_restored_and_padding_reduced():
+    """测试2: 结果按输入顺序返回，padding效率高于固定分批"""
+    print("\n【测试2: 顺序还原与padding效率】")
+
+    rng = np.random.default_rng(0)
+    lengths = [int(x) for x in rng.integers(15, 260, size=500)]
+    texts = [f"text-{i}" for i in range(500)]
+
+    encoded_batches = []
+
+    def encode(batch):
+        encoded_batches.append(len(batch))
+        return [text.upper() for text in batch]
+
+    results, stats = run_token_batches(texts, lengths, encode, token_budget=4096, max_batch_size=64)
+
+    assert results == [text.upper() for text in texts]
+    assert sum(encoded_batches) == 500 and stats.batches == len(encoded_batches)
+
+    fixed = batching_stats(lengths, [list(range(i, min(i + 32, 500))) for i in range(0, 500, 32)])
+    assert stats.real_tokens == fixed.real_tokens == sum(lengths)
+    assert stats.padding_efficiency > 0.9
+    assert fixed.padding_efficiency < 0.7
+    assert stats.to_dict()["padding_efficiency"] == stats.padding_efficiency
+    print(f"✅ padding效率: 分桶 {stats.padding_efficiency:.1%} / 固定分批 {fixed.padding_efficiency:.1%}")
+
+
+if __name__ == "__main__":
+    test_batches_respect_budget()
+    test_order_restored_and_padding_reduced()
+    print("\n🎉 所有测试通过！")
@@ -1,17 +1,28 @@
 """
 优化版Pinecone Metadata批量更新器
-使用多线程并发加速，预计5-10分钟完成17万向量的metadata更新
+逐页fetch向量，与原始JSON计算出的字段比较，只把确实变化的向量批量并发upsert回去（复用原向量值），
+不再对每个向量单独调用index.update
+
+用法:
+    python update_pinecone_metadata_optimized.py --dry-run          # 只统计需要修改的向量
+    python update_pinecone_metadata_optimized.py --years 2016 2017
 """
 
+import argparse
 import json
 import os
+import sys
 import time
-from typing import Dict, List
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Optional
 from pinecone import Pinecone
 from dotenv import load_dotenv
 from loguru import logger
 
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from src.vectordb.metadata_patcher import MetadataPatcher
+
 # 配置logger
 logger.remove()
 logger.add(
@@ -24,14 +35,14 @@ load_dotenv()
 
 
 class OptimizedMetadataUpdater:
-    """优化版Pinecone Metadata批量更新器（多线程）"""
+    """优化版Pinecone Metadata批量更新器（差异补丁 + 批量upsert）"""
 
-    def __init__(self, max_workers: int = 20):
+    def __init__(self, max_workers: int = 4):
         """
         初始化Pinecone连接
 
         Args:
-            max_workers: 并发线程数，默认20
+            max_workers: 同时在途的upsert请求数，默认4
         """
         api_key = os.getenv('PINECONE_VECTOR_DATABASE_API_KEY')
         self.pc = Pinecone(api_key=api_key)
@@ -41,7 +52,7 @@ class OptimizedMetadataUpdater:
         # 加载原始JSON数据缓存
         self.data_cache = {}  # {year: {text_id: metadata}}
 
-        logger.info(f"✅ Pinecone连接初始化成功 (并发线程: {max_workers})")
+        logger.info(f"✅ Pinecone连接初始化成功 (并发请求: {max_workers})")
 
     def load_year_data(self, year: int) -> Dict:
         """
@@ -94,185 +105,77 @@ class OptimizedMetadataUpdater:
 
         return f"{doc_id} | {speaker} | {year}-{month}-{day}"
 
-    def update_single_vector(
-        self,
-        vector_id: str,
-        original_text_id: str,
-        year: int
-    ) -> tuple[bool, str]:
+    def desired_fields(self, vector_id: str, current_metadata: Dict) -> Optional[Dict]:
         """
-        更新单个向量的metadata（线程安全）
+        根据原始JSON计算向量应有的4个字段（MetadataPatcher回调）
 
         Args:
-            vector_id: Pinecone向量ID
-            original_text_id: 原始文本ID
-            year: 年份
-
-        Returns:
-            (是否成功, 错误信息)
-        """
-        try:
-            # 查找原始metadata
-            year_data = self.data_cache.get(year, {})
-
-            if not year_data:
-                return False, f"年份{year}数据未加载"
-
-            if original_text_id not in year_data:
-                return False, f"未找到原始metadata: {original_text_id}"
-
-            original_meta = year_data[original_text_id]
-
-            # 构建新的metadata字段（只更新4个新字段）
-            new_fields = {
-                'month': original_meta.get('month', '01'),
-                'day': original_meta.get('day', '01'),
-                'id': original_meta.get('id', original_text_id),
-                'source_reference': self.format_source_reference(original_meta)
-            }
-
-            # 使用Pinecone的update方法更新metadata
-            self.index.update(
-                id=vector_id,
-                set_metadata=new_fields
-            )
-
-            return True, ""
-
-        except Exception as e:
-            return False, str(e)
-
-    def get_all_vectors_for_year(self, year: int) -> List[tuple]:
-        """
-        获取某年所有向量的ID和original_text_id (使用list API分页获取)
+            vector_id: Pinecone向量ID（以年份开头，例如 2016_xxx_0）
+            current_metadata: 向量当前的metadata
 
         Returns:
-            [(vector_id, original_text_id), ...]
+            期望字段；找不到原始metadata时为None
         """
-        logger.info(f"📊 查询{year}年的所有向量...")
+        original_text_id = current_metadata.get('original_text_id')
+        if not original_text_id:
+            return None
 
-        all_vectors = []
-
-        try:
-            # 使用list()方法分页获取所有向量ID
-            # list()返回一个generator，每次yield一个字符串列表（100个ID）
-            page_count = 0
+        year = int(vector_id.split('_', 1)[0])
+        original_meta = self.data_cache.get(year, {}).get(original_text_id)
+        if original_meta is None:
+            return None
 
-            for id_batch in self.index.list(prefix=f'{year}_'):
-                page_count += 1
-
-                # id_batch是一个字符串列表，例如: ['2016_xxx_0', '2016_xxx_1', ...]
-                if not id_batch:
-                    break
-
-                # Fetch这批向量的metadata
-                fetch_result = self.index.fetch(ids=id_batch)
-
-                # 提取original_text_id
-                for vec_id in id_batch:
-                    if vec_id in fetch_result.vectors:
-                        vec = fetch_result.vectors[vec_id]
-                        original_text_id = vec.metadata.get('original_text_id')
-
-                        if original_text_id:
-                            all_vectors.append((vec_id, original_text_id))
-
-                # 每10页显示一次进度
-                if page_count % 10 == 0:
-                    logger.info(f"  已获取 {page_count} 页，共 {len(all_vectors)} 个向量...")
-
-            logger.info(f"✅ {year}年共找到 {len(all_vectors)} 个向量 (分{page_count}页)")
-            return all_vectors
-
-        except Exception as e:
-            logger.error(f"❌ 查询{year}年向量失败: {str(e)}")
-            import traceback
-            logger.error(traceback.format_exc())
-            return []
+        return {
+            'month': original_meta.get('month', '01'),
+            'day': original_meta.get('day', '01'),
+            'id': original_meta.get('id', original_text_id),
+            'source_reference': self.format_source_reference(original_meta)
+        }
 
-    def update_year_metadata_parallel(self, year: int) -> Dict:
+    def update_year_metadata(self, year: int, dry_run: bool = False) -> Dict:
         """
-        使用多线程并发更新某一年所有向量的metadata
+        更新某一年的metadata：只写回与原始数据不一致的向量（复用向量值批量upsert）
 
         Args:
             year: 年份
+            dry_run: 只统计需要修改的向量，不写入
 
         Returns:
             统计信息
         """
         logger.info(f"\n{'='*60}")
-        logger.info(f"🔧 开始更新{year}年metadata (并发模式)")
+        logger.info(f"🔧 开始{'检查' if dry_run else '更新'}{year}年metadata")
         logger.info(f"{'='*60}")
 
-        start_time = time.time()
-
         # 1. 预加载该年份的原始数据
         year_data = self.load_year_data(year)
         if not year_data:
             logger.warning(f"⚠️ {year}年无数据，跳过")
-            return {"year": year, "updated": 0, "failed": 0, "total": 0}
-
-        # 2. 获取所有向量
-        vectors = self.get_all_vectors_for_year(year)
-        total_vectors = len(vectors)
-
-        if total_vectors == 0:
-            logger.warning(f"⚠️ {year}年无向量数据")
-            return {"year": year, "updated": 0, "failed": 0, "total": 0}
-
-        # 3. 多线程并发更新
-        logger.info(f"🚀 启动{self.max_workers}个并发线程进行更新...")
-
-        updated_count = 0
-        failed_count = 0
-
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # 提交所有任务
-            future_to_vector = {
-                executor.submit(
-                    self.update_single_vector,
-                    vector_id,
-                    original_text_id,
-                    year
-                ): (vector_id, original_text_id)
-                for vector_id, original_text_id in vectors
-            }
-
-            # 收集结果并显示进度
-            for i, future in enumerate(as_completed(future_to_vector), 1):
-                success, error_msg = future.result()
-
-                if success:
-                    updated_count += 1
-                else:
-                    failed_count += 1
-                    if failed_count <= 5:  # 只显示前5个错误
-                        vector_id, _ = future_to_vector[future]
-                        logger.debug(f"  更新失败 {vector_id}: {error_msg}")
-
-                # 每100个显示一次进度
-                if i % 100 == 0 or i == total_vectors:
-                    progress = i / total_vectors * 100
-                    logger.info(
-                        f"  进度: {i}/{total_vectors} ({progress:.1f}%) - "
-                        f"成功: {updated_count}, 失败: {failed_count}"
-                    )
-
-        elapsed_time = time.time() - start_time
-
-        logger.info(f"\n✅ {year}年metadata更新完成")
-        logger.info(f"   总向量数: {total_vectors}")
-        logger.info(f"   成功更新: {updated_count}")
-        logger.info(f"   失败: {failed_count}")
-        logger.info(f"   耗时: {elapsed_time:.1f}秒 ({elapsed_time/60:.1f}分钟)")
-        logger.info(f"   速度: {total_vectors/elapsed_time:.1f} 向量/秒")
+            return {"year": year, "total": 0, "changed": 0, "updated": 0, "failed": 0, "time": 0.0}
+
+        # 2. 逐页fetch、比较，只upsert变化的向量
+        patcher = MetadataPatcher(
+            self.index,
+            desired_metadata=self.desired_fields,
+            max_in_flight=self.max_workers,
+            name=f"pinecone-{year}"
+        )
+        report = patcher.patch_prefix(f'{year}_', dry_run=dry_run)
+
+        logger.info(f"\n✅ {year}年metadata{'检查' if dry_run else '更新'}完成")
+        logger.info(f"   总向量数: {report.scanned}")
+        logger.info(f"   需要修改: {report.changed} (未变化: {report.unchanged}, 缺少原始数据: {report.skipped})")
+        logger.info(f"   成功更新: {report.patched}")
+        logger.info(f"   失败: {report.failed}")
+        logger.info(f"   耗时: {report.elapsed:.1f}秒 ({report.elapsed/60:.1f}分钟)")
 
         return {
             "year": year,
-            "total": total_vectors,
-            "updated": updated_count,
-            "failed": failed_count,
-            "time": elapsed_time
+            "total": report.scanned,
+            "changed": report.changed,
+            "updated": report.patched,
+            "failed": report.failed,
+            "time": report.elapsed
         }
 
     def verify_update(self, year: int, sample_size: int = 5):
@@ -326,27 +229,30 @@ class OptimizedMetadataUpdater:
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="Pinecone Metadata批量更新（只修改变化的向量）")
+    parser.add_argument("--years", nargs="*", type=int,
+                        default=[2015, 2016, 2017, 2018, 2019, 2020, 2021, 2022, 2023, 2024])
+    parser.add_argument("--dry-run", action="store_true", help="只统计需要修改的向量，不写入")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="同时在途的upsert请求数")
+    args = parser.parse_args()
+
     logger.info("="*60)
     logger.info("Pinecone Metadata批量更新工具（优化版）")
     logger.info("="*60)
-    logger.info("\n功能: 使用多线程并发更新metadata")
-    logger.info("优势: 5-10分钟完成17万向量更新\n")
-
-    # 创建更新器（20个并发线程）
-    updater = OptimizedMetadataUpdater(max_workers=20)
+    logger.info("\n功能: 与原始数据比较，只批量upsert变化的向量")
+    logger.info(f"模式: {'dry-run（不写入）' if args.dry_run else '写入'}\n")
 
-    # 要更新的年份
-    years_to_update = [2015, 2016, 2017, 2018, 2019, 2020, 2021, 2022, 2023, 2024]
+    updater = OptimizedMetadataUpdater(max_workers=args.max_in_flight)
 
     total_start = time.time()
     all_stats = []
 
-    for year in years_to_update:
-        stats = updater.update_year_metadata_parallel(year)
+    for year in args.years:
+        stats = updater.update_year_metadata(year, dry_run=args.dry_run)
         all_stats.append(stats)
 
         # 验证前3年的更新结果
-        if year <= 2017:
+        if not args.dry_run and stats['updated'] > 0 and year <= 2017:
             # 等待3秒让Pinecone同步
             logger.info(f"\n⏳ 等待3秒让Pinecone同步数据...")
             time.sleep(3)
@@ -356,24 +262,29 @@ def main():
 
     # 总结
     logger.info(f"\n{'='*60}")
-    logger.info(f"📊 所有年份更新完成")
+    logger.info(f"📊 所有年份{'检查' if args.dry_run else '更新'}完成")
     logger.info(f"{'='*60}\n")
 
+    total_vectors = sum(s['total'] for s in all_stats)
+    total_changed = sum(s['changed'] for s in all_stats)
     total_updated = sum(s['updated'] for s in all_stats)
     total_failed = sum(s['failed'] for s in all_stats)
-    total_vectors = sum(s['total'] for s in all_stats)
 
     logger.info(f"总向量数: {total_vectors:,}")
+    logger.info(f"需要修改: {total_changed:,}")
     logger.info(f"成功更新: {total_updated:,}")
     logger.info(f"失败: {total_failed:,}")
-    logger.info(f"成功率: {total_updated/total_vectors*100:.2f}%")
     logger.info(f"总耗时: {total_time:.1f}秒 ({total_time/60:.1f}分钟)")
-    logger.info(f"平均速度: {total_vectors/total_time:.1f} 向量/秒")
     logger.info(f"\n年份详情:")
 
     for stats in all_stats:
-        logger.info(f"  {stats['year']}: {stats['updated']}/{stats['total']} 成功 ({stats['time']:.1f}秒)")
+        logger.info(
+            f"  {stats['year']}: 需要修改 {stats['changed']}/{stats['total']}, "
+            f"成功 {stats['updated']}, 失败 {stats['failed']} ({stats['time']:.1f}秒)"
+        )
+
+    return 1 if total_failed else 0
 
 
 if __name__ == "__main__":
-    main()
+    exit(main())